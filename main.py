@@ -1,105 +1,34 @@
 """Main module"""
+from util import startup_timer  # noqa: F401, first import, so the start is timed from here
 import logging
-import sys
-import threading
+import os
 
 from prometheus_flask_exporter.multiprocess import GunicornPrometheusMetrics
-from service.blaze_service import BlazeService
-from service.mail_service import MailService
 from service.manual_run_service import create_api
-from service.miabis_blaze_service import MiabisBlazeService
-from util.config import get_blaze_url, get_miabis_on_fhir, get_miabis_blaze_url, get_new_file_period_days, get_records_dir_path, get_email_receiver, get_smtp_host, get_smtp_port
+from service.sync_job_queue import SyncJobQueue
+from util.config import get_failed_records_max, get_miabis_on_fhir, get_sync_job_queue_path, get_sync_state_dir
 from util.custom_logger import setup_logger
-from util.http_util import is_endpoint_available
+from util.failed_record_store import FAILED_RECORDS_FILE_NAME, FailedRecordStore
+from util.metrics import record_startup_stage
 from service.configuration_info_service import register_details_routes
-from util.service_preparation_utils import prepare_services, prepare_services_miabis
-from util.metrics import start_resource_count_scheduler, sync_in_progress
 
-BLAZE_URL = get_blaze_url()
-MIABIS_BLAZE_URL = get_miabis_blaze_url()
 MIABIS_ON_FHIR = get_miabis_on_fhir()
 
-sync_in_progress.labels(service='blaze').set(0)
-if MIABIS_ON_FHIR:
-    sync_in_progress.labels(service='miabis').set(0)
-
 setup_logger()
 logger = logging.getLogger(__name__)
-logger.info("Starting FHIR_Module...")
-
-# Prepare standard FHIR services
-services = prepare_services()
-blaze_service = BlazeService(
-    patient_service=services.patient_service,
-    condition_service=services.condition_service,
-    sample_service=services.sample_service,
-    blaze_url=BLAZE_URL,
-    sample_collection_repository=services.sample_collection_repository
-)
-blaze_services_initialized = services.patient_service is not None
-
-if blaze_services_initialized:
-    logger.info("Standard FHIR services initialized successfully.")
-else:
-    logger.warning("Standard FHIR services not initialized: parsing map configuration is missing or invalid.")
-    logger.info("API will remain available. Services will retry initialization on next sync.")
+logger.info("Starting FHIR_Module API...")
+record_startup_stage("api", "imports")
 
-# Prepare MIABIS services if enabled
-miabis_blaze_service = None
-miabis_services_initialized = False
-if MIABIS_ON_FHIR:
-    miabis_services = prepare_services_miabis()
-    miabis_blaze_service = MiabisBlazeService(
-        patient_service=miabis_services.patient_service,
-        sample_service=miabis_services.sample_service,
-        blaze_url=MIABIS_BLAZE_URL,
-        sample_collection_repository=miabis_services.sample_collection_repository,
-        biobank_repository=miabis_services.biobank_repository
-    )
-    miabis_services_initialized = miabis_services.patient_service is not None
-    
-    if miabis_services_initialized:
-        logger.info("MIABIS services initialized successfully.")
-    else:
-        logger.warning("MIABIS services not initialized: parsing map configuration is missing or invalid.")
-        logger.info("API will remain available. Services will retry initialization on next sync.")
-
-mail_service = MailService(records_path=get_records_dir_path(), new_file_period=get_new_file_period_days(),
-                           smtp_host=get_smtp_host(), smtp_port=get_smtp_port(), email_receiver=get_email_receiver())
-
-if (MIABIS_ON_FHIR and miabis_blaze_service is not None):
-    app = create_api(blaze_service, miabis_blaze_service)
-else:
-    app = create_api(blaze_service)
+# Syncs, schedulers and deletes run in the sync worker process (worker.py), the API only queues jobs for it
+job_queue = SyncJobQueue(get_sync_job_queue_path())
+failed_records = FailedRecordStore(os.path.join(get_sync_state_dir(), FAILED_RECORDS_FILE_NAME),
+                                   get_failed_records_max())
+app = create_api(job_queue, MIABIS_ON_FHIR, failed_records)
 
 register_details_routes(app)
 
 metrics = GunicornPrometheusMetrics(app)
 metrics.info('app_info', 'Application info', version='1.0.0')
 
-if is_endpoint_available(endpoint_url=BLAZE_URL, wait_time=10, max_attempts=5):
-    if MIABIS_ON_FHIR:
-        if not is_endpoint_available(endpoint_url=MIABIS_BLAZE_URL, wait_time=10, max_attempts=5):
-            logger.error("Exiting FHIR_Module.")
-            sys.exit()
-    # validator_factory = get_validator_factory()
-    # validator = validator_factory.create_validator()
-    # try:
-    #     validator.validate()
-    # except (NoFilesProvidedException, NonexistentAttributeParsingMapException, WrongParsingMapException):
-    #     logger.error("Incorrect parsing map and/or file structure. Exiting FHIR_module.")
-    #     sys.exit()
-    if blaze_services_initialized:
-        blaze_service.start_scheduler()
-
-    if MIABIS_ON_FHIR and miabis_services_initialized and miabis_blaze_service is not None:
-        miabis_blaze_service.start_scheduler()
-    
-    # Start periodic FHIR resource count updates for Prometheus
-    start_resource_count_scheduler(interval_seconds=30)
-        
-    scheduler_mail_thread = threading.Thread(target=mail_service.run_scheduler, daemon=True)
-    scheduler_mail_thread.start()
-else:
-    logger.error("Exiting FHIR_Module.")
-    sys.exit()
+# The API does not wait for the Blaze stores, they are probed by the sync worker
+record_startup_stage("api", "ready")
@@ -7,18 +7,24 @@ import fhirclient.models.condition as fhir_condition
 import fhirclient.models.fhirreference
 import fhirclient.models.meta
 from datetime import datetime
-import simple_icd_10 as icd10
 from fhirclient.models.fhirdatetime import FHIRDateTime
 
+from util.lazy_import import LazyImport
+from util.string_util import intern_value
+
+# the ICD-10 tables take a tenth of a second to load, they are loaded by the first validated code
+icd10 = LazyImport("simple_icd_10")
+
 
 class Condition:
     """Class representing a patient's medical condition using ICD-10 coding."""
+    __slots__ = ("_icd_10_code", "_patient_id", "_diagnosis_datetime")
 
     def __init__(self, icd_10_code: str, patient_id: str, diagnosis_datetime: datetime = None):
         if not icd10.is_valid_item(icd_10_code):
             raise TypeError(f"The provided string ({icd_10_code}) is not a valid ICD-10 code.")
-        self._icd_10_code = icd_10_code
-        self._patient_id = patient_id
+        self._icd_10_code = intern_value(icd_10_code)
+        self._patient_id = intern_value(patient_id)
         if diagnosis_datetime is not None and not isinstance(diagnosis_datetime, datetime):
             raise TypeError(f"diagnosis_datetime is not a datetime object, it is {type(diagnosis_datetime)}")
         self._diagnosis_datetime = diagnosis_datetime
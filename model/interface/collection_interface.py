@@ -2,6 +2,8 @@ import abc
 
 
 class CollectionInterface:
+    __slots__ = ()
+
     @property
     @abc.abstractmethod
     def identifier(self):
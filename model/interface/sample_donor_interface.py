@@ -6,6 +6,8 @@ from miabis_model import Gender
 
 
 class SampleDonorInterface:
+    __slots__ = ()
+
 
     @property
     @abc.abstractmethod
@@ -5,6 +5,8 @@ from miabis_model import StorageTemperature
 
 
 class SampleInterface:
+    __slots__ = ()
+
 
     @property
     @abc.abstractmethod
@@ -3,6 +3,7 @@ from datetime import datetime
 from miabis_model import Sample, StorageTemperature, Condition
 
 from model.interface.sample_interface import SampleInterface
+from util.string_util import intern_value
 
 
 class SampleMiabis(Sample, SampleInterface):
@@ -11,7 +12,12 @@ class SampleMiabis(Sample, SampleInterface):
                  diagnoses_with_observed_datetime: list[tuple[str, datetime | None]], material_type: str = None,
                  sample_collection_id: str = None,
                  collected_datetime: datetime = None, storage_temperature: StorageTemperature = None):
-        super().__init__(identifier, donor_identifier=donor_id, material_type=material_type,
+        # the MIABIS on FHIR model keeps its attributes in an instance dict, only the repeated values are shared
+        donor_id = intern_value(donor_id)
+        if diagnoses_with_observed_datetime is not None:
+            diagnoses_with_observed_datetime = [(intern_value(diagnosis), observed_datetime)
+                                                for diagnosis, observed_datetime in diagnoses_with_observed_datetime]
+        super().__init__(identifier, donor_identifier=donor_id, material_type=intern_value(material_type),
                          collected_datetime=collected_datetime, storage_temperature=storage_temperature,
                          diagnoses_with_observed_datetime=diagnoses_with_observed_datetime)
         self.sample_collection_id = sample_collection_id
@@ -23,7 +29,7 @@ class SampleMiabis(Sample, SampleInterface):
 
     @sample_collection_id.setter
     def sample_collection_id(self, collection_id: str):
-        self._sample_collection_id = collection_id
+        self._sample_collection_id = intern_value(collection_id)
 
     @property
     def diagnoses(self) -> list[str]:
@@ -2,7 +2,6 @@
 from datetime import datetime
 from typing import List
 
-import simple_icd_10 as icd10
 from fhirclient.models.codeableconcept import CodeableConcept
 from fhirclient.models.coding import Coding
 from fhirclient.models.extension import Extension
@@ -14,10 +13,17 @@ from fhirclient.models.specimen import Specimen, SpecimenCollection
 
 from model.interface.sample_interface import SampleInterface
 from model.storage_temperature import StorageTemperature
+from util.lazy_import import LazyImport
+from util.string_util import intern_value
+
+# the ICD-10 tables take a tenth of a second to load, they are loaded by the first validated code
+icd10 = LazyImport("simple_icd_10")
 
 
 class Sample(SampleInterface):
     """Class representing a biological specimen."""
+    __slots__ = ("_identifier", "_donor_id", "_material_type", "_diagnoses", "_sample_collection_id",
+                 "_collected_datetime", "_storage_temperature")
 
     def __init__(self, identifier: str, donor_id: str, material_type: str = None, diagnoses: list[str] = None,
                  sample_collection_id: str = None,
@@ -32,15 +38,15 @@ class Sample(SampleInterface):
         :param storage_temperature: Temperature at which the sample is stored
         """
         self._identifier: str = identifier
-        self._donor_id: str = donor_id
-        self._material_type: str = material_type
+        self._donor_id: str = intern_value(donor_id)
+        self._material_type: str = intern_value(material_type)
         self.diagnoses = []
         if diagnoses is not None:
             for diagnosis in diagnoses:
                 if diagnosis is not None and not icd10.is_valid_item(diagnosis):
                     raise TypeError(f"The provided string {diagnosis} is not a valid ICD-10 code.")
-            self._diagnoses: list[str] = diagnoses
-        self._sample_collection_id: str = sample_collection_id
+            self._diagnoses: list[str] = [intern_value(diagnosis) for diagnosis in diagnoses]
+        self._sample_collection_id: str = intern_value(sample_collection_id)
         self._collected_datetime: datetime = collected_datetime
         self._storage_temperature: StorageTemperature = storage_temperature
 
@@ -62,7 +68,7 @@ class Sample(SampleInterface):
     @material_type.setter
     def material_type(self, sample_type: str):
         """Sample type. E.g. tissue, plasma..."""
-        self._material_type = sample_type
+        self._material_type = intern_value(sample_type)
 
     @property
     def diagnoses(self) -> list[str]:
@@ -75,7 +81,7 @@ class Sample(SampleInterface):
         for diagnosis in icd_10_codes:
             if not icd10.is_valid_item(diagnosis):
                 raise TypeError(f"The provided string ({diagnosis}) is not a valid ICD-10 code.")
-        self._diagnoses = icd_10_codes
+        self._diagnoses = [intern_value(diagnosis) for diagnosis in icd_10_codes]
 
     @property
     def sample_collection_id(self) -> str:
@@ -84,7 +90,7 @@ class Sample(SampleInterface):
 
     @sample_collection_id.setter
     def sample_collection_id(self, sample_collection_id: str):
-        self._sample_collection_id = sample_collection_id
+        self._sample_collection_id = intern_value(sample_collection_id)
 
     @property
     def collected_datetime(self) -> datetime:
@@ -211,5 +217,5 @@ class Sample(SampleInterface):
         current_diagnoses = list(map(self.__diagnosis_with_period, self.diagnoses))
         for diagnosis in new_diagnoses:
             if self.__diagnosis_with_period(diagnosis) not in current_diagnoses:
-                self.diagnoses.append(diagnosis)
+                self.diagnoses.append(intern_value(diagnosis))
 
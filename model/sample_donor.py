@@ -12,6 +12,7 @@ from model.interface.sample_donor_interface import SampleDonorInterface
 
 class SampleDonor(SampleDonorInterface):
     """Class representing a sample donor/patient"""
+    __slots__ = ("_identifier", "_gender", "_date_of_birth")
 
     def __init__(self, identifier: str, gender: Gender = None, birth_date: datetime = None):
         if not isinstance(identifier, str):
@@ -1,7 +1,7 @@
 from collections.abc import Callable
-import csv
 import logging
 import os
+from contextlib import closing
 from datetime import datetime
 from typing import Generator
 
@@ -10,6 +10,8 @@ from dateutil.parser import ParserError
 
 from model.condition import Condition
 from persistence.condition_repository import ConditionRepository
+from persistence.csv_row_source import CsvRowSource
+from persistence.records_catalog import list_record_files
 from util.custom_logger import setup_logger
 from util.sample_util import extract_all_diagnosis
 from util.config import get_csv_separator
@@ -19,9 +21,13 @@ logger = logging.getLogger()
 
 class ConditionCsvRepository(ConditionRepository):
     """ Class for handling condition persistence in Csv files """
+    _file_extension = ".csv"
 
-    def __init__(self, records_path: str, separator: str, condition_parsing_map: dict):
+    def __init__(self, records_path: str, separator: str, condition_parsing_map: dict,
+                 row_source: CsvRowSource = None):
         super().__init__(records_path)
+        self._row_source = row_source if row_source is not None else CsvRowSource(cache_rows=False)
+        self._row_source.register_consumer()
         self._dir_path = records_path
         self.separator = separator
         self._condition_parsing_map = condition_parsing_map
@@ -29,10 +35,8 @@ class ConditionCsvRepository(ConditionRepository):
         logger.debug(f"Loaded the following condition parsing map {condition_parsing_map}")
 
     def get_all(self) -> Generator[Condition, None, None]:
-        with os.scandir(self._dir_path) as entries:
-            for dir_entry in entries:
-                if dir_entry.name.lower().endswith(".csv"):
-                    yield from self.__extract_condition_from_csv_file(dir_entry)
+        for dir_entry in list_record_files(self._dir_path, self._file_extension):
+            yield from self.__extract_condition_from_csv_file(dir_entry)
 
     def update_mappings(self) -> None:
         """Update the mappings for the repository."""
@@ -40,12 +44,11 @@ class ConditionCsvRepository(ConditionRepository):
         self._separator = get_csv_separator()
 
     def _get_supported_extensions(self) -> tuple[str, Callable]:
-        return ".csv", self.__validate_conditions_from_csv_file  
+        return self._file_extension, self.__validate_conditions_from_csv_file  
 
     def __extract_condition_from_csv_file(self, dir_entry: os.DirEntry) -> Condition:
         try:
-            with open(dir_entry, "r") as file_content:
-                reader = csv.reader(file_content, delimiter=self.separator)
+            with closing(self._row_source.read(dir_entry.path, self.separator)) as reader:
                 self._fields_dict = {}
                 fields = next(reader)
                 for i, field in enumerate(fields):
@@ -68,8 +71,7 @@ class ConditionCsvRepository(ConditionRepository):
     def __validate_conditions_from_csv_file(self, dir_entry: os.DirEntry) ->  list[str]:
         errors = []
         try:
-            with open(dir_entry, "r") as file_content:
-                reader = csv.reader(file_content, delimiter=self.separator)
+            with closing(self._row_source.read(dir_entry.path, self.separator)) as reader:
                 self._fields_dict = {}
                 fields = next(reader)
                 for i, field in enumerate(fields):
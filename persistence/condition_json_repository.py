@@ -8,8 +8,12 @@ from dateutil import parser as date_parser
 from dateutil.parser import ParserError
 
 from model.condition import Condition
+from persistence.json_util import parse_json_file
+from persistence.parsed_file_source import ParsedFileSource
 from persistence.condition_repository import ConditionRepository
+from persistence.records_catalog import list_record_files
 from util.custom_logger import setup_logger
+from util.record_file_util import open_record_file
 from util.sample_util import extract_all_diagnosis
 
 setup_logger()
@@ -19,16 +23,16 @@ logger = logging.getLogger()
 class ConditionJsonRepository(ConditionRepository):
     """ Class for handling condition persistence in Csv files """
 
-    def __init__(self, records_path: str, condition_parsing_map: dict):
+    def __init__(self, records_path: str, condition_parsing_map: dict, file_source: ParsedFileSource = None):
         super().__init__(records_path)
+        self._file_source = file_source if file_source is not None else ParsedFileSource(cache_files=False)
+        self._file_source.register_consumer()
         self._sample_parsing_map = condition_parsing_map
         logger.debug(f"Loaded the following condition parsing map {condition_parsing_map}")
 
     def get_all(self) -> Generator[Condition, None, None]:
-        with os.scandir(self._dir_path) as entries:
-            for dir_entry in entries:
-                if dir_entry.name.lower().endswith(".json"):
-                    yield from self.__extract_condition_from_json_file(dir_entry)
+        for dir_entry in list_record_files(self._dir_path, ".json"):
+            yield from self.__extract_condition_from_json_file(dir_entry)
 
     def update_mappings(self) -> None:
         """Update the mappings for the repository."""
@@ -39,45 +43,43 @@ class ConditionJsonRepository(ConditionRepository):
     
     def __extract_condition_from_json_file(self, dir_entry: os.DirEntry) -> Condition:
         try:
-            with open(dir_entry, "r", encoding="utf-8-sig") as json_file:
-                try:
-                    conditions_json = json.load(json_file)
-                except JSONDecodeError:
-                    logger.error("Biobank file does not have a correct JSON format. Exiting...")
-                    return
-
-                for condition_json in conditions_json:
-                    try:
-                        diagnosis_field = condition_json.get(self._sample_parsing_map.get("icd-10_code"))
-                        if diagnosis_field is None:
-                            logger.error("No ICD-10 code field found in the csv file. Skipping...")
-                            continue
-                        diagnoses = extract_all_diagnosis(diagnosis_field)
-                        patient_id = str(condition_json.get(self._sample_parsing_map.get("patient_id")))
-                        diagnosis_datetime = condition_json.get(self._sample_parsing_map.get("diagnosis_date"))
-                        if diagnosis_datetime is not None:
-                            try:
-                                diagnosis_datetime = date_parser.parse(diagnosis_datetime)
-                                diagnosis_datetime = diagnosis_datetime.replace(hour=0, minute=0, second=0)
-                            except ParserError:
-                                logger.info(
-                                    f"Error parsing date for condition for patient with id {patient_id} "
-                                    f"while parsing diagnosis datetime with value {diagnosis_datetime}. "
-                                    f"Please make sure the date is in a valid format."
-                                )
-                                return
-                        for diagnosis in diagnoses:
-                            condition = Condition(patient_id=patient_id, icd_10_code=diagnosis,
-                                                  diagnosis_datetime=diagnosis_datetime)
-                            yield condition
-                    except TypeError as err:
-                        logger.error(f"{err} Skipping...")
-                        continue
+            conditions_json = self._file_source.parse(dir_entry, parse_json_file)
+        except JSONDecodeError:
+            logger.error("Biobank file does not have a correct JSON format. Exiting...")
+            return
         except OSError as e:
             logger.debug(f"Error while opening file {dir_entry.name}: {e}")
             logger.info(f"Error while opening file {dir_entry.name} [Skipping...]")
             return
 
+        for condition_json in conditions_json:
+            try:
+                diagnosis_field = condition_json.get(self._sample_parsing_map.get("icd-10_code"))
+                if diagnosis_field is None:
+                    logger.error("No ICD-10 code field found in the csv file. Skipping...")
+                    continue
+                diagnoses = extract_all_diagnosis(diagnosis_field)
+                patient_id = str(condition_json.get(self._sample_parsing_map.get("patient_id")))
+                diagnosis_datetime = condition_json.get(self._sample_parsing_map.get("diagnosis_date"))
+                if diagnosis_datetime is not None:
+                    try:
+                        diagnosis_datetime = date_parser.parse(diagnosis_datetime)
+                        diagnosis_datetime = diagnosis_datetime.replace(hour=0, minute=0, second=0)
+                    except ParserError:
+                        logger.info(
+                            f"Error parsing date for condition for patient with id {patient_id} "
+                            f"while parsing diagnosis datetime with value {diagnosis_datetime}. "
+                            f"Please make sure the date is in a valid format."
+                        )
+                        return
+                for diagnosis in diagnoses:
+                    condition = Condition(patient_id=patient_id, icd_10_code=diagnosis,
+                                          diagnosis_datetime=diagnosis_datetime)
+                    yield condition
+            except TypeError as err:
+                logger.error(f"{err} Skipping...")
+                continue
+
     def __validate_json_diagnosis_field(self, condition_json: dict, validation_errors: list) -> str | None:
         """Extract and validate the diagnosis field from JSON."""
         diagnosis_field = condition_json.get(self._sample_parsing_map.get("icd-10_code"))
@@ -120,7 +122,7 @@ class ConditionJsonRepository(ConditionRepository):
     def __validate_conditions_from_json_file(self, dir_entry: os.DirEntry) -> list[str]:
         errors = []
         try:
-            with open(dir_entry, "r", encoding="utf-8-sig") as json_file:
+            with open_record_file(dir_entry, "r", encoding="utf-8-sig") as json_file:
                 try:
                     conditions_json = json.load(json_file)
                 except JSONDecodeError:
@@ -0,0 +1,31 @@
+import os
+from typing import Callable
+
+from persistence.condition_csv_repository import ConditionCsvRepository
+from persistence.parquet_row_source import ParquetRowSource, parquet_columns, validate_parquet_columns
+
+
+class ConditionParquetRepository(ConditionCsvRepository):
+    """Class for handling condition persistence in Parquet files. Rows are read from the column batches
+    of the files and parsed with the same parsing map as the Csv files."""
+    _file_extension = ".parquet"
+
+    def __init__(self, records_path: str, condition_parsing_map: dict, row_source: ParquetRowSource = None):
+        if row_source is None:
+            row_source = ParquetRowSource(parquet_columns(condition_parsing_map))
+        super().__init__(records_path=records_path, separator=None, condition_parsing_map=condition_parsing_map,
+                         row_source=row_source)
+
+    def update_mappings(self) -> None:
+        """Update the mappings for the repository."""
+        super().update_mappings()
+        self._row_source = ParquetRowSource(parquet_columns(self._condition_parsing_map))
+
+    def _get_supported_extensions(self) -> tuple[str, Callable]:
+        return self._file_extension, self.__validate_condition_parquet_schema
+
+    def __validate_condition_parquet_schema(self, dir_entry: os.DirEntry) -> list[str]:
+        return validate_parquet_columns(dir_entry,
+                                        {"icd-10_code": self._condition_parsing_map.get("icd-10_code"),
+                                         "patient_id": self._condition_parsing_map.get("patient_id")},
+                                        "Condition")
@@ -1,6 +1,5 @@
 """Module for handling condition persistence"""
 import abc
-import os
 from typing import Callable, Generator
 import logging
 
@@ -8,6 +7,7 @@ from model.condition import Condition
 from exception.wrong_parsing_map import WrongParsingMapException
 from util.custom_logger import setup_logger
 from util.config import get_records_dir_path, get_parsing_map, MAX_VALIDATION_FILES
+from persistence.records_catalog import list_record_files
 
 setup_logger()
 logger = logging.getLogger()
@@ -51,15 +51,8 @@ class ConditionRepository(abc.ABC):
         all_errors: list[str] = []
         
         ext, validation_method = self._get_supported_extensions()
-        files_to_validate = []
         max_files = MAX_VALIDATION_FILES if validate_all else 1
-        
-        with os.scandir(self._dir_path) as entries:
-            for entry in entries:
-                if entry.name.lower().endswith(ext):
-                    files_to_validate.append(entry)
-                    if len(files_to_validate) >= max_files:
-                        break
+        files_to_validate = list_record_files(self._dir_path, ext)[:max_files]
         
         if not files_to_validate:
             error_message = f"No {ext} files found in directory {self._dir_path}"
@@ -8,8 +8,10 @@ from dateutil.parser import ParserError
 from glom import glom
 
 from model.condition import Condition
+from persistence.parsed_file_source import ParsedFileSource
 from persistence.condition_repository import ConditionRepository
 from persistence.xml_util import parse_xml_file, WrongXMLFormatError
+from persistence.records_catalog import list_record_files
 from util.custom_logger import setup_logger
 
 setup_logger()
@@ -19,16 +21,16 @@ logger = logging.getLogger()
 class ConditionXMLRepository(ConditionRepository):
     """Class for handling condition persistence in XML files"""
 
-    def __init__(self, records_path: str, condition_parsing_map: dict):
+    def __init__(self, records_path: str, condition_parsing_map: dict, file_source: ParsedFileSource = None):
         super().__init__(records_path)
+        self._file_source = file_source if file_source is not None else ParsedFileSource(cache_files=False)
+        self._file_source.register_consumer()
         self._sample_parsing_map = condition_parsing_map
         logger.debug(f"Loaded the following condition parsing map {condition_parsing_map}")
 
     def get_all(self) -> Generator[Condition, None, None]:
-        with os.scandir(self._dir_path) as entries:
-            for dir_entry in entries:
-                if dir_entry.name.lower().endswith(".xml"):
-                    yield from self.__extract_condition_from_xml_file(dir_entry)
+        for dir_entry in list_record_files(self._dir_path, ".xml"):
+            yield from self.__extract_condition_from_xml_file(dir_entry)
 
     def update_mappings(self) -> None:
         """Update the mappings for the repository."""
@@ -40,7 +42,7 @@ class ConditionXMLRepository(ConditionRepository):
     def __extract_condition_from_xml_file(self, dir_entry: os.DirEntry) -> Condition:
         """Extracts Condition from an XML file"""
         try:
-            file_content = parse_xml_file(dir_entry)
+            file_content = self._file_source.parse(dir_entry, parse_xml_file)
         except WrongXMLFormatError:
             logger.info(f"Wrong XLM format of file: {dir_entry.name} [Skipping...]")
             return
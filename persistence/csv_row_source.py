@@ -0,0 +1,289 @@
+"""Module for sharing parsed CSV rows between repositories"""
+import csv
+import logging
+import os
+import pickle
+import shutil
+import tempfile
+import threading
+import weakref
+from typing import Callable, Generator, Optional
+
+from util.custom_logger import setup_logger
+from util.record_file_util import open_record_file
+
+setup_logger()
+logger = logging.getLogger()
+
+# Number of rows pickled together when a file is spilled to disk
+ROW_BATCH_SIZE = 1000
+# Rows of all cached files kept in memory together, the files read once the budget is used up are spilled to disk
+MAX_ROWS_IN_MEMORY = 50000
+# Number of rows parsed at once by the reader which is furthest ahead in a file
+PARSE_CHUNK_SIZE = 100
+
+
+class _SharedCsvFile:
+    """Rows of a single CSV file, parsed once and shared by all of its readers. The file is parsed only as far as
+    the reader furthest ahead needs it, so no reader waits for another one to finish the file. The parsed rows are
+    kept for the readers behind it: in memory as long as the in-memory budget shared by all cached files allows it,
+    the whole file is moved to a spill file once it does not."""
+
+    def __init__(self, path: str, separator: str, spill_path_factory: Callable[[], str],
+                 reserve_rows: Callable[[int], bool], release_rows: Callable[[int], None]):
+        """
+        :param path: path of the csv file
+        :param separator: csv delimiter
+        :param spill_path_factory: returns a new path of a spill file
+        :param reserve_rows: reserves rows of the shared in-memory budget, returns False if they do not fit in it
+        :param release_rows: returns rows to the shared in-memory budget
+        """
+        self._path = path
+        self._separator = separator
+        self._spill_path_factory = spill_path_factory
+        self._reserve_rows = reserve_rows
+        self._release_rows = release_rows
+        self._file = None
+        self._parser = None
+        self._complete = False
+        self._batches: list[list[list[str]]] = []
+        self._current_batch: list[list[str]] = []
+        self._rows_in_memory = 0
+        self._spill_path: Optional[str] = None
+        self._spill_file = None
+        self._spill_reader = None
+        self._spill_offsets: list[int] = []
+        self._lock = threading.Lock()
+        self.reads = 0
+        self.active_readers = 0
+
+    def rows(self) -> Generator[list[str], None, None]:
+        """
+        Yields all rows of the file, parsing it further if this reader is ahead of the others.
+        :raises OSError: if the file cannot be opened.
+        """
+        position = (0, 0)
+        while (next_rows := self.__next_rows(position)) is not None:
+            rows, position = next_rows
+            yield from rows
+
+    def discard(self) -> None:
+        with self._lock:
+            self.__close_parser()
+            for spill_handle in (self._spill_file, self._spill_reader):
+                if spill_handle is not None:
+                    spill_handle.close()
+            self._spill_file = self._spill_reader = None
+            self._batches = []
+            self._current_batch = []
+            self.__release_memory()
+            if self._spill_path is not None and os.path.exists(self._spill_path):
+                os.remove(self._spill_path)
+
+    def __next_rows(self, position: tuple[int, int]) -> Optional[tuple[list[list[str]], tuple[int, int]]]:
+        """
+        Rows following a position (index of a batch, index of a row in the batch) of a reader.
+        :return: the rows and the position after them, None at the end of the file
+        """
+        batch_index, row_index = position
+        with self._lock:
+            while True:
+                if batch_index < self.__stored_batches():
+                    return self.__load_batch(batch_index)[row_index:], (batch_index + 1, 0)
+                if row_index < len(self._current_batch):
+                    return self._current_batch[row_index:], (batch_index, len(self._current_batch))
+                if self._complete:
+                    return None
+                self.__parse_chunk()
+
+    def __parse_chunk(self) -> None:
+        if self._parser is None:
+            self._file = open_record_file(self._path, "r")
+            self._parser = csv.reader(self._file, delimiter=self._separator)
+        for _ in range(PARSE_CHUNK_SIZE):
+            row = next(self._parser, None)
+            if row is None:
+                if self._current_batch:
+                    self.__store_batch()
+                self.__close_parser()
+                self._complete = True
+                return
+            self._current_batch.append(row)
+            if len(self._current_batch) >= ROW_BATCH_SIZE:
+                self.__store_batch()
+                return
+
+    def __close_parser(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        self._parser = None
+
+    def __stored_batches(self) -> int:
+        return len(self._spill_offsets) if self._spill_path is not None else len(self._batches)
+
+    def __load_batch(self, batch_index: int) -> list[list[str]]:
+        if self._spill_path is None:
+            return self._batches[batch_index]
+        if self._spill_reader is None:
+            self._spill_reader = open(self._spill_path, "rb")
+        self._spill_reader.seek(self._spill_offsets[batch_index])
+        return pickle.load(self._spill_reader)
+
+    def __store_batch(self) -> None:
+        batch = self._current_batch
+        self._current_batch = []
+        if self._spill_path is None and self._reserve_rows(len(batch)):
+            self._batches.append(batch)
+            self._rows_in_memory += len(batch)
+            return
+        if self._spill_path is None:
+            self._spill_path = self._spill_path_factory()
+            logger.debug(f"CSV row cache is over its in-memory budget, spilling to {self._spill_path}")
+            self._spill_file = open(self._spill_path, "wb")
+            for stored_batch in self._batches:
+                self.__spill(stored_batch)
+            self._batches = []
+            self.__release_memory()
+        self.__spill(batch)
+
+    def __spill(self, batch: list[list[str]]) -> None:
+        self._spill_offsets.append(self._spill_file.tell())
+        pickle.dump(batch, self._spill_file, protocol=pickle.HIGHEST_PROTOCOL)
+        # the readers behind read the batch right away
+        self._spill_file.flush()
+
+    def __release_memory(self) -> None:
+        if self._rows_in_memory:
+            self._release_rows(self._rows_in_memory)
+            self._rows_in_memory = 0
+
+
+class CsvRowSource:
+    """Reads and splits every CSV file once and shares the rows between the donor, condition and sample
+    repositories. A file is parsed by the first consumer reading it, the following consumers of the same unchanged
+    file are served the rows parsed so far and continue the parse if they get ahead. Parsed rows are kept in memory,
+    or spilled to disk once the rows of all cached files exceed the in-memory budget. Once every registered consumer
+    has read the file, its rows are released.
+    The source can be shared by consumers running in several threads (e.g. the standard and the MIABIS sync
+    run side by side) or nested in one thread (e.g. the pipelined sync), every consumer reads at its own pace
+    and none waits for another one to finish a file."""
+
+    def __init__(self, cache_rows: bool = True, max_rows_in_memory: int = MAX_ROWS_IN_MEMORY):
+        """
+        :param cache_rows: cache the rows of the read files for the other consumers
+        :param max_rows_in_memory: rows of all cached files kept in memory together
+        """
+        self._cache_rows = cache_rows
+        self._max_rows_in_memory = max_rows_in_memory
+        self._rows_in_memory = 0
+        self._shared_files: dict[tuple, _SharedCsvFile] = {}
+        self._spill_dir: Optional[str] = None
+        self._consumers = 0
+        self._spill_files = 0
+        self._files_read = 0
+        self._files_served_from_cache = 0
+        self._lock = threading.Lock()
+
+    @property
+    def files_read(self) -> int:
+        """Number of times a CSV file was opened and parsed."""
+        return self._files_read
+
+    @property
+    def files_served_from_cache(self) -> int:
+        """Number of reads served from already parsed rows."""
+        return self._files_served_from_cache
+
+    @property
+    def rows_in_memory(self) -> int:
+        """Number of cached rows kept in memory, by all cached files together."""
+        return self._rows_in_memory
+
+    def register_consumer(self) -> None:
+        """Registers a repository which reads every file from this source."""
+        with self._lock:
+            self._consumers += 1
+
+    def read(self, path: str | os.PathLike, separator: str) -> Generator[list[str], None, None]:
+        """
+        Yields all rows of a CSV file, header row included.
+        :param path: path of the csv file
+        :param separator: csv delimiter
+        :raises OSError: if the file cannot be opened.
+        """
+        path = os.fspath(path)
+        if not self._cache_rows or self._consumers <= 1:
+            yield from self.__read_uncached(path, separator)
+            return
+
+        key = self.__cache_key(path, separator)
+        with self._lock:
+            shared_file = self._shared_files.get(key)
+            if shared_file is None:
+                shared_file = _SharedCsvFile(path, separator, self.__spill_path, self.__reserve_rows,
+                                             self.__release_rows)
+                self._shared_files[key] = shared_file
+                self._files_read += 1
+            else:
+                self._files_served_from_cache += 1
+            shared_file.reads += 1
+            shared_file.active_readers += 1
+            if shared_file.reads >= self._consumers:
+                del self._shared_files[key]
+        try:
+            yield from shared_file.rows()
+        finally:
+            with self._lock:
+                shared_file.active_readers -= 1
+                released = self._shared_files.get(key) is not shared_file and shared_file.active_readers == 0
+            if released:
+                shared_file.discard()
+
+    def clear(self) -> None:
+        """Drops all cached rows and removes spill files."""
+        with self._lock:
+            shared_files = list(self._shared_files.values())
+            self._shared_files = {}
+        being_read = False
+        for shared_file in shared_files:
+            if shared_file.active_readers == 0:
+                shared_file.discard()
+            else:
+                being_read = True
+        if self._spill_dir is not None and not being_read:
+            shutil.rmtree(self._spill_dir, ignore_errors=True)
+            self._spill_dir = None
+
+    def __read_uncached(self, path: str, separator: str) -> Generator[list[str], None, None]:
+        with self._lock:
+            self._files_read += 1
+        with open_record_file(path, "r") as file_content:
+            yield from csv.reader(file_content, delimiter=separator)
+
+    def __reserve_rows(self, rows: int) -> bool:
+        with self._lock:
+            if self._rows_in_memory + rows > self._max_rows_in_memory:
+                return False
+            self._rows_in_memory += rows
+            return True
+
+    def __release_rows(self, rows: int) -> None:
+        with self._lock:
+            self._rows_in_memory -= rows
+
+    def __spill_path(self) -> str:
+        with self._lock:
+            return self.__new_spill_path()
+
+    def __new_spill_path(self) -> str:
+        if self._spill_dir is None:
+            self._spill_dir = tempfile.mkdtemp(prefix="fhir-module-csv-rows-")
+            weakref.finalize(self, shutil.rmtree, self._spill_dir, True)
+        self._spill_files += 1
+        return os.path.join(self._spill_dir, f"rows-{self._spill_files}.pickle")
+
+    @staticmethod
+    def __cache_key(path: str, separator: str) -> tuple:
+        stat = os.stat(path)
+        return os.path.abspath(path), stat.st_mtime_ns, stat.st_size, separator
@@ -3,6 +3,7 @@ from persistence.biobank_json_repository import BiobankJSONRepository
 from persistence.biobank_repository import BiobankRepository
 from persistence.condition_csv_repository import ConditionCsvRepository
 from persistence.condition_repository import ConditionRepository
+from persistence.csv_row_source import CsvRowSource
 from persistence.factories.repository_factory import RepositoryFactory
 from persistence.sample_collection_json_repository import SampleCollectionJSONRepository
 from persistence.sample_collection_repository import SampleCollectionRepository
@@ -19,7 +20,11 @@ from util.config import get_records_dir_path, get_csv_separator, get_parsing_map
 setup_logger()
 logger = logging.getLogger()
 class CSVRepositoryFactory(RepositoryFactory):
-    """This class instantiates repositories that work with csv files"""
+    """This class instantiates repositories that work with csv files.
+    Repositories created by the same factory share one CsvRowSource, so each file is parsed only once."""
+
+    def __init__(self):
+        self._row_source = CsvRowSource()
 
     def _get_safe_parsing_map(self, map_key: str) -> dict:
         """Safely get a parsing map, raising exception if not found."""
@@ -44,7 +49,8 @@ class CSVRepositoryFactory(RepositoryFactory):
     def create_condition_repository(self) -> ConditionRepository:
         return ConditionCsvRepository(records_path=get_records_dir_path(),
                                       separator=get_csv_separator(),
-                                      condition_parsing_map=self._get_safe_parsing_map('condition_map'))
+                                      condition_parsing_map=self._get_safe_parsing_map('condition_map'),
+                                      row_source=self._row_source)
 
     def create_sample_collection_repository(self, miabis_on_fhir_model: bool = False) -> SampleCollectionRepository:
         return SampleCollectionJSONRepository(get_sample_collections_path(), miabis_on_fhir_model)
@@ -62,13 +68,18 @@ class CSVRepositoryFactory(RepositoryFactory):
                                    type_to_collection_map=get_type_to_collection_map(),
                                    storage_temp_map=storage_temp_map,
                                    material_type_map=material_type_map,
-                                   miabis_on_fhir_model=miabis_on_fhir_model)
+                                   miabis_on_fhir_model=miabis_on_fhir_model,
+                                   row_source=self._row_source)
 
     def create_sample_donor_repository(self, miabis_on_fhir_model: bool = False) -> SampleDonorRepository:
         return SampleDonorCsvRepository(records_path=get_records_dir_path(),
                                         separator=get_csv_separator(),
                                         donor_parsing_map=self._get_safe_parsing_map('donor_map'),
-                                        miabis_on_fhir_model=miabis_on_fhir_model)
+                                        miabis_on_fhir_model=miabis_on_fhir_model,
+                                        row_source=self._row_source)
 
     def create_biobank_repository(self) -> BiobankRepository:
         return BiobankJSONRepository(biobank_json_file_path=get_biobank_path())
+
+    def release_shared_records(self) -> None:
+        self._row_source.clear()
@@ -16,6 +16,10 @@ def get_repository_factory() -> RepositoryFactory:
             return XMLRepositoryFactory()
         case "json":
             return JsonRepositoryFactory()
+        case "parquet":
+            # pyarrow is imported only when the records are in Parquet files
+            from persistence.factories.parquet_repository_factory import ParquetRepositoryFactory
+            return ParquetRepositoryFactory()
         case _:
             raise WrongRecordsFileTypeException("RECORDS_FILE_TYPE environment variable has unsupported file type.")
 
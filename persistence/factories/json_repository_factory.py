@@ -4,6 +4,7 @@ from persistence.biobank_repository import BiobankRepository
 from persistence.condition_json_repository import ConditionJsonRepository
 from persistence.condition_repository import ConditionRepository
 from persistence.factories.repository_factory import RepositoryFactory
+from persistence.parsed_file_source import ParsedFileSource
 from persistence.sample_collection_json_repository import SampleCollectionJSONRepository
 from persistence.sample_collection_repository import SampleCollectionRepository
 from persistence.sample_donor_json_repository import SampleDonorJsonRepository
@@ -19,7 +20,11 @@ from util.config import get_records_dir_path, get_parsing_map, get_sample_collec
 setup_logger()
 logger = logging.getLogger()
 class JsonRepositoryFactory(RepositoryFactory):
-    """This class instantiates repositories that work with csv files"""
+    """This class instantiates repositories that work with JSON files.
+    Repositories created by the same factory share one ParsedFileSource, so each file is parsed only once."""
+
+    def __init__(self):
+        self._file_source = ParsedFileSource()
 
     def _get_safe_parsing_map(self, map_key: str) -> dict:
         """Safely get a parsing map, raising exception if not found."""
@@ -43,7 +48,8 @@ class JsonRepositoryFactory(RepositoryFactory):
 
     def create_condition_repository(self) -> ConditionRepository:
         return ConditionJsonRepository(records_path=get_records_dir_path(),
-                                      condition_parsing_map=self._get_safe_parsing_map('condition_map'))
+                                      condition_parsing_map=self._get_safe_parsing_map('condition_map'),
+                                      file_source=self._file_source)
 
     def create_sample_collection_repository(self, miabis_on_fhir_model: bool = False) -> SampleCollectionRepository:
         return SampleCollectionJSONRepository(get_sample_collections_path(), miabis_on_fhir_model)
@@ -60,12 +66,17 @@ class JsonRepositoryFactory(RepositoryFactory):
                                    type_to_collection_map=get_type_to_collection_map(),
                                    storage_temp_map=storage_temp_map,
                                    material_type_map=material_type_map,
-                                   miabis_on_fhir_model=miabis_on_fhir_model)
+                                   miabis_on_fhir_model=miabis_on_fhir_model,
+                                   file_source=self._file_source)
 
     def create_sample_donor_repository(self, miabis_on_fhir_model: bool = False) -> SampleDonorRepository:
         return SampleDonorJsonRepository(records_path=get_records_dir_path(),
                                         donor_parsing_map=self._get_safe_parsing_map('donor_map'),
-                                        miabis_on_fhir_model=miabis_on_fhir_model)
+                                        miabis_on_fhir_model=miabis_on_fhir_model,
+                                        file_source=self._file_source)
 
     def create_biobank_repository(self) -> BiobankRepository:
         return BiobankJSONRepository(biobank_json_file_path=get_biobank_path())
+
+    def release_shared_records(self) -> None:
+        self._file_source.clear()
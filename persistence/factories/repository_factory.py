@@ -28,3 +28,7 @@ class RepositoryFactory(abc.ABC):
     @abc.abstractmethod
     def create_biobank_repository(self) -> BiobankRepository:
         pass
+
+    def release_shared_records(self) -> None:
+        """Releases records parsed once and shared by the repositories created by this factory."""
+        pass
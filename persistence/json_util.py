@@ -0,0 +1,16 @@
+"""Module containing utility functions for handling JSON record files"""
+import json
+import os
+from typing import Any
+
+from util.record_file_util import open_record_file
+
+
+def parse_json_file(dir_entry: os.DirEntry) -> Any:
+    """
+    Parse a JSON record file (with or without a byte order mark).
+    :raises JSONDecodeError: if the file does not have a correct JSON format.
+    :raises OSError: if the file cannot be read.
+    """
+    with open_record_file(dir_entry, "r", encoding="utf-8-sig") as json_file:
+        return json.load(json_file)
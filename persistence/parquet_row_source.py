@@ -0,0 +1,110 @@
+"""Module for reading Parquet record files as rows of strings, the same way CSV files are read"""
+import logging
+import os
+from typing import Generator, Iterable, Optional
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+from util.custom_logger import setup_logger
+
+setup_logger()
+logger = logging.getLogger()
+
+# Number of rows of a column batch read at once
+BATCH_SIZE = 10000
+
+
+def parquet_columns(*parsing_maps: Optional[dict]) -> list[str]:
+    """Names of all columns the parsing maps refer to, the only columns read from the Parquet files."""
+    columns: list[str] = []
+
+    def collect(value):
+        if isinstance(value, dict):
+            for nested_value in value.values():
+                collect(nested_value)
+        elif isinstance(value, str) and value not in columns:
+            columns.append(value)
+
+    for parsing_map in parsing_maps:
+        collect(parsing_map or {})
+    return columns
+
+
+def validate_parquet_columns(dir_entry: os.DirEntry, required_columns: dict[str, Optional[str]],
+                             concept: str) -> list[str]:
+    """
+    Validates a Parquet file by its schema and metadata only, without reading any of its rows.
+    :param dir_entry: the Parquet file
+    :param required_columns: columns which have to be present in the file, by their parsing map key
+    :param concept: name of the records in the error messages (e.g. Sample Donor)
+    :return: list of errors
+    """
+    try:
+        metadata = pq.read_metadata(dir_entry.path)
+    except (OSError, pa.ArrowException) as e:
+        return [f"Error while opening file {dir_entry.name}: {e}"]
+    names = set(metadata.schema.to_arrow_schema().names)
+    errors = []
+    for parsing_map_key, column in required_columns.items():
+        if column is None:
+            errors.append(f"File {dir_entry.name} - {concept}: parsing map has no column for {parsing_map_key}")
+        elif column not in names:
+            errors.append(f"File {dir_entry.name} - {concept}: column {column} ({parsing_map_key}) "
+                          f"is not present in the file")
+    if metadata.num_rows == 0:
+        errors.append(f"File {dir_entry.name} - {concept}: file does not contain any records")
+    return errors
+
+
+def _column_to_strings(column: pa.Array) -> list[str]:
+    """Values of a column as strings, as they would be written in a CSV file. Missing values are empty strings."""
+    if pa.types.is_floating(column.type):
+        # whole numbers (e.g. a birth year stored as a double) are written without the decimal part
+        return ["" if value is None else str(int(value)) if value.is_integer() else str(value)
+                for value in column.to_pylist()]
+    try:
+        return pc.fill_null(pc.cast(column, pa.string()), "").to_pylist()
+    except pa.ArrowNotImplementedError:
+        return ["" if value is None else str(value) for value in column.to_pylist()]
+
+
+class ParquetRowSource:
+    """Reads Parquet files in column batches and yields their rows as lists of strings, with the header row first,
+    so the CSV repositories can build the records from them. Only the columns referred to by the parsing maps
+    are read. Shares the interface of the CsvRowSource."""
+
+    def __init__(self, columns: Iterable[str] = None, batch_size: int = BATCH_SIZE):
+        """
+        :param columns: columns to read, all columns are read if not given
+        :param batch_size: number of rows read at once
+        """
+        self._columns = list(columns) if columns is not None else None
+        self._batch_size = batch_size
+
+    def register_consumer(self) -> None:
+        """Parquet files are not cached, every consumer reads only the column batches."""
+
+    def read(self, path: str | os.PathLike, separator: str = None) -> Generator[list[str], None, None]:
+        """
+        Yields the header row with the names of the read columns, followed by all rows of a Parquet file.
+        :param path: path of the Parquet file
+        :param separator: not used, Parquet files are not delimited
+        :raises OSError: if the file cannot be opened or is not a Parquet file.
+        """
+        try:
+            parquet_file = pq.ParquetFile(os.fspath(path))
+        except pa.ArrowException as e:
+            raise OSError(f"Cannot read Parquet file {path}: {e}") from e
+        with parquet_file:
+            names = parquet_file.schema_arrow.names
+            columns = names if self._columns is None else [column for column in self._columns if column in names]
+            yield list(columns)
+            if not columns:
+                return
+            for batch in parquet_file.iter_batches(batch_size=self._batch_size, columns=columns):
+                yield from map(list, zip(*(_column_to_strings(column) for column in batch.columns)))
+
+    def clear(self) -> None:
+        """Nothing is cached."""
@@ -0,0 +1,140 @@
+"""Module for sharing parsed XML and JSON record files between repositories"""
+import logging
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Callable
+
+from util.custom_logger import setup_logger
+
+setup_logger()
+logger = logging.getLogger()
+
+# Size of the record files whose parsed content is kept in memory together, in bytes (the parsed content of a file
+# takes several times the size of the file)
+MAX_BYTES_IN_MEMORY = 16 * 1024 * 1024
+
+_NOT_PARSED = object()
+
+
+class _ParsedFile:
+    """Parsed content of a single record file, shared by all of its readers."""
+
+    def __init__(self, size: int):
+        self.size = size
+        self.content = _NOT_PARSED
+        self.reads = 0
+        self.lock = threading.Lock()
+
+
+class ParsedFileSource:
+    """Parses every XML or JSON record file once and shares the parsed content between the donor, condition and
+    sample repositories, like CsvRowSource shares the rows of CSV files. A file is parsed by the first consumer
+    reading it, the following consumers of the same unchanged file are served the parsed content. Parsed files
+    are kept in memory as long as the size of all kept files is within the in-memory budget, the least recently
+    read ones are dropped once it is not and parsed again by the consumers which still read them. Once every
+    registered consumer has read the file, its content is released.
+    The parsed content is shared, the consumers must not modify it."""
+
+    def __init__(self, cache_files: bool = True, max_bytes_in_memory: int = MAX_BYTES_IN_MEMORY):
+        """
+        :param cache_files: cache the parsed files for the other consumers
+        :param max_bytes_in_memory: size of the record files whose parsed content is kept in memory together
+        """
+        self._cache_files = cache_files
+        self._max_bytes_in_memory = max_bytes_in_memory
+        self._bytes_in_memory = 0
+        self._parsed_files: OrderedDict[tuple, _ParsedFile] = OrderedDict()
+        self._consumers = 0
+        self._files_parsed = 0
+        self._files_served_from_cache = 0
+        self._lock = threading.Lock()
+
+    @property
+    def files_parsed(self) -> int:
+        """Number of times a record file was parsed."""
+        return self._files_parsed
+
+    @property
+    def files_served_from_cache(self) -> int:
+        """Number of reads served from an already parsed file."""
+        return self._files_served_from_cache
+
+    @property
+    def bytes_in_memory(self) -> int:
+        """Size of the record files whose parsed content is kept in memory."""
+        return self._bytes_in_memory
+
+    def register_consumer(self) -> None:
+        """Registers a repository which reads every file from this source."""
+        with self._lock:
+            self._consumers += 1
+
+    def parse(self, dir_entry: os.DirEntry, parser: Callable[[os.DirEntry], Any]) -> Any:
+        """
+        Parsed content of a record file.
+        :param dir_entry: the record file
+        :param parser: parses the file, the same parser has to be used by all consumers of the file
+        :return: the content returned by the parser, shared with the other consumers
+        :raises OSError: if the file cannot be read, any error the parser raises.
+        """
+        if not self._cache_files or self._consumers <= 1:
+            with self._lock:
+                self._files_parsed += 1
+            return parser(dir_entry)
+
+        stat = dir_entry.stat()
+        key = (os.path.abspath(dir_entry.path), stat.st_mtime_ns, stat.st_size, parser)
+        with self._lock:
+            parsed_file = self._parsed_files.get(key)
+            if parsed_file is None:
+                parsed_file = _ParsedFile(stat.st_size)
+                self._parsed_files[key] = parsed_file
+            else:
+                self._parsed_files.move_to_end(key)
+            parsed_file.reads += 1
+            last_read = parsed_file.reads >= self._consumers
+            if last_read:
+                del self._parsed_files[key]
+        # readers of the same file wait for the one parsing it, the parse does not depend on other files
+        with parsed_file.lock:
+            content = parsed_file.content
+            if content is _NOT_PARSED:
+                content = parser(dir_entry)
+                with self._lock:
+                    self._files_parsed += 1
+                    if not last_read:
+                        self.__keep_locked(key, parsed_file, content)
+            else:
+                with self._lock:
+                    self._files_served_from_cache += 1
+            if last_read:
+                with self._lock:
+                    self.__drop_locked(parsed_file)
+        return content
+
+    def clear(self) -> None:
+        """Drops all parsed files."""
+        with self._lock:
+            for parsed_file in self._parsed_files.values():
+                self.__drop_locked(parsed_file)
+            self._parsed_files = OrderedDict()
+
+    def __keep_locked(self, key: tuple, parsed_file: _ParsedFile, content: Any) -> None:
+        """Keeps a parsed file for its other readers, dropping the least recently read files over the budget."""
+        if parsed_file.size > self._max_bytes_in_memory or self._parsed_files.get(key) is not parsed_file:
+            return
+        parsed_file.content = content
+        self._bytes_in_memory += parsed_file.size
+        for other_key, other_file in self._parsed_files.items():
+            if self._bytes_in_memory <= self._max_bytes_in_memory:
+                break
+            if other_key != key and other_file.content is not _NOT_PARSED:
+                logger.debug("Parsed record files are over their in-memory budget, dropping the least "
+                             "recently read one.")
+                self.__drop_locked(other_file)
+
+    def __drop_locked(self, parsed_file: _ParsedFile) -> None:
+        if parsed_file.content is not _NOT_PARSED:
+            parsed_file.content = _NOT_PARSED
+            self._bytes_in_memory -= parsed_file.size
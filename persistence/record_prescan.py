@@ -0,0 +1,197 @@
+"""Module for a fast estimate of the number of records in the records directory, without parsing the files"""
+import logging
+import os
+import re
+import threading
+from typing import Optional
+
+from persistence.records_catalog import get_records_catalog, list_record_files
+from util.custom_logger import setup_logger
+from util.record_file_util import open_record_file
+
+setup_logger()
+logger = logging.getLogger()
+
+# Size of the chunks in which the files are scanned
+SCAN_CHUNK_SIZE = 1024 * 1024
+# Resource types the estimates are reported for
+RESOURCE_TYPES = ("patients", "conditions", "specimens")
+
+_JSON_TOKEN = re.compile(rb'[\[\]{}"]')
+_JSON_STRING_TOKEN = re.compile(rb'["\\]')
+
+
+def _count_csv_rows(path: str) -> int:
+    """Number of data rows (lines without the header) of a csv file."""
+    lines = 0
+    last_byte = b"\n"
+    with open_record_file(path, "rb") as file_content:
+        while chunk := file_content.read(SCAN_CHUNK_SIZE):
+            lines += chunk.count(b"\n")
+            last_byte = chunk[-1:]
+    if last_byte != b"\n":
+        lines += 1
+    return max(lines - 1, 0)
+
+
+def _count_parquet_rows(path: str) -> int:
+    """Number of rows of a Parquet file, read from its metadata."""
+    import pyarrow.parquet as pq
+    try:
+        return pq.read_metadata(path).num_rows
+    except ValueError as e:
+        raise OSError(f"{path} is not a Parquet file: {e}") from e
+
+
+def _count_json_records(path: str) -> int:
+    """Number of objects in the top level array of a json file, scanned in chunks. Brackets inside strings are
+    skipped by tracking whether the scan is inside a string and whether the next byte is escaped."""
+    records = 0
+    depth = 0
+    in_string = False
+    # bytes at the start of the next chunk escaped by a backslash at the end of the previous one
+    escaped = 0
+    with open_record_file(path, "rb") as file_content:
+        while chunk := file_content.read(SCAN_CHUNK_SIZE):
+            position = escaped
+            while (token := (_JSON_STRING_TOKEN if in_string else _JSON_TOKEN).search(chunk, position)) is not None:
+                position = token.end()
+                match token.group():
+                    case b"\\":
+                        position += 1
+                    case b'"':
+                        in_string = not in_string
+                    case b"[" | b"{" as bracket:
+                        if depth == 1 and bracket == b"{":
+                            records += 1
+                        depth += 1
+                    case _:
+                        depth -= 1
+            escaped = max(position - len(chunk), 0)
+    return records
+
+
+def _count_occurrences(path: str, needle: bytes) -> int:
+    """Number of occurrences of a byte sequence in a file, scanned in chunks."""
+    occurrences = 0
+    carry = b""
+    with open_record_file(path, "rb") as file_content:
+        while chunk := file_content.read(SCAN_CHUNK_SIZE):
+            data = carry + chunk
+            occurrences += data.count(needle)
+            # keep the tail, so a needle split between two chunks is found, but not counted twice
+            carry = data[-(len(needle) - 1):] if len(needle) > 1 else b""
+    return occurrences
+
+
+def _xml_needle(parsing_path: Optional[str]) -> Optional[bytes]:
+    """Byte sequence marking an element (or attribute) addressed by the last part of a parsing map path."""
+    if not parsing_path:
+        return None
+    name = parsing_path.split(".")[-1]
+    if not name or name == "*":
+        return None
+    if name.startswith("@"):
+        return f' {name[1:]}="'.encode("utf-8")
+    return f"<{name}>".encode("utf-8")
+
+
+class RecordPrescan:
+    """Estimates the number of patients, conditions and specimens in the records directory by cheap scanning
+    of the files (line counting for csv, counting of array items for json, counting of tags for xml,
+    row count from the metadata for parquet).
+    The estimates are cached per file, unchanged files are not scanned again. The estimates of the files removed
+    from the records directory, or of their previous versions, are dropped after every prescan."""
+
+    def __init__(self):
+        self._cache: dict[tuple, dict[str, int]] = {}
+        self._lock = threading.Lock()
+
+    def estimate_totals(self, records_dir_path: str, file_type: str, parsing_map: dict) -> dict[str, int]:
+        """
+        :param records_dir_path: path to the directory with records
+        :param file_type: type of the record files (csv, json or xml)
+        :param parsing_map: parsing map used for the records
+        :return: estimated number of records for every resource type
+        """
+        file_type = file_type.lower()
+        totals = dict.fromkeys(RESOURCE_TYPES, 0)
+        try:
+            files = list_record_files(records_dir_path, f".{file_type}")
+        except OSError as e:
+            logger.debug(f"Cannot scan records directory {records_dir_path}: {e}")
+            return totals
+        for dir_entry in files:
+            for resource_type, count in self.__file_estimate(dir_entry, file_type, parsing_map).items():
+                totals[resource_type] += count
+        self.__prune(records_dir_path, file_type)
+        return totals
+
+    def __prune(self, records_dir_path: str, file_type: str) -> None:
+        """Drops the cached estimates of the files of the directory which are no longer listed in it unchanged.
+        The whole listing is used, a prescan limited to some files keeps the estimates of the others."""
+        try:
+            listed_files = {(os.path.abspath(entry.path), entry.stat().st_size, entry.stat().st_mtime_ns)
+                            for entry in get_records_catalog(records_dir_path).files(f".{file_type}")}
+        except OSError as e:
+            logger.debug(f"Cannot list records directory {records_dir_path}: {e}")
+            return
+        dir_path = os.path.abspath(records_dir_path)
+        with self._lock:
+            for key in [key for key in self._cache
+                        if key[3] == file_type and os.path.dirname(key[0]) == dir_path
+                        and key[:3] not in listed_files]:
+                del self._cache[key]
+
+    def __file_estimate(self, dir_entry: os.DirEntry, file_type: str, parsing_map: dict) -> dict[str, int]:
+        try:
+            stat = dir_entry.stat()
+        except OSError:
+            return {}
+        sample_id_path = (parsing_map.get("sample_map") or {}).get("sample_details", {}).get("id")
+        condition_path = (parsing_map.get("condition_map") or {}).get("icd-10_code")
+        key = (os.path.abspath(dir_entry.path), stat.st_size, stat.st_mtime_ns, file_type,
+               sample_id_path, condition_path)
+        with self._lock:
+            cached = self._cache.get(key)
+        if cached is not None:
+            return cached
+        try:
+            estimate = self.__scan_file(dir_entry.path, file_type, sample_id_path, condition_path)
+        except OSError as e:
+            logger.debug(f"Cannot scan file {dir_entry.name}: {e}")
+            return {}
+        with self._lock:
+            self._cache[key] = estimate
+        return estimate
+
+    @staticmethod
+    def __scan_file(path: str, file_type: str, sample_id_path: Optional[str],
+                    condition_path: Optional[str]) -> dict[str, int]:
+        match file_type:
+            case "csv":
+                rows = _count_csv_rows(path)
+                return {"patients": rows, "conditions": rows, "specimens": rows}
+            case "parquet":
+                rows = _count_parquet_rows(path)
+                return {"patients": rows, "conditions": rows, "specimens": rows}
+            case "json":
+                records = _count_json_records(path)
+                return {"patients": records, "conditions": records, "specimens": records}
+            case "xml":
+                # every xml file holds a single patient
+                sample_needle = _xml_needle(sample_id_path)
+                condition_needle = _xml_needle(condition_path)
+                return {"patients": 1,
+                        "conditions": _count_occurrences(path, condition_needle) if condition_needle else 0,
+                        "specimens": _count_occurrences(path, sample_needle) if sample_needle else 0}
+            case _:
+                return {}
+
+
+_record_prescan = RecordPrescan()
+
+
+def estimate_record_totals(records_dir_path: str, file_type: str, parsing_map: dict) -> dict[str, int]:
+    """Estimates the number of records for every resource type, sharing the per file cache between syncs."""
+    return _record_prescan.estimate_totals(records_dir_path, file_type, parsing_map)
@@ -0,0 +1,336 @@
+"""Module for a cached listing of the records directory, shared by the repositories, validators and services"""
+import ctypes
+import ctypes.util
+import logging
+import os
+import stat
+import struct
+import sys
+import threading
+import time
+from contextvars import ContextVar, Token
+from dataclasses import dataclass, field
+from typing import Callable, Iterable, Optional
+
+from util.custom_logger import setup_logger
+from util.record_file_util import is_record_file
+
+setup_logger()
+logger = logging.getLogger()
+
+# Longest time (in seconds) the listing is trusted to inotify only, afterwards the directory is listed again
+FULL_RESCAN_INTERVAL = 300.0
+
+# inotify event masks, see inotify(7)
+_IN_MODIFY = 0x00000002
+_IN_ATTRIB = 0x00000004
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_FROM = 0x00000040
+_IN_MOVED_TO = 0x00000080
+_IN_CREATE = 0x00000100
+_IN_DELETE = 0x00000200
+_IN_DELETE_SELF = 0x00000400
+_IN_MOVE_SELF = 0x00000800
+_IN_Q_OVERFLOW = 0x00004000
+_IN_IGNORED = 0x00008000
+_WATCH_MASK = (_IN_MODIFY | _IN_ATTRIB | _IN_CLOSE_WRITE | _IN_MOVED_FROM | _IN_MOVED_TO | _IN_CREATE | _IN_DELETE
+               | _IN_DELETE_SELF | _IN_MOVE_SELF)
+_EVENT_HEADER = struct.Struct("iIII")
+
+
+@dataclass(frozen=True)
+class CatalogEntry:
+    """A file of the records directory with its stat. Usable wherever an os.DirEntry of the file is expected."""
+    name: str
+    path: str
+    stat_result: os.stat_result
+
+    def __fspath__(self) -> str:
+        return self.path
+
+    def is_file(self) -> bool:
+        return True
+
+    def is_dir(self) -> bool:
+        return False
+
+    def stat(self) -> os.stat_result:
+        return self.stat_result
+
+    def age_days(self, now: float = None) -> float:
+        """Days since the file was last modified."""
+        now = time.time() if now is None else now
+        return (now - self.stat_result.st_mtime) / (60 * 60 * 24)
+
+
+@dataclass
+class CatalogChanges:
+    """Files of the records directory which changed since the previous refresh of the catalog."""
+    added: list[CatalogEntry] = field(default_factory=list)
+    modified: list[CatalogEntry] = field(default_factory=list)
+    removed: list[str] = field(default_factory=list)
+
+    def __bool__(self) -> bool:
+        return bool(self.added or self.modified or self.removed)
+
+    @property
+    def changed(self) -> list[CatalogEntry]:
+        """Files which were added or modified."""
+        return self.added + self.modified
+
+
+class _Watch:
+    """Names of the files of one directory reported as changed by inotify since they were last taken."""
+
+    def __init__(self):
+        self.changed_names: set[str] = set()
+        self.lost = False
+
+    def take(self) -> Optional[set[str]]:
+        """
+        :return: the changed names, None if events were lost (queue overflow, directory moved or deleted)
+        """
+        if self.lost:
+            self.lost = False
+            self.changed_names.clear()
+            return None
+        changed_names, self.changed_names = self.changed_names, set()
+        return changed_names
+
+
+class _Inotify:
+    """Single inotify instance (Linux only) with a watch for every records directory of the catalogs."""
+
+    def __init__(self):
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self._libc = libc
+        self._fd = fd
+        self._lock = threading.Lock()
+        self._watches: dict[int, _Watch] = {}
+
+    def watch(self, dir_path: str) -> Optional[_Watch]:
+        """Watches a directory, None if it cannot be watched (e.g. it does not exist)."""
+        watch_descriptor = self._libc.inotify_add_watch(self._fd, os.fsencode(dir_path), _WATCH_MASK)
+        if watch_descriptor < 0:
+            return None
+        with self._lock:
+            return self._watches.setdefault(watch_descriptor, _Watch())
+
+    def dispatch(self) -> None:
+        """Reads all pending events and records the changed file names in the watches."""
+        with self._lock:
+            while True:
+                try:
+                    data = os.read(self._fd, 64 * 1024)
+                except BlockingIOError:
+                    return
+                offset = 0
+                while offset < len(data):
+                    watch_descriptor, mask, _, length = _EVENT_HEADER.unpack_from(data, offset)
+                    name = data[offset + _EVENT_HEADER.size:offset + _EVENT_HEADER.size + length].rstrip(b"\0")
+                    offset += _EVENT_HEADER.size + length
+                    if mask & _IN_Q_OVERFLOW:
+                        for watch in self._watches.values():
+                            watch.lost = True
+                        continue
+                    watch = self._watches.get(watch_descriptor)
+                    if watch is None:
+                        continue
+                    if mask & (_IN_IGNORED | _IN_DELETE_SELF | _IN_MOVE_SELF):
+                        watch.lost = True
+                        if mask & _IN_IGNORED:
+                            del self._watches[watch_descriptor]
+                    elif name:
+                        watch.changed_names.add(os.fsdecode(name))
+
+
+_inotify_instance: Optional[_Inotify] = None
+_inotify_unavailable = not sys.platform.startswith("linux")
+_inotify_lock = threading.Lock()
+
+
+def _inotify() -> Optional[_Inotify]:
+    """The shared inotify instance, None where inotify is not available."""
+    global _inotify_instance, _inotify_unavailable
+    with _inotify_lock:
+        if _inotify_instance is None and not _inotify_unavailable:
+            try:
+                _inotify_instance = _Inotify()
+            except (OSError, AttributeError) as e:
+                logger.info(f"inotify is not available, the records directory is listed on every refresh: {e}")
+                _inotify_unavailable = True
+        return _inotify_instance
+
+
+class RecordsCatalog:
+    """Cached listing of the files of the records directory, with their stat. The listing is refreshed
+    incrementally: with inotify only the files reported as changed are stat-ed again, without it (or when
+    the events were lost) the directory is listed again and diffed with the cached listing by the sizes and
+    modification times of the files."""
+
+    def __init__(self, dir_path: str, use_inotify: bool = True, clock: Callable[[], float] = time.monotonic):
+        """
+        :param dir_path: path to the records directory
+        :param use_inotify: refresh the listing by inotify events, where inotify is available
+        :param clock: monotonic clock in seconds
+        """
+        self._dir_path = dir_path
+        self._use_inotify = use_inotify
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._entries: Optional[dict[str, CatalogEntry]] = None
+        self._watch: Optional[_Watch] = None
+        self._dir_stat: Optional[tuple[int, int, int]] = None
+        self._last_full_scan = 0.0
+
+    def refresh(self, full_rescan: bool = False) -> CatalogChanges:
+        """
+        Brings the listing up to date.
+        :param full_rescan: list the directory again and stat every file, e.g. where a change may not have been
+        noticed yet (a network mount without inotify events)
+        :return: the files which changed since the previous refresh (all files on the first one)
+        :raises OSError: if the records directory cannot be listed.
+        """
+        with self._lock:
+            dir_stat = os.stat(self._dir_path)
+            dir_key = (dir_stat.st_dev, dir_stat.st_ino, dir_stat.st_mtime_ns)
+            changed_names = self.__take_changed_names()
+            # a directory changed without any event (e.g. a network mount) is listed again
+            if (full_rescan or self._entries is None or changed_names is None
+                    or (dir_key != self._dir_stat and not changed_names)
+                    or self._clock() - self._last_full_scan > FULL_RESCAN_INTERVAL):
+                changes = self.__rescan()
+            else:
+                changes = self.__restat(changed_names)
+            self._dir_stat = dir_key
+            return changes
+
+    def files(self, extension: str = None, max_age_days: float = None) -> list[CatalogEntry]:
+        """
+        Files of the records directory, sorted by their names.
+        :param extension: extension of the record files (e.g. .csv), compressed record files are included,
+        all files if not given
+        :param max_age_days: only the files modified within the number of days
+        :raises OSError: if the records directory cannot be listed.
+        """
+        self.refresh()
+        with self._lock:
+            entries = sorted(self._entries.values(), key=lambda entry: entry.name)
+        if extension is not None:
+            entries = [entry for entry in entries if is_record_file(entry.name, extension)]
+        if max_age_days is not None:
+            now = time.time()
+            entries = [entry for entry in entries if entry.age_days(now) <= max_age_days]
+        return entries
+
+    def __take_changed_names(self) -> Optional[set[str]]:
+        """Names of the files reported as changed by inotify, None if the directory has to be listed again."""
+        if not self._use_inotify:
+            return None
+        inotify = _inotify()
+        if inotify is None:
+            return None
+        if self._watch is None:
+            # the watch is added before the directory is listed, so no change is missed
+            self._watch = inotify.watch(self._dir_path)
+            return None
+        inotify.dispatch()
+        changed_names = self._watch.take()
+        if changed_names is None:
+            self._watch = None
+        return changed_names
+
+    def __rescan(self) -> CatalogChanges:
+        entries: dict[str, CatalogEntry] = {}
+        with os.scandir(self._dir_path) as dir_entries:
+            for dir_entry in dir_entries:
+                try:
+                    if dir_entry.is_file():
+                        entries[dir_entry.name] = CatalogEntry(dir_entry.name, dir_entry.path, dir_entry.stat())
+                except OSError:
+                    continue
+        previous_entries = self._entries or {}
+        changes = CatalogChanges(removed=sorted(set(previous_entries) - set(entries)))
+        for name in sorted(entries):
+            if name not in previous_entries:
+                changes.added.append(entries[name])
+            elif not self.__same_stat(previous_entries[name], entries[name]):
+                changes.modified.append(entries[name])
+        self._entries = entries
+        self._last_full_scan = self._clock()
+        return changes
+
+    def __restat(self, names: set[str]) -> CatalogChanges:
+        changes = CatalogChanges()
+        for name in sorted(names):
+            path = os.path.join(self._dir_path, name)
+            try:
+                stat_result = os.stat(path)
+            except OSError:
+                stat_result = None
+            previous_entry = self._entries.get(name)
+            if stat_result is None or not stat.S_ISREG(stat_result.st_mode):
+                if previous_entry is not None:
+                    del self._entries[name]
+                    changes.removed.append(name)
+                continue
+            entry = CatalogEntry(name, path, stat_result)
+            self._entries[name] = entry
+            if previous_entry is None:
+                changes.added.append(entry)
+            elif not self.__same_stat(previous_entry, entry):
+                changes.modified.append(entry)
+        return changes
+
+    @staticmethod
+    def __same_stat(entry: CatalogEntry, other_entry: CatalogEntry) -> bool:
+        return (entry.stat_result.st_size, entry.stat_result.st_mtime_ns) == \
+            (other_entry.stat_result.st_size, other_entry.stat_result.st_mtime_ns)
+
+
+_catalogs: dict[str, RecordsCatalog] = {}
+_catalogs_lock = threading.Lock()
+
+# Names of the record files a sync is limited to, None if all files are synced
+_record_files_scope: ContextVar[Optional[frozenset[str]]] = ContextVar("record_files_scope", default=None)
+
+
+def get_records_catalog(dir_path: str) -> RecordsCatalog:
+    """The catalog of a records directory, shared by all its consumers."""
+    key = os.path.abspath(dir_path)
+    with _catalogs_lock:
+        if key not in _catalogs:
+            _catalogs[key] = RecordsCatalog(dir_path)
+        return _catalogs[key]
+
+
+def list_record_files(dir_path: str, extension: str) -> list[CatalogEntry]:
+    """
+    Record files of the type in a records directory, sorted by their names.
+    :param dir_path: path to the records directory
+    :param extension: extension of the record files, with the leading dot (e.g. .csv)
+    :raises OSError: if the records directory cannot be listed.
+    """
+    files = get_records_catalog(dir_path).files(extension)
+    scope = _record_files_scope.get()
+    if scope is not None:
+        files = [entry for entry in files if entry.name in scope]
+    return files
+
+
+def set_record_files_scope(names: Optional[Iterable[str]]) -> Token:
+    """
+    Limits the record files listed by list_record_files in the current context (thread) to the named files,
+    e.g. for a sync of the newly dropped files only.
+    :param names: names of the files in the records directory, None for all files
+    :return: token to reset the scope with
+    """
+    return _record_files_scope.set(frozenset(names) if names is not None else None)
+
+
+def reset_record_files_scope(token: Token) -> None:
+    """Resets the scope of the record files to the one before set_record_files_scope."""
+    _record_files_scope.reset(token)
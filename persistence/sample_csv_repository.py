@@ -1,6 +1,6 @@
-import csv
 import logging
 import os
+from contextlib import closing
 from typing import Callable, Generator
 
 from dateutil import parser as date_parser
@@ -13,8 +13,10 @@ from exception.value_mapping_record_does_not_exist import ValueMappingRecordDoes
 from model.interface.sample_interface import SampleInterface
 from model.miabis.sample_miabis import SampleMiabis
 from model.sample import Sample
+from persistence.csv_row_source import CsvRowSource
 from persistence.csv_util import check_sample_map_format
 from persistence.sample_repository import SampleRepository
+from persistence.records_catalog import list_record_files
 from util.custom_logger import setup_logger
 from util.enums_util import parse_storage_temp_from_code as module_parse_storage_temp_from_code
 from util.sample_util import extract_all_diagnosis
@@ -26,11 +28,14 @@ logger = logging.getLogger()
 
 class SampleCsvRepository(SampleRepository):
     """Class for handling persistence in Csv files"""
+    _file_extension = ".csv"
 
     def __init__(self, records_path: str, sample_parsing_map: dict, separator: str,
                  type_to_collection_map: dict = None, storage_temp_map: dict = None, material_type_map: dict = None,
-                 miabis_on_fhir_model: bool = False):
+                 miabis_on_fhir_model: bool = False, row_source: CsvRowSource = None):
         super().__init__(records_path)
+        self._row_source = row_source if row_source is not None else CsvRowSource(cache_rows=False)
+        self._row_source.register_consumer()
         self._sample_parsing_map = sample_parsing_map
         self._separator = separator
         logger.debug(f"Loaded the following sample parsing map {sample_parsing_map}")
@@ -41,10 +46,8 @@ class SampleCsvRepository(SampleRepository):
         self._fields_dict = {}
 
     def get_all(self) -> Generator[SampleInterface, None, None]:
-        with os.scandir(self._dir_path) as entries:
-            for dir_entry in entries:
-                if dir_entry.name.lower().endswith(".csv"):
-                    yield from self.__extract_sample_from_csv_file(dir_entry)
+        for dir_entry in list_record_files(self._dir_path, self._file_extension):
+            yield from self.__extract_sample_from_csv_file(dir_entry)
 
     def update_mappings(self) -> None:
         """Update the mappings for the repository."""
@@ -52,12 +55,11 @@ class SampleCsvRepository(SampleRepository):
         self._separator = get_csv_separator()
 
     def _get_supported_extensions(self) -> tuple[str, Callable]:
-        return ".csv", self.__validate_sample_from_csv_file
+        return self._file_extension, self.__validate_sample_from_csv_file
 
     def __extract_sample_from_csv_file(self, dir_entry: os.DirEntry) -> SampleInterface:
         try:
-            with open(dir_entry, "r") as file_content:
-                reader = csv.reader(file_content, delimiter=self._separator)
+            with closing(self._row_source.read(dir_entry.path, self._separator)) as reader:
                 self._fields_dict = {}
                 fields = next(reader)
                 for i, field in enumerate(fields):
@@ -82,8 +84,7 @@ class SampleCsvRepository(SampleRepository):
     def __validate_sample_from_csv_file(self, dir_entry: os.DirEntry) -> list[str]:
         errors = []
         try:
-            with open(dir_entry, "r") as file_content:
-                reader = csv.reader(file_content, delimiter=self._separator)
+            with closing(self._row_source.read(dir_entry.path, self._separator)) as reader:
                 self._fields_dict = {}
                 fields = next(reader)
                 for i, field in enumerate(fields):
@@ -1,6 +1,6 @@
-import csv
 import logging
 import os
+from contextlib import closing
 from typing import Callable, Generator
 
 from dateutil.parser import ParserError
@@ -12,7 +12,9 @@ from util.enums_util import get_gender_from_abbreviation
 from model.sample_donor import SampleDonor
 from model.miabis.sample_donor_miabis import SampleDonorMiabis
 from miabis_model.gender import get_gender_from_abbreviation as miabis_get_gender_from_abbreviation
+from persistence.csv_row_source import CsvRowSource
 from persistence.sample_donor_repository import SampleDonorRepository
+from persistence.records_catalog import list_record_files
 from util.custom_logger import setup_logger
 from dateutil import parser as date_parser
 from util.config import get_csv_separator
@@ -23,9 +25,13 @@ logger = logging.getLogger()
 
 class SampleDonorCsvRepository(SampleDonorRepository):
     """Class for handling sample donors stored in Csv files"""
+    _file_extension = ".csv"
 
-    def __init__(self, records_path: str, separator: str, donor_parsing_map: dict, miabis_on_fhir_model: bool = False):
+    def __init__(self, records_path: str, separator: str, donor_parsing_map: dict, miabis_on_fhir_model: bool = False,
+                 row_source: CsvRowSource = None):
         super().__init__(records_path)
+        self._row_source = row_source if row_source is not None else CsvRowSource(cache_rows=False)
+        self._row_source.register_consumer()
         self._ids: set = set()
         self.separator = separator
         self._donor_parsing_map = donor_parsing_map
@@ -35,10 +41,8 @@ class SampleDonorCsvRepository(SampleDonorRepository):
 
     def get_all(self) -> Generator[SampleDonorInterface, None, None]:
         self._ids = set()
-        with os.scandir(self._dir_path) as entries:
-            for dir_entry in entries:
-                if dir_entry.name.lower().endswith(".csv"):
-                    yield from self.__extract_donor_from_csv_file(dir_entry)
+        for dir_entry in list_record_files(self._dir_path, self._file_extension):
+            yield from self.__extract_donor_from_csv_file(dir_entry)
 
     def update_mappings(self) -> None:
         """Update the mappings for the repository."""
@@ -46,12 +50,11 @@ class SampleDonorCsvRepository(SampleDonorRepository):
         self._separator = get_csv_separator()
 
     def _get_supported_extensions(self) -> tuple[str, Callable]:
-        return ".csv", self.__validate_donor_from_csv_file
+        return self._file_extension, self.__validate_donor_from_csv_file
     
     def __extract_donor_from_csv_file(self, dir_entry: os.DirEntry) -> SampleDonorInterface:
         try:
-            with open(dir_entry, "r") as file_content:
-                reader = csv.reader(file_content, delimiter=self.separator)
+            with closing(self._row_source.read(dir_entry.path, self.separator)) as reader:
                 self._fields_dict = {}
                 fields = next(reader)
                 for i, field in enumerate(fields):
@@ -79,8 +82,7 @@ class SampleDonorCsvRepository(SampleDonorRepository):
     def __validate_donor_from_csv_file(self, dir_entry: os.DirEntry) -> list[str]:
         errors = []
         try:
-            with open(dir_entry, "r") as file_content:
-                reader = csv.reader(file_content, delimiter=self.separator)
+            with closing(self._row_source.read(dir_entry.path, self.separator)) as reader:
                 self._fields_dict = {}
                 fields = next(reader)
                 for i, field in enumerate(fields):
@@ -14,8 +14,12 @@ from model.gender import Gender as ModuleGender
 from model.interface.sample_donor_interface import SampleDonorInterface
 from model.miabis.sample_donor_miabis import SampleDonorMiabis
 from model.sample_donor import SampleDonor
+from persistence.json_util import parse_json_file
+from persistence.parsed_file_source import ParsedFileSource
 from persistence.sample_donor_repository import SampleDonorRepository
+from persistence.records_catalog import list_record_files
 from util.custom_logger import setup_logger
+from util.record_file_util import open_record_file
 
 setup_logger()
 logger = logging.getLogger()
@@ -24,8 +28,11 @@ logger = logging.getLogger()
 class SampleDonorJsonRepository(SampleDonorRepository):
     """Class for handling sample donors stored in Csv files"""
 
-    def __init__(self, records_path: str, donor_parsing_map: dict, miabis_on_fhir_model: bool = False):
+    def __init__(self, records_path: str, donor_parsing_map: dict, miabis_on_fhir_model: bool = False,
+                 file_source: ParsedFileSource = None):
         super().__init__(records_path)
+        self._file_source = file_source if file_source is not None else ParsedFileSource(cache_files=False)
+        self._file_source.register_consumer()
         self._ids: set = set()
         self._donor_parsing_map = donor_parsing_map
         self._miabis_on_fhir_model = miabis_on_fhir_model
@@ -33,10 +40,8 @@ class SampleDonorJsonRepository(SampleDonorRepository):
 
     def get_all(self) -> Generator[SampleDonorInterface, None, None]:
         self._ids = set()
-        with os.scandir(self._dir_path) as entries:
-            for dir_entry in entries:
-                if dir_entry.name.lower().endswith(".json"):
-                    yield from self.__extract_donor_from_json_file(dir_entry)
+        for dir_entry in list_record_files(self._dir_path, ".json"):
+            yield from self.__extract_donor_from_json_file(dir_entry)
 
     def update_mappings(self) -> None:
         """Update the mappings for the repository."""
@@ -47,36 +52,34 @@ class SampleDonorJsonRepository(SampleDonorRepository):
 
     def __extract_donor_from_json_file(self, dir_entry: os.DirEntry) -> SampleDonorInterface:
         try:
-            with open(dir_entry, "r", encoding="utf-8-sig") as json_file:
-                try:
-                    donors_json = json.load(json_file)
-                except JSONDecodeError:
-                    logger.error("Biobank file does not have a correct JSON format. Exiting...")
-                    return
-                for donor_json in donors_json:
-                    try:
-                        donor = self.__build_donor(donor_json)
-                        if donor.identifier not in self._ids:
-                            self._ids.add(donor.identifier)
-                            yield donor
-                    except ParserError as err:
-                        logger.info(f"{err}Skipping...")
-                        continue
-                    except TypeError as err:
-                        logger.info(f"{err} Skipping...")
-                        continue
-                    except KeyError as err:
-                        logger.info(f"{err} Skipping...")
-                        continue
+            donors_json = self._file_source.parse(dir_entry, parse_json_file)
+        except JSONDecodeError:
+            logger.error("Biobank file does not have a correct JSON format. Exiting...")
+            return
         except OSError as e:
             logger.debug(f"Error while opening file {dir_entry.name}: {e}")
             logger.info(f"Error while opening file {dir_entry.name} [Skipping...]")
             return
+        for donor_json in donors_json:
+            try:
+                donor = self.__build_donor(donor_json)
+                if donor.identifier not in self._ids:
+                    self._ids.add(donor.identifier)
+                    yield donor
+            except ParserError as err:
+                logger.info(f"{err}Skipping...")
+                continue
+            except TypeError as err:
+                logger.info(f"{err} Skipping...")
+                continue
+            except KeyError as err:
+                logger.info(f"{err} Skipping...")
+                continue
         
     def __validate_donor_from_json_file(self, dir_entry: os.DirEntry) -> list[str]:
         errors = []
         try:
-            with open(dir_entry, "r", encoding="utf-8-sig") as json_file:
+            with open_record_file(dir_entry, "r", encoding="utf-8-sig") as json_file:
                 try:
                     donors_json = json.load(json_file)
                 except JSONDecodeError:
@@ -0,0 +1,29 @@
+import os
+from typing import Callable
+
+from persistence.parquet_row_source import ParquetRowSource, parquet_columns, validate_parquet_columns
+from persistence.sample_donor_csv_repository import SampleDonorCsvRepository
+
+
+class SampleDonorParquetRepository(SampleDonorCsvRepository):
+    """Class for handling sample donors stored in Parquet files. Rows are read from the column batches
+    of the files and parsed with the same parsing map as the Csv files."""
+    _file_extension = ".parquet"
+
+    def __init__(self, records_path: str, donor_parsing_map: dict, miabis_on_fhir_model: bool = False,
+                 row_source: ParquetRowSource = None):
+        if row_source is None:
+            row_source = ParquetRowSource(parquet_columns(donor_parsing_map))
+        super().__init__(records_path=records_path, separator=None, donor_parsing_map=donor_parsing_map,
+                         miabis_on_fhir_model=miabis_on_fhir_model, row_source=row_source)
+
+    def update_mappings(self) -> None:
+        """Update the mappings for the repository."""
+        super().update_mappings()
+        self._row_source = ParquetRowSource(parquet_columns(self._donor_parsing_map))
+
+    def _get_supported_extensions(self) -> tuple[str, Callable]:
+        return self._file_extension, self.__validate_donor_parquet_schema
+
+    def __validate_donor_parquet_schema(self, dir_entry: os.DirEntry) -> list[str]:
+        return validate_parquet_columns(dir_entry, {"id": self._donor_parsing_map.get("id")}, "Sample Donor")
@@ -12,8 +12,10 @@ from model.gender import Gender as ModuleGender
 from model.interface.sample_donor_interface import SampleDonorInterface
 from model.miabis.sample_donor_miabis import SampleDonorMiabis
 from model.sample_donor import SampleDonor
+from persistence.parsed_file_source import ParsedFileSource
 from persistence.sample_donor_repository import SampleDonorRepository
 from persistence.xml_util import parse_xml_file, WrongXMLFormatError
+from persistence.records_catalog import list_record_files
 from util.custom_logger import setup_logger
 from util.enums_util import get_gender_from_abbreviation
 
@@ -24,8 +26,11 @@ logger = logging.getLogger()
 class SampleDonorXMLFilesRepository(SampleDonorRepository):
     """Class for handling sample donors stored in XML files"""
 
-    def __init__(self, records_path: str, donor_parsing_map: dict, miabis_on_fhir_model: bool = False):
+    def __init__(self, records_path: str, donor_parsing_map: dict, miabis_on_fhir_model: bool = False,
+                 file_source: ParsedFileSource = None):
         super().__init__(records_path)
+        self._file_source = file_source if file_source is not None else ParsedFileSource(cache_files=False)
+        self._file_source.register_consumer()
         self._ids: set = set()
         self._donor_parsing_map = donor_parsing_map
         self._miabis_on_fhir_model = miabis_on_fhir_model
@@ -33,10 +38,8 @@ class SampleDonorXMLFilesRepository(SampleDonorRepository):
 
     def get_all(self) -> Generator[SampleDonorInterface, None, None]:
         self._ids = set()
-        with os.scandir(self._dir_path) as entries:
-            for dir_entry in entries:
-                if dir_entry.name.lower().endswith(".xml"):
-                    yield from self.__extract_donor_from_xml_file(dir_entry)
+        for dir_entry in list_record_files(self._dir_path, ".xml"):
+            yield from self.__extract_donor_from_xml_file(dir_entry)
 
     def update_mappings(self) -> None:
         super().update_mappings()
@@ -48,7 +51,7 @@ class SampleDonorXMLFilesRepository(SampleDonorRepository):
         """Extracts SampleDonor from an XML file"""
         donor = None
         try:
-            contents = parse_xml_file(dir_entry)
+            contents = self._file_source.parse(dir_entry, parse_xml_file)
             donor = self.__build_donor(contents)
         except ParserError as err:
             logger.warning(err)
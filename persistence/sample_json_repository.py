@@ -15,9 +15,13 @@ from exception.value_mapping_record_does_not_exist import ValueMappingRecordDoes
 from model.interface.sample_interface import SampleInterface
 from model.miabis.sample_miabis import SampleMiabis
 from model.sample import Sample
+from persistence.json_util import parse_json_file
+from persistence.parsed_file_source import ParsedFileSource
 from persistence.csv_util import check_sample_map_format
 from persistence.sample_repository import SampleRepository
+from persistence.records_catalog import list_record_files
 from util.custom_logger import setup_logger
+from util.record_file_util import open_record_file
 from util.enums_util import parse_storage_temp_from_code as module_parse_storage_temp_from_code
 from util.sample_util import extract_all_diagnosis
 
@@ -30,8 +34,11 @@ class SampleJsonRepository(SampleRepository):
 
     def __init__(self, records_path: str, sample_parsing_map: dict,
                  type_to_collection_map: dict = None, storage_temp_map: dict = None, material_type_map: dict = None,
-                 miabis_on_fhir_model: bool = False, standardized: bool = True):
+                 miabis_on_fhir_model: bool = False, standardized: bool = True,
+                 file_source: ParsedFileSource = None):
         super().__init__(records_path)
+        self._file_source = file_source if file_source is not None else ParsedFileSource(cache_files=False)
+        self._file_source.register_consumer()
         self._sample_parsing_map = sample_parsing_map
         logger.debug(f"Loaded the following sample parsing map {sample_parsing_map}")
         self._type_to_collection_map = type_to_collection_map
@@ -41,10 +48,8 @@ class SampleJsonRepository(SampleRepository):
         self.standardized = standardized
 
     def get_all(self) -> Generator[SampleInterface, None, None]:
-        with os.scandir(self._dir_path) as entries:
-            for dir_entry in entries:
-                if dir_entry.name.lower().endswith(".json"):
-                    yield from self.__extract_sample_from_json_file(dir_entry)
+        for dir_entry in list_record_files(self._dir_path, ".json"):
+            yield from self.__extract_sample_from_json_file(dir_entry)
 
     def update_mappings(self) -> None:
         """Update the mappings for the repository."""
@@ -55,31 +60,29 @@ class SampleJsonRepository(SampleRepository):
 
     def __extract_sample_from_json_file(self, dir_entry: os.DirEntry) -> SampleInterface:
         try:
-            with open(dir_entry, "r", encoding="utf-8-sig") as json_file:
-                try:
-                    check_sample_map_format(self._sample_parsing_map)
-                    samples_json = json.load(json_file)
-                except WrongSampleMapException:
-                    logger.info("Given Sample map has a bad format, cannot parse the file")
-                    return
-                except JSONDecodeError:
-                    logger.error("Biobank file does not have a correct JSON format. Exiting...")
-                    return
-                for sample_json in samples_json:
-                    try:
-                        sample = self.__build_sample(sample_json)
-                        yield sample
-                    except (ValueError, TypeError, KeyError) as err:
-                        logger.info(f"{err} Skipping....")
+            check_sample_map_format(self._sample_parsing_map)
+            samples_json = self._file_source.parse(dir_entry, parse_json_file)
+        except WrongSampleMapException:
+            logger.info("Given Sample map has a bad format, cannot parse the file")
+            return
+        except JSONDecodeError:
+            logger.error("Biobank file does not have a correct JSON format. Exiting...")
+            return
         except OSError as e:
             logger.debug(f"Error while opening file {dir_entry.name}: {e}")
             logger.info(f"Error while opening file {dir_entry.name} [Skipping...]")
             return
+        for sample_json in samples_json:
+            try:
+                sample = self.__build_sample(sample_json)
+                yield sample
+            except (ValueError, TypeError, KeyError) as err:
+                logger.info(f"{err} Skipping....")
 
     def __validate_sample_from_json_file(self, dir_entry: os.DirEntry) -> list[str]:
         errors = []
         try:
-            with open(dir_entry, "r", encoding="utf-8-sig") as json_file:
+            with open_record_file(dir_entry, "r", encoding="utf-8-sig") as json_file:
                 try:
                     check_sample_map_format(self._sample_parsing_map)
                     samples_json = json.load(json_file)
@@ -0,0 +1,36 @@
+import os
+from typing import Callable
+
+from persistence.parquet_row_source import ParquetRowSource, parquet_columns, validate_parquet_columns
+from persistence.sample_csv_repository import SampleCsvRepository
+
+
+class SampleParquetRepository(SampleCsvRepository):
+    """Class for handling sample persistence in Parquet files. Rows are read from the column batches
+    of the files and parsed with the same parsing map as the Csv files."""
+    _file_extension = ".parquet"
+
+    def __init__(self, records_path: str, sample_parsing_map: dict,
+                 type_to_collection_map: dict = None, storage_temp_map: dict = None, material_type_map: dict = None,
+                 miabis_on_fhir_model: bool = False, row_source: ParquetRowSource = None):
+        if row_source is None:
+            row_source = ParquetRowSource(parquet_columns(sample_parsing_map))
+        super().__init__(records_path=records_path, sample_parsing_map=sample_parsing_map, separator=None,
+                         type_to_collection_map=type_to_collection_map, storage_temp_map=storage_temp_map,
+                         material_type_map=material_type_map, miabis_on_fhir_model=miabis_on_fhir_model,
+                         row_source=row_source)
+
+    def update_mappings(self) -> None:
+        """Update the mappings for the repository."""
+        super().update_mappings()
+        self._row_source = ParquetRowSource(parquet_columns(self._sample_parsing_map))
+
+    def _get_supported_extensions(self) -> tuple[str, Callable]:
+        return self._file_extension, self.__validate_sample_parquet_schema
+
+    def __validate_sample_parquet_schema(self, dir_entry: os.DirEntry) -> list[str]:
+        sample_details = self._sample_parsing_map.get("sample_details") or {}
+        return validate_parquet_columns(dir_entry,
+                                        {"sample_details.id": sample_details.get("id"),
+                                         "donor_id": self._sample_parsing_map.get("donor_id")},
+                                        "Sample")
@@ -12,8 +12,10 @@ from exception.value_mapping_record_does_not_exist import ValueMappingRecordDoes
 from model.interface.sample_interface import SampleInterface
 from model.miabis.sample_miabis import SampleMiabis
 from model.sample import Sample
+from persistence.parsed_file_source import ParsedFileSource
 from persistence.sample_repository import SampleRepository
 from persistence.xml_util import parse_xml_file, WrongXMLFormatError
+from persistence.records_catalog import list_record_files
 from util.custom_logger import setup_logger
 from util.enums_util import parse_storage_temp_from_code as module_parse_storage_temp_from_code
 from util.sample_util import diagnosis_with_period, extract_all_diagnosis
@@ -26,8 +28,11 @@ class SampleXMLRepository(SampleRepository):
     """Class for handling sample persistence in XML files."""
 
     def __init__(self, records_path: str, sample_parsing_map: dict, type_to_collection_map: dict = None,
-                 storage_temp_map: dict = None, material_type_map: dict = None, miabis_on_fhir_model: bool = False):
+                 storage_temp_map: dict = None, material_type_map: dict = None, miabis_on_fhir_model: bool = False,
+                 file_source: ParsedFileSource = None):
         super().__init__(records_path)
+        self._file_source = file_source if file_source is not None else ParsedFileSource(cache_files=False)
+        self._file_source.register_consumer()
         self._sample_parsing_map = sample_parsing_map
         logger.debug(f"Loaded the following sample parsing map {sample_parsing_map}")
         self._type_to_collection_map = type_to_collection_map
@@ -36,10 +41,8 @@ class SampleXMLRepository(SampleRepository):
         self._miabis_on_fhir_model = miabis_on_fhir_model
 
     def get_all(self) -> Generator[SampleInterface, None, None]:
-        with os.scandir(self._dir_path) as entries:
-            for dir_entry in entries:
-                if dir_entry.name.lower().endswith(".xml"):
-                    yield from self.__extract_sample_from_xml_file(dir_entry)
+        for dir_entry in list_record_files(self._dir_path, ".xml"):
+            yield from self.__extract_sample_from_xml_file(dir_entry)
 
     def update_mappings(self) -> None:
         """Update the mappings for the repository."""
@@ -51,7 +54,7 @@ class SampleXMLRepository(SampleRepository):
     def __extract_sample_from_xml_file(self, dir_entry: os.DirEntry) -> SampleInterface:
         """Extracts Sample from an XML file"""
         try:
-            file_content = parse_xml_file(dir_entry)
+            file_content = self._file_source.parse(dir_entry, parse_xml_file)
         except WrongXMLFormatError:
             logger.info(f"Wrong XLM format of file: {dir_entry.name} [Skipping...]")
             return
@@ -1,15 +1,20 @@
 """Module containing utility functions for handling XML files"""
 import os
 from collections import OrderedDict
-from pyexpat import ExpatError
-from typing import Any
+from pyexpat import ExpatError, ParserCreate
+from typing import Any, Callable, Optional
 
 import xmltodict
 
+from util.record_file_util import open_record_file
+
+# Bytes of an XML file read before the tree is probed for the first time, doubled after every probe
+PROBE_CHUNK_SIZE = 64 * 1024
+
 
 def parse_xml_file(dir_entry: os.DirEntry) -> OrderedDict[str, Any]:
     """Parse an XML file as an OrderedDictionary"""
-    with open(dir_entry, encoding="UTF-8") as xml_file:
+    with open_record_file(dir_entry, encoding="UTF-8") as xml_file:
         try:
             file_content = xmltodict.parse(xml_file.read())
             return file_content
@@ -17,6 +22,78 @@ def parse_xml_file(dir_entry: os.DirEntry) -> OrderedDict[str, Any]:
             raise WrongXMLFormatError
 
 
+def parse_xml_prefix(dir_entry: os.DirEntry, is_sufficient: Callable[[dict], bool],
+                     chunk_size: int = None) -> dict:
+    """
+    Parse an XML file the same way as parse_xml_file, but only until the part read so far is sufficient.
+    The file is read in growing chunks, after every chunk the tree of the elements read so far (the elements
+    which are still open contain the content read so far) is probed. The whole file is parsed only if the probe
+    never succeeds.
+    :param dir_entry: the XML file
+    :param is_sufficient: probe of the tree, must not raise
+    :param chunk_size: bytes read before the first probe, PROBE_CHUNK_SIZE if not given
+    :return: the tree of the part of the file which was read
+    """
+    chunk_size = chunk_size or PROBE_CHUNK_SIZE
+    builder = _PartialTreeBuilder()
+    parser = ParserCreate()
+    parser.StartElementHandler = builder.start_element
+    parser.EndElementHandler = builder.end_element
+    parser.CharacterDataHandler = builder.characters
+    with open_record_file(dir_entry, "rb") as xml_file:
+        try:
+            while chunk := xml_file.read(chunk_size):
+                parser.Parse(chunk, False)
+                if builder.tree and is_sufficient(builder.tree):
+                    return builder.tree
+                chunk_size *= 2
+            parser.Parse(b"", True)
+        except ExpatError:
+            raise WrongXMLFormatError
+    return builder.tree
+
+
+class _PartialTreeBuilder:
+    """Builds the same dictionary as xmltodict.parse from the parsing events of expat. Every element is added
+    to the tree as soon as it starts, so the tree can be inspected before the file is read to the end."""
+
+    def __init__(self):
+        self.tree: dict = {}
+        # open elements: their node, text, parent node, tag and position among the siblings with the same tag
+        self._open_elements: list[tuple[dict, list[str], dict, str, Optional[int]]] = []
+
+    def start_element(self, name: str, attributes: dict) -> None:
+        node = {f"@{key}": value for key, value in attributes.items()}
+        parent = self._open_elements[-1][0] if self._open_elements else self.tree
+        if name not in parent:
+            parent[name] = node
+            index = None
+        elif isinstance(parent[name], list):
+            parent[name].append(node)
+            index = len(parent[name]) - 1
+        else:
+            parent[name] = [parent[name], node]
+            index = 1
+        self._open_elements.append((node, [], parent, name, index))
+
+    def characters(self, data: str) -> None:
+        if self._open_elements:
+            self._open_elements[-1][1].append(data)
+
+    def end_element(self, name: str) -> None:
+        node, text_parts, parent, tag, index = self._open_elements.pop()
+        text = "".join(text_parts).strip()
+        if node:
+            if text:
+                node["#text"] = text
+            return
+        # an element without attributes and children is represented by its text only
+        if index is None:
+            parent[tag] = text or None
+        else:
+            parent[tag][index] = text or None
+
+
 class WrongXMLFormatError(Exception):
     """Raised when the XML file being read has a wrong format"""
     pass
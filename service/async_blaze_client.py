@@ -0,0 +1,186 @@
+"""Module for the asyncio client of a Blaze store, running many concurrent lookups and uploads from one thread"""
+import asyncio
+import json
+import logging
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Iterable, Optional
+
+import aiohttp
+
+from util.adaptive_load_controller import AdaptiveLoadController, MAX_RETRY_AFTER, parse_retry_after
+from util.custom_logger import setup_logger
+from util.http_util import RequestCounter
+
+setup_logger()
+logger = logging.getLogger()
+
+# Largest number of connections open to the Blaze store at the same time
+CONNECTION_LIMIT = 100
+# Number of records read from the repositories at once and finished before the next ones are read
+ASYNC_WINDOW_SIZE = 500
+# Retries of a request which failed to reach the Blaze store or was answered with a retried status, and the factor
+# of their exponential backoff in seconds, like the Retry of the synchronous sessions
+MAX_RETRIES = 5
+BACKOFF_FACTOR = 0.1
+# Status codes of an overloaded Blaze store after which a request is retried, a Retry-After header is honored
+RETRY_STATUS_CODES = frozenset({429, 500, 502, 503, 504})
+_FHIR_JSON = "application/fhir+json"
+
+
+@dataclass
+class AsyncResponse:
+    """Response of the Blaze store, read whole. Has the attributes of a requests response used by the services."""
+    status_code: int
+    headers: dict[str, str] = field(default_factory=dict)
+    text: str = ""
+
+    def json(self) -> dict:
+        return json.loads(self.text) if self.text else {}
+
+
+class AsyncBlazeClient:
+    """asyncio client of a Blaze store, for the lookups and uploads of the sync. All requests share one connection
+    pool, limited to a number of connections, so hundreds of requests can be awaited at once from a single thread
+    without overloading the store. Every request takes a slot of the load controller shared with the synchronous
+    session of the service, requests which fail or are answered with an overload status are retried with
+    an exponential backoff, or after the pause requested by a Retry-After header.
+    Used as an async context manager, which opens and closes the connection pool."""
+
+    def __init__(self, blaze_url: str, auth: tuple[str, str] = None, connection_limit: int = CONNECTION_LIMIT,
+                 request_counter: RequestCounter = None, load_controller: AdaptiveLoadController = None,
+                 max_retries: int = MAX_RETRIES, backoff_factor: float = BACKOFF_FACTOR):
+        """
+        :param blaze_url: base url of the Blaze store, without a trailing /
+        :param auth: basic auth username and password, no authentication if the username is empty
+        :param connection_limit: largest number of connections open at the same time
+        :param request_counter: counter of the HTTP calls, shared with the synchronous session of the service
+        :param load_controller: controller of the load put on the Blaze store, shared with the synchronous session
+        :param max_retries: number of times a failed request is retried
+        :param backoff_factor: seconds before the first retry, doubled with every following one
+        """
+        self._blaze_url = blaze_url
+        self._auth = aiohttp.BasicAuth(*auth) if auth is not None and auth[0] else None
+        self._connection_limit = connection_limit
+        self._request_counter = request_counter
+        self._load_controller = load_controller
+        self._max_retries = max_retries
+        self._backoff_factor = backoff_factor
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    @property
+    def connection_limit(self) -> int:
+        return self._connection_limit
+
+    async def __aenter__(self) -> "AsyncBlazeClient":
+        self._session = aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=self._connection_limit, ssl=False),
+                                              auth=self._auth, headers={"Accept": _FHIR_JSON})
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback) -> None:
+        await self._session.close()
+        self._session = None
+
+    async def count(self, resource_type: str, params: dict = None) -> int:
+        """
+        Number of resources matching a search, without any of the resources.
+        :raises aiohttp.ClientError: if the search fails.
+        :raises asyncio.TimeoutError: if the Blaze store does not respond in time.
+        """
+        response = await self.__request("GET", f"{self._blaze_url}/{resource_type}",
+                                        params={**(params or {}), "_summary": "count"})
+        if response.status_code != 200:
+            raise aiohttp.ClientError(f"Count of {resource_type} failed with status {response.status_code}")
+        return response.json().get("total", 0)
+
+    async def create(self, resource_type: str, resource: dict) -> AsyncResponse:
+        """
+        Creates a resource.
+        :raises aiohttp.ClientError: if the Blaze store cannot be reached.
+        :raises asyncio.TimeoutError: if the Blaze store does not respond in time.
+        """
+        return await self.__request("POST", f"{self._blaze_url}/{resource_type}", json=resource)
+
+    async def __request(self, method: str, url: str, **kwargs) -> AsyncResponse:
+        """Sends a request, retrying it while it fails or is answered with a retried status and retries are left."""
+        for attempt in range(self._max_retries + 1):
+            retries_left = attempt < self._max_retries
+            try:
+                result = await self.__send(method, url, **kwargs)
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                if not retries_left:
+                    raise
+                logger.debug(f"{method} {url} failed: {e!r}, retrying.")
+                await asyncio.sleep(self.__backoff(attempt))
+                continue
+            if result.status_code not in RETRY_STATUS_CODES or not retries_left:
+                return result
+            retry_after = _retry_after(result)
+            logger.debug(f"{method} {url} was answered with status {result.status_code}, retrying.")
+            await asyncio.sleep(min(retry_after, MAX_RETRY_AFTER) if retry_after is not None
+                                else self.__backoff(attempt))
+
+    async def __send(self, method: str, url: str, **kwargs) -> AsyncResponse:
+        if self._load_controller is None:
+            return await self.__send_once(method, url, **kwargs)
+        async with self._load_controller.async_slot() as started_at:
+            try:
+                result = await self.__send_once(method, url, **kwargs)
+            except (aiohttp.ClientError, asyncio.TimeoutError):
+                self._load_controller.record_overload(started_at)
+                raise
+            self._load_controller.record_response(started_at, result.status_code, _retry_after(result))
+        return result
+
+    async def __send_once(self, method: str, url: str, **kwargs) -> AsyncResponse:
+        async with self._session.request(method, url, **kwargs) as response:
+            result = AsyncResponse(response.status, dict(response.headers), await response.text())
+        if self._request_counter is not None:
+            self._request_counter(result)
+        return result
+
+    def __backoff(self, attempt: int) -> float:
+        return self._backoff_factor * 2 ** attempt
+
+def _retry_after(response: AsyncResponse) -> Optional[float]:
+    """Seconds of the Retry-After header of a response, the header names keep the case sent by the Blaze store."""
+    return parse_retry_after(next((value for name, value in response.headers.items()
+                                   if name.lower() == "retry-after"), None))
+
+
+async def feed_windows(windows: Iterable[list], handle: Callable[[Any], Awaitable[None]], workers: int,
+                       prepare: Callable[[list], Iterable] = None) -> None:
+    """
+    Feeds windows of records through an async queue to concurrent workers. The windows are read (and prepared)
+    in a thread, so reading the record files does not block the event loop. A window is finished before the next
+    one is read, so a checkpoint committing a window when the next one is requested never commits records
+    which are still in flight.
+    :param windows: windows of records, e.g. of a generator-based repository
+    :param handle: coroutine function handling one record (or prepared item), it is expected to handle its errors
+    :param workers: number of records handled at the same time
+    :param prepare: function turning a window into the items to handle, e.g. by resolving the window in bulk,
+    the records themselves if not given
+    """
+    queue: asyncio.Queue = asyncio.Queue(maxsize=workers)
+
+    async def worker() -> None:
+        while True:
+            item = await queue.get()
+            try:
+                await handle(item)
+            except Exception as e:
+                logger.exception(f"Handling a record failed: {e}")
+            finally:
+                queue.task_done()
+
+    tasks = [asyncio.create_task(worker()) for _ in range(workers)]
+    windows = iter(windows)
+    try:
+        while (window := await asyncio.to_thread(next, windows, None)) is not None:
+            items = window if prepare is None else await asyncio.to_thread(lambda: list(prepare(window)))
+            for item in items:
+                await queue.put(item)
+            await queue.join()
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
@@ -1,11 +1,15 @@
+import asyncio
 import logging
 import threading
 import time
-from typing import Optional, cast
+from dataclasses import dataclass
+import os
+import sqlite3
+from itertools import islice
+from typing import Callable, Generator, Iterable, Optional, cast
 
 import requests
 import schedule
-from requests.adapters import HTTPAdapter, Retry
 from fhirclient.models.bundle import Bundle, BundleEntry, BundleEntryRequest
 from glom import glom, Iter, T, Coalesce
 
@@ -14,23 +18,112 @@ from exception.wrong_parsing_map import WrongParsingMapException
 from model.sample import Sample
 from model.sample_collection import SampleCollection
 from model.sample_donor import SampleDonor
+from persistence.records_catalog import reset_record_files_scope, set_record_files_scope
 from persistence.sample_collection_repository import SampleCollectionRepository
 from service.condition_service import ConditionService
+from service.fhir_search import FhirSearch
 from service.patient_service import PatientService
 from service.sample_service import SampleService
-from util.config import get_blaze_auth
+from service.sync_progress_estimator import SyncProgressEstimator
+from util.adaptive_load_controller import AdaptiveLoadController, mount_adaptive_adapter
+from util.blaze_snapshot import BlazeSnapshot, created_fhir_id
+from util.config import get_async_blaze_client, get_async_blaze_connections, get_blaze_auth, \
+    get_reconciliation_snapshot, get_records_dir_path, get_sync_state_dir, get_sync_tracemalloc, \
+    get_sync_tracemalloc_top, get_failed_records_max, get_sync_pipelined
 from util.custom_logger import setup_logger
+from util.failed_record_store import FAILED_RECORDS_FILE_NAME, FailedRecordStore
+from util.fhir_util import any_of_search_values, get_version_id, has_same_content, if_match_headers
+from util.http_util import count_requests
+from util.lazy_import import LazyImport
+from util.memory_tracker import PhaseMemoryTracker
+from util.resource_cache import ResourceCache
 from util.sample_util import build_sample_from_json
 from util.metrics import get_metrics_for_service
-from util.service_preparation_utils import prepare_services
+from util.service_preparation_utils import ServiceBundle, prepare_services
+from util.sync_checkpoint import SyncCheckpoint, fingerprint_records_dir
 import json
 
+# aiohttp and the asyncio client are imported only by the first sync using the asyncio client
+aiohttp = LazyImport("aiohttp")
+async_blaze_client = LazyImport("service.async_blaze_client")
+
 setup_logger()
 logger = logging.getLogger()
 sync_logger = logging.getLogger("sync_logger")
 
 _CANNOT_CONNECT_MSG = "Cannot connect to blaze!"
-_RESOURCE_ID_PATH = "**.resource.id"
+_CUSTODIAN_EXTENSION_URL = "https://fhir.bbmri.de/StructureDefinition/Custodian"
+_CHECKPOINT_FILE_NAME = "blaze_sync_checkpoint.json"
+_SERVICE_NAME = 'blaze'
+# Number of conditions whose patients and existing conditions are resolved with one search
+CONDITION_RESOLUTION_WINDOW = 100
+# Number of donors committed together in the pipelined sync before their conditions and samples are dispatched
+PIPELINE_WINDOW = 100
+# Elements of the resources pulled into the snapshot of the Blaze store, Specimens are pulled whole to be compared
+_SNAPSHOT_ELEMENTS = {"Patient": "identifier", "Condition": "code,subject", "Organization": "identifier"}
+
+
+def _condition_key(condition) -> str:
+    """Identifier of a condition in the failed record store, a patient has every condition once."""
+    return f"{condition.patient_id}:{condition.icd_10_code}"
+
+
+def _windows(records: Iterable, size: int) -> Generator[list, None, None]:
+    """Splits records into lists of up to size records."""
+    iterator = iter(records)
+    while window := list(islice(iterator, size)):
+        yield window
+
+
+class _DependentRecords:
+    """Records depending on a donor (conditions, samples) in the pipelined sync. The records are read in their order,
+    up to the first one whose donor was not committed yet, which is held back until it is. Only one record is held
+    back, so records ordered like their donors follow them closely, and other records wait for the end of the
+    donors."""
+
+    def __init__(self, records: Iterable, donor_identifier: Callable[[object], str]):
+        self._records = iter(records)
+        self._donor_identifier = donor_identifier
+        self._held_back = None
+
+    def ready(self, committed_donors: dict[str, Optional[str]]) -> Generator:
+        """Records whose donors were committed, up to the first record of a donor which was not."""
+        while True:
+            if self._held_back is None:
+                self._held_back = next(self._records, None)
+                if self._held_back is None:
+                    return
+            if self._donor_identifier(self._held_back) not in committed_donors:
+                return
+            record, self._held_back = self._held_back, None
+            yield record
+
+    def remaining(self) -> Generator:
+        """All records which were not read yet, once no further donor is committed."""
+        if self._held_back is not None:
+            record, self._held_back = self._held_back, None
+            yield record
+        yield from self._records
+
+
+@dataclass
+class SampleResolution:
+    """State of a single sample in the Blaze store, resolved once and shared by the compare and update steps."""
+    specimen: Optional[dict] = None
+    patient_fhir_id: Optional[str] = None
+    specimen_donor_identifier: Optional[str] = None
+
+    @property
+    def specimen_present(self) -> bool:
+        return self.specimen is not None
+
+    @property
+    def patient_present(self) -> bool:
+        return self.patient_fhir_id is not None
+
+    @property
+    def specimen_fhir_id(self) -> Optional[str]:
+        return self.specimen.get("id") if self.specimen is not None else None
 
 
 class BlazeService:
@@ -53,28 +146,46 @@ class BlazeService:
         self._blaze_url = blaze_url
         self._sample_collection_repository = sample_collection_repository
         self._credentials = get_blaze_auth()
-        self.metrics = get_metrics_for_service('blaze')
-        retries = Retry(total=5,
-                        backoff_factor=0.1,
-                        status_forcelist=[500, 502, 503, 504])
+        self.metrics = get_metrics_for_service(_SERVICE_NAME)
+        self.load_controller = AdaptiveLoadController(_SERVICE_NAME)
         session = requests.session()
-        session.mount('http://', HTTPAdapter(max_retries=retries))
+        mount_adaptive_adapter(session, self.load_controller)
         session.auth = get_blaze_auth()
         session.trust_env = False
+        self._request_counter = count_requests(session)
         self._session = session
+        self._search = FhirSearch(session, blaze_url)
         self._scheduler_thread = None
         self._sync_lock = threading.Lock()
         self._scheduler = schedule.Scheduler()
-
-    def _refresh_services(self) -> bool:
+        self._organization_fhir_ids: dict[str, Optional[str]] = {}
+        self._resource_cache = ResourceCache('blaze')
+        self._checkpoint: Optional[SyncCheckpoint] = None
+        self._snapshot: Optional[BlazeSnapshot] = None
+        self._stale_resources: dict[str, int] = {}
+        self._progress_estimator: Optional[SyncProgressEstimator] = None
+        self._phase_durations: dict[str, float] = {}
+        self._memory = PhaseMemoryTracker()
+        self._failed_records: Optional[FailedRecordStore] = None
+        self._failed_keys: set[tuple[str, str]] = set()
+        self._repository_factory = None
+
+    def _refresh_services(self, services: ServiceBundle = None) -> bool:
         """
         Refresh services and repositories to handle file format changes.
         This allows the sync to adapt to changes in data source format (CSV, JSON, XML).
-        
+
+        Args:
+            services: already prepared services to use, e.g. ones sharing the parsed records with the MIABIS sync
+
         Returns:
             bool: True if services were successfully refreshed, False otherwise
         """
-        services = prepare_services()
+        if services is None:
+            services = prepare_services()
+            # records shared by the repositories of the factory are released by this sync, shared services
+            # passed in are released by their owner
+            self._repository_factory = services.repository_factory
         self._patient_service = services.patient_service
         self._condition_service = services.condition_service
         self._sample_service = services.sample_service
@@ -87,43 +198,61 @@ class BlazeService:
         logger.debug("Services refreshed successfully.")
         return True
 
-    def sync(self):
-        """Starts the sync between the repositories and the Blaze store."""
+    def sync(self, resume: bool = False, services: ServiceBundle = None, files: list[str] = None) -> Optional[dict]:
+        """
+        Starts the sync between the repositories and the Blaze store.
+        :param resume: continue from the checkpoint of the last interrupted sync, if there is one.
+        :param services: prepared services to sync from, new ones are prepared if not given.
+        :param files: names of the record files to sync, all files if not given. A sync of some files only
+        neither uses nor replaces the checkpoint of an interrupted full sync, and it does not pull snapshots
+        of the Blaze store, as its few records are checked by single requests.
+        :return: summary of the sync (counts and durations of the phases, number of HTTP calls),
+        None if another sync is already in progress
+        """
         if not self._sync_lock.acquire(blocking=False):
             logger.warning("Sync already in progress, skipping duplicate invocation.")
-            return
+            return None
 
+        files_scope = set_record_files_scope(files)
         try:
-            logger.info("Starting sync with Blaze 🔥!")
+            if files is None:
+                logger.info("Starting sync with Blaze 🔥!")
+            else:
+                logger.info(f"Starting sync of {len(files)} record file(s) with Blaze 🔥!")
 
             if self.metrics:
                 self.metrics.start_sync()
-            if not self._refresh_services():
+            if not self._refresh_services(services):
                 error_msg = "Sync failed: Mapping files are misconfigured. Please check your parsing map configuration."
                 sync_logger.error(error_msg)
                 if self.metrics:
                     self.metrics.set_metric('last_sync_error', error_msg)
-                return
+                return {'success': False, 'error_message': error_msg}
 
+            self._request_counter.reset()
+            self._phase_durations = {}
+            self._failed_keys = self.__stored_failed_keys()
+            self._memory = PhaseMemoryTracker(self.metrics, get_sync_tracemalloc(), get_sync_tracemalloc_top())
+            self._memory.start()
             org_summary = {'processed': 0, 'failed': 0, 'skipped': 0}
             pat_summary = {'processed': 0, 'failed': 0, 'skipped': 0}
             cond_summary = {'processed': 0, 'failed': 0, 'skipped': 0}
             samp_summary = {'processed': 0, 'failed': 0, 'skipped': 0}
-            if self.metrics:
-                self.metrics.set_sync_phase(1)
-            org_summary = self.upload_sample_collections()
-            
-            if self.metrics:
-                self.metrics.set_sync_phase(2)
-            pat_summary = self.sync_patients()
-            
-            if self.metrics:
-                self.metrics.set_sync_phase(3)
-            cond_summary = self.sync_conditions()
-            
-            if self.metrics:
-                self.metrics.set_sync_phase(4)
-            samp_summary = self.sync_samples()
+            self._checkpoint = self.__prepare_checkpoint(resume) if files is None else None
+            self._stale_resources = {}
+            if get_reconciliation_snapshot() and files is None:
+                self._snapshot = BlazeSnapshot(self._session, self._blaze_url)
+            self._progress_estimator = SyncProgressEstimator(self.metrics, ('patients', 'conditions', 'specimens'))
+            self._progress_estimator.start()
+            org_summary = self.__run_phase(1, 'organizations', self.upload_sample_collections)
+            if self.__pipeline_enabled():
+                self.__run_pipeline({'patients': pat_summary, 'conditions': cond_summary, 'specimens': samp_summary})
+            else:
+                pat_summary = self.__run_phase(2, 'patients', self.sync_patients)
+                cond_summary = self.__run_phase(3, 'conditions', self.sync_conditions)
+                samp_summary = self.__run_phase(4, 'specimens', self.sync_samples)
+            if self._checkpoint is not None:
+                self._checkpoint.clear()
 
             if self.metrics:
                 self.metrics.set_metric('last_sync_timestamp', time.time())
@@ -133,31 +262,366 @@ class BlazeService:
                 'conditions': cond_summary,
                 'specimens': samp_summary,
                 'organizations': org_summary,
+                'phase_durations': self._phase_durations,
+                'memory': self._memory.summary(),
+                'http_calls': self._request_counter.count,
                 'timestamp': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
                 'success': True
             }
+            if self._snapshot is not None:
+                sync_summary_obj['reconciliation'] = {'source': self._snapshot.source,
+                                                      'stale': self._stale_resources}
+            if files is not None:
+                sync_summary_obj['files'] = sorted(files)
             sync_logger.info(json.dumps({'sync_summary': sync_summary_obj}))
 
             logger.info("Sync completed successfully!")
+            return sync_summary_obj
         except Exception as e:
             logger.exception(f"Sync failed: {e}")
+            if self._checkpoint is not None:
+                self._checkpoint.save()
             
             sync_summary_obj = {
                 'patients': pat_summary,
                 'conditions': cond_summary,
                 'specimens': samp_summary,
                 'organizations': org_summary,
+                'phase_durations': self._phase_durations,
+                'memory': self._memory.summary(),
+                'http_calls': self._request_counter.count,
                 'timestamp': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
                 'success': False,
                 'error_message': str(e)
             }
             sync_logger.info(json.dumps({'sync_summary': sync_summary_obj}))
+            return sync_summary_obj
         finally:
             # Always ensure sync state is cleaned up
             if self.metrics:
                 self.metrics.end_sync()
+            if self._snapshot is not None:
+                self._snapshot.close()
+                self._snapshot = None
+            self._memory.stop()
+            self._checkpoint = None
+            if self._repository_factory is not None:
+                self._repository_factory.release_shared_records()
+                self._repository_factory = None
+            reset_record_files_scope(files_scope)
             self._sync_lock.release()
 
+    def retry_failed(self, ignore_backoff: bool = False) -> Optional[dict]:
+        """
+        Retries only the records which failed in earlier syncs and whose backoff has passed, instead of
+        syncing all records again. Every record is resolved again before it is uploaded, so records which were
+        uploaded in the meantime are not uploaded twice. Records which fail again are kept with a longer backoff.
+        :param ignore_backoff: retry all failed records, also the ones whose backoff has not passed yet
+        :return: summary of the retry, None if a sync is in progress
+        """
+        if not self._sync_lock.acquire(blocking=False):
+            logger.warning("Sync in progress, skipping retry of the failed records.")
+            return None
+        summary = {resource_type: {'processed': 0, 'failed': 0, 'skipped': 0}
+                   for resource_type in ('patients', 'conditions', 'specimens')}
+        try:
+            self._request_counter.reset()
+            self._failed_keys = self.__stored_failed_keys()
+            if not self._failed_keys:
+                logger.info("No failed records to retry.")
+                return {**summary, 'remaining': {}, 'http_calls': 0, 'success': True}
+            failed_records = self.__failed_record_store().due(_SERVICE_NAME, ignore_backoff)
+            logger.info(f"Retrying {len(failed_records)} failed record(s).")
+            self._organization_fhir_ids = {}
+            with self._resource_cache.scope():
+                for failed_record in failed_records:
+                    outcome = self.__replay(failed_record.resource_type, failed_record.record)
+                    summary[failed_record.resource_type][outcome] += 1
+                    if outcome == 'skipped':
+                        self.__record_success(failed_record.resource_type, failed_record.identifier)
+            summary_obj = {**summary, 'remaining': self.__failed_record_store().count(_SERVICE_NAME),
+                           'http_calls': self._request_counter.count,
+                           'timestamp': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()), 'success': True}
+            sync_logger.info(json.dumps({'retry_summary': summary_obj}))
+            return summary_obj
+        except Exception as e:
+            logger.exception(f"Retry of the failed records failed: {e}")
+            return {**summary, 'http_calls': self._request_counter.count, 'success': False,
+                    'error_message': str(e)}
+        finally:
+            self._failed_keys = set()
+            self._sync_lock.release()
+
+    def __replay(self, resource_type: str, record) -> str:
+        """Syncs a single failed record again. Returns 'processed', 'failed' or 'skipped'."""
+        match resource_type:
+            case 'patients':
+                if self.__should_skip_donor(record):
+                    return 'skipped'
+                processed, _ = self.__process_donor_upload(record)
+            case 'conditions':
+                patient_fhir_ids = self.__find_patient_fhir_ids({record.patient_id})
+                if record.patient_id not in patient_fhir_ids:
+                    self.__record_failure('conditions', _condition_key(record), record,
+                                          f"Patient {record.patient_id} is not present")
+                    return 'failed'
+                condition_codes = self.__find_condition_codes(set(patient_fhir_ids.values()))
+                patient_fhir_id = self.__condition_upload_subject(record, patient_fhir_ids, condition_codes, None)
+                if patient_fhir_id is None:
+                    return 'skipped'
+                processed, _ = self.__process_condition_upload(record, patient_fhir_id)
+            case 'specimens':
+                resolution = self.__resolve_sample(record)
+                if not resolution.patient_present:
+                    self.__record_failure('specimens', record.identifier, record,
+                                          f"Patient {record.donor_id} is not present")
+                    return 'failed'
+                if resolution.specimen_present:
+                    processed, failed, _ = self.__process_existing_sample_update(record, resolution)
+                    if not processed and not failed:
+                        return 'skipped'
+                else:
+                    processed, _ = self.__process_new_sample_upload(record, resolution)
+            case _:
+                raise ValueError(f"Cannot retry records of type {resource_type}")
+        return 'processed' if processed else 'failed'
+
+    def __failed_record_store(self) -> FailedRecordStore:
+        if self._failed_records is None:
+            self._failed_records = FailedRecordStore(os.path.join(get_sync_state_dir(), FAILED_RECORDS_FILE_NAME),
+                                                     get_failed_records_max())
+        return self._failed_records
+
+    def __stored_failed_keys(self) -> set[tuple[str, str]]:
+        """Keys of the stored failed records, so records synced later are removed from the store."""
+        if self._failed_records is None and \
+                not os.path.exists(os.path.join(get_sync_state_dir(), FAILED_RECORDS_FILE_NAME)):
+            return set()
+        try:
+            return self.__failed_record_store().keys(_SERVICE_NAME)
+        except sqlite3.Error as e:
+            logger.error(f"Cannot read the failed record store: {e}")
+            return set()
+
+    def __record_failure(self, resource_type: str, identifier: str, record, error) -> None:
+        """Keeps a record which failed to sync in the failed record store, to be retried later."""
+        try:
+            self.__failed_record_store().add(_SERVICE_NAME, resource_type, identifier, record, str(error))
+            self._failed_keys.add((resource_type, identifier))
+        except (OSError, sqlite3.Error) as e:
+            logger.error(f"Cannot store failed {resource_type} record {identifier}: {e}")
+
+    def __record_success(self, resource_type: str, identifier: str) -> None:
+        """Removes a synced record from the failed record store, if it failed before."""
+        if (resource_type, identifier) not in self._failed_keys:
+            return
+        try:
+            self.__failed_record_store().remove(_SERVICE_NAME, resource_type, identifier)
+            self._failed_keys.discard((resource_type, identifier))
+        except sqlite3.Error as e:
+            logger.error(f"Cannot remove synced {resource_type} record {identifier} from the failed records: {e}")
+
+    def __prepare_checkpoint(self, resume: bool) -> SyncCheckpoint:
+        """Checkpoint of this sync. A sync which is not resumed starts from the beginning."""
+        checkpoint = SyncCheckpoint(os.path.join(get_sync_state_dir(), _CHECKPOINT_FILE_NAME),
+                                    fingerprint_records_dir(get_records_dir_path()))
+        if not resume:
+            checkpoint.clear()
+        elif checkpoint.load():
+            logger.info(f"Resuming sync from phase {checkpoint.phase}, after {checkpoint.offset} committed records.")
+        else:
+            logger.info("No checkpoint of an interrupted sync found, starting sync from the beginning.")
+        return checkpoint
+
+    def __run_phase(self, phase: int, resource_type: str, sync_phase: Callable[[], dict]) -> dict:
+        """Runs a phase of the sync, unless it was already finished by the resumed sync."""
+        if self.metrics:
+            self.metrics.set_sync_phase(phase)
+        if self._checkpoint is not None and self._checkpoint.is_phase_finished(phase):
+            logger.info(f"Sync of {resource_type} was already finished by the interrupted sync. Skipping....")
+            summary = self._checkpoint.get_summary(resource_type) or {'processed': 0, 'failed': 0, 'skipped': 0}
+            self._progress_estimator.finish(resource_type, summary, already_done=True)
+            return summary
+        if self._checkpoint is not None:
+            self._checkpoint.start_phase(phase)
+        phase_started = time.monotonic()
+        with self._memory.phase(resource_type):
+            summary = sync_phase()
+        self._phase_durations[resource_type] = round(time.monotonic() - phase_started, 3)
+        if self._checkpoint is not None:
+            self._checkpoint.finish_phase(phase, resource_type, summary)
+        self._progress_estimator.finish(resource_type, summary)
+        return summary
+
+    def __pipeline_enabled(self) -> bool:
+        """The patients, conditions and samples are synced by the pipeline, unless the asyncio client is used, or
+        a resumed sync continues a phase interrupted in the middle."""
+        if not get_sync_pipelined() or get_async_blaze_client():
+            return False
+        return self._checkpoint is None or (not self._checkpoint.is_phase_finished(2) and self._checkpoint.offset == 0)
+
+    def __run_pipeline(self, summaries: dict[str, dict]) -> None:
+        """
+        Syncs the patients, conditions and samples in one pass ordered by their dependencies, instead of one phase
+        after the other. The donors are committed in windows and the conditions and samples of the committed donors
+        are dispatched right after their window, with the FHIR ids of their patients already known, so the phases
+        overlap and the records of a donor are synced while they are still cached. Records whose donor is not among
+        the committed ones are synced at the end, like in the sequential phases. The three record streams read the
+        record files nested in this thread, a CSV file is parsed once and shared by them. The summaries, progress and
+        durations are kept per resource type; the pipeline is checkpointed as a whole, an interrupted pipeline
+        runs again from its start.
+        :param summaries: summaries of the resource types, counted in place
+        """
+        if self.metrics:
+            self.metrics.set_sync_phase(2)
+        if self._checkpoint is not None:
+            self._checkpoint.start_phase(2)
+        pipeline_started = time.monotonic()
+        busy_seconds = dict.fromkeys(summaries, 0.0)
+        services = {'patients': self._patient_service, 'conditions': self._condition_service,
+                    'specimens': self._sample_service}
+        records = {}
+        for resource_type, service in services.items():
+            try:
+                service.update_mappings()
+                records[resource_type] = service.get_all()
+            except WrongParsingMapException as e:
+                logger.exception(f"Failed to update {resource_type} mappings, skipping their sync: {e}")
+                records[resource_type] = []
+        conditions = _DependentRecords(records['conditions'], lambda condition: condition.patient_id)
+        samples = _DependentRecords(records['specimens'], lambda sample: sample.donor_id)
+        committed_donors: dict[str, Optional[str]] = {}
+        snapshot = self.__pull_snapshot(["Patient", "Condition", "Specimen", "Organization"])
+        self._organization_fhir_ids = {}
+
+        def dispatch(resource_type: str, windows: Iterable[list], sync_window: Callable) -> None:
+            for window in windows:
+                started = time.monotonic()
+                sync_window(window, snapshot, summaries[resource_type], committed_donors)
+                busy_seconds[resource_type] += time.monotonic() - started
+
+        with self._memory.phase('pipeline'), self._resource_cache.scope():
+            if snapshot is not None:
+                self._organization_fhir_ids.update(snapshot.fhir_ids("Organization"))
+                for organization in snapshot.resources("Organization"):
+                    self._resource_cache.put(organization)
+            for donors in _windows(records['patients'], PIPELINE_WINDOW):
+                dispatch('patients', [donors], self.__sync_donor_window)
+                dispatch('conditions', _windows(conditions.ready(committed_donors), CONDITION_RESOLUTION_WINDOW),
+                         self.__sync_condition_window)
+                dispatch('specimens', _windows(samples.ready(committed_donors), PIPELINE_WINDOW),
+                         self.__sync_sample_window)
+            if self.metrics:
+                self.metrics.set_sync_phase(3)
+            dispatch('conditions', _windows(conditions.remaining(), CONDITION_RESOLUTION_WINDOW),
+                     self.__sync_condition_window)
+            if self.metrics:
+                self.metrics.set_sync_phase(4)
+            dispatch('specimens', _windows(samples.remaining(), PIPELINE_WINDOW), self.__sync_sample_window)
+
+        self._phase_durations.update({resource_type: round(seconds, 3)
+                                      for resource_type, seconds in busy_seconds.items()})
+        self._phase_durations['pipeline'] = round(time.monotonic() - pipeline_started, 3)
+        for phase, (resource_type, fhir_resource_type) in enumerate((('patients', "Patient"),
+                                                                     ('conditions', "Condition"),
+                                                                     ('specimens', "Specimen")), start=2):
+            self.__record_stale(snapshot, resource_type, fhir_resource_type, resumed=False)
+            if self._checkpoint is not None:
+                self._checkpoint.finish_phase(phase, resource_type, summaries[resource_type])
+            self._progress_estimator.finish(resource_type, summaries[resource_type])
+            logger.info(f"{resource_type.capitalize()} sync complete: {summaries[resource_type]['processed']} "
+                        f"processed, {summaries[resource_type]['failed']} failed, "
+                        f"{summaries[resource_type]['skipped']} skipped")
+
+    def __sync_donor_window(self, donors: list, snapshot: Optional[BlazeSnapshot], summary: dict,
+                            committed_donors: dict[str, Optional[str]]) -> None:
+        """Syncs a window of donors in the pipeline and commits them with the FHIR ids of their patients
+        (None if the donor failed), resolved with a single search for the whole window."""
+        present = self.__find_patient_fhir_ids({donor.identifier for donor in donors
+                                                if self.__validate_donor_type(donor)}, snapshot)
+        uploaded: set[str] = set()
+        for donor in donors:
+            if not isinstance(donor, SampleDonor):
+                summary['skipped'] += 1
+            elif donor.identifier in present or donor.identifier in uploaded:
+                if snapshot is not None and donor.identifier in present:
+                    snapshot.mark_seen("Patient", present[donor.identifier])
+                summary['skipped'] += 1
+            else:
+                new_processed, new_failed = self.__process_donor_upload(donor)
+                summary['processed'] += new_processed
+                summary['failed'] += new_failed
+                uploaded.add(donor.identifier)
+            if self.metrics:
+                self.metrics.increment_sync_progress('patients')
+        committed = {**present, **self.__find_patient_fhir_ids(uploaded, snapshot)}
+        for donor in donors:
+            if isinstance(donor, SampleDonor):
+                committed_donors[donor.identifier] = committed.get(donor.identifier)
+
+    def __checkpointed_windows(self, records: Iterable, resource_type: str, size: int) -> Iterable[list]:
+        """Windows of records, skipping records already committed by the resumed sync and advancing
+        the checkpoint after every window."""
+        if self._checkpoint is None:
+            return _windows(records, size)
+
+        def on_skipped():
+            if self.metrics:
+                self.metrics.increment_sync_progress(resource_type)
+
+        return self._checkpoint.track_windows(records, size, on_skipped)
+
+    def __checkpointed(self, records: Iterable, resource_type: str) -> Iterable:
+        """Skips records already committed by the resumed sync and advances the checkpoint."""
+        if self._checkpoint is None:
+            return records
+
+        def on_skipped():
+            if self.metrics:
+                self.metrics.increment_sync_progress(resource_type)
+
+        return self._checkpoint.track(records, on_skipped)
+
+    def __pull_snapshot(self, resource_types: list[str]) -> Optional[BlazeSnapshot]:
+        """
+        Pulls the resources of the types into the snapshot of this sync, for the records of a phase to be looked up
+        in it. Every type is pulled once per sync, the later phases reuse it, as the resources created by the sync
+        are added to the snapshot. Returns None if the sync runs without a snapshot or it cannot be pulled,
+        the records are then checked in the Blaze store one by one.
+        """
+        if self._snapshot is None:
+            return None
+        missing_types = [resource_type for resource_type in resource_types
+                         if resource_type not in self._snapshot.pulled_types]
+        if not missing_types:
+            return self._snapshot
+        try:
+            self._snapshot.pull(missing_types, _SNAPSHOT_ELEMENTS)
+        except (requests.exceptions.RequestException, ValueError, OSError, sqlite3.Error) as e:
+            logger.warning(f"Cannot pull a snapshot of the Blaze store, the records are checked one by one: {e}")
+            return None
+        return self._snapshot
+
+    def __record_stale(self, snapshot: Optional[BlazeSnapshot], resource_type: str, fhir_resource_type: str,
+                       resumed: bool) -> None:
+        """Counts the resources of the snapshot which were not matched by any record of a phase.
+        They are only reported, the sync never deletes resources from the Blaze store."""
+        if snapshot is None or resumed:
+            return
+        stale = snapshot.count_stale(fhir_resource_type)
+        self._stale_resources[resource_type] = stale
+        if stale:
+            logger.info(f"{stale} {fhir_resource_type} resources in the Blaze store are not among the records.")
+
+    def __phase_resumed(self) -> bool:
+        """Checks if the current phase continues from the checkpoint, i.e. some of its records are skipped."""
+        return self._checkpoint is not None and self._checkpoint.offset > 0
+
+    def __remember_created(self, response: requests.Response, resource_json: dict) -> None:
+        """Adds a resource created by the sync to the snapshot, so the following records do not create it again."""
+        if self._snapshot is not None and response.status_code == 201:
+            self._snapshot.add(resource_json, created_fhir_id(response))
+
     def __initialize_scheduler(self):
         logger.info("Initializing scheduler...")
         self._scheduler.clear()
@@ -189,11 +653,16 @@ class BlazeService:
         """
         This method posts all patients from the repository to the Blaze store. WARNING: can result in duplication of
         patients. This method should be called only once, specifically if there are no patients in the FHIR server.
-        :return: Status code of the http request
+        The patients are posted in transaction bundles, sized by the adaptive load controller.
+        :return: Status code of the last http request
         """
         logger.info("Starting upload of patients...")
-        bundle = self._patient_service.get_all_patients_in_fhir_transaction()
-        status_code = self.__post_bundle(bundle=bundle)
+        status_code = None
+        for bundle in self._patient_service.get_patients_in_fhir_transactions(
+                lambda: self.load_controller.batch_size):
+            status_code = self.__post_bundle(bundle=bundle)
+            if status_code >= 300:
+                break
         logger.info('Number of patients successfully uploaded: %s',
                     self.get_number_of_resources("Patient"))
         return status_code
@@ -221,9 +690,15 @@ class BlazeService:
             return False
         return True
 
-    def __should_skip_donor(self, donor: SampleDonor) -> bool:
-        """Check if donor should be skipped (already present in Blaze)."""
-        return self.is_resource_present_in_blaze(resource_type="patient", identifier=donor.identifier)
+    def __should_skip_donor(self, donor: SampleDonor, snapshot: Optional[BlazeSnapshot] = None) -> bool:
+        """Check if donor should be skipped (already present in Blaze, or in the snapshot of it)."""
+        if snapshot is None:
+            return self.is_resource_present_in_blaze(resource_type="patient", identifier=donor.identifier)
+        patient_fhir_id = snapshot.fhir_id("Patient", donor.identifier)
+        if patient_fhir_id is None:
+            return False
+        snapshot.mark_seen("Patient", patient_fhir_id)
+        return True
 
     def __process_donor_upload(self, donor: SampleDonor) -> tuple[int, int]:
         """
@@ -233,14 +708,18 @@ class BlazeService:
         try:
             status = self.__upload_donor(donor)
             if status == 201:
+                self.__record_success('patients', donor.identifier)
                 return 1, 0
             else:
+                self.__record_failure('patients', donor.identifier, donor, f"Blaze responded with status {status}")
                 return 0, 1
-        except requests.exceptions.ConnectionError:
+        except requests.exceptions.ConnectionError as e:
             logger.error(_CANNOT_CONNECT_MSG)
+            self.__record_failure('patients', donor.identifier, donor, e)
             return 0, 1
         except Exception as e:
             logger.exception(f"Error uploading patient {donor.identifier}: {e}")
+            self.__record_failure('patients', donor.identifier, donor, e)
             return 0, 1
 
     def sync_patients(self):
@@ -258,8 +737,16 @@ class BlazeService:
             logger.exception(f"Failed to update patient mappings: {e}")
             logger.error("Skipping patient sync due to parsing map error.")
             return {"processed": 0, "failed": 0, "skipped": 0}
-        
-        for donor in self._patient_service.get_all():
+
+        resumed = self.__phase_resumed()
+        snapshot = self.__pull_snapshot(["Patient"])
+        if get_async_blaze_client():
+            summary = asyncio.run(self.__sync_patients_async(snapshot))
+            processed, failed, skipped = summary['processed'], summary['failed'], summary['skipped']
+            donors = []
+        else:
+            donors = self.__checkpointed(self._patient_service.get_all(), 'patients')
+        for donor in donors:
             # Validate donor type
             if not self.__validate_donor_type(donor):
                 skipped += 1
@@ -270,7 +757,7 @@ class BlazeService:
             donor = cast(SampleDonor, donor)
             
             # Skip if donor already exists
-            if self.__should_skip_donor(donor):
+            if self.__should_skip_donor(donor, snapshot):
                 skipped += 1
                 if self.metrics:
                     self.metrics.increment_sync_progress('patients')
@@ -284,47 +771,87 @@ class BlazeService:
             if self.metrics:
                 self.metrics.increment_sync_progress('patients')
 
+        self.__record_stale(snapshot, 'patients', "Patient", resumed)
         logger.info(f"Patients sync complete: {processed} processed, {failed} failed, {skipped} skipped")
         return {'processed': processed, 'failed': failed, 'skipped': skipped}
 
+    async def __sync_patients_async(self, snapshot: Optional[BlazeSnapshot]) -> dict:
+        """Syncs the SampleDonors with concurrent lookups and uploads of the asyncio client."""
+        summary = {'processed': 0, 'failed': 0, 'skipped': 0}
+        # a donor repeated in the records is uploaded once, its first upload may still be in flight
+        seen_identifiers: set[str] = set()
+
+        async with self.__async_client() as client:
+            async def sync_donor(donor) -> None:
+                summary[await self.__sync_donor_async(client, donor, snapshot, seen_identifiers)] += 1
+                if self.metrics:
+                    self.metrics.increment_sync_progress('patients')
+
+            windows = self.__checkpointed_windows(self._patient_service.get_all(), 'patients',
+                                                  async_blaze_client.ASYNC_WINDOW_SIZE)
+            await async_blaze_client.feed_windows(windows, sync_donor, client.connection_limit)
+        return summary
+
+    async def __sync_donor_async(self, client: "async_blaze_client.AsyncBlazeClient", donor,
+                                 snapshot: Optional[BlazeSnapshot], seen_identifiers: set[str]) -> str:
+        """Syncs a single donor. Returns 'processed', 'failed' or 'skipped'."""
+        if not self.__validate_donor_type(donor) or donor.identifier in seen_identifiers:
+            return 'skipped'
+        seen_identifiers.add(donor.identifier)
+        try:
+            if snapshot is not None:
+                present = self.__should_skip_donor(donor, snapshot)
+            else:
+                present = await client.count("Patient", {"identifier": donor.identifier}) > 0
+            if present:
+                return 'skipped'
+            patient_json = donor.to_fhir().as_json()
+            response = await client.create("Patient", patient_json)
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            logger.error(f"Error uploading patient {donor.identifier}: {e}")
+            self.__record_failure('patients', donor.identifier, donor, e)
+            return 'failed'
+        self.__remember_created(response, patient_json)
+        if response.status_code != 201:
+            self.__record_failure('patients', donor.identifier, donor,
+                                  f"Blaze responded with status {response.status_code}")
+            return 'failed'
+        logger.info("Patient " + donor.identifier + " uploaded.")
+        self.__record_success('patients', donor.identifier)
+        return 'processed'
+
+    def __async_client(self) -> "async_blaze_client.AsyncBlazeClient":
+        return async_blaze_client.AsyncBlazeClient(self._blaze_url, self._credentials,
+                                                   get_async_blaze_connections(), self._request_counter,
+                                                   self.load_controller)
+
     def __upload_donor(self, donor: SampleDonor) -> int:
-        logger.debug("Uploading patient: " + donor.to_fhir().as_json().__str__())
+        patient_json = donor.to_fhir().as_json()
+        logger.debug("Uploading patient: " + patient_json.__str__())
         res = self._session.post(url=self._blaze_url + "/Patient",
-                                 json=donor.to_fhir().as_json(),
+                                 json=patient_json,
                                  verify=False)
+        self.__remember_created(res, patient_json)
         logger.info("Patient " + donor.identifier + " uploaded.")
         return res.status_code
 
-    def __check_patient_for_condition(self, condition) -> tuple[bool, bool]:
-        """
-        Check if patient exists and if they already have the condition.
-        Returns (patient_exists, patient_has_condition).
-        """
-        try:
-            patient_has_condition = self.patient_has_condition(
-                patient_identifier=condition.patient_id,
-                icd_10_code=condition.icd_10_code
-            )
-            return True, patient_has_condition
-        except PatientNotFoundError:
-            logger.info(
-                f"Patient with identifier: {condition.patient_id} not present in the FHIR store. Skipping..."
-            )
-            return False, False
-
-    def __process_condition_upload(self, condition) -> tuple[int, int]:
+    def __process_condition_upload(self, condition, patient_fhir_id: str) -> tuple[int, int]:
         """
         Process uploading a single condition.
         Returns (processed_count, failed_count).
         """
         try:
-            status = self.__upload_condition(condition)
+            status = self.__upload_condition(condition, patient_fhir_id)
             if status == 201:
+                self.__record_success('conditions', _condition_key(condition))
                 return 1, 0
             else:
+                self.__record_failure('conditions', _condition_key(condition), condition,
+                                      f"Blaze responded with status {status}")
                 return 0, 1
         except Exception as e:
             logger.exception(f"Error uploading condition: {e}")
+            self.__record_failure('conditions', _condition_key(condition), condition, e)
             return 0, 1
 
     def sync_conditions(self):
@@ -346,28 +873,19 @@ class BlazeService:
             logger.exception(f"Failed to update condition mappings: {e}")
             logger.error("Skipping condition sync due to parsing map error.")
             return {"processed": 0, "failed": 0, "skipped": 0}
-        
-        for condition in self._condition_service.get_all():
-            # Check if patient exists and already has this condition
-            patient_exists, patient_has_condition = self.__check_patient_for_condition(condition)
-            
-            if not patient_exists:
-                skipped += 1
-                if self.metrics:
-                    self.metrics.increment_sync_progress('conditions')
-                continue
-            
-            # Upload condition if patient doesn't have it yet
-            if not patient_has_condition:
-                new_processed, new_failed = self.__process_condition_upload(condition)
-                processed += new_processed
-                failed += new_failed
-            else:
-                skipped += 1
-            
-            if self.metrics:
-                self.metrics.increment_sync_progress('conditions')
 
+        resumed = self.__phase_resumed()
+        snapshot = self.__pull_snapshot(["Patient", "Condition"])
+        if get_async_blaze_client():
+            summary = asyncio.run(self.__sync_conditions_async(snapshot))
+        else:
+            summary = {'processed': 0, 'failed': 0, 'skipped': 0}
+            for window in self.__checkpointed_windows(self._condition_service.get_all(), 'conditions',
+                                                      CONDITION_RESOLUTION_WINDOW):
+                self.__sync_condition_window(window, snapshot, summary)
+        processed, failed, skipped = summary['processed'], summary['failed'], summary['skipped']
+
+        self.__record_stale(snapshot, 'conditions', "Condition", resumed)
         logger.info("Upload of conditions ended.")
         logger.debug(
             f"Successfully uploaded {self.get_number_of_resources('Condition') - num_of_conditions_before_upload} new conditions.")
@@ -375,76 +893,254 @@ class BlazeService:
 
         return {'processed': processed, 'failed': failed, 'skipped': skipped}
 
-    def __upload_condition(self, condition):
-        patient_fhir_id = self.__get_fhir_id_of_donor(condition.patient_id)
+    def __sync_condition_window(self, window: list, snapshot: Optional[BlazeSnapshot], summary: dict,
+                                committed_donors: dict[str, Optional[str]] = None) -> None:
+        """
+        Syncs a window of conditions. The patients of the window and their conditions are resolved in bulk,
+        every condition is decided about locally.
+        :param committed_donors: FHIR ids of the patients committed by the pipeline, they are not searched again
+        """
+        committed_donors = committed_donors or {}
+        patient_fhir_ids = {condition.patient_id: committed_donors[condition.patient_id] for condition in window
+                            if committed_donors.get(condition.patient_id) is not None}
+        patient_fhir_ids.update(self.__find_patient_fhir_ids({condition.patient_id for condition in window
+                                                              if condition.patient_id not in committed_donors},
+                                                             snapshot))
+        condition_codes = self.__find_condition_codes(set(patient_fhir_ids.values()), snapshot)
+        for condition in window:
+            patient_fhir_id = self.__condition_upload_subject(condition, patient_fhir_ids, condition_codes, snapshot)
+            if patient_fhir_id is None:
+                summary['skipped'] += 1
+            else:
+                new_processed, new_failed = self.__process_condition_upload(condition, patient_fhir_id)
+                summary['processed'] += new_processed
+                summary['failed'] += new_failed
+                if new_processed:
+                    condition_codes[patient_fhir_id][condition.icd_10_code] = None
+
+            if self.metrics:
+                self.metrics.increment_sync_progress('conditions')
+
+    def __condition_upload_subject(self, condition, patient_fhir_ids: dict[str, str],
+                                   condition_codes: dict[str, dict[str, Optional[str]]],
+                                   snapshot: Optional[BlazeSnapshot]) -> Optional[str]:
+        """
+        Decides about a condition of a resolved window.
+        :return: FHIR id of the patient the condition is uploaded to, None if the condition is skipped
+        (its patient is not present, or the patient already has the condition)
+        """
+        patient_fhir_id = patient_fhir_ids.get(condition.patient_id)
+        if patient_fhir_id is None:
+            logger.info(f"Patient with identifier: {condition.patient_id} not present in the FHIR store. Skipping...")
+            return None
+        if condition.icd_10_code in condition_codes[patient_fhir_id]:
+            condition_fhir_id = condition_codes[patient_fhir_id][condition.icd_10_code]
+            if snapshot is not None and condition_fhir_id is not None:
+                snapshot.mark_seen("Condition", condition_fhir_id)
+            return None
+        return patient_fhir_id
+
+    async def __sync_conditions_async(self, snapshot: Optional[BlazeSnapshot]) -> dict:
+        """Syncs the Conditions with concurrent uploads of the asyncio client. Every window is resolved in bulk
+        like in the synchronous sync, the uploads of its new conditions are sent concurrently."""
+        summary = {'processed': 0, 'failed': 0, 'skipped': 0}
+
+        def resolve_window(window: list) -> Generator[tuple, None, None]:
+            patient_fhir_ids = self.__find_patient_fhir_ids({condition.patient_id for condition in window}, snapshot)
+            condition_codes = self.__find_condition_codes(set(patient_fhir_ids.values()), snapshot)
+            for condition in window:
+                patient_fhir_id = self.__condition_upload_subject(condition, patient_fhir_ids, condition_codes,
+                                                                  snapshot)
+                if patient_fhir_id is None:
+                    summary['skipped'] += 1
+                    if self.metrics:
+                        self.metrics.increment_sync_progress('conditions')
+                    continue
+                # a condition repeated in the window is uploaded once, the first upload is still to be sent
+                condition_codes[patient_fhir_id][condition.icd_10_code] = None
+                yield condition, patient_fhir_id
+
+        async with self.__async_client() as client:
+            async def upload_condition(upload: tuple) -> None:
+                condition, patient_fhir_id = upload
+                condition_json = condition.to_fhir(subject_id=patient_fhir_id).as_json()
+                try:
+                    response = await client.create("Condition", condition_json)
+                    error = f"Blaze responded with status {response.status_code}"
+                except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                    logger.error(f"Error uploading condition: {e}")
+                    response = None
+                    error = e
+                if response is not None and response.status_code == 201:
+                    self.__remember_created(response, condition_json)
+                    self.__record_success('conditions', _condition_key(condition))
+                    summary['processed'] += 1
+                else:
+                    self.__record_failure('conditions', _condition_key(condition), condition, error)
+                    summary['failed'] += 1
+                if self.metrics:
+                    self.metrics.increment_sync_progress('conditions')
+
+            windows = self.__checkpointed_windows(self._condition_service.get_all(), 'conditions',
+                                                  CONDITION_RESOLUTION_WINDOW)
+            await async_blaze_client.feed_windows(windows, upload_condition, client.connection_limit,
+                                                  prepare=resolve_window)
+        return summary
+
+    def __upload_condition(self, condition, patient_fhir_id: str):
+        condition_json = condition.to_fhir(subject_id=patient_fhir_id).as_json()
         res = self._session.post(url=self._blaze_url + "/Condition",
-                           json=condition.to_fhir(subject_id=patient_fhir_id).as_json(),
+                           json=condition_json,
                            verify=False)
+        self.__remember_created(res, condition_json)
         logger.info(f"Condition {condition.icd_10_code} successfully uploaded for patient"
                     f"with FHIR id: {patient_fhir_id} and org. id: {condition.patient_id}.")
         return res.status_code
 
-    def __get_fhir_id_of_donor(self, patient_id: str) -> str:
+    def __find_patient_fhir_ids(self, patient_identifiers: set[str],
+                                snapshot: Optional[BlazeSnapshot] = None) -> dict[str, str]:
+        """
+        Resolves the FHIR ids of patients with a single search for all of them, or in the snapshot.
+        :param patient_identifiers: identifiers of the sample donors
+        :return: FHIR ids by the identifier, patients not present in the Blaze store are left out
+        """
+        patient_fhir_ids: dict[str, str] = {}
+        if not patient_identifiers:
+            return patient_fhir_ids
+        if snapshot is not None:
+            for patient_identifier in patient_identifiers:
+                patient_fhir_id = snapshot.fhir_id("Patient", patient_identifier)
+                if patient_fhir_id is not None:
+                    patient_fhir_ids[patient_identifier] = patient_fhir_id
+            return patient_fhir_ids
+        for patient in self._search.resources("Patient",
+                                              {"identifier": any_of_search_values(sorted(patient_identifiers))},
+                                              elements="identifier"):
+            for identifier in patient.get("identifier", []):
+                if identifier.get("value") in patient_identifiers:
+                    patient_fhir_ids.setdefault(identifier.get("value"), patient.get("id"))
+        return patient_fhir_ids
+
+    def __find_condition_codes(self, patient_fhir_ids: set[str],
+                               snapshot: Optional[BlazeSnapshot] = None) -> dict[str, dict[str, Optional[str]]]:
         """
-        Get Resource id for a patient with identifier.
-        :param patient_id: Identifier of the sample donor
-        :return: FHIR resource id
+        Fetches the codes of the conditions of patients with a single search for all of them, or from the snapshot.
+        :param patient_fhir_ids: FHIR ids of the patients
+        :return: FHIR ids of the conditions by their codes (ICD-10 with a period), by the FHIR id of the patient
         """
-        return glom(self._session.get(url=f"{self._blaze_url}/Patient",
-                                      params={"identifier": patient_id},
-                                      verify=False).json(), _RESOURCE_ID_PATH)[0]
+        condition_codes: dict[str, dict[str, Optional[str]]] = {patient_fhir_id: {}
+                                                                 for patient_fhir_id in patient_fhir_ids}
+        if not patient_fhir_ids:
+            return condition_codes
+        if snapshot is not None:
+            conditions = snapshot.referencing("Condition", sorted(patient_fhir_ids))
+        else:
+            subjects = any_of_search_values(f"Patient/{patient_fhir_id}"
+                                            for patient_fhir_id in sorted(patient_fhir_ids))
+            conditions = self._search.resources("Condition", {"subject": subjects}, elements="code,subject")
+        for condition in conditions:
+            patient_fhir_id = condition.get("subject", {}).get("reference", "").split("/")[-1]
+            if patient_fhir_id in condition_codes:
+                for coding in condition.get("code", {}).get("coding", []):
+                    condition_codes[patient_fhir_id].setdefault(coding.get("code"), condition.get("id"))
+        return condition_codes
 
     def patient_has_condition(self, patient_identifier: str, icd_10_code: str) -> bool:
         """Checks if patient already has a condition with specific ICD-10 code (use a dot format)."""
-        try:
-            patient_fhir_id = glom(self._session.get(url=f"{self._blaze_url}/Patient",
-                                                     params={"identifier": patient_identifier},
-                                                     verify=False).json(), _RESOURCE_ID_PATH)[0]
-        except IndexError:
+        patient_fhir_id = self._search.first_id("Patient", {"identifier": patient_identifier})
+        if patient_fhir_id is None:
             raise PatientNotFoundError
-        return self._session.get(f"{self._blaze_url}/Condition",
-                                 params={"patient": patient_fhir_id, "code": icd_10_code},
-                                 verify=False).json().get("total") > 0
-
-    def __check_sample_and_patient_presence(self, sample) -> tuple[bool, bool]:
-        """Check if sample and patient are present in Blaze store."""
-        logger.debug(f"Checking if Specimen with ID: {sample.identifier} is present."
-                     f"Checking if Patient with ID: {sample.donor_id} is present")
-        specimen_present = self.is_resource_present_in_blaze(resource_type="Specimen", identifier=sample.identifier)
-        patient_present = self.is_resource_present_in_blaze(resource_type="Patient", identifier=sample.donor_id)
-        return specimen_present, patient_present
-
-    def __process_new_sample_upload(self, sample) -> tuple[int, int]:
+        return self._search.count("Condition", {"patient": patient_fhir_id, "code": icd_10_code}) > 0
+
+    def __resolve_sample(self, sample, snapshot: Optional[BlazeSnapshot] = None,
+                         patient_fhir_id: Optional[str] = None) -> SampleResolution:
+        """
+        Resolve the Blaze state of a sample. The Specimen is fetched together with its subject in a single search,
+        the Patient is searched separately only if the Specimen is missing or belongs to a different donor.
+        With a snapshot of the Blaze store, the sample is resolved in the snapshot without any request.
+        :param patient_fhir_id: FHIR id of the patient of the donor, if already known, it is not searched again
+        """
+        logger.debug(f"Resolving Specimen with ID: {sample.identifier} and Patient with ID: {sample.donor_id}")
+        if snapshot is not None:
+            return self.__resolve_sample_in_snapshot(sample, snapshot)
+        bundle = next(self._search.pages("Specimen", {"identifier": sample.identifier,
+                                                      "_include": "Specimen:subject"}, page_size=1))
+        resolution = SampleResolution()
+        included_patients = {}
+        for entry in bundle.get("entry", []):
+            resource = entry.get("resource", {})
+            if resource.get("resourceType") == "Specimen" and resolution.specimen is None:
+                resolution.specimen = resource
+            elif resource.get("resourceType") == "Patient":
+                included_patients[resource.get("id")] = resource
+        if resolution.specimen is not None:
+            subject_reference = resolution.specimen.get("subject", {}).get("reference", "")
+            patient = included_patients.get(subject_reference.split("/")[-1])
+            if patient is not None:
+                resolution.specimen_donor_identifier = self.__first_identifier_value(patient)
+                if resolution.specimen_donor_identifier == sample.donor_id:
+                    resolution.patient_fhir_id = patient.get("id")
+        if resolution.patient_fhir_id is None:
+            resolution.patient_fhir_id = patient_fhir_id or self.__find_fhir_id("Patient", sample.donor_id)
+        return resolution
+
+    def __resolve_sample_in_snapshot(self, sample, snapshot: BlazeSnapshot) -> SampleResolution:
+        """Resolve the Blaze state of a sample from the snapshot of the Blaze store."""
+        resolution = SampleResolution(specimen=snapshot.find("Specimen", sample.identifier))
+        if resolution.specimen is not None:
+            snapshot.mark_seen("Specimen", resolution.specimen_fhir_id)
+            subject_fhir_id = resolution.specimen.get("subject", {}).get("reference", "").split("/")[-1]
+            patient = snapshot.get("Patient", subject_fhir_id)
+            if patient is not None:
+                resolution.specimen_donor_identifier = self.__first_identifier_value(patient)
+                if resolution.specimen_donor_identifier == sample.donor_id:
+                    resolution.patient_fhir_id = subject_fhir_id
+        if resolution.patient_fhir_id is None:
+            resolution.patient_fhir_id = snapshot.fhir_id("Patient", sample.donor_id)
+        return resolution
+
+    def __process_new_sample_upload(self, sample, resolution: SampleResolution) -> tuple[int, int]:
         """Process upload of a new sample. Returns (processed_count, failed_count)."""
         logger.debug(f"Specimen with org. ID: {sample.identifier} is not present in Blaze but the Donor is "
                      f"present. Uploading...")
         try:
-            status = self.__upload_sample(sample)
+            status = self.__upload_sample(sample, resolution.patient_fhir_id)
             if status == 201:
                 logger.info(f"Succesfully uploaded Specimen with org ID: {sample.identifier}")
+                self.__record_success('specimens', sample.identifier)
                 return 1, 0
             else:
+                self.__record_failure('specimens', sample.identifier, sample, f"Blaze responded with status {status}")
                 return 0, 1
         except Exception as e:
             logger.exception(f"Error uploading sample {sample.identifier}: {e}")
+            self.__record_failure('specimens', sample.identifier, sample, e)
             return 0, 1
 
-    def __process_existing_sample_update(self, sample) -> tuple[int, int, int]:
+    def __process_existing_sample_update(self, sample, resolution: SampleResolution) -> tuple[int, int, int]:
         """Process update of an existing sample. Returns (processed_count, failed_count, skipped_count)."""
         logger.debug(f"Specimen with org. ID: {sample.identifier} is already present in Blaze."
                      f"Checking if the sample is up to date.")
-        old_sample = self.__build_existing_sample(sample)
+        old_sample = self.__build_existing_sample(resolution)
         if sample == old_sample:
             logger.info("Sample is up to date. Skipping....")
             return 0, 0, 1
         
         try:
-            old_sample_id = self.__get_fhir_sample_id(sample.identifier)
             sample.update_diagnoses(old_sample.diagnoses)
-            self.__update_sample(sample, old_sample_id)
-            return 1, 0, 0
+            match self.__update_sample(sample, resolution):
+                case 'processed':
+                    self.__record_success('specimens', sample.identifier)
+                    return 1, 0, 0
+                case 'skipped':
+                    self.__record_success('specimens', sample.identifier)
+                    return 0, 0, 1
+                case outcome:
+                    self.__record_failure('specimens', sample.identifier, sample, f"Update of the sample: {outcome}")
+                    return 0, 1, 0
         except Exception as e:
             logger.exception(f"Error updating sample {sample.identifier}: {e}")
+            self.__record_failure('specimens', sample.identifier, sample, e)
             return 0, 1, 0
 
     def sync_samples(self):
@@ -457,106 +1153,151 @@ class BlazeService:
         processed = 0
         failed = 0
         skipped = 0
-        
+        self._organization_fhir_ids = {}
+
         try:
             self._sample_service.update_mappings()
         except WrongParsingMapException as e:
             logger.exception(f"Failed to update sample mappings: {e}")
             logger.error("Skipping sample sync due to parsing map error.")
             return {"processed": 0, "failed": 0, "skipped": 0}
-        
-        for sample in self._sample_service.get_all():
-            specimen_present, patient_present = self.__check_sample_and_patient_presence(sample)
-            
-            if not specimen_present and patient_present:
-                new_processed, new_failed = self.__process_new_sample_upload(sample)
-                processed += new_processed
-                failed += new_failed
-            elif specimen_present and patient_present:
-                new_processed, new_failed, new_skipped = self.__process_existing_sample_update(sample)
-                processed += new_processed
-                failed += new_failed
-                skipped += new_skipped
-            else:
-                # Skip if patient is not present - cannot upload sample without patient
-                logger.debug(f"Patient with ID: {sample.donor_id} is not present. Skipping sample {sample.identifier}.")
-                skipped += 1
-            
-            if self.metrics:
-                self.metrics.increment_sync_progress('specimens')
 
+        resumed = self.__phase_resumed()
+        snapshot = self.__pull_snapshot(["Patient", "Specimen", "Organization"])
+        # the Organizations of the existing samples are fetched once per sample sync
+        with self._resource_cache.scope():
+            if snapshot is not None:
+                self._organization_fhir_ids.update(snapshot.fhir_ids("Organization"))
+                for organization in snapshot.resources("Organization"):
+                    self._resource_cache.put(organization)
+            summary = {'processed': 0, 'failed': 0, 'skipped': 0}
+            for sample in self.__checkpointed(self._sample_service.get_all(), 'specimens'):
+                self.__sync_sample(sample, snapshot, summary)
+            processed, failed, skipped = summary['processed'], summary['failed'], summary['skipped']
+
+        self.__record_stale(snapshot, 'specimens', "Specimen", resumed)
         logger.info(f"Successfully uploaded {self.get_number_of_resources('Specimen') - num_of_samples_before_sync} new samples.")
         logger.info("Upload of samples ended.")
         logger.info(f"Samples sync complete: {processed} processed, {failed} failed, {skipped} skipped")
 
         return {'processed': processed, 'failed': failed, 'skipped': skipped}
 
-    def __upload_sample(self, sample: Sample):
-        custodian_fhir_id: Optional[str] = None
-        if (sample.sample_collection_id is not None and
-                self.is_resource_present_in_blaze("Organization", sample.sample_collection_id)):
-            custodian_fhir_id = self.__get_organization_fhir_id(sample.sample_collection_id)
+    def __sync_sample(self, sample, snapshot: Optional[BlazeSnapshot], summary: dict,
+                      patient_fhir_id: Optional[str] = None) -> None:
+        """Uploads a new sample, or updates an existing one, and counts it in the summary."""
+        resolution = self.__resolve_sample(sample, snapshot, patient_fhir_id)
+
+        if not resolution.specimen_present and resolution.patient_present:
+            new_processed, new_failed = self.__process_new_sample_upload(sample, resolution)
+            summary['processed'] += new_processed
+            summary['failed'] += new_failed
+        elif resolution.specimen_present and resolution.patient_present:
+            new_processed, new_failed, new_skipped = self.__process_existing_sample_update(sample, resolution)
+            summary['processed'] += new_processed
+            summary['failed'] += new_failed
+            summary['skipped'] += new_skipped
+        else:
+            # Skip if patient is not present - cannot upload sample without patient
+            logger.debug(f"Patient with ID: {sample.donor_id} is not present. Skipping sample {sample.identifier}.")
+            summary['skipped'] += 1
+
+        if self.metrics:
+            self.metrics.increment_sync_progress('specimens')
+
+    def __sync_sample_window(self, samples: list, snapshot: Optional[BlazeSnapshot], summary: dict,
+                             committed_donors: dict[str, Optional[str]]) -> None:
+        """Syncs the samples of committed donors in the pipeline, with the FHIR ids of their patients known."""
+        for sample in samples:
+            self.__sync_sample(sample, snapshot, summary, committed_donors.get(sample.donor_id))
+
+    def __upload_sample(self, sample: Sample, patient_fhir_id: str):
+        sample_json = sample.to_fhir(subject_id=patient_fhir_id,
+                                     custodian_id=self.__get_custodian_fhir_id(sample.sample_collection_id)).as_json()
         response = self._session.post(url=self._blaze_url + "/Specimen",
-                                      json=sample.to_fhir(
-                                          subject_id=self.__get_fhir_id_of_donor(sample.donor_id),
-                                          custodian_id=custodian_fhir_id)
-                                      .as_json(),
+                                      json=sample_json,
                                       verify=False
                                       )
+        self.__remember_created(response, sample_json)
         if response.status_code != 201:
             logger.error(f"Failed to upload sample with ID: {sample.identifier}. Reason: {response.text}")
         return response.status_code
 
-    def __update_sample(self, updated_sample: Sample, sample_fhir_id: str):
+    def __update_sample(self, updated_sample: Sample, resolution: SampleResolution) -> str:
         """
-        Updates a sample in the Blaze store.
-        :param sample: Sample object to update.
-        :param sample_fhir_id: FHIR resource ID of the sample.
+        Updates a sample in the Blaze store. The update is skipped if the stored Specimen already has the same
+        content, and is conditional on the version that was resolved, so concurrent changes are not overwritten.
+        :param updated_sample: Sample object to update.
+        :param resolution: Resolved state of the sample in the Blaze store.
+        :return: 'processed', 'skipped' or 'failed'
         """
-        custodian_fhir_id: Optional[str] = None
-        if (updated_sample.sample_collection_id is not None and
-                self.is_resource_present_in_blaze("Organization", updated_sample.sample_collection_id)):
-            custodian_fhir_id = self.__get_organization_fhir_id(updated_sample.sample_collection_id)
+        sample_fhir_id = resolution.specimen_fhir_id
         updated_sample_fhir = updated_sample.to_fhir(
-            subject_id=self.__get_fhir_id_of_donor(updated_sample.donor_id),
-            custodian_id=custodian_fhir_id).as_json()
+            subject_id=resolution.patient_fhir_id,
+            custodian_id=self.__get_custodian_fhir_id(updated_sample.sample_collection_id)).as_json()
         updated_sample_fhir["id"] = sample_fhir_id
+        if has_same_content(updated_sample_fhir, resolution.specimen):
+            logger.info(f"Sample with ID: {updated_sample.identifier} has the same content in Blaze. Skipping....")
+            self.__record_update('skipped')
+            return 'skipped'
         response = self._session.put(url=self._blaze_url + f"/Specimen/{sample_fhir_id}",
                                      json=updated_sample_fhir,
+                                     headers=if_match_headers(get_version_id(resolution.specimen)),
                                      verify=False
                                      )
+        self._resource_cache.invalidate("Specimen", sample_fhir_id)
         if response.status_code == 200:
             logger.info(f"Sample with ID: {updated_sample.identifier} successfully updated.")
+            self.__record_update('applied')
+            return 'processed'
+        if response.status_code == 412:
+            logger.warning(f"Sample with ID: {updated_sample.identifier} was modified in Blaze since it was read. "
+                           f"Skipping the update so the newer version is not overwritten.")
+            self.__record_update('conflict')
         else:
             logger.error(f"Failed to update sample with ID: {updated_sample.identifier}. Reason: {response.text}")
+        return 'failed'
+
+    def __record_update(self, outcome: str) -> None:
+        if self.metrics:
+            self.metrics.record_update('specimens', outcome)
 
-    def __build_existing_sample(self, new_sample: Sample) -> Sample:
+    def __build_existing_sample(self, resolution: SampleResolution) -> Sample:
         """
-        Builds a Sample object from the Blaze store using the identifier of the new Sample object.
-        :param new_sample: sample to be added (the existing sample is to be built using this sample's FHIR ID)
+        Builds a Sample object from the Specimen already fetched from the Blaze store.
+        :param resolution: Resolved state of the sample in the Blaze store.
         """
-        fhir_sample_id = self.__get_fhir_sample_id(new_sample.identifier)
-        fhir_sample = self._session.get(url=self._blaze_url + f"/Specimen/{fhir_sample_id}",
-                                        verify=False).json()
-        old_donor_id = glom(fhir_sample, ("**.subject", ["reference"]))[0]
-        old_sample_donor_identifier = self.__get_donor_identifier(old_donor_id)
+        fhir_sample = resolution.specimen
         old_sample_collection_identifier = None
-        if fhir_sample.get("extension") is not None:
-            for ext in fhir_sample.get("extension"):
-                if ext.get("url") == "https://fhir.bbmri.de/StructureDefinition/Custodian":
-                    old_sample_collection_id = ext.get("valueReference").get("reference")
-                    old_sample_collection_identifier = self.__get_collection_identifier(old_sample_collection_id)
-        old_sample = build_sample_from_json(fhir_sample, old_sample_donor_identifier, old_sample_collection_identifier)
-        return old_sample
-
-    def __get_organization_fhir_id(self, organization_identifier: str):
-        organization_fhir_id = \
-            glom(self._session.get(
-                url=f"{self._blaze_url}/Organization",
-                params={"identifier": organization_identifier},
-                verify=False)
-                 .json(), _RESOURCE_ID_PATH)[0]
-        return organization_fhir_id
+        for ext in fhir_sample.get("extension", []):
+            if ext.get("url") == _CUSTODIAN_EXTENSION_URL:
+                old_sample_collection_reference = ext.get("valueReference").get("reference")
+                old_sample_collection_identifier = self.__get_collection_identifier(
+                    old_sample_collection_reference)
+        return build_sample_from_json(fhir_sample, resolution.specimen_donor_identifier,
+                                      old_sample_collection_identifier)
+
+    def __get_custodian_fhir_id(self, sample_collection_id: Optional[str]) -> Optional[str]:
+        """Get the FHIR id of the Organization with the given identifier, looked up once per sample sync."""
+        if sample_collection_id is None:
+            return None
+        if sample_collection_id not in self._organization_fhir_ids:
+            self._organization_fhir_ids[sample_collection_id] = self.__find_fhir_id("Organization",
+                                                                                    sample_collection_id)
+        return self._organization_fhir_ids[sample_collection_id]
+
+    def __find_fhir_id(self, resource_type: str, identifier: str) -> Optional[str]:
+        """Get the FHIR id of a resource with the given identifier, or None if it is not present."""
+        try:
+            return self._search.first_id(resource_type, {"identifier": identifier})
+        except requests.exceptions.HTTPError:
+            return None
+
+    @staticmethod
+    def __first_identifier_value(resource: dict) -> Optional[str]:
+        for identifier in resource.get("identifier", []):
+            if identifier.get("value") is not None:
+                return identifier.get("value")
+        return None
 
     def get_number_of_resources(self, resource_type: str) -> int:
         """
@@ -565,9 +1306,7 @@ class BlazeService:
         :return: The number of resources in the Blaze store.
         """
         try:
-            return self._session.get(url=f"{self._blaze_url}/{resource_type.capitalize()}",
-                                     params={"_summary": "count"},
-                                     verify=False).json().get("total")
+            return self._search.count(resource_type.capitalize())
         except requests.exceptions.ConnectionError:
             logger.error(_CANNOT_CONNECT_MSG)
             return 0
@@ -581,17 +1320,17 @@ class BlazeService:
         :param resource_type: Type of FHIR resource to delete.
         :return: Status code of the http request.
         """
-        response = self._session.get(url=f"{self._blaze_url}/{resource_type.capitalize()}",
-                                     params={search_param: param_value},
-                                     verify=False)
-        list_of_full_urls: list[str] = glom(response.json(), "**.fullUrl")
-        if response.status_code == 404 or len(list_of_full_urls) == 0:
+        resource_type = resource_type.capitalize()
+        try:
+            fhir_ids = list(self._search.ids(resource_type, {search_param: param_value}))
+        except requests.exceptions.HTTPError:
+            return 404
+        if len(fhir_ids) == 0:
             return 404
-        for url in list_of_full_urls:
-            logger.info("Deleting " + url)
-            resource_type, fhir_id = url.split("/")[-2:]
-            if resource_type.capitalize() == "Patient":
-                patient_reference = url[url.find("Patient/"):]
+        for fhir_id in fhir_ids:
+            logger.info(f"Deleting {resource_type}/{fhir_id}")
+            if resource_type == "Patient":
+                patient_reference = f"Patient/{fhir_id}"
                 logger.info("In order to delete Patient successfully, "
                             "all resources which reference this patient needs to be deleted as well.")
                 self.delete_fhir_resource("Condition", patient_reference, "reference")
@@ -615,53 +1354,28 @@ class BlazeService:
             logger.info(f"Donor with FHIR id {donor_fhir_id} is not present in the blaze store.")
         donor_entry = self.__create_delete_bundle_entry("Patient", donor_fhir_id)
         entries.append(donor_entry)
-        conditions_response = self._session.get(url=f"{self._blaze_url}/Condition",
-                                                params={"subject": f"Patient/{donor_fhir_id}"},
-                                                verify=False)
-        samples_response = self._session.get(url=f"{self._blaze_url}/Specimen",
-                                             params={"subject": f"Patient/{donor_fhir_id}"},
-                                             verify=False)
-        for condition_json in conditions_response.json().get("entry", []):
-            condition_resource = condition_json.get("resource", {})
-            condition_fhir_id = condition_resource.get("id", None)
-            if condition_fhir_id is not None:
-                entries.append(self.__create_delete_bundle_entry("Condition", condition_fhir_id))
-        for sample_json in samples_response.json().get("entry", []):
-            sample_resource = sample_json.get("resource", {})
-            sample_fhir_id = sample_resource.get("id", None)
-            if sample_fhir_id is not None:
-                entries.append(self.__create_delete_bundle_entry("Specimen", sample_fhir_id))
+        for condition_fhir_id in self._search.ids("Condition", {"subject": f"Patient/{donor_fhir_id}"}):
+            entries.append(self.__create_delete_bundle_entry("Condition", condition_fhir_id))
+        for sample_fhir_id in self._search.ids("Specimen", {"subject": f"Patient/{donor_fhir_id}"}):
+            entries.append(self.__create_delete_bundle_entry("Specimen", sample_fhir_id))
         bundle = self.__create_bundle(entries)
         response = self._session.post(f"{self._blaze_url}", json=bundle.as_json(), verify=False)
         return response.status_code == 200 or response.status_code == 204
 
     def delete_everything(self) -> bool:
         """Delete all Patient,Sample, and Condition resources from the blaze."""
-        response = self._session.get(url=self._blaze_url + "/Patient", verify=False)
-        while response.status_code == 200:
-            response_json = response.json()
-            for entry in response_json.get("entry", []):
-                resource = entry.get("resource", {})
-                patient_fhir_id = resource.get("id", None)
-                patient_identifier = resource.get("identifier", [{}])[0].get("value", None)
-                if patient_identifier is not None:
-                    logger.info(
-                        f"Deleting patient with id {patient_identifier}, along with his Condition and Specimen resources.")
-                    deleted = self.delete_donor(patient_fhir_id)
-                    if not deleted:
-                        logger.error(
-                            f"Could not delete patient with organization identifier {patient_identifier}. Skipping....")
-            links = response_json.get("link", [])
-            link_relations = [link.get("relation") for link in links]
-            if "next" not in link_relations:
-                break
-            next_index = link_relations.index("next")
-            url = links[next_index].get("url")
-            url_after_fhir = url.find("/fhir")
-            if url_after_fhir == -1:
-                break
-            next_link = self._blaze_url + url[url_after_fhir + len("/fhir"):]
-            response = self._session.get(url=next_link, verify=False)
+        # the patients are collected first, deleting them while paging through the search would shift its pages
+        patients = list(self._search.resources("Patient", elements="identifier"))
+        for resource in patients:
+            patient_fhir_id = resource.get("id", None)
+            patient_identifier = resource.get("identifier", [{}])[0].get("value", None)
+            if patient_identifier is not None:
+                logger.info(
+                    f"Deleting patient with id {patient_identifier}, along with his Condition and Specimen resources.")
+                deleted = self.delete_donor(patient_fhir_id)
+                if not deleted:
+                    logger.error(
+                        f"Could not delete patient with organization identifier {patient_identifier}. Skipping....")
         logger.info("Delete successful")
         return True
 
@@ -673,12 +1387,10 @@ class BlazeService:
         :param identifier: Business identifier value (may contain &, ?, =, /, spaces, etc.).
         :return: Total count reported by Blaze, or 0 on error.
         """
-        response = self._session.get(
-            url=f"{self._blaze_url}/{resource_type.capitalize()}",
-            params={"identifier": identifier, "_summary": "count"},
-            verify=False,
-        )
-        return response.json().get("total", 0)
+        try:
+            return self._search.count(resource_type.capitalize(), {"identifier": identifier})
+        except requests.exceptions.HTTPError:
+            return 0
 
     def is_resource_present_in_blaze(self, resource_type: str, identifier: str) -> bool:
         """
@@ -757,8 +1469,8 @@ class BlazeService:
         """Get the identifier of the Sample Collection to which a sample belongs.
         :param sample_identifier: Identifier of the sample.
         :return: Identifier of the Sample Collection. if not found, returns None."""
-        sample_id = self.__get_fhir_sample_id(sample_identifier)
-        sample = self._session.get(url=self._blaze_url + f"/Specimen/{sample_id}", verify=False).json()
+        with self._resource_cache.scope():
+            sample = self.__get_specimen(sample_identifier)
         sample_collection_id = None
         if sample.get("extension") is not None:
             for ext in sample.get("extension"):
@@ -770,8 +1482,8 @@ class BlazeService:
         """Get diagnoses from a sample in the Blaze store.
         :param sample_identifier: Identifier of the sample.
         :return: List of diagnoses."""
-        sample_id = self.__get_fhir_sample_id(sample_identifier)
-        sample: dict = self._session.get(url=self._blaze_url + f"/Specimen/{sample_id}", verify=False).json()
+        with self._resource_cache.scope():
+            sample = self.__get_specimen(sample_identifier)
         diagnoses = []
         if sample.get("extension") is not None:
             for ext in sample.get("extension"):
@@ -784,8 +1496,8 @@ class BlazeService:
         """Get storage temperature from a sample in the Blaze store.
         :param sample_identifier: Identifier of the sample.
         :return: Storage temperature."""
-        sample_id = self.__get_fhir_sample_id(sample_identifier)
-        sample: dict = self._session.get(url=self._blaze_url + f"/Specimen/{sample_id}", verify=False).json()
+        with self._resource_cache.scope():
+            sample = self.__get_specimen(sample_identifier)
         storage_temperature = None
         if sample.get("extension") is not None:
             for ext in sample.get("extension"):
@@ -794,37 +1506,52 @@ class BlazeService:
 
         return storage_temperature
 
+    def __get_specimen(self, sample_identifier: str) -> dict:
+        """Get the Specimen resource of a sample, served from the resource cache if it was already fetched.
+        :param sample_identifier: Identifier of the sample.
+        :return: Specimen resource."""
+        return self.__read_resource("Specimen", self.__get_fhir_sample_id(sample_identifier))
+
     def __get_fhir_sample_id(self, sample_identifier: str) -> str:
-        """Get the FHIR resource ID of a sample using the sample identifier.
+        """Get the FHIR resource ID of a sample using the sample identifier. The search result and the found
+        Specimen resources are kept in the resource cache.
         :param sample_identifier: Identifier of the sample.
         :return: FHIR resource ID of the sample."""
-
-        sample = self._session.get(url=f"{self._blaze_url}/Specimen",
-                                   params={"identifier": sample_identifier},
-                                   verify=False).json()
-        return glom(sample, _RESOURCE_ID_PATH)[0]
+        sample_id = self._resource_cache.get_fhir_id("Specimen", sample_identifier)
+        if sample_id is not None:
+            return sample_id
+        # the whole Specimen is requested, it is read from the resource cache right after its id
+        specimen = next(self._search.resources("Specimen", {"identifier": sample_identifier}, page_size=1), None)
+        if specimen is None:
+            raise IndexError(f"Specimen with identifier {sample_identifier} is not present in the Blaze store.")
+        self._resource_cache.put(specimen)
+        sample_id = specimen.get("id")
+        self._resource_cache.put_fhir_id("Specimen", sample_identifier, sample_id)
+        return sample_id
+
+    def __read_resource(self, resource_type: str, fhir_id: str) -> dict:
+        """Read a resource by its FHIR id, served from the resource cache if it was already fetched."""
+        resource = self._resource_cache.get(resource_type, fhir_id)
+        if resource is None:
+            resource = self._session.get(url=self._blaze_url + f"/{resource_type}/{fhir_id}", verify=False).json()
+            self._resource_cache.put(resource)
+        return resource
+
+    def __read_reference(self, reference: str) -> dict:
+        """Read a resource by its relative reference (e.g. Patient/1)."""
+        resource_type, fhir_id = reference.split("/")[-2:]
+        return self.__read_resource(resource_type, fhir_id)
 
     def __get_collection_identifier(self, fhir_collection_id: str) -> str | None:
         """Get the identifier of the Sample Collection to which a sample belongs.
         :param fhir_collection_id: FHIR resource ID of the Sample Collection.
         :return: Identifier of the Sample Collection. if not found, returns None."""
-        collection = self._session.get(url=self._blaze_url + f"/{fhir_collection_id}", verify=False).json()
+        collection = self.__read_reference(fhir_collection_id)
         identifier_list = (glom(collection, ("**.identifier", ["**.value"]), default=None))
         if len(identifier_list) > 0:
             return self.__flatten_list(identifier_list)[0]
         return None
 
-    def __get_donor_identifier(self, fhir_patient_id: str) -> str | None:
-        """Get the identifier of the Sample Donor from the Blaze store.
-        :param fhir_patient_id: FHIR resource ID of the Sample Donor.
-        :return: Identifier of the Sample Donor. if not found, returns None."""
-        patient = self._session.get(url=self._blaze_url + f"/{fhir_patient_id}", verify=False).json()
-
-        identifier_list = glom(patient, ("**.identifier", ["**.value"]), default=None)
-        if len(identifier_list) > 0:
-            return self.__flatten_list(identifier_list)[0]
-        return None
-
     def __flatten_list(self, nested_list):
         """Flatten a nested list."""
         return [item for sublist in nested_list for item in
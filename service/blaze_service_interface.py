@@ -13,6 +13,11 @@ class BlazeServiceInterface(abc.ABC):
         """delete all records from the blaze service"""
         pass
 
+    @abc.abstractmethod
+    def retry_failed(self, ignore_backoff: bool = False):
+        """retry the records which failed to sync in earlier syncs"""
+        pass
+
     def run_scheduler(self):
         """schedule to run sync periodically"""
         pass
\ No newline at end of file
@@ -0,0 +1,91 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+from service.blaze_service import BlazeService
+from service.blaze_service_interface import BlazeServiceInterface
+from service.miabis_blaze_service import MiabisBlazeService
+from util.custom_logger import setup_logger
+from util.service_preparation_utils import prepare_shared_services
+
+setup_logger()
+logger = logging.getLogger()
+
+
+class CombinedSyncService(BlazeServiceInterface):
+    """Runs the standard and the MIABIS on FHIR sync as one shared-ingest pipeline. The repositories of both syncs
+    come from one repository factory, so the record files are parsed once and the parsed records are converted
+    to the BBMRI.de and to the MIABIS on FHIR model. The uploads to both Blaze stores run concurrently."""
+
+    def __init__(self, blaze_service: BlazeService, miabis_blaze_service: MiabisBlazeService):
+        self._blaze_service = blaze_service
+        self._miabis_blaze_service = miabis_blaze_service
+        self._sync_lock = threading.Lock()
+
+    def sync(self, resume: bool = False, files: list[str] = None) -> Optional[dict]:
+        """
+        Syncs the records to both Blaze stores.
+        :param resume: continue the standard sync from the checkpoint of the last interrupted sync.
+        :param files: names of the record files to sync, all files if not given.
+        :return: summaries of both syncs, None if a combined sync is already in progress
+        """
+        if not self._sync_lock.acquire(blocking=False):
+            logger.warning("Combined sync already in progress, skipping duplicate invocation.")
+            return None
+        try:
+            logger.info("Starting combined sync of the standard and MIABIS on FHIR Blaze stores.")
+            services, miabis_services, repository_factory = prepare_shared_services()
+            try:
+                with ThreadPoolExecutor(max_workers=2, thread_name_prefix="combined-sync") as executor:
+                    blaze_sync = executor.submit(self._blaze_service.sync, resume=resume, services=services,
+                                                 files=files)
+                    miabis_sync = executor.submit(self._miabis_blaze_service.sync, services=miabis_services,
+                                                  files=files)
+                    blaze_summary = blaze_sync.result()
+                    miabis_summary = miabis_sync.result()
+            finally:
+                repository_factory.release_shared_records()
+            return self.__combine_summaries(blaze_summary, miabis_summary)
+        finally:
+            self._sync_lock.release()
+
+    def retry_failed(self, ignore_backoff: bool = False) -> Optional[dict]:
+        """
+        Retries the records which failed in earlier syncs to both Blaze stores.
+        :param ignore_backoff: retry all failed records, also the ones whose backoff has not passed yet
+        :return: summaries of both retries, None if a combined sync is in progress
+        """
+        if not self._sync_lock.acquire(blocking=False):
+            logger.warning("Combined sync in progress, skipping retry of the failed records.")
+            return None
+        try:
+            with ThreadPoolExecutor(max_workers=2, thread_name_prefix="combined-retry") as executor:
+                blaze_retry = executor.submit(self._blaze_service.retry_failed, ignore_backoff)
+                miabis_retry = executor.submit(self._miabis_blaze_service.retry_failed, ignore_backoff)
+                return self.__combine_summaries(blaze_retry.result(), miabis_retry.result())
+        finally:
+            self._sync_lock.release()
+
+    def delete_everything(self) -> bool:
+        """Deletes all resources from both Blaze stores."""
+        deleted = self._blaze_service.delete_everything()
+        miabis_deleted = self._miabis_blaze_service.delete_everything()
+        return deleted and miabis_deleted
+
+    @staticmethod
+    def __combine_summaries(blaze_summary: Optional[dict], miabis_summary: Optional[dict]) -> dict:
+        errors = []
+        for name, summary in (("standard", blaze_summary), ("MIABIS", miabis_summary)):
+            if summary is None:
+                errors.append(f"{name} sync was already in progress")
+            elif not summary.get('success', True):
+                errors.append(f"{name} sync failed: {summary.get('error_message')}")
+        combined_summary = {
+            'blaze': blaze_summary,
+            'miabis-blaze': miabis_summary,
+            'success': not errors
+        }
+        if errors:
+            combined_summary['error_message'] = "; ".join(errors)
+        return combined_summary
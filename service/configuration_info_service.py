@@ -7,17 +7,18 @@ from flask import Flask, jsonify, make_response, request
 from werkzeug.utils import secure_filename
 
 from model.storage_temperature import StorageTemperature
-from service.condition_service import ConditionService
 from util.custom_logger import setup_logger
-
-from validation.factory.validator_factory_util import get_validator_factory
-
-from persistence.factories.factory_util import get_repository_factory
-from service.patient_service import PatientService
-from service.sample_service import SampleService
+from util.lazy_import import LazyImport
 
 from util.config import write_to_file, get_config_value, set_config_value, get_material_type_map, get_storage_temp_map, get_type_to_collection_map, reload_all_maps, get_miabis_on_fhir, get_miabis_material_type_map, get_miabis_storage_temp_map, get_records_file_type
 
+# The repositories, services and validators are imported by the first mapping validation, not by the API start
+get_validator_factory = LazyImport("validation.factory.validator_factory_util", "get_validator_factory")
+get_repository_factory = LazyImport("persistence.factories.factory_util", "get_repository_factory")
+PatientService = LazyImport("service.patient_service", "PatientService")
+SampleService = LazyImport("service.sample_service", "SampleService")
+ConditionService = LazyImport("service.condition_service", "ConditionService")
+
 setup_logger()
 logger = logging.getLogger()
 
@@ -437,13 +438,13 @@ def __categorize_validation_error(validation_error: Exception, errors: dict[str,
 
 def __run_structural_validation(errors: dict[str, list[str]]) -> bool:
     """
-    Run Stage 1 structural validation for CSV/XML files.
+    Run Stage 1 structural validation for CSV/XML/Parquet files.
     Returns True if validation passes or is skipped, False if it fails.
     """
     try:
         file_type = get_records_file_type().lower()
         
-        if file_type in ['csv', 'xml']:
+        if file_type in ['csv', 'xml', 'parquet']:
             logger.info(f"Stage 1: Running structural validation for {file_type} files...")
             validator_factory = get_validator_factory()
             validator = validator_factory.create_validator()
@@ -0,0 +1,83 @@
+"""Module for the FHIR searches of the Blaze services, with projections and paging"""
+from typing import Generator, Optional
+
+import requests
+
+from util.fhir_util import next_page_url
+
+# Number of resources requested per page of a search
+SEARCH_PAGE_SIZE = 1000
+
+
+class FhirSearch:
+    """Searches of a FHIR server. Every search requests only what its caller needs: counts are requested with
+    _summary=count, ids and identifiers with _elements. Result pages are requested and decoded one at a time,
+    only when the resources of the previous page were consumed, following the next links of the pages."""
+
+    def __init__(self, session: requests.Session, base_url: str, page_size: int = SEARCH_PAGE_SIZE):
+        """
+        :param session: session the searches are sent with
+        :param base_url: base url of the FHIR server, without a trailing /
+        :param page_size: number of resources requested per page (_count) of the searches going through all results
+        """
+        self._session = session
+        self._base_url = base_url
+        self._page_size = page_size
+
+    def pages(self, resource_type: str, params: dict = None, elements: str = None,
+              page_size: Optional[int] = None) -> Generator[dict, None, None]:
+        """
+        Yields the searchset Bundles of all pages of a search.
+        :param resource_type: resource type searched
+        :param params: search parameters
+        :param elements: elements of the resources to return (_elements), whole resources if not given
+        :param page_size: number of resources per page (_count), the page size of this search helper if not given
+        :raises requests.HTTPError: if a page cannot be fetched.
+        """
+        params = {**(params or {}), "_count": page_size or self._page_size}
+        if elements is not None:
+            params["_elements"] = elements
+        response = self._session.get(url=f"{self._base_url}/{resource_type}", params=params, verify=False)
+        while True:
+            response.raise_for_status()
+            bundle = response.json()
+            yield bundle
+            next_link = next_page_url(bundle, self._base_url)
+            if next_link is None:
+                return
+            response = self._session.get(url=next_link, verify=False)
+
+    def search(self, resource_type: str, params: dict = None, elements: str = None,
+               page_size: Optional[int] = None) -> Generator[dict, None, None]:
+        """Yields the resources of all pages of a search, including the ones added by _include."""
+        for bundle in self.pages(resource_type, params, elements, page_size):
+            for entry in bundle.get("entry", []):
+                yield entry.get("resource", {})
+
+    def resources(self, resource_type: str, params: dict = None, elements: str = None,
+                  page_size: Optional[int] = None) -> Generator[dict, None, None]:
+        """Yields the resources of the searched type of all pages of a search."""
+        for resource in self.search(resource_type, params, elements, page_size):
+            if resource.get("resourceType", resource_type) == resource_type:
+                yield resource
+
+    def ids(self, resource_type: str, params: dict = None,
+            page_size: Optional[int] = None) -> Generator[str, None, None]:
+        """Yields the FHIR ids of all resources matching a search, without their content."""
+        for resource in self.resources(resource_type, params, elements="id", page_size=page_size):
+            if resource.get("id") is not None:
+                yield resource["id"]
+
+    def first_id(self, resource_type: str, params: dict = None) -> Optional[str]:
+        """FHIR id of the first resource matching a search, None if there is none."""
+        return next(self.ids(resource_type, params, page_size=1), None)
+
+    def count(self, resource_type: str, params: dict = None) -> int:
+        """
+        Number of resources matching a search, without any of the resources.
+        :raises requests.HTTPError: if the search fails.
+        """
+        response = self._session.get(url=f"{self._base_url}/{resource_type}",
+                                     params={**(params or {}), "_summary": "count"}, verify=False)
+        response.raise_for_status()
+        return response.json().get("total", 0)
@@ -1,5 +1,4 @@
 import logging
-import os
 import smtplib
 import time
 from email.mime.multipart import MIMEMultipart
@@ -7,8 +6,8 @@ from email.mime.text import MIMEText
 
 import schedule
 
+from persistence.records_catalog import get_records_catalog
 from util.custom_logger import setup_logger
-from util.file_age_util import get_file_age
 
 setup_logger()
 logger = logging.getLogger()
@@ -16,8 +15,10 @@ logger = logging.getLogger()
 
 
 class MailService:
-    def __init__(self,records_path:str, new_file_period: int, smtp_host: str, smtp_port:int,email_receiver:str):
+    def __init__(self,records_path:str, new_file_period: int, smtp_host: str, smtp_port:int,email_receiver:str,
+                 records_file_type: str = "csv"):
         self._dir_path = records_path
+        self._records_file_type = (records_file_type or "csv").lower()
         try:
             self._new_file_period = int(new_file_period)
         except ValueError:
@@ -44,13 +45,9 @@ class MailService:
             logger.error(f"Error sending email: {e}")
 
     def check_if_data_files_are_fresh(self) -> bool:
-        dir_entry: os.DirEntry
-        for dir_entry in os.scandir(self._dir_path):
-            if dir_entry.name.lower().endswith(".csv"):
-                file_age = get_file_age(dir_entry.path)
-                if file_age <= self._new_file_period:
-                    return True
-        return False
+        fresh_files = get_records_catalog(self._dir_path).files("." + self._records_file_type,
+                                                                max_age_days=self._new_file_period)
+        return len(fresh_files) > 0
 
     def check_freshness_and_send_email(self):
         if self.check_if_data_files_are_fresh():
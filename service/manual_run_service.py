@@ -1,48 +1,185 @@
 import logging
-import threading
 
-from flask import Flask, jsonify
+from flask import Flask, Response, jsonify, request
 
-from service.blaze_service import BlazeService
-from service.miabis_blaze_service import MiabisBlazeService
+from service.sync_job_queue import SyncJobQueue
 from util.custom_logger import setup_logger
+from util.failed_record_store import FailedRecordStore
 from util.metrics import get_sync_progress
+from util.sampling_profiler import SAMPLE_INTERVAL
 
 setup_logger()
 logger = logging.getLogger()
 
 app = Flask(__name__)
 
+# Bounds of the seconds between two samples of the sync profiler
+MIN_PROFILING_INTERVAL = 0.001
+MAX_PROFILING_INTERVAL = 1.0
+
 not_initialized_error = "MIABIS on FHIR service is not initialized. Please check if MIABIS is enabled and mapping file configuration is correct."
-def create_api(blaze_service: BlazeService,miabis_blaze_service: MiabisBlazeService = None):
+def create_api(job_queue: SyncJobQueue, miabis_on_fhir: bool = False, failed_records: FailedRecordStore = None):
+    """
+    Creates the API. Syncs and deletes are not run by the API process, they are queued for the sync worker.
+    :param job_queue: queue of the sync worker
+    :param miabis_on_fhir: MIABIS on FHIR service is enabled
+    :param failed_records: store of the records which failed to sync, for their inspection
+    """
 
     @app.route('/miabis-sync', methods=['POST'])
     def miabis_sync():
         logger.info("MIABIS on FHIR: Manually starting sync.")
-        if miabis_blaze_service is None:
+        if not miabis_on_fhir:
             return jsonify({"error": not_initialized_error}), 503
-        threading.Thread(target=miabis_blaze_service.sync).start()
-        return jsonify({"message": "MIABIS sync started. see logs of fhir-module for more info"})
+        job = job_queue.enqueue('miabis-blaze', 'sync')
+        return jsonify({"message": "MIABIS sync started. see logs of fhir-module for more info", "job_id": job.id,
+                        "coalesced": job.coalesced})
 
     @app.route('/sync', methods=['POST'])
     def sync_now():
-        logger.info("Manually starting sync.")
-        threading.Thread(target=blaze_service.sync).start()
-        return jsonify({"message": "sync started. see logs of fhir-module for more info"})
+        resume = request.args.get('resume', 'false').lower() == 'true'
+        logger.info(f"Manually starting sync{' (resuming from the last checkpoint)' if resume else ''}.")
+        job = job_queue.enqueue('blaze', 'sync', {'resume': resume} if resume else None)
+        return jsonify({"message": "sync started. see logs of fhir-module for more info", "job_id": job.id,
+                        "coalesced": job.coalesced})
+
+    @app.route('/sync-all', methods=['POST'])
+    def sync_all():
+        resume = request.args.get('resume', 'false').lower() == 'true'
+        logger.info("Manually starting combined sync of the standard and MIABIS on FHIR Blaze stores.")
+        if not miabis_on_fhir:
+            return jsonify({"error": not_initialized_error}), 503
+        job = job_queue.enqueue('combined', 'sync', {'resume': resume} if resume else None)
+        return jsonify({"message": "combined sync started. see logs of fhir-module for more info", "job_id": job.id,
+                        "coalesced": job.coalesced})
 
     @app.route('/miabis-delete', methods=['POST'])
     def miabis_delete():
         logger.info("MIABIS on FHIR: Manually deleting every resource")
-        if miabis_blaze_service is None:
+        if not miabis_on_fhir:
             return jsonify({"error": not_initialized_error}), 503
-        threading.Thread(target=miabis_blaze_service.delete_everything).start()
-        return jsonify({"message": "Delete started. see logs of fhir-module for more info"})
+        job = job_queue.enqueue('miabis-blaze', 'delete')
+        return jsonify({"message": "Delete started. see logs of fhir-module for more info", "job_id": job.id,
+                        "coalesced": job.coalesced})
 
     @app.route('/delete', methods=['POST'])
     def delete():
         logger.info("Manually deleting every resource")
-        threading.Thread(target=blaze_service.delete_everything).start()
-        return jsonify({"message": "Delete started. see logs of fhir-module for more info"})
+        job = job_queue.enqueue('blaze', 'delete')
+        return jsonify({"message": "Delete started. see logs of fhir-module for more info", "job_id": job.id,
+                        "coalesced": job.coalesced})
+
+    @app.route('/sync-retry-failed', methods=['POST'])
+    def sync_retry_failed():
+        """Retry only the records which failed in earlier syncs, all of them with all=true, else the ones whose
+        backoff has passed"""
+        service = request.args.get('service', 'blaze')
+        ignore_backoff = request.args.get('all', 'false').lower() == 'true'
+        if service not in ('blaze', 'miabis-blaze', 'combined'):
+            return jsonify({"error": f"Unknown service {service}"}), 400
+        if service != 'blaze' and not miabis_on_fhir:
+            return jsonify({"error": not_initialized_error}), 503
+        logger.info(f"Manually retrying the failed records of service {service}.")
+        job = job_queue.enqueue(service, 'retry_failed', {'ignore_backoff': True} if ignore_backoff else None)
+        return jsonify({"message": "retry of the failed records started. see logs of fhir-module for more info",
+                        "job_id": job.id, "coalesced": job.coalesced})
+
+    @app.route('/sync-failed-records', methods=['GET'])
+    def get_sync_failed_records():
+        """Get the records which failed to sync, with their error and number of attempts, failing most recently
+        first"""
+        if failed_records is None:
+            return jsonify({"error": "Failed records are not available"}), 503
+        service = request.args.get('service')
+        resource_type = request.args.get('resource_type')
+        limit = request.args.get('limit', 100, type=int)
+        return jsonify({"counts": failed_records.count(service),
+                        "records": [record.to_dict()
+                                    for record in failed_records.list_records(service, resource_type, limit)]})
+
+    @app.route('/sync-failed-records', methods=['DELETE'])
+    def clear_sync_failed_records():
+        """Drop the records which failed to sync, e.g. once their source was fixed and fully synced"""
+        if failed_records is None:
+            return jsonify({"error": "Failed records are not available"}), 503
+        service = request.args.get('service')
+        removed = failed_records.clear(service)
+        logger.info(f"Dropped {removed} failed record(s){f' of service {service}' if service else ''}.")
+        return jsonify({"message": f"dropped {removed} failed record(s)", "removed": removed})
+
+    @app.route('/sync-runs', methods=['GET'])
+    def get_sync_runs():
+        """Get history of sync and delete runs, newest first"""
+        service = request.args.get('service')
+        limit = request.args.get('limit', 50, type=int)
+        return jsonify([job.to_dict() for job in job_queue.list_jobs(service=service, limit=limit)])
+
+    @app.route('/sync-runs/<int:job_id>', methods=['GET'])
+    def get_sync_run(job_id: int):
+        """Get state and statistics of a single sync or delete run"""
+        job = job_queue.get_job(job_id)
+        if job is None:
+            return jsonify({"error": f"Sync run {job_id} not found"}), 404
+        return jsonify(job.to_dict())
+
+    @app.route('/sync-runs/<int:job_id>/memory', methods=['GET'])
+    def get_sync_run_memory(job_id: int):
+        """Get the memory of the phases of a sync run (peak RSS, Python heap, top allocation sites with tracemalloc)"""
+        job = job_queue.get_job(job_id)
+        if job is None:
+            return jsonify({"error": f"Sync run {job_id} not found"}), 404
+        summary = job.summary or {}
+        if 'memory' in summary:
+            memory = summary['memory']
+        else:
+            # combined sync, with the summaries of both syncs
+            memory = {service: service_summary['memory'] for service, service_summary in summary.items()
+                      if isinstance(service_summary, dict) and 'memory' in service_summary}
+        if not memory:
+            return jsonify({"error": f"Sync run {job_id} has no memory statistics"}), 404
+        return jsonify({"job_id": job_id, "memory": memory})
+
+    @app.route('/sync-runs/<int:job_id>/profile', methods=['GET'])
+    def get_sync_run_profile(job_id: int):
+        """Get the profile of a profiled sync run, as top functions or as collapsed stacks (format=collapsed)"""
+        profile = job_queue.get_profile(job_id)
+        if profile is None:
+            return jsonify({"error": f"Sync run {job_id} was not profiled"}), 404
+        statistics, collapsed = profile
+        if request.args.get('format') == 'collapsed':
+            return Response(collapsed, mimetype='text/plain')
+        return jsonify({"job_id": job_id, **statistics})
+
+    @app.route('/sync-profiling', methods=['GET'])
+    def get_sync_profiling():
+        """Get the services whose next sync is profiled, and the jobs being profiled"""
+        return jsonify(job_queue.list_profiling())
+
+    @app.route('/sync-profiling', methods=['POST'])
+    def start_sync_profiling():
+        """Profile the next sync of a service with a sampling profiler"""
+        service = request.args.get('service', 'blaze')
+        interval = request.args.get('interval', SAMPLE_INTERVAL, type=float)
+        if service not in ('blaze', 'miabis-blaze', 'combined'):
+            return jsonify({"error": f"Unknown service {service}"}), 400
+        if service != 'blaze' and not miabis_on_fhir:
+            return jsonify({"error": not_initialized_error}), 503
+        if not MIN_PROFILING_INTERVAL <= interval <= MAX_PROFILING_INTERVAL:
+            return jsonify({"error": f"Interval has to be between {MIN_PROFILING_INTERVAL} and "
+                                     f"{MAX_PROFILING_INTERVAL} seconds"}), 400
+        logger.info(f"Profiling the next sync of service {service}.")
+        job_queue.request_profiling(service, interval)
+        return jsonify({"message": f"next sync of service {service} will be profiled", "service": service,
+                        "interval": interval})
+
+    @app.route('/sync-profiling', methods=['DELETE'])
+    def stop_sync_profiling():
+        """Stop profiling a service, before its next sync or during the sync being profiled"""
+        service = request.args.get('service', 'blaze')
+        if not job_queue.cancel_profiling(service):
+            return jsonify({"error": f"Service {service} is not being profiled"}), 404
+        logger.info(f"Profiling of service {service} stopped.")
+        return jsonify({"message": f"profiling of service {service} stopped", "service": service})
 
     @app.route('/sync-progress', methods=['GET'])
     def get_standard_sync_progress():
@@ -53,7 +190,7 @@ def create_api(blaze_service: BlazeService,miabis_blaze_service: MiabisBlazeServ
     @app.route('/miabis-sync-progress', methods=['GET'])
     def get_miabis_sync_progress():
         """Get progress of the MIABIS on FHIR sync operation"""
-        if miabis_blaze_service is None:
+        if not miabis_on_fhir:
             return jsonify({"error": not_initialized_error}), 503
         progress = get_sync_progress('miabis-blaze')
         return jsonify(progress)
@@ -1,10 +1,12 @@
+import os
+import sqlite3
 import threading
 import time
-from typing import cast
+from typing import Optional, cast
 
 import requests
 import schedule
-from blaze_client import BlazeClient, NonExistentResourceException
+from blaze_client import NonExistentResourceException
 import logging
 import json
 
@@ -14,20 +16,29 @@ from model.miabis.collection_miabis import CollectionMiabis
 from model.miabis.sample_donor_miabis import SampleDonorMiabis
 from model.miabis.sample_miabis import SampleMiabis
 from persistence.biobank_repository import BiobankRepository
+from persistence.records_catalog import reset_record_files_scope, set_record_files_scope
 from persistence.sample_collection_repository import SampleCollectionRepository
 from service.blaze_service_interface import BlazeServiceInterface
 
 from service.patient_service import PatientService
 from service.sample_service import SampleService
-from util.config import get_miabis_blaze_auth
+from service.sync_progress_estimator import SyncProgressEstimator
+from service.versioned_blaze_client import VersionedBlazeClient
+from util.adaptive_load_controller import AdaptiveLoadController
+from util.config import get_failed_records_max, get_miabis_blaze_auth, get_sync_state_dir, get_sync_tracemalloc, \
+    get_sync_tracemalloc_top
 from util.custom_logger import setup_logger
+from util.failed_record_store import FAILED_RECORDS_FILE_NAME, FailedRecordStore
+from util.http_util import count_requests
+from util.memory_tracker import PhaseMemoryTracker
 from util.metrics import get_metrics_for_service
-from util.service_preparation_utils import prepare_services_miabis
+from util.service_preparation_utils import MiabisServiceBundle, prepare_services_miabis
 
 setup_logger()
 logger = logging.getLogger()
 sync_logger = logging.getLogger("miabis_sync_logger")
 
+_SERVICE_NAME = 'miabis-blaze'
 
 class MiabisBlazeService(BlazeServiceInterface):
     def __init__(self,
@@ -37,27 +48,36 @@ class MiabisBlazeService(BlazeServiceInterface):
                  sample_collection_repository: SampleCollectionRepository,
                  biobank_repository: BiobankRepository
                  ):
-        self.blaze_client = BlazeClient(blaze_url=blaze_url, blaze_username=get_miabis_blaze_auth()[0], blaze_password=get_miabis_blaze_auth()[1])
+        self.metrics = get_metrics_for_service(_SERVICE_NAME)
+        self.load_controller = AdaptiveLoadController(_SERVICE_NAME)
+        self.blaze_client = VersionedBlazeClient(blaze_url=blaze_url, blaze_username=get_miabis_blaze_auth()[0],
+                                                 blaze_password=get_miabis_blaze_auth()[1], metrics=self.metrics,
+                                                 load_controller=self.load_controller)
         self.blaze_client._session.trust_env = False
+        self._request_counter = count_requests(self.blaze_client._session)
         self.patient_service = patient_service
         self.sample_service = sample_service
         self.sample_collection_repository = sample_collection_repository
         self.biobank_repository = biobank_repository
-        self.metrics = get_metrics_for_service('miabis-blaze')
         self._scheduler_thread = None
         self._sync_lock = threading.Lock()
         self._scheduler = schedule.Scheduler()
+        self._failed_records: Optional[FailedRecordStore] = None
+        self._failed_keys: set[tuple[str, str]] = set()
 
-    def _refresh_services(self) -> bool:
+    def _refresh_services(self, services: MiabisServiceBundle = None) -> bool:
         """
         Refresh services and repositories to handle file format changes.
         This allows the sync to adapt to changes in data source format (CSV, JSON, XML).
-        
+
+        Args:
+            services: already prepared services to use, e.g. ones sharing the parsed records with the standard sync
+
         Returns:
             bool: True if services were successfully refreshed, False otherwise
         """
         logger.info("MIABIS on FHIR: Refreshing services to detect any file format changes...")
-        services = prepare_services_miabis()
+        services = services or prepare_services_miabis()
         self.patient_service = services.patient_service
         self.sample_service = services.sample_service
         self.sample_collection_repository = services.sample_collection_repository
@@ -70,40 +90,66 @@ class MiabisBlazeService(BlazeServiceInterface):
         logger.debug("MIABIS on FHIR: Services refreshed successfully.")
         return True
 
-    def sync(self):
+    def sync(self, services: MiabisServiceBundle = None, files: list[str] = None) -> Optional[dict]:
+        """
+        Starts the sync between the repositories and the MIABIS on FHIR Blaze store.
+        :param services: prepared services to sync from, new ones are prepared if not given.
+        :param files: names of the record files to sync, all files if not given.
+        :return: summary of the sync (counts and durations of the phases, number of HTTP calls),
+        None if another sync is already in progress
+        """
         if not self._sync_lock.acquire(blocking=False):
             logger.warning("MIABIS on FHIR: Sync already in progress, skipping duplicate invocation.")
-            return
+            return None
 
+        files_scope = set_record_files_scope(files)
+        memory = PhaseMemoryTracker(self.metrics, get_sync_tracemalloc(), get_sync_tracemalloc_top())
+        phase_durations = {}
         try:
             if self.metrics:
                 self.metrics.start_sync()
-            if not self._refresh_services():
+            if not self._refresh_services(services):
                 error_msg = "MIABIS sync failed: Mapping files are misconfigured. Please check your parsing map configuration."
                 sync_logger.error(error_msg)
                 if self.metrics:
                     self.metrics.set_metric('last_sync_error', error_msg)
-                return
+                return {'success': False, 'error_message': error_msg}
 
+            self._request_counter.reset()
+            self._failed_keys = self.__stored_failed_keys()
+            memory.start()
             biobank_summary = {'processed': 0, 'failed': 0, 'skipped': 0}
             collection_summary = {'processed': 0, 'failed': 0, 'skipped': 0}
             pat_summary = {'processed': 0, 'failed': 0, 'skipped': 0}
             samp_summary = {'processed': 0, 'failed': 0, 'skipped': 0}
             condition_summary = {'processed': 0, 'failed': 0, 'skipped': 0}
 
+            progress_estimator = SyncProgressEstimator(self.metrics, ('patients', 'specimens'))
+            progress_estimator.start()
             if self.metrics:
                 self.metrics.set_sync_phase(1)  # Phase 1: Biobank and Collections
-            biobank_collection_summary = self.sync_biobank_and_collections()
+            phase_started = time.monotonic()
+            with memory.phase('collections'):
+                biobank_collection_summary = self.sync_biobank_and_collections()
+            phase_durations['collections'] = round(time.monotonic() - phase_started, 3)
             biobank_summary = biobank_collection_summary['biobank']
             collection_summary = biobank_collection_summary['collections']
             
             if self.metrics:
                 self.metrics.set_sync_phase(2)  # Phase 2: Patients
-            pat_summary = self.upload_patients()
+            phase_started = time.monotonic()
+            with memory.phase('patients'):
+                pat_summary = self.upload_patients()
+            phase_durations['patients'] = round(time.monotonic() - phase_started, 3)
+            progress_estimator.finish('patients', pat_summary)
             
             if self.metrics:
                 self.metrics.set_sync_phase(4)  # Phase 4: Specimens (skipping 3 as MIABIS handles conditions differently)
-            samp_summary, condition_summary = self.upload_samples()
+            phase_started = time.monotonic()
+            with memory.phase('specimens'):
+                samp_summary, condition_summary = self.upload_samples()
+            phase_durations['specimens'] = round(time.monotonic() - phase_started, 3)
+            progress_estimator.finish('specimens', samp_summary)
 
             if self.metrics:
                 self.metrics.set_metric('last_sync_timestamp', time.time())
@@ -114,12 +160,18 @@ class MiabisBlazeService(BlazeServiceInterface):
                 'conditions': condition_summary,
                 'biobank': biobank_summary,
                 'collections': collection_summary,
+                'phase_durations': phase_durations,
+                'memory': memory.summary(),
+                'http_calls': self._request_counter.count,
                 'timestamp': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
                 'success': True
             }
+            if files is not None:
+                sync_summary_obj['files'] = sorted(files)
             sync_logger.info(json.dumps({'sync_summary': sync_summary_obj}))
 
             logger.info("MIABIS on FHIR: Sync completed successfully!")
+            return sync_summary_obj
         except Exception as e:
             logger.exception(f"MIABIS on FHIR: Sync failed: {e}")
             
@@ -129,17 +181,104 @@ class MiabisBlazeService(BlazeServiceInterface):
                 'conditions': condition_summary,
                 'biobank': biobank_summary,
                 'collections': collection_summary,
+                'phase_durations': phase_durations,
+                'memory': memory.summary(),
+                'http_calls': self._request_counter.count,
                 'timestamp': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
                 'success': False,
                 'error_message': str(e)
             }
             sync_logger.info(json.dumps({'sync_summary': sync_summary_obj}))
+            return sync_summary_obj
         finally:
             # Always ensure sync state is cleaned up
             if self.metrics:
                 self.metrics.end_sync()
+            memory.stop()
+            reset_record_files_scope(files_scope)
+            self._failed_keys = set()
+            self._sync_lock.release()
+
+    def retry_failed(self, ignore_backoff: bool = False) -> Optional[dict]:
+        """
+        Retries only the samples which failed in earlier syncs and whose backoff has passed. The samples are
+        checked in the Blaze store again, like in the sync, and added to their collections.
+        :param ignore_backoff: retry all failed samples, also the ones whose backoff has not passed yet
+        :return: summary of the retry, None if a sync is in progress
+        """
+        if not self._sync_lock.acquire(blocking=False):
+            logger.warning("MIABIS on FHIR: Sync in progress, skipping retry of the failed records.")
+            return None
+        samp_summary = {'processed': 0, 'failed': 0, 'skipped': 0}
+        condition_summary = {'processed': 0, 'failed': 0, 'skipped': 0}
+        try:
+            self._request_counter.reset()
+            self._failed_keys = self.__stored_failed_keys()
+            if not self._failed_keys:
+                logger.info("MIABIS on FHIR: No failed records to retry.")
+                return {'specimens': samp_summary, 'conditions': condition_summary, 'remaining': {},
+                        'http_calls': 0, 'success': True}
+            failed_records = self.__failed_record_store().due(_SERVICE_NAME, ignore_backoff)
+            logger.info(f"MIABIS on FHIR: Retrying {len(failed_records)} failed record(s).")
+            collection_with_new_samples_map = {}
+            for failed_record in failed_records:
+                self.__upload_sample_with_condition(failed_record.record, collection_with_new_samples_map,
+                                                    samp_summary, condition_summary)
+            self.__add_samples_to_collections(collection_with_new_samples_map)
+            sync_summary_obj = {
+                'specimens': samp_summary,
+                'conditions': condition_summary,
+                'remaining': self.__failed_record_store().count(_SERVICE_NAME),
+                'http_calls': self._request_counter.count,
+                'timestamp': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+                'success': True
+            }
+            sync_logger.info(json.dumps({'retry_summary': sync_summary_obj}))
+            return sync_summary_obj
+        except Exception as e:
+            logger.exception(f"MIABIS on FHIR: Retry of the failed records failed: {e}")
+            return {'specimens': samp_summary, 'conditions': condition_summary,
+                    'http_calls': self._request_counter.count, 'success': False, 'error_message': str(e)}
+        finally:
+            self._failed_keys = set()
             self._sync_lock.release()
 
+    def __failed_record_store(self) -> FailedRecordStore:
+        if self._failed_records is None:
+            self._failed_records = FailedRecordStore(os.path.join(get_sync_state_dir(), FAILED_RECORDS_FILE_NAME),
+                                                     get_failed_records_max())
+        return self._failed_records
+
+    def __stored_failed_keys(self) -> set[tuple[str, str]]:
+        """Keys of the stored failed records, so records synced later are removed from the store."""
+        if self._failed_records is None and \
+                not os.path.exists(os.path.join(get_sync_state_dir(), FAILED_RECORDS_FILE_NAME)):
+            return set()
+        try:
+            return self.__failed_record_store().keys(_SERVICE_NAME)
+        except sqlite3.Error as e:
+            logger.error(f"MIABIS on FHIR: Cannot read the failed record store: {e}")
+            return set()
+
+    def __record_failure(self, resource_type: str, identifier: str, record, error) -> None:
+        """Keeps a record which failed to sync in the failed record store, to be retried later."""
+        try:
+            self.__failed_record_store().add(_SERVICE_NAME, resource_type, identifier, record, str(error))
+            self._failed_keys.add((resource_type, identifier))
+        except (OSError, sqlite3.Error) as e:
+            logger.error(f"MIABIS on FHIR: Cannot store failed {resource_type} record {identifier}: {e}")
+
+    def __record_success(self, resource_type: str, identifier: str) -> None:
+        """Removes a synced record from the failed record store, if it failed before."""
+        if (resource_type, identifier) not in self._failed_keys:
+            return
+        try:
+            self.__failed_record_store().remove(_SERVICE_NAME, resource_type, identifier)
+            self._failed_keys.discard((resource_type, identifier))
+        except sqlite3.Error as e:
+            logger.error(f"MIABIS on FHIR: Cannot remove synced {resource_type} record {identifier} "
+                         f"from the failed records: {e}")
+
     def __create_sync_summary(self) -> dict:
         """Create empty sync summary structure for biobank and collections."""
         return {
@@ -295,74 +434,77 @@ class MiabisBlazeService(BlazeServiceInterface):
 
     def upload_samples(self):
         logger.info("MIABIS on FHIR: Starting upload of samples...")
-        processed_samples = 0
-        failed_samples = 0
-        skipped_samples = 0
-
-        processed_conditions = 0
-        failed_conditions = 0
-        skipped_conditions = 0
+        samp_summary = {'processed': 0, 'failed': 0, 'skipped': 0}
+        condition_summary = {'processed': 0, 'failed': 0, 'skipped': 0}
         collection_with_new_samples_map = {}
         for sample in self.sample_service.get_all():
             if not isinstance(sample, SampleMiabis):
                 logger.error("MIABIS on FHIR: sample is not instance of MIABIS on FHIR model, "
                              f"but rather its type is {type(sample)}. Skipping....")
-                skipped_samples += 1
+                samp_summary['skipped'] += 1
                 if self.metrics:
                     self.metrics.increment_sync_progress('specimens')
                 continue
-            sample = cast(SampleMiabis, sample)
-            try:
-                if not self.blaze_client.is_resource_present_in_blaze("Specimen", sample.identifier, "identifier"):
-
-                        sample_fhir_id = self.blaze_client.upload_sample(sample)
-
-                        logger.debug(f"MIABIS on FHIR: Successfully uploaded sample with id {sample.identifier}")
-                        patient_fhir_id = self.blaze_client.get_fhir_id("Patient", sample.donor_identifier)
-
-                        if self.metrics:
-                            self.metrics.increment_sync_progress('conditions')
-                        if not self.blaze_client.is_resource_present_in_blaze("Condition", patient_fhir_id,
-                                                                              "subject"):
-                            logger.debug(
-                                f"MIABIS on FHIR: Condition for patient : {sample.donor_identifier} is not present. Uploading new condition")
-
-                            try:
-                                self.blaze_client.upload_condition(sample.condition)
-                                processed_conditions += 1
-                            except Exception as e:
-                                logger.exception(f"MIABIS on FHIR: Error uploading condition {sample.condition.icd_10_code}: {e}")
-                                failed_conditions += 1
-                            logger.debug("MIABIS on FHIR: Succesfully uploaded new Condition")
-                        else:
-                            skipped_conditions += 1
-                        if sample.sample_collection_id is not None:
-                            collection_with_new_samples_map.setdefault(sample.sample_collection_id, []).append(
-                                sample_fhir_id)
-
-                        processed_samples += 1
-                else:
-                    logger.debug(f"MIABIS on FHIR: sample with id {sample.identifier}  is already present in the blaze store. Checking if the data of sample are same.")
-                    sample_fhir_id = self.blaze_client.get_fhir_id("Specimen",sample.identifier)
-                    sample_from_blaze = self.blaze_client.build_sample_from_json(sample_fhir_id)
-                    if sample != sample_from_blaze:
-                        logger.debug("MIABIS on FHIR: sample is different than the sample already present in the blaze. Updating.")
-                        sample_fhir_id = self.blaze_client.update_sample(sample)
-
-                        if sample.sample_collection_id is not None:
-                            collection_with_new_samples_map.setdefault(sample.sample_collection_id, []).append(
-                                sample_fhir_id)
-
-                        processed_samples += 1
-                    else:
-                        skipped_samples += 1
-            except (NonExistentResourceException, HTTPError) as err:
-                logger.exception(f"MIABIS on FHIR: {err}")
-                failed_samples += 1
-            
+            self.__upload_sample_with_condition(cast(SampleMiabis, sample), collection_with_new_samples_map,
+                                                samp_summary, condition_summary)
             if self.metrics:
                 self.metrics.increment_sync_progress('specimens')
 
+        self.__add_samples_to_collections(collection_with_new_samples_map)
+        logger.info("MIABIS on FHIR: upload of samples is done.")
+        logger.info(f"MIABIS on FHIR: Samples sync complete: {samp_summary['processed']} processed, {samp_summary['failed']} failed, {samp_summary['skipped']} skipped")
+        return samp_summary, condition_summary
+
+    def __upload_sample_with_condition(self, sample: SampleMiabis, collection_with_new_samples_map: dict,
+                                       samp_summary: dict, condition_summary: dict) -> None:
+        """Uploads or updates a single sample, and the condition of its donor, and counts them in the summaries.
+        A sample which failed is kept in the failed record store."""
+        try:
+            if not self.blaze_client.is_resource_present_in_blaze("Specimen", sample.identifier, "identifier"):
+                sample_fhir_id = self.blaze_client.upload_sample(sample)
+                logger.debug(f"MIABIS on FHIR: Successfully uploaded sample with id {sample.identifier}")
+                patient_fhir_id = self.blaze_client.get_fhir_id("Patient", sample.donor_identifier)
+                if self.metrics:
+                    self.metrics.increment_sync_progress('conditions')
+                if not self.blaze_client.is_resource_present_in_blaze("Condition", patient_fhir_id,
+                                                                      "subject"):
+                    logger.debug(
+                        f"MIABIS on FHIR: Condition for patient : {sample.donor_identifier} is not present. Uploading new condition")
+                    try:
+                        self.blaze_client.upload_condition(sample.condition)
+                        condition_summary['processed'] += 1
+                    except Exception as e:
+                        logger.exception(f"MIABIS on FHIR: Error uploading condition {sample.condition.icd_10_code}: {e}")
+                        condition_summary['failed'] += 1
+                    logger.debug("MIABIS on FHIR: Succesfully uploaded new Condition")
+                else:
+                    condition_summary['skipped'] += 1
+                if sample.sample_collection_id is not None:
+                    collection_with_new_samples_map.setdefault(sample.sample_collection_id, []).append(
+                        sample_fhir_id)
+                samp_summary['processed'] += 1
+            else:
+                logger.debug(f"MIABIS on FHIR: sample with id {sample.identifier}  is already present in the blaze store. Checking if the data of sample are same.")
+                sample_fhir_id = self.blaze_client.get_fhir_id("Specimen",sample.identifier)
+                sample_from_blaze = self.blaze_client.build_sample_from_json(sample_fhir_id)
+                if sample != sample_from_blaze:
+                    logger.debug("MIABIS on FHIR: sample is different than the sample already present in the blaze. Updating.")
+                    sample_fhir_id = self.blaze_client.update_sample(sample)
+
+                    if sample.sample_collection_id is not None:
+                        collection_with_new_samples_map.setdefault(sample.sample_collection_id, []).append(
+                            sample_fhir_id)
+
+                    samp_summary['processed'] += 1
+                else:
+                    samp_summary['skipped'] += 1
+            self.__record_success('specimens', sample.identifier)
+        except (NonExistentResourceException, HTTPError) as err:
+            logger.exception(f"MIABIS on FHIR: {err}")
+            samp_summary['failed'] += 1
+            self.__record_failure('specimens', sample.identifier, sample, err)
+
+    def __add_samples_to_collections(self, collection_with_new_samples_map: dict) -> None:
         for collection_id, sample_fhir_ids in collection_with_new_samples_map.items():
             logger.info(f"MIABIS on FHIR: adding samples to the respective collection with identifier {collection_id}")
             collection_fhir_id = self.blaze_client.get_fhir_id("Group", collection_id)
@@ -372,9 +514,6 @@ class MiabisBlazeService(BlazeServiceInterface):
                 logger.info(f"MIABIS on FHIR: Successfully updated Collection {collection_id} with new values")
             else:
                 logger.info(f"MIABIS on FHIR: Collection {collection_id}  was not updated.")
-        logger.info("MIABIS on FHIR: upload of samples is done.")
-        logger.info(f"MIABIS on FHIR: Samples sync complete: {processed_samples} processed, {failed_samples} failed, {skipped_samples} skipped")
-        return {'processed': processed_samples, 'failed': failed_samples, 'skipped': skipped_samples}, {'processed': processed_conditions, 'failed': failed_conditions, 'skipped': skipped_conditions}
 
     def delete_everything(self):
         """Just as name says.DELETES EVERYTHING!!!"""
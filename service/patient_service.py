@@ -1,5 +1,5 @@
 import uuid
-from typing import Generator
+from typing import Callable, Generator
 
 from fhirclient.models.bundle import Bundle, BundleEntry, BundleEntryRequest
 from fhirclient.models.resource import Resource
@@ -20,6 +20,24 @@ class PatientService:
             bundle.entry.append(self.__build_bundle_entry_for_post(patient))
         return bundle
 
+    def get_patients_in_fhir_transactions(self, batch_size: Callable[[], int]) -> Generator[Bundle, None, None]:
+        """
+        Fetches all patients/sample donors from the repository as FHIR transaction bundles.
+        :param batch_size: number of patients in the next bundle, read before every bundle, so it can be adapted
+        to the load of the Blaze store while the bundles are posted
+        :return: bundles of patients, at least one (possibly empty)
+        """
+        bundle = self.__build_bundle()
+        bundles_yielded = 0
+        for sample_donor in self._sample_donor_repository.get_all():
+            bundle.entry.append(self.__build_bundle_entry_for_post(sample_donor.to_fhir()))
+            if len(bundle.entry) >= max(batch_size(), 1):
+                yield bundle
+                bundles_yielded += 1
+                bundle = self.__build_bundle()
+        if bundle.entry or bundles_yielded == 0:
+            yield bundle
+
     def update_mappings(self) -> None:
         self._sample_donor_repository.update_mappings()
 
@@ -0,0 +1,85 @@
+"""Module for the syncs triggered by record files dropped into the records directory"""
+import logging
+import time
+from typing import Callable, Optional
+
+from persistence.records_catalog import get_records_catalog
+from service.sync_job_queue import SyncJob, SyncJobQueue, JOB_TRIGGER_FILES
+from util.custom_logger import setup_logger
+
+setup_logger()
+logger = logging.getLogger()
+
+# Seconds between two checks of the records directory
+CHECK_INTERVAL = 5.0
+
+
+class RecordsWatcher:
+    """Watches the records directory for new or modified record files and queues a sync of only those files,
+    once the directory has not changed for the debounce window, so files which are still being copied are
+    not synced half-written. Files present when the watcher starts, and removed files, are left to the full syncs."""
+
+    def __init__(self, job_queue: SyncJobQueue, services: list[str], dir_path: str, file_type: str,
+                 debounce_seconds: float, check_interval: float = CHECK_INTERVAL,
+                 clock: Callable[[], float] = time.monotonic):
+        """
+        :param job_queue: queue the syncs are queued to
+        :param services: names of the services the files are synced by (blaze, miabis-blaze, combined)
+        :param dir_path: path to the records directory
+        :param file_type: type of the record files (csv, json, xml, parquet)
+        :param debounce_seconds: seconds the directory has to stay unchanged before the files are synced
+        :param check_interval: seconds between two checks of the directory
+        :param clock: monotonic clock in seconds
+        """
+        self._job_queue = job_queue
+        self._services = services
+        self._dir_path = dir_path
+        self._extension = "." + file_type
+        self._debounce_seconds = debounce_seconds
+        self._check_interval = check_interval
+        self._clock = clock
+        self._known_files: Optional[dict[str, tuple[int, int]]] = None
+        self._pending_files: set[str] = set()
+        self._last_change = 0.0
+
+    def check(self) -> list[SyncJob]:
+        """
+        Checks the records directory once and queues the sync of the changed files, if the debounce window
+        has passed since their last change.
+        :return: the queued sync jobs, one per service
+        """
+        try:
+            entries = get_records_catalog(self._dir_path).files(self._extension)
+        except OSError as e:
+            logger.warning(f"Cannot check the records directory for new files: {e}")
+            return []
+        now = self._clock()
+        current_files = {entry.name: (entry.stat_result.st_size, entry.stat_result.st_mtime_ns)
+                         for entry in entries}
+        if self._known_files is None:
+            self._known_files = current_files
+            return []
+        changed_files = {name for name, key in current_files.items() if self._known_files.get(name) != key}
+        self._known_files = current_files
+        if changed_files:
+            self._pending_files |= changed_files
+            self._last_change = now
+            return []
+        if not self._pending_files or now - self._last_change < self._debounce_seconds:
+            return []
+        files = sorted(self._pending_files & current_files.keys())
+        self._pending_files.clear()
+        if not files:
+            return []
+        logger.info(f"Queueing sync of {len(files)} new or modified record file(s).")
+        return [self._job_queue.enqueue(service, "sync", {"files": files}, trigger=JOB_TRIGGER_FILES)
+                for service in self._services]
+
+    def run_forever(self) -> None:
+        logger.info(f"Watching {self._dir_path} for new or modified record files.")
+        while True:
+            try:
+                self.check()
+            except Exception as e:
+                logger.exception(f"Checking the records directory for new files failed: {e}")
+            time.sleep(self._check_interval)
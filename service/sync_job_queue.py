@@ -0,0 +1,294 @@
+"""Module for the queue and history of sync jobs shared between the API and the sync worker process"""
+import json
+import logging
+import sqlite3
+import time
+from dataclasses import dataclass, field
+from typing import Optional
+
+from util.custom_logger import setup_logger
+from util.sqlite_util import create_database, transaction
+
+setup_logger()
+logger = logging.getLogger()
+
+JOB_STATUS_QUEUED = "queued"
+JOB_STATUS_RUNNING = "running"
+JOB_STATUS_FINISHED = "finished"
+JOB_STATUS_FAILED = "failed"
+
+JOB_TRIGGER_API = "api"
+JOB_TRIGGER_SCHEDULE = "schedule"
+JOB_TRIGGER_FILES = "files"
+
+# Largest number of finished (and failed) jobs kept in the history, the oldest ones are dropped first
+MAX_FINISHED_JOBS = 1000
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sync_jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    service TEXT NOT NULL,
+    action TEXT NOT NULL,
+    options TEXT NOT NULL DEFAULT '{}',
+    status TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    error TEXT,
+    trigger TEXT NOT NULL DEFAULT 'api',
+    summary TEXT
+)
+"""
+
+# Profiling requested for the next sync of a service, and the profiles of the profiled runs
+_PROFILING_SCHEMA = (
+    """
+    CREATE TABLE IF NOT EXISTS profiling_requests (
+        service TEXT PRIMARY KEY,
+        interval REAL NOT NULL,
+        requested_at REAL NOT NULL,
+        job_id INTEGER
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS sync_profiles (
+        job_id INTEGER PRIMARY KEY,
+        profile TEXT NOT NULL,
+        collapsed TEXT NOT NULL
+    )
+    """,
+)
+
+
+@dataclass
+class SyncJob:
+    """Job for the sync worker, e.g. a sync or delete of the resources of one of the Blaze services.
+    Finished jobs are kept as the history of the runs, together with the statistics of the run."""
+    id: int
+    service: str
+    action: str
+    status: str
+    created_at: float
+    options: dict = field(default_factory=dict)
+    trigger: str = JOB_TRIGGER_API
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    error: Optional[str] = None
+    summary: Optional[dict] = None
+    coalesced: bool = False
+
+    @property
+    def duration(self) -> Optional[float]:
+        """Duration of the run in seconds."""
+        if self.started_at is None or self.finished_at is None:
+            return None
+        return self.finished_at - self.started_at
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "service": self.service,
+            "action": self.action,
+            "options": self.options,
+            "trigger": self.trigger,
+            "status": self.status,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "duration": self.duration,
+            "error": self.error,
+            "summary": self.summary,
+        }
+
+
+class SyncJobQueue:
+    """Persistent queue of sync jobs in a local SQLite database. The API process and the schedulers enqueue jobs,
+    the sync worker process claims and runs them one at a time. A job requested while the same job is still
+    waiting in the queue is coalesced with the waiting one. The history keeps a bounded number of finished jobs."""
+
+    def __init__(self, db_path: str, max_finished_jobs: int = MAX_FINISHED_JOBS):
+        """
+        :param db_path: path to the SQLite database file, created if it does not exist
+        :param max_finished_jobs: largest number of finished and failed jobs kept in the history
+        """
+        self._db_path = db_path
+        self._max_finished_jobs = max_finished_jobs
+        create_database(db_path, _SCHEMA, *_PROFILING_SCHEMA)
+
+    def enqueue(self, service: str, action: str, options: dict = None, trigger: str = JOB_TRIGGER_API) -> SyncJob:
+        """
+        Adds a job to the end of the queue, unless the same job is already waiting in the queue.
+        :param service: name of the service the job is run by (blaze, miabis-blaze)
+        :param action: action of the service to run (sync, delete)
+        :param options: keyword arguments of the action
+        :param trigger: what requested the job (api, schedule, files)
+        :return: the queued job, with coalesced set if it was already waiting in the queue
+        """
+        options = options or {}
+        serialized_options = json.dumps(options, sort_keys=True)
+        created_at = time.time()
+        with transaction(self._db_path) as connection:
+            connection.execute("BEGIN IMMEDIATE")
+            waiting = connection.execute(
+                "SELECT * FROM sync_jobs WHERE status = ? AND service = ? AND action = ? AND options = ? "
+                "ORDER BY id LIMIT 1", (JOB_STATUS_QUEUED, service, action, serialized_options)).fetchone()
+            if waiting is not None:
+                job = self.__to_job(waiting)
+                job.coalesced = True
+                logger.info(f"{action} job for service {service} is already waiting in the queue as job {job.id}.")
+                return job
+            cursor = connection.execute(
+                "INSERT INTO sync_jobs (service, action, options, status, created_at, trigger) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (service, action, serialized_options, JOB_STATUS_QUEUED, created_at, trigger))
+            job_id = cursor.lastrowid
+        logger.debug(f"Queued {action} job {job_id} for service {service}.")
+        return SyncJob(id=job_id, service=service, action=action, status=JOB_STATUS_QUEUED,
+                       created_at=created_at, options=options, trigger=trigger)
+
+    def claim_next(self) -> Optional[SyncJob]:
+        """
+        Marks the oldest queued job as running.
+        :return: the claimed job, or None if the queue is empty
+        """
+        with transaction(self._db_path) as connection:
+            connection.execute("BEGIN IMMEDIATE")
+            row = connection.execute("SELECT * FROM sync_jobs WHERE status = ? ORDER BY id LIMIT 1",
+                                     (JOB_STATUS_QUEUED,)).fetchone()
+            if row is None:
+                return None
+            started_at = time.time()
+            connection.execute("UPDATE sync_jobs SET status = ?, started_at = ? WHERE id = ?",
+                               (JOB_STATUS_RUNNING, started_at, row["id"]))
+        job = self.__to_job(row)
+        job.status = JOB_STATUS_RUNNING
+        job.started_at = started_at
+        return job
+
+    def finish(self, job_id: int, error: str = None, summary: dict = None) -> None:
+        """
+        Marks a running job as finished, or as failed if an error is given. The oldest finished jobs over the
+        history limit are dropped, together with their profiles.
+        :param job_id: id of the job
+        :param error: error the job failed with
+        :param summary: statistics of the run (counts, phase durations, number of HTTP calls)
+        """
+        with transaction(self._db_path) as connection:
+            connection.execute("BEGIN IMMEDIATE")
+            connection.execute(
+                "UPDATE sync_jobs SET status = ?, finished_at = ?, error = ?, summary = ? WHERE id = ?",
+                (JOB_STATUS_FAILED if error else JOB_STATUS_FINISHED, time.time(), error,
+                 json.dumps(summary) if summary is not None else None, job_id))
+            dropped = connection.execute(
+                "DELETE FROM sync_jobs WHERE id IN (SELECT id FROM sync_jobs WHERE status IN (?, ?) "
+                "ORDER BY id DESC LIMIT -1 OFFSET ?)",
+                (JOB_STATUS_FINISHED, JOB_STATUS_FAILED, self._max_finished_jobs)).rowcount
+            if dropped:
+                connection.execute("DELETE FROM sync_profiles WHERE job_id NOT IN (SELECT id FROM sync_jobs)")
+        if dropped:
+            logger.debug(f"Dropped {dropped} oldest job(s) from the sync run history.")
+
+    def fail_running_jobs(self, error: str) -> int:
+        """
+        Marks jobs which are still running as failed, used when the worker starts after it was stopped mid-job.
+        :return: number of jobs marked as failed
+        """
+        with transaction(self._db_path) as connection:
+            cursor = connection.execute("UPDATE sync_jobs SET status = ?, finished_at = ?, error = ? WHERE status = ?",
+                                        (JOB_STATUS_FAILED, time.time(), error, JOB_STATUS_RUNNING))
+            connection.execute("DELETE FROM profiling_requests WHERE job_id IS NOT NULL")
+            return cursor.rowcount
+
+    def get_job(self, job_id: int) -> Optional[SyncJob]:
+        with transaction(self._db_path) as connection:
+            row = connection.execute("SELECT * FROM sync_jobs WHERE id = ?", (job_id,)).fetchone()
+        return self.__to_job(row) if row is not None else None
+
+    def list_jobs(self, service: str = None, limit: int = 50) -> list[SyncJob]:
+        """
+        Most recent jobs, newest first.
+        :param service: only jobs of this service
+        :param limit: maximal number of returned jobs
+        """
+        query = "SELECT * FROM sync_jobs"
+        params: tuple = ()
+        if service is not None:
+            query += " WHERE service = ?"
+            params = (service,)
+        query += " ORDER BY id DESC LIMIT ?"
+        with transaction(self._db_path) as connection:
+            rows = connection.execute(query, params + (limit,)).fetchall()
+        return [self.__to_job(row) for row in rows]
+
+    def request_profiling(self, service: str, interval: float) -> None:
+        """
+        Requests profiling of the next sync of a service. Replaces a waiting request of the service.
+        :param service: name of the service whose next sync is profiled (blaze, miabis-blaze, combined)
+        :param interval: seconds between two samples of the profiler
+        """
+        with transaction(self._db_path) as connection:
+            connection.execute("INSERT OR REPLACE INTO profiling_requests (service, interval, requested_at, job_id) "
+                               "VALUES (?, ?, ?, NULL)", (service, interval, time.time()))
+
+    def cancel_profiling(self, service: str) -> bool:
+        """
+        Cancels the profiling of a service, a waiting request or the profiling of a sync which is running.
+        :return: whether there was profiling to cancel
+        """
+        with transaction(self._db_path) as connection:
+            return connection.execute("DELETE FROM profiling_requests WHERE service = ?", (service,)).rowcount > 0
+
+    def list_profiling(self) -> list[dict]:
+        """Profiling requests, with the id of the job being profiled once its sync started."""
+        with transaction(self._db_path) as connection:
+            rows = connection.execute("SELECT * FROM profiling_requests ORDER BY requested_at").fetchall()
+        return [dict(row) for row in rows]
+
+    def claim_profiling(self, service: str, job_id: int) -> Optional[float]:
+        """
+        Claims the profiling request of a service for a job of the service.
+        :return: seconds between two samples, or None if profiling of the service was not requested
+        """
+        with transaction(self._db_path) as connection:
+            connection.execute("BEGIN IMMEDIATE")
+            row = connection.execute("SELECT interval FROM profiling_requests WHERE service = ? AND job_id IS NULL",
+                                     (service,)).fetchone()
+            if row is None:
+                return None
+            connection.execute("UPDATE profiling_requests SET job_id = ? WHERE service = ?", (job_id, service))
+        return row["interval"]
+
+    def is_profiling(self, job_id: int) -> bool:
+        """Whether the profiling of a job was not cancelled."""
+        with transaction(self._db_path) as connection:
+            return connection.execute("SELECT 1 FROM profiling_requests WHERE job_id = ?",
+                                      (job_id,)).fetchone() is not None
+
+    def save_profile(self, job_id: int, profile: dict, collapsed: str) -> None:
+        """
+        Stores the profile of a job and ends the profiling request of the job.
+        :param job_id: id of the profiled job
+        :param profile: sampling statistics and top functions of the run
+        :param collapsed: collapsed stacks of the run
+        """
+        with transaction(self._db_path) as connection:
+            connection.execute("INSERT OR REPLACE INTO sync_profiles (job_id, profile, collapsed) VALUES (?, ?, ?)",
+                               (job_id, json.dumps(profile), collapsed))
+            connection.execute("DELETE FROM profiling_requests WHERE job_id = ?", (job_id,))
+
+    def get_profile(self, job_id: int) -> Optional[tuple[dict, str]]:
+        """
+        Profile of a job.
+        :return: sampling statistics and top functions, and collapsed stacks, None if the job was not profiled
+        """
+        with transaction(self._db_path) as connection:
+            row = connection.execute("SELECT profile, collapsed FROM sync_profiles WHERE job_id = ?",
+                                     (job_id,)).fetchone()
+        return (json.loads(row["profile"]), row["collapsed"]) if row is not None else None
+
+    @staticmethod
+    def __to_job(row: sqlite3.Row) -> SyncJob:
+        return SyncJob(id=row["id"], service=row["service"], action=row["action"], status=row["status"],
+                       created_at=row["created_at"], options=json.loads(row["options"]), trigger=row["trigger"],
+                       started_at=row["started_at"], finished_at=row["finished_at"], error=row["error"],
+                       summary=json.loads(row["summary"]) if row["summary"] is not None else None)
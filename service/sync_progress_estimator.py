@@ -0,0 +1,71 @@
+import contextvars
+import logging
+import threading
+from typing import Iterable, Optional
+
+from persistence.record_prescan import estimate_record_totals
+from util.config import get_parsing_map, get_records_dir_path, get_records_file_type
+from util.custom_logger import setup_logger
+from util.metrics import MetricsService
+
+setup_logger()
+logger = logging.getLogger()
+
+
+class SyncProgressEstimator:
+    """Publishes the totals of the sync progress. Estimates computed by a pre-scan of the records, which runs
+    in the background next to the first phase of the sync, are replaced by the exact number of processed records
+    once the phase of a resource type is finished."""
+
+    def __init__(self, metrics: Optional[MetricsService], resource_types: Iterable[str]):
+        """
+        :param metrics: metrics service of the sync
+        :param resource_types: resource types the estimated totals are published for
+        """
+        self._metrics = metrics
+        self._resource_types = tuple(resource_types)
+        self._finished: set[str] = set()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        """Starts the pre-scan of the records in a daemon thread."""
+        if self._metrics is None:
+            return
+        # the pre-scan sees the same record files as the sync, e.g. when the sync is limited to some files
+        self._thread = threading.Thread(target=contextvars.copy_context().run, args=(self.__publish_estimates,),
+                                        daemon=True, name="record-prescan")
+        self._thread.start()
+
+    def join(self, timeout: float = None) -> None:
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def finish(self, resource_type: str, summary: dict, already_done: bool = False) -> None:
+        """
+        Replaces the estimated total of a resource type by the number of records the phase went through.
+        :param resource_type: resource type of the finished phase
+        :param summary: summary of the phase
+        :param already_done: the phase was finished by an earlier (interrupted) sync, its progress is set as complete
+        """
+        if self._metrics is None:
+            return
+        total = sum(summary.values())
+        with self._lock:
+            self._finished.add(resource_type)
+            if already_done:
+                self._metrics.set_sync_progress(resource_type, total, total)
+            else:
+                self._metrics.set_sync_progress_total(resource_type, total)
+
+    def __publish_estimates(self) -> None:
+        try:
+            totals = estimate_record_totals(get_records_dir_path(), get_records_file_type(), get_parsing_map() or {})
+        except Exception as e:
+            logger.debug(f"Pre-scan of the records failed, sync progress totals are not estimated: {e}")
+            return
+        logger.debug(f"Estimated number of records: {totals}")
+        with self._lock:
+            for resource_type in self._resource_types:
+                if resource_type in totals and resource_type not in self._finished:
+                    self._metrics.set_sync_progress_total(resource_type, totals[resource_type])
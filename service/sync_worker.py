@@ -0,0 +1,111 @@
+import logging
+import time
+from contextlib import contextmanager
+from typing import Generator
+
+import schedule
+
+from service.blaze_service_interface import BlazeServiceInterface
+from service.sync_job_queue import SyncJob, SyncJobQueue, JOB_TRIGGER_SCHEDULE
+from util.custom_logger import setup_logger
+from util.sampling_profiler import SamplingProfiler
+
+setup_logger()
+logger = logging.getLogger()
+
+# Seconds between two checks of the job queue
+POLL_INTERVAL = 1.0
+
+
+class SyncWorker:
+    """Runs the jobs queued by the API and by its schedules with the Blaze services, one job at a time,
+    in the sync worker process."""
+
+    def __init__(self, job_queue: SyncJobQueue, services: dict[str, BlazeServiceInterface],
+                 poll_interval: float = POLL_INTERVAL):
+        """
+        :param job_queue: queue the jobs are claimed from
+        :param services: Blaze services by the service name used in the jobs (blaze, miabis-blaze)
+        :param poll_interval: seconds between two checks of an empty queue
+        """
+        self._job_queue = job_queue
+        self._services = services
+        self._poll_interval = poll_interval
+        self._scheduler = schedule.Scheduler()
+
+    def schedule_weekly_sync(self, service: str) -> None:
+        """Queues a sync of a service every week."""
+        logger.info(f"Scheduling weekly sync of service {service}.")
+        self._scheduler.every().week.do(self._job_queue.enqueue, service, "sync", trigger=JOB_TRIGGER_SCHEDULE)
+
+    def run_forever(self) -> None:
+        interrupted_jobs = self._job_queue.fail_running_jobs("Sync worker was restarted while the job was running.")
+        if interrupted_jobs:
+            logger.warning(f"{interrupted_jobs} job(s) were interrupted by a restart of the sync worker.")
+        logger.info("Sync worker is waiting for jobs.")
+        while True:
+            self._scheduler.run_pending()
+            if self.run_pending_jobs() == 0:
+                time.sleep(self._poll_interval)
+
+    def run_pending_jobs(self) -> int:
+        """
+        Runs all queued jobs.
+        :return: number of jobs that were run
+        """
+        jobs_run = 0
+        while (job := self._job_queue.claim_next()) is not None:
+            self.__run_job(job)
+            jobs_run += 1
+        return jobs_run
+
+    def __run_job(self, job: SyncJob) -> None:
+        service = self._services.get(job.service)
+        if service is None:
+            logger.error(f"Cannot run {job.action} job {job.id}: service {job.service} is not enabled.")
+            self._job_queue.finish(job.id, error=f"Service {job.service} is not enabled.")
+            return
+        logger.info(f"Running {job.action} job {job.id} for service {job.service}.")
+        summary = None
+        error = None
+        try:
+            match job.action:
+                case "sync":
+                    with self.__profiling(job):
+                        summary = service.sync(**job.options)
+                    if summary is not None and not summary.get("success", True):
+                        error = summary.get("error_message", "Sync failed.")
+                case "retry_failed":
+                    summary = service.retry_failed(**job.options)
+                    if summary is not None and not summary.get("success", True):
+                        error = summary.get("error_message", "Retry of the failed records failed.")
+                case "delete":
+                    if service.delete_everything() is False:
+                        error = "Delete failed."
+                case _:
+                    raise ValueError(f"Unknown job action {job.action}")
+        except Exception as e:
+            logger.exception(f"Job {job.id} failed: {e}")
+            error = str(e)
+        self._job_queue.finish(job.id, error=error, summary=summary)
+        logger.info(f"Job {job.id} {'failed' if error else 'finished'}.")
+
+    @contextmanager
+    def __profiling(self, job: SyncJob) -> Generator[None, None, None]:
+        """Profiles the job with a sampling profiler, if profiling of the next sync of its service was requested."""
+        interval = self._job_queue.claim_profiling(job.service, job.id)
+        if interval is None:
+            yield
+            return
+        logger.info(f"Profiling job {job.id} with a sample every {interval} seconds.")
+        profiler = SamplingProfiler(interval, should_stop=lambda: not self._job_queue.is_profiling(job.id)).start()
+        try:
+            yield
+        finally:
+            profile = profiler.stop()
+            try:
+                self._job_queue.save_profile(job.id, profile.to_dict(), profile.collapsed())
+                logger.info(f"Profile of job {job.id} stored, {profile.samples} samples over "
+                            f"{profile.duration:.1f} seconds.")
+            except Exception as e:
+                logger.error(f"Cannot store the profile of job {job.id}: {e}")
@@ -0,0 +1,119 @@
+import logging
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+from blaze_client import BlazeClient
+from requests import HTTPError, Response
+
+from util.adaptive_load_controller import AdaptiveLoadController, mount_adaptive_adapter
+from util.custom_logger import setup_logger
+from util.fhir_util import get_version_id, has_same_content, if_match_headers
+from util.metrics import MetricsService
+
+setup_logger()
+logger = logging.getLogger()
+
+# resource type labels used by the sync metrics
+_METRICS_RESOURCE_TYPES = {
+    "Patient": "patients",
+    "Specimen": "specimens",
+    "Condition": "conditions",
+    "Organization": "organizations",
+    "Group": "groups",
+}
+# Number of the latest read resources of every type kept for the updates following the reads
+READ_RESOURCES_KEPT = 8
+
+
+def _raise_for_status(response: Response) -> None:
+    """Raises HTTPError for an error response, with the diagnostics of the returned OperationOutcome."""
+    try:
+        response.raise_for_status()
+    except HTTPError as http_err:
+        try:
+            diagnostics = [issue.get("diagnostics", "No diagnostics available")
+                           for issue in response.json().get("issue", [])]
+        except ValueError:
+            raise http_err
+        if diagnostics:
+            http_err.args = (f"{http_err.args[0]} - Diagnostics: {diagnostics[-1]}",)
+        raise
+
+
+class VersionedBlazeClient(BlazeClient):
+    """BlazeClient which updates resources conditionally. Every update of the client follows a read of the resource
+    it compares the new values with, the latest reads are kept, so the update is compared with the read resource
+    and sent with If-Match on its version without reading the resource again. The update is skipped if the content
+    did not change, changes made by another writer since the read are not overwritten."""
+
+    def __init__(self, blaze_url: str, blaze_username: str, blaze_password: str, metrics: MetricsService = None,
+                 load_controller: AdaptiveLoadController = None):
+        """
+        :param blaze_url: url of the blaze server
+        :param blaze_username: blaze username
+        :param blaze_password: blaze password
+        :param metrics: metrics service the update outcomes are recorded to
+        :param load_controller: controller of the load put on the blaze server by the session of the client
+        """
+        super().__init__(blaze_url=blaze_url, blaze_username=blaze_username, blaze_password=blaze_password)
+        self._metrics = metrics
+        if load_controller is not None:
+            mount_adaptive_adapter(self._session, load_controller)
+        self._reads = threading.local()
+
+    def get_fhir_resource_as_json(self, resource_type: str, resource_fhir_id: str) -> dict | None:
+        """Get a FHIR resource from blaze as a json, kept for a following update of the resource.
+        :param resource_type: the type of the resource
+        :param resource_fhir_id: the fhir id of the resource
+        :return: json representation of the resource, or None if such resource is not present.
+        :raises HTTPError: if the request to blaze fails
+        """
+        resource_json = super().get_fhir_resource_as_json(resource_type, resource_fhir_id)
+        if resource_json is not None:
+            reads = self.__reads_of_type(resource_type)
+            reads[resource_fhir_id] = resource_json
+            reads.move_to_end(resource_fhir_id)
+            if len(reads) > READ_RESOURCES_KEPT:
+                reads.popitem(last=False)
+        return resource_json
+
+    def _update_fhir_resource(self, resource_type: str, resource_fhir_id: str, resource_json: dict) -> bool:
+        """Update a FHIR resource in blaze, if its content changed.
+        :param resource_type: the type of the resource
+        :param resource_fhir_id: the fhir id of the resource
+        :param resource_json: the json representation of the resource
+        :return: True if the resource was updated successfully or is already up to date
+        :raises HTTPError: if the request to blaze fails or the resource was modified since it was read
+        """
+        resource_url = f"{self._blaze_url}/{resource_type.capitalize()}/{resource_fhir_id}"
+        read_resource = self.__pop_read(resource_type, resource_fhir_id)
+        if read_resource is None:
+            logger.debug(f"{resource_type} with FHIR id {resource_fhir_id} was not read before its update. "
+                         f"Updating it unconditionally.")
+        elif has_same_content(resource_json, read_resource):
+            logger.debug(f"{resource_type} with FHIR id {resource_fhir_id} has the same content. Skipping update.")
+            self.__record_update(resource_type, "skipped")
+            return True
+        version_id = get_version_id(read_resource) if read_resource is not None else None
+        response = self._session.put(resource_url, json=resource_json, headers=if_match_headers(version_id))
+        if response.status_code == 412:
+            self.__record_update(resource_type, "conflict")
+            raise HTTPError(f"{resource_type} with FHIR id {resource_fhir_id} was modified in the blaze store "
+                            f"since it was read. Update was not applied.", response=response)
+        _raise_for_status(response)
+        self.__record_update(resource_type, "applied")
+        return response.status_code == 200 or response.status_code == 201
+
+    def __reads_of_type(self, resource_type: str) -> OrderedDict:
+        if not hasattr(self._reads, "resources"):
+            self._reads.resources = {}
+        return self._reads.resources.setdefault(resource_type.capitalize(), OrderedDict())
+
+    def __pop_read(self, resource_type: str, resource_fhir_id: str) -> Optional[dict]:
+        return self.__reads_of_type(resource_type).pop(resource_fhir_id, None)
+
+    def __record_update(self, resource_type: str, outcome: str) -> None:
+        if self._metrics is not None:
+            self._metrics.record_update(
+                _METRICS_RESOURCE_TYPES.get(resource_type.capitalize(), resource_type.lower()), outcome)
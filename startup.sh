@@ -15,6 +15,11 @@ if [[ "$(stat -c '%u:%g' /var/log/fhir-module)" != "1001:1001" ]]; then
   chown -R nextjs:nodejs /var/log/fhir-module
 fi
 
+mkdir -p /var/lib/fhir-module
+if [[ "$(stat -c '%u:%g' /var/lib/fhir-module)" != "1001:1001" ]]; then
+  chown -R nextjs:nodejs /var/lib/fhir-module
+fi
+
 # Fix permissions for shared_config.json if it exists
 if [[ -f "/opt/fhir-module/util/shared_config.json" ]]; then
     echo "Fixing permissions for shared_config.json"
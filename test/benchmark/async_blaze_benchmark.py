@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Synchronous vs asyncio Blaze Client Benchmark
+
+Starts a local stand-in of a Blaze store, which answers the patient lookups and creates the uploaded patients after
+a fixed latency, and syncs the same donors to it with the synchronous (requests) and the asyncio (aiohttp)
+implementation of the patient phase. Every donor needs a lookup and an upload, so the phase is bound by the latency.
+
+Usage:
+    python test/benchmark/async_blaze_benchmark.py --donors 2000 --latency 0.02 --connections 100
+"""
+
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import Mock, patch
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from model.sample_donor import SampleDonor  # noqa: E402
+from service.blaze_service import BlazeService  # noqa: E402
+
+
+class StandInBlaze(ThreadingHTTPServer):
+    """Stand-in of a Blaze store, with a fixed latency of every response. No patient is present before the sync."""
+    daemon_threads = True
+    request_queue_size = 1024
+
+    def __init__(self, latency: float):
+        super().__init__(("127.0.0.1", 0), StandInHandler)
+        self.latency = latency
+        self.created = 0
+        self.lock = threading.Lock()
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}/fhir"
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        time.sleep(self.server.latency)
+        self.respond(200, {"resourceType": "Bundle", "type": "searchset", "total": 0})
+
+    def do_POST(self):
+        resource = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        time.sleep(self.server.latency)
+        with self.server.lock:
+            self.server.created += 1
+            fhir_id = str(self.server.created)
+        self.respond(201, {**resource, "id": fhir_id},
+                     {"Location": f"{self.server.url}/{resource['resourceType']}/{fhir_id}/_history/1"})
+
+    def respond(self, status: int, body: dict, headers: dict = None):
+        content = json.dumps(body).encode()
+        self.send_response(status)
+        for name, value in {"Content-Type": "application/fhir+json", **(headers or {})}.items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+
+def sync_seconds(donors: int, latency: float, use_async: bool, connections: int) -> tuple[float, dict, int]:
+    server = StandInBlaze(latency)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        with patch("service.blaze_service.get_async_blaze_client", return_value=use_async), \
+             patch("service.blaze_service.get_async_blaze_connections", return_value=connections), \
+             patch("service.blaze_service.get_blaze_auth", return_value=("", "")), \
+             patch("service.blaze_service.get_metrics_for_service", return_value=None):
+            service = BlazeService(patient_service=Mock(), condition_service=Mock(), sample_service=Mock(),
+                                   blaze_url=server.url, sample_collection_repository=Mock())
+            service._patient_service.get_all.return_value = (SampleDonor(f"donor_{index}")
+                                                             for index in range(donors))
+            started = time.perf_counter()
+            summary = service.sync_patients()
+            return time.perf_counter() - started, summary, server.created
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the synchronous and asyncio patient sync.")
+    parser.add_argument("--donors", type=int, default=2000, help="Number of donors synced")
+    parser.add_argument("--latency", type=float, default=0.02, help="Latency of the stand-in Blaze store [s]")
+    parser.add_argument("--connections", type=int, default=100, help="Connection limit of the asyncio client")
+    args = parser.parse_args()
+    print(f"{'client':<8}{'donors':>8}{'created':>9}{'seconds':>9}{'donors/s':>10}")
+    for name, use_async in (("sync", False), ("asyncio", True)):
+        seconds, summary, created = sync_seconds(args.donors, args.latency, use_async, args.connections)
+        assert summary['processed'] == args.donors, f"{name}: {summary}"
+        print(f"{name:<8}{args.donors:>8}{created:>9}{seconds:>9.2f}{args.donors / seconds:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
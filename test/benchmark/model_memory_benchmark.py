@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Model Memory Benchmark
+
+Measures the memory held by buffered record objects (Sample, SampleDonor, Condition and their MIABIS variants),
+in bytes per record. Every record is built from freshly created strings, the same way the repositories build
+them from parsed record files, so the effect of interning of repeated values is included.
+
+Usage:
+    python test/benchmark/model_memory_benchmark.py --records 100000
+"""
+
+import argparse
+import gc
+import os
+import sys
+import tracemalloc
+from datetime import datetime
+from typing import Callable
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from model.condition import Condition  # noqa: E402
+from model.gender import Gender  # noqa: E402
+from model.miabis.sample_donor_miabis import SampleDonorMiabis  # noqa: E402
+from model.miabis.sample_miabis import SampleMiabis  # noqa: E402
+from model.sample import Sample  # noqa: E402
+from model.sample_donor import SampleDonor  # noqa: E402
+from model.storage_temperature import StorageTemperature  # noqa: E402
+
+MATERIAL_TYPES = ["tissue", "serum", "plasma", "whole-blood", "buffy-coat"]
+COLLECTIONS = ["test:collection:1", "test:collection:2", "test:collection:3"]
+DIAGNOSES = ["C509", "C61", "C188", "C349", "E11"]
+
+
+def _fresh(value: str) -> str:
+    """Copy of a string, as if it was read from a record file."""
+    return "".join(list(value))
+
+
+def _sample(i: int) -> Sample:
+    return Sample(identifier=str(i), donor_id=str(i // 3), material_type=_fresh(MATERIAL_TYPES[i % 5]),
+                  diagnoses=[_fresh(DIAGNOSES[i % 5])], sample_collection_id=_fresh(COLLECTIONS[i % 3]),
+                  collected_datetime=datetime(2020, 1, 1), storage_temperature=StorageTemperature.TEMPERATURE_LN)
+
+
+def _sample_miabis(i: int) -> SampleMiabis:
+    return SampleMiabis(identifier=str(i), donor_id=str(i // 3), material_type=_fresh("Serum"),
+                        diagnoses_with_observed_datetime=[(_fresh(DIAGNOSES[i % 5]), None)],
+                        sample_collection_id=_fresh(COLLECTIONS[i % 3]), collected_datetime=datetime(2020, 1, 1))
+
+
+def _sample_donor(i: int) -> SampleDonor:
+    return SampleDonor(identifier=str(i), gender=Gender.FEMALE, birth_date=datetime(1960, 1, 1))
+
+
+def _sample_donor_miabis(i: int) -> SampleDonorMiabis:
+    return SampleDonorMiabis(identifier=str(i), birth_date=datetime(1960, 1, 1))
+
+
+def _condition(i: int) -> Condition:
+    return Condition(icd_10_code=_fresh(DIAGNOSES[i % 5]), patient_id=str(i // 3))
+
+
+BENCHMARKS: dict[str, Callable[[int], object]] = {
+    "Sample": _sample,
+    "SampleMiabis": _sample_miabis,
+    "SampleDonor": _sample_donor,
+    "SampleDonorMiabis": _sample_donor_miabis,
+    "Condition": _condition,
+}
+
+
+def bytes_per_record(build: Callable[[int], object], records: int) -> float:
+    """Memory allocated by buffered records, divided by their number."""
+    gc.collect()
+    tracemalloc.start()
+    start, _ = tracemalloc.get_traced_memory()
+    buffered = [build(i) for i in range(records)]
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    # the list holding the records is not a part of the records
+    held = current - start - sys.getsizeof(buffered)
+    del buffered
+    return held / records
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure memory per buffered record object.")
+    parser.add_argument("--records", type=int, default=100000, help="Number of buffered records per model")
+    args = parser.parse_args()
+    print(f"{'model':<20}{'bytes/record':>14}")
+    for name, build in BENCHMARKS.items():
+        print(f"{name:<20}{bytes_per_record(build, args.records):>14.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Parquet vs CSV Records Benchmark
+
+Writes the same records as a CSV file and as a Parquet file, and compares the file sizes and the time
+the donor, condition and sample repositories take to read all records from them. The records contain
+a few columns which are not in the parsing map, the Parquet repositories do not read them at all.
+
+Usage:
+    python test/benchmark/parquet_csv_benchmark.py --records 100000
+"""
+
+import argparse
+import csv
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from persistence.condition_csv_repository import ConditionCsvRepository  # noqa: E402
+from persistence.condition_parquet_repository import ConditionParquetRepository  # noqa: E402
+from persistence.sample_csv_repository import SampleCsvRepository  # noqa: E402
+from persistence.sample_donor_csv_repository import SampleDonorCsvRepository  # noqa: E402
+from persistence.sample_donor_parquet_repository import SampleDonorParquetRepository  # noqa: E402
+from persistence.sample_parquet_repository import SampleParquetRepository  # noqa: E402
+
+DONOR_MAP = {"id": "patient_pseudonym", "gender": "sex", "birthDate": "birth_year"}
+CONDITION_MAP = {"icd-10_code": "diagnosis", "patient_id": "patient_pseudonym"}
+SAMPLE_MAP = {"sample_details": {"id": "sample_ID", "material_type": "sampling_type", "diagnosis": "diagnosis",
+                                 "collection_date": "sampling_date"},
+              "donor_id": "patient_pseudonym"}
+MATERIAL_TYPE_MAP = {"serum": "serum", "plasma": "plasma", "tissue": "tissue-frozen"}
+
+
+def generate_columns(records: int) -> dict[str, list]:
+    random.seed(42)
+    return {
+        "sample_ID": [str(i) for i in range(records)],
+        "patient_pseudonym": [str(i // 3) for i in range(records)],
+        "sex": [random.choice(["m", "f"]) for _ in range(records)],
+        "birth_year": [str(random.randint(1930, 2000)) for _ in range(records)],
+        "diagnosis": [random.choice(["C509", "C61", "C188", "C349"]) for _ in range(records)],
+        "sampling_type": [random.choice(list(MATERIAL_TYPE_MAP)) for _ in range(records)],
+        "sampling_date": [(date(2010, 1, 1) + timedelta(days=random.randint(0, 4000))).isoformat()
+                          for _ in range(records)],
+        "available_number_of_samples": [str(random.randint(1, 10)) for _ in range(records)],
+        "laboratory_note": [f"sample stored in box {random.randint(1, 500)} of freezer {random.randint(1, 20)}"
+                            for _ in range(records)],
+    }
+
+
+def write_records(columns: dict[str, list], csv_dir: str, parquet_dir: str) -> tuple[int, int]:
+    csv_path = os.path.join(csv_dir, "records.csv")
+    with open(csv_path, "w", newline="") as csv_file:
+        writer = csv.writer(csv_file, delimiter=";")
+        writer.writerow(columns.keys())
+        writer.writerows(zip(*columns.values()))
+    parquet_path = os.path.join(parquet_dir, "records.parquet")
+    pq.write_table(pa.table(columns), parquet_path)
+    return os.path.getsize(csv_path), os.path.getsize(parquet_path)
+
+
+def read_seconds(repository) -> tuple[float, int]:
+    started = time.perf_counter()
+    records = sum(1 for _ in repository.get_all())
+    return time.perf_counter() - started, records
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare reading of records from CSV and Parquet files.")
+    parser.add_argument("--records", type=int, default=100000, help="Number of records in the files")
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as csv_dir, tempfile.TemporaryDirectory() as parquet_dir:
+        csv_size, parquet_size = write_records(generate_columns(args.records), csv_dir, parquet_dir)
+        print(f"file size: csv {csv_size / 1024:.0f} KiB, parquet {parquet_size / 1024:.0f} KiB")
+        repositories = {
+            "donors": (SampleDonorCsvRepository(csv_dir, ";", DONOR_MAP),
+                       SampleDonorParquetRepository(parquet_dir, DONOR_MAP)),
+            "conditions": (ConditionCsvRepository(csv_dir, ";", CONDITION_MAP),
+                           ConditionParquetRepository(parquet_dir, CONDITION_MAP)),
+            "samples": (SampleCsvRepository(csv_dir, SAMPLE_MAP, ";", material_type_map=MATERIAL_TYPE_MAP),
+                        SampleParquetRepository(parquet_dir, SAMPLE_MAP, material_type_map=MATERIAL_TYPE_MAP)),
+        }
+        print(f"{'repository':<12}{'records':>10}{'csv [s]':>10}{'parquet [s]':>13}")
+        for name, (csv_repository, parquet_repository) in repositories.items():
+            csv_seconds, records = read_seconds(csv_repository)
+            parquet_seconds, parquet_records = read_seconds(parquet_repository)
+            assert records == parquet_records, f"{name}: {records} records in csv, {parquet_records} in parquet"
+            print(f"{name:<12}{records:>10}{csv_seconds:>10.2f}{parquet_seconds:>13.2f}")
+
+
+if __name__ == "__main__":
+    main()
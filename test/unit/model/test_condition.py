@@ -49,3 +49,8 @@ class TestCondition(unittest.TestCase):
         condition = Condition("C18.8", "patient-ID", datetime(year=2007, month=10, day=16))
         condition_fhir = condition.to_fhir("fake_fhir_id")
         self.assertEqual("2007-10-16", condition_fhir.onsetDateTime.date.isoformat())
+
+    def test_condition_has_no_instance_dict(self):
+        condition = Condition("C50.9", "patient")
+        self.assertFalse(hasattr(condition, "__dict__"))
+        self.assertIs(condition.patient_id, Condition("C50.9", "".join(["pat", "ient"])).patient_id)
@@ -122,4 +122,19 @@ class TestSample(unittest.TestCase):
         collected_datetime = datetime.datetime.strptime("2022", '%Y')
         sample: Sample = Sample(identifier="sampleID", donor_id="donor", collected_datetime=collected_datetime)
         self.assertEqual("2022-01-01T00:00:00", sample.collected_datetime.isoformat())
-        self.assertEqual("2022-01-01", sample.to_fhir().collection.collectedDateTime.date.isoformat())
\ No newline at end of file
+        self.assertEqual("2022-01-01", sample.to_fhir().collection.collectedDateTime.date.isoformat())
+
+    def test_sample_has_no_instance_dict(self):
+        sample = Sample(identifier="sampleId", donor_id="patient", material_type="tissue")
+        self.assertFalse(hasattr(sample, "__dict__"))
+        with self.assertRaises(AttributeError):
+            sample.note = "not an attribute of a sample"
+
+    def test_repeated_values_are_shared_between_samples(self):
+        first = Sample(identifier="1", donor_id="patient", material_type="".join(["tis", "sue"]),
+                       diagnoses=["".join(["C5", "09"])], sample_collection_id="".join(["collection", ":1"]))
+        second = Sample(identifier="2", donor_id="patient", material_type="".join(["tiss", "ue"]),
+                        diagnoses=["".join(["C50", "9"])], sample_collection_id="".join(["collection:", "1"]))
+        self.assertIs(first.material_type, second.material_type)
+        self.assertIs(first.diagnoses[0], second.diagnoses[0])
+        self.assertIs(first.sample_collection_id, second.sample_collection_id)
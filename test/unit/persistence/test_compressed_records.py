@@ -0,0 +1,93 @@
+import gzip
+import json
+import os
+import tempfile
+import unittest
+
+from persistence.condition_csv_repository import ConditionCsvRepository
+from persistence.condition_xml_repository import ConditionXMLRepository
+from persistence.record_prescan import RecordPrescan
+from persistence.sample_donor_csv_repository import SampleDonorCsvRepository
+from persistence.sample_donor_json_repository import SampleDonorJsonRepository
+from service.mail_service import MailService
+from util.record_file_util import is_record_file, open_record_file, zstandard
+
+
+class TestCompressedRecords(unittest.TestCase):
+    csv_content = "patient;sex;birth;diagnosis\n1;f;1950;C509\n2;m;1960;C61\n"
+    donor_map = {"id": "patient", "gender": "sex", "birthDate": "birth"}
+    condition_map = {"icd-10_code": "diagnosis", "patient_id": "patient"}
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.dir_path = self.tmp_dir.name
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def write_gzip(self, name: str, content: str) -> str:
+        path = os.path.join(self.dir_path, name)
+        with gzip.open(path, "wt", encoding="utf-8") as compressed_file:
+            compressed_file.write(content)
+        return path
+
+    def test_compressed_files_are_recognized(self):
+        self.assertTrue(is_record_file("records.CSV.GZ", ".csv"))
+        self.assertTrue(is_record_file("records.json", ".json"))
+        self.assertFalse(is_record_file("records.csv.gz", ".json"))
+        self.assertFalse(is_record_file("records.gz", ".csv"))
+        self.assertFalse(is_record_file("records.parquet.gz", ".parquet"))
+        self.assertEqual(zstandard is not None, is_record_file("records.xml.zst", ".xml"))
+
+    def test_gzip_file_is_decompressed_in_stream(self):
+        path = self.write_gzip("records.csv.gz", self.csv_content)
+        with open_record_file(path, "r") as file_content:
+            self.assertEqual("patient;sex;birth;diagnosis\n", file_content.readline())
+        with open_record_file(path, "rb") as file_content:
+            self.assertEqual(self.csv_content.encode(), file_content.read())
+
+    @unittest.skipIf(zstandard is None, "zstandard is not installed")
+    def test_zstd_file_is_decompressed_in_stream(self):
+        path = os.path.join(self.dir_path, "records.csv.zst")
+        with zstandard.open(path, "wt", encoding="utf-8") as compressed_file:
+            compressed_file.write(self.csv_content)
+        with open_record_file(path, "r") as file_content:
+            self.assertEqual(self.csv_content, file_content.read())
+
+    def test_csv_records_are_read_from_compressed_and_plain_files(self):
+        self.write_gzip("a.csv.gz", self.csv_content)
+        with open(os.path.join(self.dir_path, "b.csv"), "w") as plain_file:
+            plain_file.write("patient;sex;birth;diagnosis\n3;f;1970;C501\n")
+        donors = SampleDonorCsvRepository(self.dir_path, ";", self.donor_map).get_all()
+        self.assertEqual(["1", "2", "3"], sorted(donor.identifier for donor in donors))
+        conditions = ConditionCsvRepository(self.dir_path, ";", self.condition_map).get_all()
+        self.assertEqual(["C50.1", "C50.9", "C61"], sorted(condition.icd_10_code for condition in conditions))
+
+    def test_json_records_are_read_from_compressed_file(self):
+        self.write_gzip("records.json.gz", json.dumps([{"patient": "1", "sex": "F", "birth": "1950-01-01"}]))
+        donors = list(SampleDonorJsonRepository(self.dir_path, self.donor_map).get_all())
+        self.assertEqual(["1"], [donor.identifier for donor in donors])
+
+    def test_xml_records_are_read_from_compressed_file(self):
+        self.write_gzip("1.xml.gz", '<patient id="1"><STS><material><diagnosis>C509</diagnosis></material>'
+                                    '</STS></patient>')
+        repository = ConditionXMLRepository(self.dir_path, {"icd-10_code": "**.diagnosis",
+                                                            "patient_id": "patient.@id"})
+        self.assertEqual(["C50.9"], [condition.icd_10_code for condition in repository.get_all()])
+
+    def test_compressed_files_are_validated(self):
+        self.write_gzip("records.csv.gz", self.csv_content)
+        self.assertEqual([], SampleDonorCsvRepository(self.dir_path, ";", self.donor_map).smoke_validate())
+
+    def test_compressed_rows_are_counted_by_prescan(self):
+        self.write_gzip("records.csv.gz", self.csv_content)
+        totals = RecordPrescan().estimate_totals(self.dir_path, "csv", {})
+        self.assertEqual(2, totals["patients"])
+
+    def test_compressed_files_count_as_fresh_data(self):
+        self.write_gzip("records.json.gz", "[]")
+        mail_service = MailService(self.dir_path, 30, "localhost", 25, "receiver@example.com",
+                                   records_file_type="json")
+        self.assertTrue(mail_service.check_if_data_files_are_fresh())
+        csv_mail_service = MailService(self.dir_path, 30, "localhost", 25, "receiver@example.com")
+        self.assertFalse(csv_mail_service.check_if_data_files_are_fresh())
@@ -0,0 +1,195 @@
+import threading
+import unittest
+from contextlib import closing
+
+from pyfakefs.fake_filesystem_unittest import patchfs
+
+from persistence.condition_csv_repository import ConditionCsvRepository
+from persistence.csv_row_source import CsvRowSource
+from persistence.sample_csv_repository import SampleCsvRepository
+from persistence.sample_donor_csv_repository import SampleDonorCsvRepository
+
+
+class TestCsvRowSource(unittest.TestCase):
+    header = "sample_ID;patient_pseudonym;sex;birth_year;diagnosis;sampling_type\n"
+    rows = ["1;1113;f;1939;C509;serum\n",
+            "2;1114;m;1950;C509,C501;serum\n",
+            "3;1115;f;1960;C509;serum\n"]
+    dir_path = "/mock_dir/"
+    file_path = dir_path + "mock_file.csv"
+
+    def _create_source(self, consumers: int, **kwargs) -> CsvRowSource:
+        row_source = CsvRowSource(**kwargs)
+        for _ in range(consumers):
+            row_source.register_consumer()
+        return row_source
+
+    @patchfs
+    def test_read_returns_header_and_rows(self, fake_fs):
+        fake_fs.create_file(self.file_path, contents=self.header + "".join(self.rows))
+        row_source = self._create_source(consumers=1)
+        rows = list(row_source.read(self.file_path, ";"))
+        self.assertEqual(4, len(rows))
+        self.assertEqual("sample_ID", rows[0][0])
+        self.assertEqual(["2", "1114", "m", "1950", "C509,C501", "serum"], rows[2])
+
+    @patchfs
+    def test_file_is_parsed_once_for_all_consumers(self, fake_fs):
+        fake_fs.create_file(self.file_path, contents=self.header + "".join(self.rows))
+        row_source = self._create_source(consumers=3)
+        results = [list(row_source.read(self.file_path, ";")) for _ in range(3)]
+        self.assertEqual(results[0], results[1])
+        self.assertEqual(results[0], results[2])
+        self.assertEqual(1, row_source.files_read)
+        self.assertEqual(2, row_source.files_served_from_cache)
+
+    @patchfs
+    def test_cache_is_released_after_last_consumer(self, fake_fs):
+        fake_fs.create_file(self.file_path, contents=self.header + "".join(self.rows))
+        row_source = self._create_source(consumers=2)
+        for _ in range(3):
+            list(row_source.read(self.file_path, ";"))
+        self.assertEqual(2, row_source.files_read)
+        self.assertEqual(1, row_source.files_served_from_cache)
+
+    @patchfs
+    def test_changed_file_is_read_again(self, fake_fs):
+        fake_file = fake_fs.create_file(self.file_path, contents=self.header + self.rows[0])
+        row_source = self._create_source(consumers=3)
+        list(row_source.read(self.file_path, ";"))
+        fake_file.set_contents(self.header + "".join(self.rows))
+        self.assertEqual(4, len(list(row_source.read(self.file_path, ";"))))
+        self.assertEqual(2, row_source.files_read)
+
+    @patchfs
+    def test_partially_read_file_is_parsed_further_by_next_consumer(self, fake_fs):
+        fake_fs.create_file(self.file_path, contents=self.header + "".join(self.rows))
+        row_source = self._create_source(consumers=3)
+        with closing(row_source.read(self.file_path, ";")) as reader:
+            next(reader)
+        self.assertEqual(4, len(list(row_source.read(self.file_path, ";"))))
+        self.assertEqual(1, row_source.files_read)
+        self.assertEqual(1, row_source.files_served_from_cache)
+
+    @patchfs
+    def test_large_file_is_spilled_to_disk(self, fake_fs):
+        content = self.header + "".join(f"{i};{i};f;1939;C509;serum\n" for i in range(2500))
+        fake_fs.create_file(self.file_path, contents=content)
+        row_source = self._create_source(consumers=2, max_rows_in_memory=1000)
+        first_read = list(row_source.read(self.file_path, ";"))
+        second_read = list(row_source.read(self.file_path, ";"))
+        self.assertEqual(2501, len(second_read))
+        self.assertEqual(first_read, second_read)
+        self.assertEqual(1, row_source.files_read)
+        row_source.clear()
+
+    @patchfs
+    def test_in_memory_budget_is_shared_by_all_files(self, fake_fs):
+        content = self.header + "".join(f"{i};{i};f;1939;C509;serum\n" for i in range(1200))
+        file_paths = [self.dir_path + f"mock_file_{index}.csv" for index in range(3)]
+        for file_path in file_paths:
+            fake_fs.create_file(file_path, contents=content)
+        row_source = self._create_source(consumers=2, max_rows_in_memory=2500)
+        first_reads = [list(row_source.read(file_path, ";")) for file_path in file_paths]
+        self.assertLessEqual(row_source.rows_in_memory, 2500)
+        second_reads = [list(row_source.read(file_path, ";")) for file_path in file_paths]
+        self.assertEqual(first_reads, second_reads)
+        self.assertEqual(3, row_source.files_read)
+        self.assertEqual(0, row_source.rows_in_memory)
+        row_source.clear()
+
+    @patchfs
+    def test_missing_file_raises_os_error(self, fake_fs):
+        fake_fs.create_dir(self.dir_path)
+        row_source = self._create_source(consumers=3)
+        with self.assertRaises(OSError):
+            next(row_source.read(self.file_path, ";"))
+
+    @patchfs
+    def test_repositories_share_one_read_per_file(self, fake_fs):
+        fake_fs.create_file(self.file_path, contents=self.header + "".join(self.rows))
+        row_source = CsvRowSource()
+        donor_repository = SampleDonorCsvRepository(records_path=self.dir_path, separator=";",
+                                                    donor_parsing_map={"id": "patient_pseudonym", "gender": "sex",
+                                                                       "birthDate": "birth_year"},
+                                                    row_source=row_source)
+        condition_repository = ConditionCsvRepository(records_path=self.dir_path, separator=";",
+                                                      condition_parsing_map={"icd-10_code": "diagnosis",
+                                                                             "patient_id": "patient_pseudonym"},
+                                                      row_source=row_source)
+        sample_repository = SampleCsvRepository(records_path=self.dir_path, separator=";",
+                                                sample_parsing_map={"sample_details": {"id": "sample_ID",
+                                                                                       "diagnosis": "diagnosis"},
+                                                                    "donor_id": "patient_pseudonym"},
+                                                row_source=row_source)
+        self.assertEqual(3, len(list(donor_repository.get_all())))
+        self.assertEqual(4, len(list(condition_repository.get_all())))
+        self.assertEqual(3, len(list(sample_repository.get_all())))
+        self.assertEqual(1, row_source.files_read)
+        self.assertEqual(2, row_source.files_served_from_cache)
+
+    @patchfs
+    def test_consumer_in_another_thread_does_not_wait_for_running_read(self, fake_fs):
+        fake_fs.create_file(self.file_path, contents=self.header + "".join(self.rows))
+        row_source = self._create_source(consumers=2)
+        results = {}
+        with closing(row_source.read(self.file_path, ";")) as reader:
+            first_rows = [next(reader)]
+            other_consumer = threading.Thread(
+                target=lambda: results.setdefault("rows", list(row_source.read(self.file_path, ";"))))
+            other_consumer.start()
+            other_consumer.join(5)
+            self.assertFalse(other_consumer.is_alive())
+            first_rows.extend(reader)
+        self.assertEqual(first_rows, results["rows"])
+        self.assertEqual(1, row_source.files_read)
+        self.assertEqual(1, row_source.files_served_from_cache)
+
+    @patchfs
+    def test_nested_read_in_the_same_thread_shares_the_parse(self, fake_fs):
+        fake_fs.create_file(self.file_path, contents=self.header + "".join(self.rows))
+        row_source = self._create_source(consumers=2)
+        with closing(row_source.read(self.file_path, ";")) as reader:
+            next(reader)
+            self.assertEqual(4, len(list(row_source.read(self.file_path, ";"))))
+            self.assertEqual(3, len(list(reader)))
+        self.assertEqual(1, row_source.files_read)
+        self.assertEqual(0, row_source.rows_in_memory)
+
+    @patchfs
+    def test_spilled_file_is_read_while_it_is_parsed(self, fake_fs):
+        content = self.header + "".join(f"{i};{i};f;1939;C509;serum\n" for i in range(2500))
+        fake_fs.create_file(self.file_path, contents=content)
+        row_source = self._create_source(consumers=2, max_rows_in_memory=1000)
+        ahead = row_source.read(self.file_path, ";")
+        behind = row_source.read(self.file_path, ";")
+        ahead_rows = [next(ahead) for _ in range(2200)]
+        behind_rows = list(behind)
+        ahead_rows.extend(ahead)
+        self.assertEqual(2501, len(behind_rows))
+        self.assertEqual(ahead_rows, behind_rows)
+        self.assertEqual(1, row_source.files_read)
+        row_source.clear()
+
+    @patchfs
+    def test_standard_and_miabis_repositories_share_one_read(self, fake_fs):
+        fake_fs.create_file(self.file_path, contents=self.header + "".join(self.rows))
+        row_source = CsvRowSource()
+        sample_parsing_map = {"sample_details": {"id": "sample_ID", "diagnosis": "diagnosis",
+                                                 "material_type": "sampling_type"},
+                              "donor_id": "patient_pseudonym"}
+        repositories = [SampleCsvRepository(records_path=self.dir_path, separator=";",
+                                            sample_parsing_map=sample_parsing_map,
+                                            material_type_map={"serum": material_type},
+                                            miabis_on_fhir_model=miabis_on_fhir_model, row_source=row_source)
+                        for miabis_on_fhir_model, material_type in ((False, "serum"), (True, "Serum"))]
+        samples = {}
+        threads = [threading.Thread(target=lambda repository=repository: samples.setdefault(
+            repository, list(repository.get_all()))) for repository in repositories]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(5)
+        self.assertEqual(["1", "2", "3"], [sample.identifier for sample in samples[repositories[0]]])
+        self.assertEqual(["1", "2", "3"], [sample.identifier for sample in samples[repositories[1]]])
+        self.assertEqual(1, row_source.files_read)
@@ -0,0 +1,85 @@
+import os
+import tempfile
+import unittest
+from datetime import date
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from model.miabis.sample_miabis import SampleMiabis
+from persistence.condition_parquet_repository import ConditionParquetRepository
+from persistence.parquet_row_source import ParquetRowSource, parquet_columns
+from persistence.record_prescan import RecordPrescan
+from persistence.sample_donor_parquet_repository import SampleDonorParquetRepository
+from persistence.sample_parquet_repository import SampleParquetRepository
+
+
+class TestParquetRepositories(unittest.TestCase):
+    donor_map = {"id": "patient_pseudonym", "gender": "sex", "birthDate": "birth_year"}
+    condition_map = {"icd-10_code": "diagnosis", "patient_id": "patient_pseudonym"}
+    sample_map = {"sample_details": {"id": "sample_ID", "material_type": "sampling_type",
+                                     "diagnosis": "diagnosis", "collection_date": "sampling_date"},
+                  "donor_id": "patient_pseudonym"}
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.dir_path = self.tmp_dir.name
+        table = pa.table({
+            "sample_ID": ["1", "2", "3"],
+            "patient_pseudonym": ["1113", "1114", "1114"],
+            "sex": ["f", "m", "m"],
+            "birth_year": [1939, 1950, None],
+            "diagnosis": ["C509", "C509,C501", "C61"],
+            "sampling_type": ["serum", "serum", "tissue"],
+            "sampling_date": [date(2020, 1, 1), date(2021, 5, 6), date(2022, 2, 3)],
+            "unused_note": ["a", "b", "c"],
+        })
+        pq.write_table(table, os.path.join(self.dir_path, "records.parquet"))
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_only_mapped_columns_are_read(self):
+        row_source = ParquetRowSource(parquet_columns(self.donor_map, {"not_a_column_map": "missing_column"}))
+        rows = list(row_source.read(os.path.join(self.dir_path, "records.parquet")))
+        self.assertEqual(["patient_pseudonym", "sex", "birth_year"], rows[0])
+        self.assertEqual(["1113", "f", "1939"], rows[1])
+        self.assertEqual(["1114", "m", ""], rows[3])
+
+    def test_donors_are_read(self):
+        donors = list(SampleDonorParquetRepository(self.dir_path, self.donor_map).get_all())
+        self.assertEqual(["1113", "1114"], [donor.identifier for donor in donors])
+        self.assertEqual("FEMALE", donors[0].gender.name)
+        self.assertEqual(1939, donors[0].date_of_birth.year)
+
+    def test_conditions_are_read(self):
+        conditions = list(ConditionParquetRepository(self.dir_path, self.condition_map).get_all())
+        self.assertEqual(["C50.9", "C50.9", "C50.1", "C61"], [condition.icd_10_code for condition in conditions])
+
+    def test_samples_are_read(self):
+        samples = list(SampleParquetRepository(self.dir_path, self.sample_map,
+                                               material_type_map={"serum": "Serum", "tissue": "TissueFixed"},
+                                               miabis_on_fhir_model=True).get_all())
+        self.assertEqual(3, len(samples))
+        self.assertIsInstance(samples[0], SampleMiabis)
+        self.assertEqual("Serum", samples[0].material_type)
+        self.assertEqual(date(2021, 5, 6), samples[1].collected_datetime.date())
+
+    def test_validation_uses_schema(self):
+        repository = SampleParquetRepository(self.dir_path, {"sample_details": {"id": "sample_ID"},
+                                                             "donor_id": "donor"})
+        errors = repository.smoke_validate()
+        self.assertEqual(1, len(errors))
+        self.assertIn("column donor (donor_id) is not present", errors[0])
+        self.assertEqual([], SampleDonorParquetRepository(self.dir_path, self.donor_map).smoke_validate())
+
+    def test_not_a_parquet_file_is_skipped(self):
+        with open(os.path.join(self.dir_path, "broken.parquet"), "w") as broken_file:
+            broken_file.write("patient_pseudonym\n1115\n")
+        donors = list(SampleDonorParquetRepository(self.dir_path, self.donor_map).get_all())
+        self.assertEqual(2, len(donors))
+        self.assertEqual(1, len(SampleDonorParquetRepository(self.dir_path, self.donor_map).smoke_validate(True)))
+
+    def test_prescan_counts_rows_from_metadata(self):
+        totals = RecordPrescan().estimate_totals(self.dir_path, "parquet", {})
+        self.assertEqual({"patients": 3, "conditions": 3, "specimens": 3}, totals)
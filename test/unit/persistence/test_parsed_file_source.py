@@ -0,0 +1,115 @@
+import os
+import tempfile
+import unittest
+
+from model.sample_donor import SampleDonor
+from persistence.condition_xml_repository import ConditionXMLRepository
+from persistence.json_util import parse_json_file
+from persistence.parsed_file_source import ParsedFileSource
+from persistence.sample_donor_json_repository import SampleDonorJsonRepository
+from persistence.sample_donor_xml_files_repository import SampleDonorXMLFilesRepository
+from persistence.xml_util import parse_xml_file
+
+
+class TestParsedFileSource(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.parses = 0
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def _create_file(self, name: str, content: str) -> os.DirEntry:
+        with open(os.path.join(self.tmp_dir.name, name), "w") as record_file:
+            record_file.write(content)
+        return next(entry for entry in os.scandir(self.tmp_dir.name) if entry.name == name)
+
+    def _create_source(self, consumers: int, **kwargs) -> ParsedFileSource:
+        file_source = ParsedFileSource(**kwargs)
+        for _ in range(consumers):
+            file_source.register_consumer()
+        return file_source
+
+    def _count_parse(self, dir_entry: os.DirEntry):
+        self.parses += 1
+        return parse_json_file(dir_entry)
+
+    def test_file_is_parsed_once_for_all_consumers(self):
+        dir_entry = self._create_file("records.json", '[{"id": "1"}]')
+        file_source = self._create_source(consumers=3)
+
+        results = [file_source.parse(dir_entry, self._count_parse) for _ in range(3)]
+
+        self.assertEqual([[{"id": "1"}]] * 3, results)
+        self.assertEqual(1, self.parses)
+        self.assertEqual(2, file_source.files_served_from_cache)
+        self.assertEqual(0, file_source.bytes_in_memory)
+
+    def test_file_is_released_after_last_consumer(self):
+        dir_entry = self._create_file("records.json", '[{"id": "1"}]')
+        file_source = self._create_source(consumers=2)
+
+        for _ in range(3):
+            file_source.parse(dir_entry, self._count_parse)
+
+        self.assertEqual(2, self.parses)
+
+    def test_least_recently_read_files_are_dropped_over_the_budget(self):
+        first = self._create_file("first.json", '[{"id": "1"}]')
+        second = self._create_file("second.json", '[{"id": "2"}]')
+        file_source = self._create_source(consumers=2, max_bytes_in_memory=first.stat().st_size)
+
+        file_source.parse(first, self._count_parse)
+        file_source.parse(second, self._count_parse)
+        self.assertEqual(second.stat().st_size, file_source.bytes_in_memory)
+        file_source.parse(second, self._count_parse)
+        file_source.parse(first, self._count_parse)
+
+        self.assertEqual(3, self.parses)
+        self.assertEqual(0, file_source.bytes_in_memory)
+
+    def test_error_of_the_parser_is_raised_to_every_consumer(self):
+        dir_entry = self._create_file("records.xml", "not xml")
+        file_source = self._create_source(consumers=2)
+
+        for _ in range(2):
+            with self.assertRaises(Exception):
+                file_source.parse(dir_entry, parse_xml_file)
+
+    def test_xml_repositories_share_the_parsed_files(self):
+        self._create_file("1.xml", '<patient id="9999" sex="female"><STS><diagnosisMaterial>'
+                                   '<diagnosis>C509</diagnosis></diagnosisMaterial></STS></patient>')
+        file_source = ParsedFileSource()
+        donor_repository = SampleDonorXMLFilesRepository(self.tmp_dir.name, {"id": "patient.@id",
+                                                                             "gender": "patient.@sex"},
+                                                         file_source=file_source)
+        condition_repository = ConditionXMLRepository(self.tmp_dir.name,
+                                                      {"icd-10_code": "patient.**.diagnosis",
+                                                       "patient_id": "patient.@id"},
+                                                      file_source=file_source)
+
+        donors = list(donor_repository.get_all())
+        conditions = list(condition_repository.get_all())
+
+        self.assertEqual(["9999"], [donor.identifier for donor in donors])
+        self.assertEqual(["C50.9"], [condition.icd_10_code for condition in conditions])
+        self.assertEqual(1, file_source.files_parsed)
+        self.assertEqual(1, file_source.files_served_from_cache)
+
+    def test_json_repositories_of_both_models_share_the_parsed_files(self):
+        self._create_file("donors.json", '[{"id": "1", "sex": "male"}]')
+        file_source = ParsedFileSource()
+        donor_map = {"id": "id", "gender": "sex"}
+        repositories = [SampleDonorJsonRepository(self.tmp_dir.name, donor_map, miabis_on_fhir_model=miabis,
+                                                  file_source=file_source) for miabis in (False, True)]
+
+        donors = [list(repository.get_all()) for repository in repositories]
+
+        self.assertIsInstance(donors[0][0], SampleDonor)
+        self.assertEqual("1", donors[1][0].identifier)
+        self.assertEqual(1, file_source.files_parsed)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,90 @@
+import os
+import unittest
+from unittest.mock import patch
+
+from pyfakefs.fake_filesystem_unittest import patchfs
+
+from persistence.record_prescan import RecordPrescan
+
+
+class TestRecordPrescan(unittest.TestCase):
+    dir_path = "/mock_dir/"
+    xml_parsing_map = {"sample_map": {"sample_details": {"id": "@sampleId"}},
+                       "condition_map": {"icd-10_code": "**.diagnosis"}}
+    xml_content = ('<patient id="1"><LTS>'
+                   '<tissue sampleId="1:1"><diagnosis>C509</diagnosis></tissue>'
+                   '<tissue sampleId="1:2"><diagnosis>C61</diagnosis></tissue>'
+                   '</LTS><STS><serum sampleId="1:3"/></STS></patient>')
+
+    @patchfs
+    def test_csv_rows_are_counted_without_header(self, fake_fs):
+        fake_fs.create_file(self.dir_path + "a.csv", contents="id;patient\n1;1\n2;1\n3;2\n")
+        fake_fs.create_file(self.dir_path + "b.csv", contents="id;patient\n4;3\n5;3")
+        fake_fs.create_file(self.dir_path + "notes.txt", contents="not\na\nrecord\n")
+        totals = RecordPrescan().estimate_totals(self.dir_path, "csv", {})
+        self.assertEqual({"patients": 5, "conditions": 5, "specimens": 5}, totals)
+
+    @patchfs
+    def test_json_top_level_objects_are_counted(self, fake_fs):
+        fake_fs.create_file(self.dir_path + "records.json",
+                            contents='[{"id": "1", "nested": {"a": [1, 2]}, "note": "{not [a] record}"},'
+                                     ' {"id": "2"}, {"id": "3"}]')
+        totals = RecordPrescan().estimate_totals(self.dir_path, "json", {})
+        self.assertEqual(3, totals["specimens"])
+
+    @patchfs
+    def test_json_strings_split_between_chunks_are_skipped(self, fake_fs):
+        fake_fs.create_file(self.dir_path + "records.json",
+                            contents='[{"id": "1", "note": "a \\"{quoted}\\" [x] \\\\"}, {"id": "2", "n": {}},'
+                                     ' {"id": "3\\\\", "list": [{"a": "]"}]}]')
+        for chunk_size in range(1, 12):
+            with patch("persistence.record_prescan.SCAN_CHUNK_SIZE", chunk_size):
+                totals = RecordPrescan().estimate_totals(self.dir_path, "json", {})
+            self.assertEqual(3, totals["specimens"], chunk_size)
+
+    @patchfs
+    def test_xml_samples_and_diagnoses_are_counted(self, fake_fs):
+        fake_fs.create_file(self.dir_path + "1.xml", contents=self.xml_content)
+        fake_fs.create_file(self.dir_path + "2.xml", contents=self.xml_content)
+        totals = RecordPrescan().estimate_totals(self.dir_path, "xml", self.xml_parsing_map)
+        self.assertEqual({"patients": 2, "conditions": 4, "specimens": 6}, totals)
+
+    @patchfs
+    def test_needle_split_between_chunks_is_counted_once(self, fake_fs):
+        fake_fs.create_file(self.dir_path + "1.xml", contents=self.xml_content)
+        with patch("persistence.record_prescan.SCAN_CHUNK_SIZE", 7):
+            totals = RecordPrescan().estimate_totals(self.dir_path, "xml", self.xml_parsing_map)
+        self.assertEqual(3, totals["specimens"])
+        self.assertEqual(2, totals["conditions"])
+
+    @patchfs
+    def test_unchanged_files_are_served_from_cache(self, fake_fs):
+        fake_file = fake_fs.create_file(self.dir_path + "a.csv", contents="id\n1\n2\n")
+        prescan = RecordPrescan()
+        self.assertEqual(2, prescan.estimate_totals(self.dir_path, "csv", {})["patients"])
+        with patch("persistence.record_prescan._count_csv_rows") as count_rows:
+            self.assertEqual(2, prescan.estimate_totals(self.dir_path, "csv", {})["patients"])
+            count_rows.assert_not_called()
+        fake_file.set_contents("id\n1\n2\n3\n")
+        self.assertEqual(3, prescan.estimate_totals(self.dir_path, "csv", {})["patients"])
+
+    @patchfs
+    def test_estimates_of_removed_and_modified_files_are_dropped(self, fake_fs):
+        fake_fs.create_file(self.dir_path + "removed.csv", contents="id\n1\n")
+        modified_file = fake_fs.create_file(self.dir_path + "modified.csv", contents="id\n1\n")
+        fake_fs.create_file(self.dir_path + "a.xml", contents=self.xml_content)
+        prescan = RecordPrescan()
+        prescan.estimate_totals(self.dir_path, "csv", {})
+        prescan.estimate_totals(self.dir_path, "xml", self.xml_parsing_map)
+        self.assertEqual(3, len(prescan._cache))
+
+        fake_fs.remove(self.dir_path + "removed.csv")
+        modified_file.set_contents("id\n1\n2\n")
+        self.assertEqual(2, prescan.estimate_totals(self.dir_path, "csv", {})["patients"])
+
+        self.assertEqual(["a.xml", "modified.csv"], sorted(os.path.basename(key[0]) for key in prescan._cache))
+
+    @patchfs
+    def test_missing_directory_gives_zero_totals(self, fake_fs):
+        totals = RecordPrescan().estimate_totals("/does_not_exist/", "csv", {})
+        self.assertEqual({"patients": 0, "conditions": 0, "specimens": 0}, totals)
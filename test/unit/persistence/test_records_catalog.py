@@ -0,0 +1,90 @@
+import os
+import tempfile
+import time
+import unittest
+from unittest.mock import patch
+
+from persistence.records_catalog import RecordsCatalog, _inotify
+from util.sync_checkpoint import fingerprint_records_dir
+
+
+class TestRecordsCatalog(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.dir_path = self.temp_dir.name
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def _write(self, name: str, content: str = "id;gender\n1;M\n") -> str:
+        path = os.path.join(self.dir_path, name)
+        with open(path, "w") as file:
+            file.write(content)
+        return path
+
+    def test_files_are_filtered_by_extension_and_sorted(self):
+        self._write("b.csv")
+        self._write("a.csv.gz")
+        self._write("notes.txt")
+        os.mkdir(os.path.join(self.dir_path, "c.csv"))
+
+        catalog = RecordsCatalog(self.dir_path, use_inotify=False)
+
+        self.assertEqual(["a.csv.gz", "b.csv"], [entry.name for entry in catalog.files(".csv")])
+        self.assertEqual(["a.csv.gz", "b.csv", "notes.txt"], [entry.name for entry in catalog.files()])
+
+    def test_files_are_filtered_by_freshness(self):
+        old_path = self._write("old.csv")
+        self._write("new.csv")
+        ten_days_ago = time.time() - 10 * 24 * 60 * 60
+        os.utime(old_path, (ten_days_ago, ten_days_ago))
+
+        catalog = RecordsCatalog(self.dir_path, use_inotify=False)
+
+        self.assertEqual(["new.csv"], [entry.name for entry in catalog.files(".csv", max_age_days=7)])
+
+    def test_refresh_reports_changes_since_previous_refresh(self):
+        self._write("kept.csv")
+        modified_path = self._write("modified.csv")
+        removed_path = self._write("removed.csv")
+        catalog = RecordsCatalog(self.dir_path, use_inotify=False)
+        self.assertEqual(3, len(catalog.refresh().added))
+
+        self._write("added.csv")
+        with open(modified_path, "a") as file:
+            file.write("2;F\n")
+        os.remove(removed_path)
+        changes = catalog.refresh()
+
+        self.assertEqual(["added.csv"], [entry.name for entry in changes.added])
+        self.assertEqual(["modified.csv"], [entry.name for entry in changes.modified])
+        self.assertEqual(["removed.csv"], changes.removed)
+        self.assertFalse(catalog.refresh())
+
+    def test_inotify_refresh_stats_only_changed_files(self):
+        if _inotify() is None:
+            self.skipTest("inotify is not available")
+        self._write("kept.csv")
+        catalog = RecordsCatalog(self.dir_path)
+        catalog.refresh()
+
+        self._write("added.csv")
+        with patch("persistence.records_catalog.os.scandir", side_effect=AssertionError("directory listed")):
+            changes = catalog.refresh()
+
+        self.assertEqual(["added.csv"], [entry.name for entry in changes.added])
+        self.assertEqual(["added.csv", "kept.csv"], [entry.name for entry in catalog.files(".csv")])
+
+    def test_fingerprint_sees_change_missed_by_incremental_refresh(self):
+        path = self._write("records.csv")
+        fingerprint = fingerprint_records_dir(self.dir_path)
+        os.utime(path, ns=(time.time_ns(), time.time_ns() + 10 ** 9))
+
+        # a network mount without inotify events: no file is reported as changed, the directory is unchanged
+        with patch.object(RecordsCatalog, "_RecordsCatalog__take_changed_names", return_value=set()):
+            self.assertNotEqual(fingerprint, fingerprint_records_dir(self.dir_path))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,41 @@
+"""
+Helpers shared by the unit tests of BlazeService, which mock the session of the service.
+"""
+
+from unittest.mock import Mock, patch
+
+from service.blaze_service import BlazeService
+
+BLAZE_URL = "http://blaze:8080/fhir"
+
+
+def make_service(mock_session: Mock) -> BlazeService:
+    """BlazeService sending its requests through the mocked session, with mocked repositories."""
+    with patch("service.blaze_service.requests.session") as mock_session_factory, \
+         patch("service.blaze_service.setup_logger"), \
+         patch("service.blaze_service.get_blaze_auth", return_value=("u", "p")), \
+         patch("service.blaze_service.get_metrics_for_service"):
+        mock_session_factory.return_value = mock_session
+        return BlazeService(
+            patient_service=Mock(),
+            condition_service=Mock(),
+            sample_service=Mock(),
+            blaze_url=BLAZE_URL,
+            sample_collection_repository=Mock(),
+        )
+
+
+def mock_response(body: dict, status_code: int = 200) -> Mock:
+    """Response of the Blaze store with a JSON body."""
+    response = Mock()
+    response.status_code = status_code
+    response.json.return_value = body
+    return response
+
+
+def mock_search_response(resources: list[dict], next_url: str = None) -> Mock:
+    """Page of a search of the Blaze store, linking the next page if its url is given."""
+    body = {"resourceType": "Bundle", "entry": [{"resource": resource} for resource in resources]}
+    if next_url is not None:
+        body["link"] = [{"relation": "next", "url": next_url}]
+    return mock_response(body)
@@ -0,0 +1,126 @@
+import threading
+import unittest
+from unittest.mock import patch
+
+import requests
+from urllib3 import HTTPResponse
+
+from util.adaptive_load_controller import AdaptiveLoadController, AdaptiveHTTPAdapter, AdaptiveRetry, \
+    INCREASE_WINDOW, mount_adaptive_adapter
+from util.metrics import adaptive_batch_size, adaptive_max_in_flight
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class TestAdaptiveLoadController(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.controller = AdaptiveLoadController("test-blaze", latency_target=1.0, min_batch_size=10,
+                                                 max_batch_size=200, initial_batch_size=100, max_in_flight=4,
+                                                 initial_in_flight=2, clock=self.clock)
+
+    def respond(self, status_code: int = 200, latency: float = 0.1, retry_after: float = None) -> None:
+        with self.controller.slot() as started_at:
+            self.clock.now += latency
+        self.controller.record_response(started_at, status_code, retry_after)
+
+    def test_load_is_increased_after_window_of_fast_responses(self):
+        for _ in range(INCREASE_WINDOW - 1):
+            self.respond()
+        self.assertEqual(100, self.controller.batch_size)
+        self.respond()
+        self.assertEqual(110, self.controller.batch_size)
+        self.assertEqual(3, self.controller.max_in_flight)
+        self.assertEqual(110, adaptive_batch_size.labels(service="test-blaze")._value.get())
+        self.assertEqual(3, adaptive_max_in_flight.labels(service="test-blaze")._value.get())
+
+    def test_load_is_halved_on_overload_status_and_slow_response(self):
+        self.respond(status_code=503)
+        self.assertEqual(50, self.controller.batch_size)
+        self.assertEqual(1, self.controller.max_in_flight)
+        self.respond(latency=2.0)
+        self.assertEqual(25, self.controller.batch_size)
+        for _ in range(3):
+            self.respond(status_code=429)
+        self.assertEqual(10, self.controller.batch_size)
+        self.assertEqual(1, self.controller.max_in_flight)
+
+    def test_requests_sent_before_decrease_do_not_decrease_again(self):
+        first_slot = self.controller.slot()
+        first_started_at = first_slot.__enter__()
+        second_slot = self.controller.slot()
+        second_started_at = second_slot.__enter__()
+        self.clock.now += 0.1
+        self.controller.record_response(first_started_at, 503)
+        self.controller.record_response(second_started_at, 503)
+        first_slot.__exit__(None, None, None)
+        second_slot.__exit__(None, None, None)
+        self.assertEqual(50, self.controller.batch_size)
+
+    def test_retry_after_pauses_new_requests(self):
+        controller = AdaptiveLoadController("test-blaze")
+        with controller.slot() as started_at:
+            pass
+        controller.record_response(started_at, 503, retry_after=0.5)
+        slot_entered = threading.Event()
+
+        def send():
+            with controller.slot():
+                slot_entered.set()
+
+        sender = threading.Thread(target=send)
+        sender.start()
+        self.assertFalse(slot_entered.wait(0.2))
+        sender.join(timeout=5)
+        self.assertTrue(slot_entered.is_set())
+
+    def test_requests_in_flight_are_limited(self):
+        self.respond(status_code=503)
+        slot = self.controller.slot()
+        slot.__enter__()
+        slot_entered = threading.Event()
+
+        def send():
+            with self.controller.slot():
+                slot_entered.set()
+
+        sender = threading.Thread(target=send)
+        sender.start()
+        self.assertFalse(slot_entered.wait(0.2))
+        slot.__exit__(None, None, None)
+        sender.join(timeout=5)
+        self.assertTrue(slot_entered.is_set())
+
+    def test_retried_responses_are_reported(self):
+        retry = AdaptiveRetry(total=5, status_forcelist=[503], controller=self.controller)
+        response = HTTPResponse(status=503, headers={"Retry-After": "3"})
+        retry = retry.increment(method="GET", url="/Patient", response=response)
+        self.assertIs(self.controller, retry.controller)
+        self.assertEqual(50, self.controller.batch_size)
+        # a second retry of the same burst does not decrease the load again
+        retry.increment(method="GET", url="/Patient", response=response)
+        self.assertEqual(50, self.controller.batch_size)
+
+    def test_adapter_is_mounted_to_session(self):
+        session = requests.Session()
+        mount_adaptive_adapter(session, self.controller)
+        adapter = session.get_adapter("http://blaze:8080/fhir")
+        self.assertIsInstance(adapter, AdaptiveHTTPAdapter)
+        self.assertIs(self.controller, adapter.max_retries.controller)
+        response = requests.Response()
+        response.status_code = 201
+        with patch("requests.adapters.HTTPAdapter.send", return_value=response):
+            for _ in range(INCREASE_WINDOW):
+                session.post("http://blaze:8080/fhir/Patient", json={})
+        self.assertEqual(110, self.controller.batch_size)
+
+
+if __name__ == '__main__':
+    unittest.main()
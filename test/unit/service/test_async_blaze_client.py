@@ -0,0 +1,231 @@
+import asyncio
+import json
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import AsyncMock, Mock, patch
+from urllib.parse import parse_qs, urlparse
+
+import aiohttp
+
+from model.condition import Condition
+from model.sample_donor import SampleDonor
+from service.async_blaze_client import AsyncBlazeClient, feed_windows
+from service.blaze_service import BlazeService
+from util.adaptive_load_controller import AdaptiveLoadController
+
+
+class _StandInBlaze(ThreadingHTTPServer):
+    """Local stand-in of a Blaze store: counts the searched patients, creates resources with a short latency."""
+    daemon_threads = True
+
+    def __init__(self, existing_patients: set[str], latency: float = 0.05):
+        super().__init__(("127.0.0.1", 0), _StandInHandler)
+        self.existing_patients = existing_patients
+        self.latency = latency
+        self.created: list[dict] = []
+        # number of the next POSTs answered with 503 and a Retry-After header, like an overloaded store
+        self.overloaded_posts = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.lock = threading.Lock()
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}/fhir"
+
+
+class _StandInHandler(BaseHTTPRequestHandler):
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        identifier = parse_qs(url.query).get("identifier", [None])[0]
+        self.__respond(200, {"resourceType": "Bundle", "total": int(identifier in self.server.existing_patients)})
+
+    def do_POST(self):
+        resource = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        with self.server.lock:
+            overloaded = self.server.overloaded_posts > 0
+            self.server.overloaded_posts -= int(overloaded)
+        if overloaded:
+            self.__respond(503, {"resourceType": "OperationOutcome"}, {"Retry-After": "0"})
+            return
+        with self.server.lock:
+            self.server.in_flight += 1
+            self.server.max_in_flight = max(self.server.max_in_flight, self.server.in_flight)
+        time.sleep(self.server.latency)
+        with self.server.lock:
+            self.server.in_flight -= 1
+            self.server.created.append(resource)
+            fhir_id = str(len(self.server.created))
+        self.__respond(201, {**resource, "id": fhir_id},
+                       {"Location": f"{self.server.url}/{resource['resourceType']}/{fhir_id}/_history/1"})
+
+    def __respond(self, status: int, body: dict, headers: dict = None):
+        content = json.dumps(body).encode()
+        self.send_response(status)
+        for name, value in {"Content-Type": "application/fhir+json", **(headers or {})}.items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+
+class TestFeedWindows(unittest.TestCase):
+
+    def test_window_is_finished_before_next_is_read(self):
+        events = []
+
+        def windows():
+            for index in range(3):
+                events.append(f"read {index}")
+                yield [index * 10 + offset for offset in range(4)]
+
+        async def handle(record):
+            await asyncio.sleep(0.01 * (4 - record % 10))
+            events.append(record)
+
+        asyncio.run(feed_windows(windows(), handle, workers=4))
+
+        self.assertEqual("read 0", events[0])
+        self.assertEqual({0, 1, 2, 3}, set(events[1:5]))
+        self.assertEqual("read 1", events[5])
+        self.assertEqual({10, 11, 12, 13}, set(events[6:10]))
+        self.assertEqual("read 2", events[10])
+
+
+class TestAsyncBlazeSync(unittest.TestCase):
+
+    def setUp(self):
+        self.server = _StandInBlaze(existing_patients={"donor_0"})
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.patches = [patch("service.blaze_service.get_async_blaze_client", return_value=True),
+                        patch("service.blaze_service.get_async_blaze_connections", return_value=20)]
+        for p in self.patches:
+            p.start()
+        with patch("service.blaze_service.get_blaze_auth", return_value=("", "")), \
+             patch("service.blaze_service.get_metrics_for_service"):
+            self.service = BlazeService(patient_service=Mock(), condition_service=Mock(), sample_service=Mock(),
+                                        blaze_url=self.server.url, sample_collection_repository=Mock())
+
+    def tearDown(self):
+        for p in self.patches:
+            p.stop()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_patients_are_uploaded_concurrently(self):
+        self.service._patient_service.get_all.return_value = \
+            [SampleDonor(f"donor_{index}") for index in range(40)] + [SampleDonor("donor_1")]
+
+        started = time.monotonic()
+        result = self.service.sync_patients()
+
+        self.assertEqual({'processed': 39, 'failed': 0, 'skipped': 2}, result)
+        self.assertEqual(39, len(self.server.created))
+        self.assertGreater(self.server.max_in_flight, 1)
+        self.assertLess(time.monotonic() - started, 39 * self.server.latency)
+        self.assertEqual(40 + 39, self.service._request_counter.count)
+
+    def test_conditions_are_uploaded_once_per_patient_and_code(self):
+        self.service._condition_service.get_all.return_value = [
+            Condition("C50.9", "donor_1"), Condition("C50.9", "donor_1"), Condition("C61", "donor_1"),
+            Condition("C61", "missing_donor")]
+        self.service.get_number_of_resources = Mock(return_value=0)
+        patient_ids = {"donor_1": "1"}
+
+        with patch.object(self.service, "_BlazeService__find_patient_fhir_ids",
+                          side_effect=lambda identifiers, snapshot: {identifier: patient_ids[identifier]
+                                                                     for identifier in identifiers
+                                                                     if identifier in patient_ids}), \
+             patch.object(self.service, "_BlazeService__find_condition_codes",
+                          side_effect=lambda fhir_ids, snapshot: {fhir_id: {} for fhir_id in fhir_ids}):
+            result = self.service.sync_conditions()
+
+        self.assertEqual({'processed': 2, 'failed': 0, 'skipped': 2}, result)
+        self.assertEqual(["C50.9", "C61"], sorted(condition["code"]["coding"][0]["code"]
+                                                  for condition in self.server.created))
+
+    def test_donor_timing_out_is_failed_and_stored(self):
+        self.service._patient_service.get_all.return_value = [SampleDonor("donor_1"), SampleDonor("donor_2")]
+
+        with patch("service.async_blaze_client.AsyncBlazeClient.create",
+                   new=AsyncMock(side_effect=asyncio.TimeoutError())), \
+             patch.object(self.service, "_BlazeService__record_failure") as record_failure:
+            result = self.service.sync_patients()
+
+        self.assertEqual({'processed': 0, 'failed': 2, 'skipped': 0}, result)
+        self.assertEqual({"donor_1", "donor_2"}, {call.args[1] for call in record_failure.call_args_list})
+
+    def test_condition_timing_out_is_failed_and_stored(self):
+        self.service._condition_service.get_all.return_value = [Condition("C50.9", "donor_1")]
+        self.service.get_number_of_resources = Mock(return_value=0)
+
+        with patch.object(self.service, "_BlazeService__find_patient_fhir_ids",
+                          side_effect=lambda identifiers, snapshot: {"donor_1": "1"}), \
+             patch.object(self.service, "_BlazeService__find_condition_codes",
+                          side_effect=lambda fhir_ids, snapshot: {fhir_id: {} for fhir_id in fhir_ids}), \
+             patch("service.async_blaze_client.AsyncBlazeClient.create",
+                   new=AsyncMock(side_effect=asyncio.TimeoutError())), \
+             patch.object(self.service, "_BlazeService__record_failure") as record_failure:
+            result = self.service.sync_conditions()
+
+        self.assertEqual({'processed': 0, 'failed': 1, 'skipped': 0}, result)
+        self.assertEqual('conditions', record_failure.call_args.args[0])
+
+
+class TestAsyncBlazeClient(unittest.TestCase):
+
+    def setUp(self):
+        self.server = _StandInBlaze(existing_patients=set(), latency=0.02)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __create_all(self, number: int, **client_kwargs) -> list[int]:
+        async def create_all():
+            async with AsyncBlazeClient(self.server.url, **client_kwargs) as client:
+                responses = await asyncio.gather(*(client.create("Patient", {"resourceType": "Patient"})
+                                                   for _ in range(number)))
+            return [response.status_code for response in responses]
+
+        return asyncio.run(create_all())
+
+    def test_overloaded_response_is_retried_after_retry_after(self):
+        self.server.overloaded_posts = 2
+        controller = AdaptiveLoadController("test-async-blaze", initial_in_flight=4)
+
+        self.assertEqual([201], self.__create_all(1, load_controller=controller, backoff_factor=0))
+        self.assertEqual(1, len(self.server.created))
+        self.assertLess(controller.max_in_flight, 4)
+
+    def test_retries_are_given_up_after_max_retries(self):
+        self.server.overloaded_posts = 3
+
+        self.assertEqual([503], self.__create_all(1, max_retries=2, backoff_factor=0))
+        self.assertEqual(0, len(self.server.created))
+
+    def test_requests_wait_for_a_slot_of_the_load_controller(self):
+        controller = AdaptiveLoadController("test-async-blaze", initial_in_flight=2)
+
+        self.assertEqual([201] * 10, self.__create_all(10, load_controller=controller))
+        self.assertEqual(10, len(self.server.created))
+        self.assertEqual(2, self.server.max_in_flight)
+
+    def test_unreachable_store_raises_client_error(self):
+        async def create():
+            async with AsyncBlazeClient("http://127.0.0.1:1/fhir", max_retries=1, backoff_factor=0) as client:
+                return await client.create("Patient", {"resourceType": "Patient"})
+
+        with self.assertRaises(aiohttp.ClientError):
+            asyncio.run(create())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,87 @@
+"""
+Unit tests for the bulk resolution step of BlazeService.sync_conditions.
+
+The patients of a window of conditions and their existing conditions are fetched with one search each,
+the decision to create or skip a condition is made locally.
+"""
+
+import unittest
+from unittest.mock import Mock, patch
+
+from model.condition import Condition
+from test.unit.service.blaze_service_test_util import make_service, mock_search_response
+
+
+def _patient(fhir_id: str, identifier: str) -> dict:
+    return {"resourceType": "Patient", "id": fhir_id, "identifier": [{"value": identifier}]}
+
+
+def _condition(patient_fhir_id: str, code: str) -> dict:
+    return {"resourceType": "Condition", "subject": {"reference": f"Patient/{patient_fhir_id}"},
+            "code": {"coding": [{"system": "http://hl7.org/fhir/sid/icd-10", "code": code}]}}
+
+
+class TestConditionResolution(unittest.TestCase):
+
+    def setUp(self):
+        self.mock_session = Mock()
+        self.service = make_service(self.mock_session)
+        self.service.get_number_of_resources = Mock(return_value=1)
+        created = Mock()
+        created.status_code = 201
+        self.mock_session.post.return_value = created
+
+    def _sync(self, conditions: list[Condition]) -> dict:
+        self.service._condition_service.get_all.return_value = conditions
+        return self.service.sync_conditions()
+
+    def test_window_is_resolved_with_two_searches(self):
+        self.mock_session.get.side_effect = [
+            mock_search_response([_patient("pat-1", "patient_1"), _patient("pat-2", "patient,2")]),
+            mock_search_response([_condition("pat-1", "C50.9")]),
+        ]
+
+        result = self._sync([Condition("C509", "patient_1"), Condition("C61", "patient_1"),
+                             Condition("C61", "patient,2"), Condition("C61", "patient,2"),
+                             Condition("C18", "missing_patient")])
+
+        self.assertEqual({'processed': 2, 'failed': 0, 'skipped': 3}, result)
+        self.assertEqual(2, self.mock_session.get.call_count)
+        patient_params = self.mock_session.get.call_args_list[0].kwargs["params"]
+        self.assertEqual("missing_patient,patient\\,2,patient_1", patient_params["identifier"])
+        condition_params = self.mock_session.get.call_args_list[1].kwargs["params"]
+        self.assertEqual("Patient/pat-1,Patient/pat-2", condition_params["subject"])
+        self.assertEqual("code,subject", condition_params["_elements"])
+        subjects = [call.kwargs["json"]["subject"]["reference"] for call in self.mock_session.post.call_args_list]
+        self.assertEqual(["Patient/pat-1", "Patient/pat-2"], subjects)
+
+    def test_result_pages_are_followed(self):
+        self.mock_session.get.side_effect = [
+            mock_search_response([_patient("pat-1", "patient_1")]),
+            mock_search_response([_condition("pat-1", "C50.9")],
+                                 next_url="http://external/fhir/Condition?page=2"),
+            mock_search_response([_condition("pat-1", "C61")]),
+        ]
+
+        result = self._sync([Condition("C509", "patient_1"), Condition("C61", "patient_1")])
+
+        self.assertEqual({'processed': 0, 'failed': 0, 'skipped': 2}, result)
+        self.assertEqual("http://blaze:8080/fhir/Condition?page=2", self.mock_session.get.call_args_list[2].kwargs["url"])
+        self.mock_session.post.assert_not_called()
+
+    def test_conditions_are_resolved_per_window(self):
+        self.mock_session.get.side_effect = [
+            mock_search_response([_patient("pat-1", "patient_1")]), mock_search_response([]),
+            mock_search_response([_patient("pat-1", "patient_1")]),
+            mock_search_response([_condition("pat-1", "C50.9")]),
+        ]
+
+        with patch("service.blaze_service.CONDITION_RESOLUTION_WINDOW", 1):
+            result = self._sync([Condition("C509", "patient_1"), Condition("C509", "patient_1")])
+
+        self.assertEqual({'processed': 1, 'failed': 0, 'skipped': 1}, result)
+        self.assertEqual(4, self.mock_session.get.call_count)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,72 @@
+"""
+Unit tests for the resource cache shared by the read-only inspection helpers of BlazeService.
+"""
+
+import unittest
+from unittest.mock import Mock
+
+from test.unit.service.blaze_service_test_util import make_service, mock_response
+from util.resource_cache import ResourceCache
+
+
+_SPECIMEN = {"resourceType": "Specimen", "id": "spec-1", "meta": {"versionId": "2"},
+             "extension": [{"url": "https://fhir.bbmri.de/StructureDefinition/Custodian",
+                            "valueReference": {"reference": "Organization/org-1"}},
+                           {"url": "https://fhir.bbmri.de/StructureDefinition/StorageTemperature",
+                            "valueCodeableConcept": {"coding": [{"code": "temperatureRoom"}]}},
+                           {"url": "https://fhir.bbmri.de/StructureDefinition/SampleDiagnosis",
+                            "valueCodeableConcept": {"coding": [{"code": "C50.9"}]}}]}
+
+
+class TestResourceCache(unittest.TestCase):
+
+    def test_resources_are_cached_only_within_scope(self):
+        cache = ResourceCache("test-blaze")
+        cache.put(_SPECIMEN)
+        self.assertIsNone(cache.get("Specimen", "spec-1"))
+        with cache.scope():
+            cache.put(_SPECIMEN)
+            with cache.scope():
+                self.assertIs(_SPECIMEN, cache.get("Specimen", "spec-1"))
+            self.assertIs(_SPECIMEN, cache.get("Specimen", "spec-1", "2"))
+            self.assertIsNone(cache.get("Specimen", "spec-1", "1"))
+        with cache.scope():
+            self.assertIsNone(cache.get("Specimen", "spec-1"))
+        self.assertEqual(2, cache.hits)
+        self.assertEqual(0.5, cache.hit_rate)
+
+    def test_newer_version_is_served_and_old_ones_are_evicted(self):
+        cache = ResourceCache("test-blaze", max_resources=2)
+        with cache.scope():
+            cache.put({"resourceType": "Patient", "id": "1", "meta": {"versionId": "1"}})
+            cache.put({"resourceType": "Patient", "id": "1", "meta": {"versionId": "2"}})
+            self.assertEqual("2", cache.get("Patient", "1")["meta"]["versionId"])
+            cache.put({"resourceType": "Patient", "id": "2"})
+            self.assertIsNone(cache.get("Patient", "1", "1"))
+            self.assertIsNotNone(cache.get("Patient", "1"))
+            cache.invalidate("Patient", "1")
+            self.assertIsNone(cache.get("Patient", "1"))
+
+
+class TestInspectionCache(unittest.TestCase):
+
+    def setUp(self):
+        self.mock_session = Mock()
+        self.service = make_service(self.mock_session)
+        self.mock_session.get.return_value = mock_response({"resourceType": "Bundle",
+                                                            "entry": [{"resource": _SPECIMEN}]})
+
+    def test_specimen_found_by_search_is_not_read_again(self):
+        self.assertEqual(["C50.9"], self.service.get_diagnoses_from_sample("sample_1"))
+        self.assertEqual(1, self.mock_session.get.call_count)
+
+    def test_specimen_is_fetched_again_in_new_scope(self):
+        self.service.get_diagnoses_from_sample("sample_1")
+        changed_specimen = dict(_SPECIMEN, meta={"versionId": "3"}, extension=[])
+        self.mock_session.get.return_value = mock_response({"resourceType": "Bundle",
+                                                            "entry": [{"resource": changed_specimen}]})
+        self.assertEqual([], self.service.get_diagnoses_from_sample("sample_1"))
+
+
+if __name__ == '__main__':
+    unittest.main()
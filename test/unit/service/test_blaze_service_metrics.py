@@ -5,12 +5,11 @@ from model.sample_donor import SampleDonor
 from model.sample import Sample
 from model.condition import Condition
 from model.sample_collection import SampleCollection
-from service.blaze_service import BlazeService
+from service.blaze_service import BlazeService, SampleResolution
 from service.patient_service import PatientService
 from service.condition_service import ConditionService
 from service.sample_service import SampleService
 from persistence.sample_collection_repository import SampleCollectionRepository
-from exception.patient_not_found import PatientNotFoundError
 import requests
 
 
@@ -88,13 +87,22 @@ class TestBlazeServiceMetrics(unittest.TestCase):
             
             self.assertEqual(result, {'processed': 0, 'failed': 0, 'skipped': 1})
 
+    def _search_response(self, resources: list[dict]) -> Mock:
+        response = Mock()
+        response.status_code = 200
+        response.json.return_value = {"resourceType": "Bundle", "entry": [{"resource": resource} for resource in resources]}
+        return response
+
     def test_sync_conditions_successful_processing(self):
         """Test condition sync with successful processing count."""
         test_condition = Condition("C50.9", "test_patient_123")
         self.mock_condition_service.get_all.return_value = [test_condition]
-        
-        with patch.object(self.blaze_service, 'patient_has_condition', return_value=False), \
-             patch.object(self.blaze_service, '_BlazeService__upload_condition', return_value=201), \
+        self.mock_session.get.side_effect = [
+            self._search_response([{"resourceType": "Patient", "id": "pat-1",
+                                    "identifier": [{"value": "test_patient_123"}]}]),
+            self._search_response([])]
+
+        with patch.object(self.blaze_service, '_BlazeService__upload_condition', return_value=201), \
              patch.object(self.blaze_service, 'get_number_of_resources', side_effect=[10, 11]):
             
             result = self.blaze_service.sync_conditions()
@@ -105,9 +113,9 @@ class TestBlazeServiceMetrics(unittest.TestCase):
         """Test condition sync metrics when patient is not found."""
         test_condition = Condition("C50.9", "nonexistent_patient")
         self.mock_condition_service.get_all.return_value = [test_condition]
-        
-        with patch.object(self.blaze_service, 'patient_has_condition', side_effect=PatientNotFoundError()), \
-             patch.object(self.blaze_service, 'get_number_of_resources', side_effect=[10, 10]):
+        self.mock_session.get.side_effect = [self._search_response([])]
+
+        with patch.object(self.blaze_service, 'get_number_of_resources', side_effect=[10, 10]):
             
             result = self.blaze_service.sync_conditions()
             
@@ -117,9 +125,13 @@ class TestBlazeServiceMetrics(unittest.TestCase):
         """Test condition sync metrics when condition already exists."""
         test_condition = Condition("C50.9", "test_patient_123")
         self.mock_condition_service.get_all.return_value = [test_condition]
-        
-        with patch.object(self.blaze_service, 'patient_has_condition', return_value=True), \
-             patch.object(self.blaze_service, 'get_number_of_resources', side_effect=[10, 10]):
+        self.mock_session.get.side_effect = [
+            self._search_response([{"resourceType": "Patient", "id": "pat-1",
+                                    "identifier": [{"value": "test_patient_123"}]}]),
+            self._search_response([{"resourceType": "Condition", "subject": {"reference": "Patient/pat-1"},
+                                    "code": {"coding": [{"code": "C50.9"}]}}])]
+
+        with patch.object(self.blaze_service, 'get_number_of_resources', side_effect=[10, 10]):
             
             result = self.blaze_service.sync_conditions()
             
@@ -130,7 +142,7 @@ class TestBlazeServiceMetrics(unittest.TestCase):
         test_sample = Sample("test_sample_123", "test_patient_123")
         self.mock_sample_service.get_all.return_value = [test_sample]
         
-        with patch.object(self.blaze_service, '_BlazeService__check_sample_and_patient_presence', return_value=(False, True)), \
+        with patch.object(self.blaze_service, '_BlazeService__resolve_sample', return_value=SampleResolution(patient_fhir_id="1")), \
              patch.object(self.blaze_service, '_BlazeService__process_new_sample_upload', return_value=(1, 0)), \
              patch.object(self.blaze_service, 'get_number_of_resources', side_effect=[5, 6]):
             
@@ -143,7 +155,7 @@ class TestBlazeServiceMetrics(unittest.TestCase):
         test_sample = Sample("test_sample_123", "nonexistent_patient")
         self.mock_sample_service.get_all.return_value = [test_sample]
         
-        with patch.object(self.blaze_service, '_BlazeService__check_sample_and_patient_presence', return_value=(False, False)), \
+        with patch.object(self.blaze_service, '_BlazeService__resolve_sample', return_value=SampleResolution()), \
              patch.object(self.blaze_service, 'get_number_of_resources', side_effect=[5, 5]):
             
             result = self.blaze_service.sync_samples()
@@ -155,7 +167,7 @@ class TestBlazeServiceMetrics(unittest.TestCase):
         test_sample = Sample("test_sample_123", "test_patient_123")
         self.mock_sample_service.get_all.return_value = [test_sample]
         
-        with patch.object(self.blaze_service, '_BlazeService__check_sample_and_patient_presence', return_value=(True, True)), \
+        with patch.object(self.blaze_service, '_BlazeService__resolve_sample', return_value=SampleResolution(specimen={"id": "2"}, patient_fhir_id="1")), \
              patch.object(self.blaze_service, '_BlazeService__process_existing_sample_update', return_value=(0, 0, 1)), \
              patch.object(self.blaze_service, 'get_number_of_resources', side_effect=[5, 5]):
             
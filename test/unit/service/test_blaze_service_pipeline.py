@@ -0,0 +1,105 @@
+import tempfile
+import unittest
+from unittest.mock import Mock, patch
+
+from model.sample_donor import SampleDonor
+from service.blaze_service import BlazeService, SampleResolution
+from util.service_preparation_utils import ServiceBundle
+
+
+class TestBlazeServicePipeline(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.patches = [patch("service.blaze_service.get_sync_state_dir", return_value=self.tmp_dir.name),
+                        patch("service.blaze_service.fingerprint_records_dir", return_value="fingerprint"),
+                        patch("service.blaze_service.get_reconciliation_snapshot", return_value=False),
+                        patch("service.blaze_service.get_sync_pipelined", return_value=True),
+                        patch("service.blaze_service.PIPELINE_WINDOW", 1)]
+        for p in self.patches:
+            p.start()
+        with patch("service.blaze_service.requests.session"), \
+             patch("service.blaze_service.get_blaze_auth", return_value=("u", "p")), \
+             patch("service.blaze_service.get_metrics_for_service"):
+            self.service = BlazeService(patient_service=Mock(), condition_service=Mock(), sample_service=Mock(),
+                                        blaze_url="http://blaze:8080/fhir", sample_collection_repository=Mock())
+        self.service._refresh_services = Mock(return_value=True)
+        self.service.upload_sample_collections = Mock(return_value={'processed': 1, 'failed': 0, 'skipped': 0})
+        self.blaze_patients = {}
+        self.synced = []
+        self.service._BlazeService__find_patient_fhir_ids = Mock(
+            side_effect=lambda identifiers, snapshot=None: {identifier: self.blaze_patients[identifier]
+                                                            for identifier in identifiers
+                                                            if identifier in self.blaze_patients})
+        self.service._BlazeService__find_condition_codes = Mock(
+            side_effect=lambda fhir_ids, snapshot=None: {fhir_id: {} for fhir_id in fhir_ids})
+        self.service._BlazeService__process_donor_upload = Mock(side_effect=self._upload_donor)
+        self.service._BlazeService__process_condition_upload = Mock(side_effect=self._upload_condition)
+        self.service._BlazeService__resolve_sample = Mock(
+            side_effect=lambda sample, snapshot, patient_fhir_id: SampleResolution(patient_fhir_id=patient_fhir_id))
+        self.service._BlazeService__process_new_sample_upload = Mock(side_effect=self._upload_sample)
+
+    def tearDown(self):
+        for p in self.patches:
+            p.stop()
+        self.tmp_dir.cleanup()
+
+    def _upload_donor(self, donor):
+        self.blaze_patients[donor.identifier] = f"Patient-{donor.identifier}"
+        self.synced.append(("patient", donor.identifier))
+        return 1, 0
+
+    def _upload_condition(self, condition, patient_fhir_id):
+        self.synced.append(("condition", patient_fhir_id))
+        return 1, 0
+
+    def _upload_sample(self, sample, resolution):
+        self.synced.append(("specimen", resolution.patient_fhir_id))
+        return 1, 0
+
+    def test_records_of_a_donor_are_synced_right_after_it(self):
+        self.service._patient_service.get_all.return_value = [SampleDonor("a"), SampleDonor("b")]
+        self.service._condition_service.get_all.return_value = [Mock(patient_id="a", icd_10_code="C50"),
+                                                                Mock(patient_id="b", icd_10_code="C50"),
+                                                                Mock(patient_id="unknown", icd_10_code="C50")]
+        self.service._sample_service.get_all.return_value = [Mock(donor_id="a"), Mock(donor_id="b")]
+
+        summary = self.service.sync()
+
+        self.assertTrue(summary['success'], summary)
+        self.assertEqual([("patient", "a"), ("condition", "Patient-a"), ("specimen", "Patient-a"),
+                          ("patient", "b"), ("condition", "Patient-b"), ("specimen", "Patient-b")], self.synced)
+        self.assertEqual({'processed': 2, 'failed': 0, 'skipped': 0}, summary['patients'])
+        self.assertEqual({'processed': 2, 'failed': 0, 'skipped': 1}, summary['conditions'])
+        self.assertEqual({'processed': 2, 'failed': 0, 'skipped': 0}, summary['specimens'])
+        self.assertIn('pipeline', summary['phase_durations'])
+        self.assertIn('specimens', summary['phase_durations'])
+
+    def test_present_donors_are_not_uploaded_again(self):
+        self.blaze_patients["a"] = "Patient-a"
+        self.service._patient_service.get_all.return_value = [SampleDonor("a"), SampleDonor("a")]
+        self.service._condition_service.get_all.return_value = []
+        self.service._sample_service.get_all.return_value = [Mock(donor_id="a")]
+
+        summary = self.service.sync()
+
+        self.assertEqual({'processed': 0, 'failed': 0, 'skipped': 2}, summary['patients'])
+        self.assertEqual([("specimen", "Patient-a")], self.synced)
+
+    def test_records_shared_by_the_repositories_are_released(self):
+        repository_factory = Mock()
+        services = ServiceBundle(patient_service=Mock(), condition_service=Mock(), sample_service=Mock(),
+                                 sample_collection_repository=Mock(), repository_factory=repository_factory)
+        for service in (services.patient_service, services.condition_service, services.sample_service):
+            service.get_all.return_value = []
+        del self.service._refresh_services
+
+        with patch("service.blaze_service.prepare_services", return_value=services):
+            summary = self.service.sync()
+
+        self.assertTrue(summary['success'], summary)
+        repository_factory.release_shared_records.assert_called_once()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,152 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import Mock, patch
+
+from persistence.records_catalog import list_record_files
+from service.blaze_service import BlazeService
+from util.sync_checkpoint import SyncCheckpoint
+
+
+class TestSyncCheckpoint(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.checkpoint_path = os.path.join(self.tmp_dir.name, "checkpoint.json")
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_track_skips_committed_records(self):
+        checkpoint = SyncCheckpoint(self.checkpoint_path, "fingerprint", interval=2)
+        checkpoint.start_phase(2)
+        tracked = checkpoint.track(range(10))
+        for _ in range(5):
+            next(tracked)
+
+        resumed = SyncCheckpoint(self.checkpoint_path, "fingerprint", interval=2)
+        self.assertTrue(resumed.load())
+        self.assertEqual(2, resumed.phase)
+        skipped = []
+        self.assertEqual([4, 5, 6, 7, 8, 9], list(resumed.track(range(10), on_skipped=lambda: skipped.append(1))))
+        self.assertEqual(4, len(skipped))
+
+    def test_window_is_committed_when_next_window_is_requested(self):
+        checkpoint = SyncCheckpoint(self.checkpoint_path, "fingerprint", interval=2)
+        checkpoint.start_phase(3)
+        windows = checkpoint.track_windows(range(10), 3)
+        self.assertEqual([0, 1, 2], next(windows))
+        self.assertEqual(0, checkpoint.offset)
+        self.assertEqual([3, 4, 5], next(windows))
+
+        resumed = SyncCheckpoint(self.checkpoint_path, "fingerprint", interval=2)
+        self.assertTrue(resumed.load())
+        self.assertEqual(3, resumed.offset)
+        self.assertEqual([[3, 4, 5], [6, 7, 8], [9]], list(resumed.track_windows(range(10), 3)))
+        self.assertEqual(10, resumed.offset)
+
+    def test_checkpoint_of_changed_records_is_not_used(self):
+        checkpoint = SyncCheckpoint(self.checkpoint_path, "fingerprint")
+        checkpoint.finish_phase(1, "organizations", {'processed': 1, 'failed': 0, 'skipped': 0})
+
+        self.assertFalse(SyncCheckpoint(self.checkpoint_path, "other fingerprint").load())
+
+    def test_finished_phase_keeps_summary(self):
+        summary = {'processed': 3, 'failed': 1, 'skipped': 0}
+        checkpoint = SyncCheckpoint(self.checkpoint_path, "fingerprint")
+        checkpoint.finish_phase(2, "patients", summary)
+
+        resumed = SyncCheckpoint(self.checkpoint_path, "fingerprint")
+        resumed.load()
+        self.assertTrue(resumed.is_phase_finished(2))
+        self.assertFalse(resumed.is_phase_finished(3))
+        self.assertEqual(summary, resumed.get_summary("patients"))
+
+
+class TestBlazeServiceResume(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.patches = [patch("service.blaze_service.get_sync_state_dir", return_value=self.tmp_dir.name),
+                        patch("service.blaze_service.fingerprint_records_dir", return_value="fingerprint")]
+        for p in self.patches:
+            p.start()
+        with patch("service.blaze_service.requests.session"), \
+             patch("service.blaze_service.get_blaze_auth", return_value=("u", "p")), \
+             patch("service.blaze_service.get_metrics_for_service"):
+            self.service = BlazeService(patient_service=Mock(), condition_service=Mock(), sample_service=Mock(),
+                                        blaze_url="http://blaze:8080/fhir", sample_collection_repository=Mock())
+        self.service._refresh_services = Mock(return_value=True)
+        self.service.upload_sample_collections = Mock(return_value={'processed': 1, 'failed': 0, 'skipped': 0})
+        self.service.sync_conditions = Mock(return_value={'processed': 0, 'failed': 0, 'skipped': 0})
+        self.service.sync_samples = Mock(return_value={'processed': 0, 'failed': 0, 'skipped': 0})
+        self.donors = [Mock() for _ in range(250)]
+        self.service._patient_service.get_all.side_effect = lambda: iter(self.donors)
+        self.uploaded_donors = []
+
+    def tearDown(self):
+        for p in self.patches:
+            p.stop()
+        self.tmp_dir.cleanup()
+
+    def _sync_patients_failing_after(self, failing_at: int):
+        def sync_patients():
+            for index, donor in enumerate(self.service._BlazeService__checkpointed(
+                    self.service._patient_service.get_all(), 'patients')):
+                if index == failing_at:
+                    raise ConnectionError("Blaze went away")
+                self.uploaded_donors.append(donor)
+            return {'processed': len(self.uploaded_donors), 'failed': 0, 'skipped': 0}
+        return sync_patients
+
+    def test_resumed_sync_continues_after_last_checkpoint(self):
+        self.service.sync_patients = self._sync_patients_failing_after(failing_at=150)
+        self.service.sync()
+        self.assertEqual(150, len(self.uploaded_donors))
+
+        self.uploaded_donors = []
+        self.service.sync_patients = self._sync_patients_failing_after(failing_at=-1)
+        self.service.upload_sample_collections.reset_mock()
+        self.service.sync(resume=True)
+
+        self.service.upload_sample_collections.assert_not_called()
+        self.assertEqual(self.donors[150:], self.uploaded_donors)
+        self.assertFalse(os.path.exists(os.path.join(self.tmp_dir.name, "blaze_sync_checkpoint.json")))
+
+    def test_sync_without_resume_starts_from_beginning(self):
+        self.service.sync_patients = self._sync_patients_failing_after(failing_at=150)
+        self.service.sync()
+
+        self.uploaded_donors = []
+        self.service.sync_patients = self._sync_patients_failing_after(failing_at=-1)
+        self.service.sync()
+
+        self.service.upload_sample_collections.assert_called()
+        self.assertEqual(250, len(self.uploaded_donors))
+
+    def test_sync_of_some_files_keeps_checkpoint_of_interrupted_sync(self):
+        records_dir = os.path.join(self.tmp_dir.name, "records")
+        os.mkdir(records_dir)
+        for name in ("old.csv", "new.csv"):
+            with open(os.path.join(records_dir, name), "w") as file:
+                file.write("id;gender\n1;M\n")
+        self.service.sync_patients = self._sync_patients_failing_after(failing_at=150)
+        self.service.sync()
+
+        listed_files = []
+
+        def sync_patients():
+            listed_files.extend(entry.name for entry in list_record_files(records_dir, ".csv"))
+            return {'processed': 1, 'failed': 0, 'skipped': 0}
+        self.service.sync_patients = sync_patients
+        summary = self.service.sync(files=["new.csv"])
+
+        self.assertTrue(summary['success'])
+        self.assertEqual(["new.csv"], summary['files'])
+        self.assertEqual(["new.csv"], listed_files)
+        self.assertEqual(["new.csv", "old.csv"], [entry.name for entry in list_record_files(records_dir, ".csv")])
+
+        self.uploaded_donors = []
+        self.service.sync_patients = self._sync_patients_failing_after(failing_at=-1)
+        self.service.sync(resume=True)
+        self.assertEqual(self.donors[150:], self.uploaded_donors)
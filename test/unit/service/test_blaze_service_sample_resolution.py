@@ -0,0 +1,173 @@
+"""
+Unit tests for the per-sample resolution step of BlazeService.sync_samples.
+
+An existing Specimen is fetched once, together with its subject, and the resolved
+context is reused by the compare and update steps instead of being looked up again.
+"""
+
+import unittest
+from unittest.mock import Mock
+
+from model.sample import Sample
+from test.unit.service.blaze_service_test_util import make_service, mock_response
+
+
+def _specimen_bundle(material_type: str, donor_identifier: str = "patient_1") -> dict:
+    return {
+        "resourceType": "Bundle",
+        "total": 1,
+        "entry": [
+            {"resource": {"resourceType": "Specimen", "id": "spec-1",
+                          "identifier": [{"value": "sample_1"}],
+                          "type": {"coding": [{"code": material_type}]},
+                          "subject": {"reference": "Patient/pat-1"},
+                          "extension": [{"url": "https://fhir.bbmri.de/StructureDefinition/Custodian",
+                                         "valueReference": {"reference": "Organization/org-1"}}]},
+             "search": {"mode": "match"}},
+            {"resource": {"resourceType": "Patient", "id": "pat-1",
+                          "identifier": [{"value": donor_identifier}]},
+             "search": {"mode": "include"}},
+        ],
+    }
+
+
+class TestSampleResolution(unittest.TestCase):
+
+    def setUp(self):
+        self.mock_session = Mock()
+        self.service = make_service(self.mock_session)
+        self.service.get_number_of_resources = Mock(return_value=1)
+        self.collection_response = mock_response({"resourceType": "Organization", "id": "org-1",
+                                                   "identifier": [{"value": "collection_1"}]})
+        self.organization_search_response = mock_response({"entry": [{"resource": {"id": "org-1"}}]})
+
+    def _sync(self, samples: list[Sample]) -> dict:
+        self.service._sample_service.get_all.return_value = samples
+        return self.service.sync_samples()
+
+    def test_up_to_date_sample_needs_one_search(self):
+        self.mock_session.get.side_effect = [mock_response(_specimen_bundle("tissue")), self.collection_response]
+
+        result = self._sync([Sample("sample_1", "patient_1", material_type="tissue",
+                                    sample_collection_id="collection_1")])
+
+        self.assertEqual({'processed': 0, 'failed': 0, 'skipped': 1}, result)
+        first_call_kwargs = self.mock_session.get.call_args_list[0].kwargs
+        self.assertEqual({"identifier": "sample_1", "_include": "Specimen:subject", "_count": 1},
+                         first_call_kwargs["params"])
+        self.assertEqual(2, self.mock_session.get.call_count)
+        self.mock_session.put.assert_not_called()
+
+    def test_changed_sample_is_updated_with_resolved_ids(self):
+        self.mock_session.get.side_effect = [mock_response(_specimen_bundle("tissue")), self.collection_response,
+                                             self.organization_search_response]
+        self.mock_session.put.return_value = mock_response({}, status_code=200)
+
+        result = self._sync([Sample("sample_1", "patient_1", material_type="dna",
+                                    sample_collection_id="collection_1")])
+
+        self.assertEqual({'processed': 1, 'failed': 0, 'skipped': 0}, result)
+        self.assertEqual(3, self.mock_session.get.call_count)
+        put_kwargs = self.mock_session.put.call_args.kwargs
+        self.assertTrue(put_kwargs["url"].endswith("/Specimen/spec-1"))
+        self.assertEqual("Patient/pat-1", put_kwargs["json"]["subject"]["reference"])
+
+    def test_organization_lookups_are_shared_between_samples(self):
+        self.mock_session.get.side_effect = [mock_response(_specimen_bundle("tissue")), self.collection_response,
+                                             mock_response(_specimen_bundle("tissue"))]
+
+        result = self._sync([Sample("sample_1", "patient_1", material_type="tissue",
+                                    sample_collection_id="collection_1"),
+                             Sample("sample_1", "patient_1", material_type="tissue",
+                                    sample_collection_id="collection_1")])
+
+        self.assertEqual({'processed': 0, 'failed': 0, 'skipped': 2}, result)
+        self.assertEqual(3, self.mock_session.get.call_count)
+
+    def test_new_sample_uses_patient_id_from_resolution(self):
+        self.mock_session.get.side_effect = [mock_response({"resourceType": "Bundle", "total": 0}),
+                                             mock_response({"entry": [{"resource": {"id": "pat-9"}}]})]
+        self.mock_session.post.return_value = mock_response({}, status_code=201)
+
+        result = self._sync([Sample("sample_2", "patient_9")])
+
+        self.assertEqual({'processed': 1, 'failed': 0, 'skipped': 0}, result)
+        self.assertEqual(2, self.mock_session.get.call_count)
+        post_kwargs = self.mock_session.post.call_args.kwargs
+        self.assertEqual("Patient/pat-9", post_kwargs["json"]["subject"]["reference"])
+
+    def test_sample_without_patient_is_skipped(self):
+        self.mock_session.get.side_effect = [mock_response({"resourceType": "Bundle", "total": 0}),
+                                             mock_response({"resourceType": "Bundle", "total": 0})]
+
+        result = self._sync([Sample("sample_3", "missing_patient")])
+
+        self.assertEqual({'processed': 0, 'failed': 0, 'skipped': 1}, result)
+        self.mock_session.post.assert_not_called()
+
+    def test_sample_moved_to_other_donor_resolves_new_patient(self):
+        self.mock_session.get.side_effect = [mock_response(_specimen_bundle("tissue", donor_identifier="patient_1")),
+                                             mock_response({"entry": [{"resource": {"id": "pat-2"}}]}),
+                                             self.collection_response]
+        self.mock_session.put.return_value = mock_response({}, status_code=200)
+
+        result = self._sync([Sample("sample_1", "patient_2", material_type="tissue")])
+
+        self.assertEqual({'processed': 1, 'failed': 0, 'skipped': 0}, result)
+        put_kwargs = self.mock_session.put.call_args.kwargs
+        self.assertEqual("Patient/pat-2", put_kwargs["json"]["subject"]["reference"])
+
+
+class TestConditionalSampleUpdate(unittest.TestCase):
+
+    def setUp(self):
+        self.mock_session = Mock()
+        self.service = make_service(self.mock_session)
+        self.service.get_number_of_resources = Mock(return_value=1)
+        self.collection_response = mock_response({"resourceType": "Organization", "id": "org-1",
+                                                   "identifier": [{"value": "collection_1"}]})
+        self.organization_search_response = mock_response({"entry": [{"resource": {"id": "org-1"}}]})
+
+    def _sync_changed_sample(self, specimen_bundle: dict) -> dict:
+        self.mock_session.get.side_effect = [mock_response(specimen_bundle), self.collection_response,
+                                             self.organization_search_response]
+        self.service._sample_service.get_all.return_value = [Sample("sample_1", "patient_1", material_type="dna",
+                                                                    sample_collection_id="collection_1")]
+        return self.service.sync_samples()
+
+    def test_update_is_conditional_on_resolved_version(self):
+        bundle = _specimen_bundle("tissue")
+        bundle["entry"][0]["resource"]["meta"] = {"versionId": "7"}
+        self.mock_session.put.return_value = mock_response({}, status_code=200)
+
+        result = self._sync_changed_sample(bundle)
+
+        self.assertEqual({'processed': 1, 'failed': 0, 'skipped': 0}, result)
+        self.assertEqual({"If-Match": 'W/"7"'}, self.mock_session.put.call_args.kwargs["headers"])
+        self.service.metrics.record_update.assert_called_once_with('specimens', 'applied')
+
+    def test_concurrently_modified_sample_is_not_overwritten(self):
+        bundle = _specimen_bundle("tissue")
+        bundle["entry"][0]["resource"]["meta"] = {"versionId": "7"}
+        self.mock_session.put.return_value = mock_response({}, status_code=412)
+
+        result = self._sync_changed_sample(bundle)
+
+        self.assertEqual({'processed': 0, 'failed': 1, 'skipped': 0}, result)
+        self.service.metrics.record_update.assert_called_once_with('specimens', 'conflict')
+
+    def test_update_with_same_content_is_skipped(self):
+        # the file lists no diagnoses, so the sample differs from the stored one, but merging the stored
+        # diagnoses makes the resulting Specimen identical to the stored version
+        stored_specimen = Sample("sample_1", "patient_1", material_type="dna", diagnoses=["C50.9"],
+                                 sample_collection_id="collection_1").to_fhir(subject_id="pat-1",
+                                                                              custodian_id="org-1").as_json()
+        stored_specimen.update(id="spec-1", meta={"versionId": "8", "lastUpdated": "2024-01-01T00:00:00Z"})
+        bundle = _specimen_bundle("dna")
+        bundle["entry"][0]["resource"] = stored_specimen
+
+        result = self._sync_changed_sample(bundle)
+
+        self.assertEqual({'processed': 0, 'failed': 0, 'skipped': 1}, result)
+        self.mock_session.put.assert_not_called()
+        self.service.metrics.record_update.assert_called_once_with('specimens', 'skipped')
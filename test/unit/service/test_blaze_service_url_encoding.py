@@ -7,9 +7,9 @@ in the query string so that Blaze receives the correct identifier value.
 """
 
 import unittest
-from unittest.mock import Mock, patch, call
+from unittest.mock import Mock, call
 
-from service.blaze_service import BlazeService
+from test.unit.service.blaze_service_test_util import make_service
 
 
 RESERVED_CHAR_IDENTIFIERS = [
@@ -21,27 +21,12 @@ RESERVED_CHAR_IDENTIFIERS = [
 ]
 
 
-def _make_service(mock_session):
-    with patch("service.blaze_service.requests.session") as mock_session_factory, \
-         patch("service.blaze_service.setup_logger"), \
-         patch("service.blaze_service.get_blaze_auth", return_value=("u", "p")), \
-         patch("service.blaze_service.get_metrics_for_service"):
-        mock_session_factory.return_value = mock_session
-        return BlazeService(
-            patient_service=Mock(),
-            condition_service=Mock(),
-            sample_service=Mock(),
-            blaze_url="http://blaze:8080/fhir",
-            sample_collection_repository=Mock(),
-        )
-
-
 class TestUrlEncodingIsResourcePresentInBlaze(unittest.TestCase):
     """is_resource_present_in_blaze must pass identifier via params=, not string concat."""
 
     def setUp(self):
         self.mock_session = Mock()
-        self.service = _make_service(self.mock_session)
+        self.service = make_service(self.mock_session)
 
         mock_response = Mock()
         mock_response.json.return_value = {"total": 1}
@@ -86,7 +71,7 @@ class TestUrlEncodingGetResourceCountByIdentifier(unittest.TestCase):
 
     def setUp(self):
         self.mock_session = Mock()
-        self.service = _make_service(self.mock_session)
+        self.service = make_service(self.mock_session)
 
     def _setup_response(self, total: int):
         mock_response = Mock()
@@ -122,7 +107,7 @@ class TestUrlEncodingPatientHasCondition(unittest.TestCase):
 
     def setUp(self):
         self.mock_session = Mock()
-        self.service = _make_service(self.mock_session)
+        self.service = make_service(self.mock_session)
 
     def test_patient_lookup_uses_params(self):
         patient_response = Mock()
@@ -166,7 +151,7 @@ class TestUrlEncodingDeleteFhirResource(unittest.TestCase):
 
     def setUp(self):
         self.mock_session = Mock()
-        self.service = _make_service(self.mock_session)
+        self.service = make_service(self.mock_session)
 
     def test_identifier_with_ampersand_uses_params(self):
         get_response = Mock()
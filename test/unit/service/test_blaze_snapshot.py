@@ -0,0 +1,193 @@
+"""
+Unit tests for BlazeSnapshot and the snapshot based reconciliation of BlazeService.
+
+The resources of the Blaze store are pulled once per sync (bulk export or paged searches),
+the records are looked up in the snapshot instead of one request per record.
+"""
+
+import json
+import unittest
+from unittest.mock import MagicMock, Mock, patch
+
+from model.condition import Condition
+from model.sample import Sample
+from model.sample_donor import SampleDonor
+from service.blaze_service import BlazeService
+from util.blaze_snapshot import BlazeSnapshot, created_fhir_id
+
+BLAZE_URL = "http://blaze:8080/fhir"
+
+
+def _response(status_code: int = 200, body: dict = None, headers: dict = None) -> Mock:
+    response = Mock()
+    response.status_code = status_code
+    response.headers = headers or {}
+    response.json.return_value = body or {}
+    return response
+
+
+def _search_response(resources: list[dict], next_url: str = None) -> Mock:
+    body = {"resourceType": "Bundle", "entry": [{"resource": resource} for resource in resources]}
+    if next_url is not None:
+        body["link"] = [{"relation": "next", "url": next_url}]
+    return _response(body=body)
+
+
+def _ndjson_response(resources: list[dict]) -> MagicMock:
+    response = MagicMock()
+    response.__enter__.return_value = response
+    response.iter_lines.return_value = [json.dumps(resource) for resource in resources]
+    return response
+
+
+def _patient(fhir_id: str, identifier: str) -> dict:
+    return {"resourceType": "Patient", "id": fhir_id, "identifier": [{"value": identifier}]}
+
+
+def _specimen(fhir_id: str, identifier: str, patient_fhir_id: str) -> dict:
+    return {"resourceType": "Specimen", "id": fhir_id, "meta": {"versionId": "1"},
+            "identifier": [{"value": identifier}], "subject": {"reference": f"Patient/{patient_fhir_id}"}}
+
+
+class TestBlazeSnapshot(unittest.TestCase):
+
+    def setUp(self):
+        self.session = Mock()
+        self.snapshot = BlazeSnapshot(self.session, BLAZE_URL, poll_interval=0, sleep=Mock())
+
+    def tearDown(self):
+        self.snapshot.close()
+
+    def test_snapshot_is_pulled_by_searches_without_bulk_export(self):
+        self.session.get.side_effect = [
+            _response(status_code=404),
+            _search_response([_patient("1", "donor_1")], next_url="http://external/fhir/Patient?page=2"),
+            _search_response([_patient("2", "donor_2")]),
+        ]
+
+        counts = self.snapshot.pull(["Patient"], {"Patient": "identifier"})
+
+        self.assertEqual({"Patient": 2}, counts)
+        self.assertEqual("search", self.snapshot.source)
+        self.assertEqual({"_count": 1000, "_elements": "identifier"},
+                         self.session.get.call_args_list[1].kwargs["params"])
+        self.assertEqual(f"{BLAZE_URL}/Patient?page=2", self.session.get.call_args_list[2].kwargs["url"])
+        self.assertEqual("2", self.snapshot.fhir_id("Patient", "donor_2"))
+        self.assertIsNone(self.snapshot.fhir_id("Patient", "donor_3"))
+
+    def test_snapshot_is_pulled_by_bulk_export(self):
+        status_url = f"{BLAZE_URL}/__async-status/1"
+        manifest = {"output": [{"type": "Patient", "url": "http://blaze:8080/files/1.ndjson"},
+                               {"type": "Specimen", "url": "http://blaze:8080/files/2.ndjson"}]}
+        self.session.get.side_effect = [
+            _response(status_code=202, headers={"Content-Location": status_url}),
+            _response(status_code=202, headers={"Retry-After": "0"}),
+            _response(body=manifest),
+            _ndjson_response([_patient("1", "donor_1")]),
+            _ndjson_response([_specimen("s1", "sample_1", "1"), _specimen("s2", "sample_2", "1")]),
+        ]
+
+        counts = self.snapshot.pull(["Patient", "Specimen"])
+
+        self.assertEqual({"Patient": 1, "Specimen": 2}, counts)
+        self.assertEqual("export", self.snapshot.source)
+        self.assertEqual({"_type": "Patient,Specimen"}, self.session.get.call_args_list[0].kwargs["params"])
+        self.assertEqual("respond-async", self.session.get.call_args_list[0].kwargs["headers"]["Prefer"])
+        self.assertEqual("s2", self.snapshot.find("Specimen", "sample_2")["id"])
+
+    def test_unmatched_resources_are_stale(self):
+        self.session.get.side_effect = [
+            _response(status_code=404),
+            _search_response([_patient("1", "donor_1"), _patient("2", "donor_2"), _patient("3", "donor_3")]),
+        ]
+        self.snapshot.pull(["Patient"])
+
+        self.snapshot.mark_seen("Patient", "2")
+        self.snapshot.add({"resourceType": "Patient", "identifier": [{"value": "donor_4"}]}, "4")
+
+        self.assertEqual(["1", "3"], list(self.snapshot.stale("Patient")))
+        self.assertEqual(2, self.snapshot.count_stale("Patient"))
+        self.assertEqual("4", self.snapshot.fhir_id("Patient", "donor_4"))
+
+    def test_created_resource_without_id_is_searched_or_left_out(self):
+        self.session.get.side_effect = [_search_response([_patient("5", "donor_5")]), _search_response([])]
+
+        self.snapshot.add({"resourceType": "Patient", "identifier": [{"value": "donor_5"}]})
+        self.snapshot.add({"resourceType": "Patient", "identifier": [{"value": "donor_6"}]})
+
+        self.assertEqual("5", self.snapshot.fhir_id("Patient", "donor_5"))
+        self.assertIsNone(self.snapshot.fhir_id("Patient", "donor_6"))
+        self.assertEqual(["5"], [patient["id"] for patient in self.snapshot.resources("Patient")])
+
+    def test_created_fhir_id_is_read_from_location(self):
+        self.assertEqual("abc", created_fhir_id(
+            _response(status_code=201, headers={"Location": f"{BLAZE_URL}/Patient/abc/_history/1"})))
+        self.assertEqual("def", created_fhir_id(_response(status_code=201, body={"id": "def"})))
+
+
+class TestSnapshotReconciliation(unittest.TestCase):
+
+    def setUp(self):
+        self.session = Mock()
+        with patch("service.blaze_service.requests.session", return_value=self.session), \
+             patch("service.blaze_service.get_blaze_auth", return_value=("u", "p")), \
+             patch("service.blaze_service.get_metrics_for_service"):
+            self.service = BlazeService(patient_service=Mock(), condition_service=Mock(), sample_service=Mock(),
+                                        blaze_url=BLAZE_URL, sample_collection_repository=Mock())
+        self.service.get_number_of_resources = Mock(return_value=1)
+        self.service._snapshot = BlazeSnapshot(self.session, BLAZE_URL, use_export=False)
+        self.session.post.return_value = _response(status_code=201,
+                                                   headers={"Location": f"{BLAZE_URL}/Patient/new/_history/1"})
+
+    def tearDown(self):
+        self.service._snapshot.close()
+
+    def test_patients_are_looked_up_in_snapshot(self):
+        self.session.get.side_effect = [_search_response([_patient("1", "donor_1"), _patient("2", "donor_2")])]
+        self.service._patient_service.get_all.return_value = [
+            SampleDonor("donor_1"), SampleDonor("donor_3"), SampleDonor("donor_3")]
+
+        result = self.service.sync_patients()
+
+        self.assertEqual({'processed': 1, 'failed': 0, 'skipped': 2}, result)
+        self.assertEqual(1, self.session.get.call_count)
+        self.assertEqual(1, self.session.post.call_count)
+        self.assertEqual({'patients': 1}, self.service._stale_resources)
+
+    def test_patients_are_pulled_once_per_sync(self):
+        self.session.get.side_effect = [_search_response([_patient("1", "donor_1")]), _search_response([])]
+        self.service._patient_service.get_all.return_value = [SampleDonor("donor_1"), SampleDonor("donor_2")]
+        self.service._condition_service.get_all.return_value = [Condition("C50.9", "donor_2")]
+
+        self.service.sync_patients()
+        result = self.service.sync_conditions()
+
+        self.assertEqual({'processed': 1, 'failed': 0, 'skipped': 0}, result)
+        self.assertEqual([f"{BLAZE_URL}/Patient", f"{BLAZE_URL}/Condition"],
+                         [call.kwargs["url"] for call in self.session.get.call_args_list])
+        self.assertEqual("Patient/new", self.session.post.call_args.kwargs["json"]["subject"]["reference"])
+
+    def test_samples_are_resolved_in_snapshot(self):
+        self.session.get.side_effect = [
+            _search_response([_patient("1", "donor_1")]),
+            _search_response([_specimen("s1", "sample_1", "1")]),
+            _search_response([]),
+        ]
+        self.service._sample_service.get_all.return_value = [
+            Sample("sample_1", "donor_1"), Sample("sample_2", "donor_1"), Sample("sample_3", "donor_2")]
+
+        with patch.object(self.service, '_BlazeService__process_existing_sample_update',
+                          return_value=(0, 0, 1)) as update:
+            result = self.service.sync_samples()
+
+        self.assertEqual({'processed': 1, 'failed': 0, 'skipped': 2}, result)
+        self.assertEqual(3, self.session.get.call_count)
+        resolution = update.call_args.args[1]
+        self.assertEqual(("s1", "1", "donor_1"), (resolution.specimen_fhir_id, resolution.patient_fhir_id,
+                                                  resolution.specimen_donor_identifier))
+        self.assertEqual("Patient/1", self.session.post.call_args.kwargs["json"]["subject"]["reference"])
+        self.assertEqual({'specimens': 0}, self.service._stale_resources)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,46 @@
+import unittest
+from unittest.mock import MagicMock, patch
+
+from service.combined_sync_service import CombinedSyncService
+
+
+class TestCombinedSyncService(unittest.TestCase):
+
+    def setUp(self):
+        self.blaze_service = MagicMock()
+        self.miabis_blaze_service = MagicMock()
+        self.blaze_service.sync.return_value = {'patients': {'processed': 3}, 'success': True}
+        self.miabis_blaze_service.sync.return_value = {'patients': {'processed': 3}, 'success': True}
+        self.services = MagicMock()
+        self.miabis_services = MagicMock()
+        self.repository_factory = MagicMock()
+        patcher = patch("service.combined_sync_service.prepare_shared_services",
+                        return_value=(self.services, self.miabis_services, self.repository_factory))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.combined_sync_service = CombinedSyncService(self.blaze_service, self.miabis_blaze_service)
+
+    def test_both_syncs_run_with_shared_services(self):
+        summary = self.combined_sync_service.sync(resume=True)
+
+        self.blaze_service.sync.assert_called_once_with(resume=True, services=self.services, files=None)
+        self.miabis_blaze_service.sync.assert_called_once_with(services=self.miabis_services, files=None)
+        self.repository_factory.release_shared_records.assert_called_once()
+        self.assertTrue(summary['success'])
+        self.assertEqual({'processed': 3}, summary['miabis-blaze']['patients'])
+
+    def test_failure_of_one_sync_fails_the_combined_sync(self):
+        self.miabis_blaze_service.sync.return_value = {'success': False, 'error_message': "Cannot connect"}
+
+        summary = self.combined_sync_service.sync()
+
+        self.assertFalse(summary['success'])
+        self.assertEqual("MIABIS sync failed: Cannot connect", summary['error_message'])
+        self.assertTrue(summary['blaze']['success'])
+
+    def test_shared_records_are_released_when_a_sync_raises(self):
+        self.blaze_service.sync.side_effect = RuntimeError("boom")
+
+        with self.assertRaises(RuntimeError):
+            self.combined_sync_service.sync()
+        self.repository_factory.release_shared_records.assert_called_once()
@@ -0,0 +1,38 @@
+import json
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from util.config import ConfigLoader
+
+
+class TestConfigMapCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.map_path = os.path.join(self.tmp_dir.name, "material_type_map.json")
+        self.config = ConfigLoader()
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def _write_map(self, content: dict, mtime: int):
+        with open(self.map_path, "w") as map_file:
+            json.dump(content, map_file)
+        os.utime(self.map_path, (mtime, mtime))
+
+    def test_cached_map_is_reloaded_once_its_file_is_modified(self):
+        self._write_map({"blood": "whole-blood"}, mtime=1000)
+        with patch.object(self.config, "get", return_value=self.map_path):
+            self.assertEqual({"blood": "whole-blood"}, self.config.get_map("material_type"))
+            with patch("util.config.json.load") as json_load:
+                self.config.get_map("material_type")
+            json_load.assert_not_called()
+
+            self._write_map({"blood": "serum"}, mtime=2000)
+            self.assertEqual({"blood": "serum"}, self.config.get_map("material_type"))
+
+
+if __name__ == '__main__':
+    unittest.main()
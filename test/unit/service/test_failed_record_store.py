@@ -0,0 +1,123 @@
+import os
+import tempfile
+import time
+import unittest
+from unittest.mock import Mock, patch
+
+from model.condition import Condition
+from model.sample_donor import SampleDonor
+from service.blaze_service import BlazeService
+from util.failed_record_store import FailedRecordStore
+
+
+class TestFailedRecordStore(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmp_dir.name, "failed_records.sqlite")
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_failed_attempts_are_counted_with_backoff(self):
+        store = FailedRecordStore(self.db_path, backoff=60, max_backoff=100)
+        store.add("blaze", "patients", "donor", SampleDonor("donor"), "Blaze responded with status 500")
+        self.assertEqual([], store.due("blaze"))
+
+        store.add("blaze", "patients", "donor", SampleDonor("donor"), "Blaze responded with status 503")
+        failed_record = store.list_records("blaze")[0]
+        self.assertEqual(2, failed_record.attempts)
+        self.assertEqual("Blaze responded with status 503", failed_record.error)
+        self.assertAlmostEqual(failed_record.last_failed_at + 100, failed_record.next_attempt_at, delta=1)
+
+        due = store.due("blaze", ignore_backoff=True)
+        self.assertEqual("donor", due[0].record.identifier)
+        self.assertTrue(store.remove("blaze", "patients", "donor"))
+        self.assertEqual({}, store.count())
+
+    def test_records_are_due_in_phase_order(self):
+        store = FailedRecordStore(self.db_path, backoff=0)
+        store.add("blaze", "specimens", "sample", {"identifier": "sample"}, "error")
+        store.add("blaze", "conditions", "donor:C50.1", {"identifier": "condition"}, "error")
+        store.add("blaze", "patients", "donor", {"identifier": "donor"}, "error")
+        store.add("miabis-blaze", "specimens", "sample", {"identifier": "sample"}, "error")
+
+        self.assertEqual(["patients", "conditions", "specimens"],
+                         [failed_record.resource_type for failed_record in store.due("blaze")])
+        self.assertEqual({("specimens", "sample")}, store.keys("miabis-blaze"))
+
+    def test_records_failing_longest_ago_are_dropped(self):
+        store = FailedRecordStore(self.db_path, max_records=2)
+        for index in range(3):
+            store.add("blaze", "patients", f"donor_{index}", {}, "error")
+            time.sleep(0.01)
+
+        self.assertEqual({("patients", "donor_1"), ("patients", "donor_2")}, store.keys("blaze"))
+
+
+class TestBlazeServiceRetryFailed(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.state_dir_patch = patch("service.blaze_service.get_sync_state_dir", return_value=self.tmp_dir.name)
+        self.state_dir_patch.start()
+        with patch("service.blaze_service.requests.session"), \
+             patch("service.blaze_service.get_blaze_auth", return_value=("u", "p")), \
+             patch("service.blaze_service.get_metrics_for_service"):
+            self.service = BlazeService(patient_service=Mock(), condition_service=Mock(), sample_service=Mock(),
+                                        blaze_url="http://blaze:8080/fhir", sample_collection_repository=Mock())
+        self.service._BlazeService__should_skip_donor = Mock(return_value=False)
+
+    def tearDown(self):
+        self.state_dir_patch.stop()
+        self.tmp_dir.cleanup()
+
+    def test_only_failed_records_are_retried(self):
+        self.service._BlazeService__upload_donor = Mock(side_effect=[500, 201])
+        self.service._BlazeService__process_donor_upload(SampleDonor("failing"))
+
+        summary = self.service.retry_failed(ignore_backoff=True)
+
+        self.assertTrue(summary['success'], summary)
+        self.assertEqual({'processed': 1, 'failed': 0, 'skipped': 0}, summary['patients'])
+        self.assertEqual({}, summary['remaining'])
+        self.assertEqual("failing", self.service._BlazeService__upload_donor.call_args.args[0].identifier)
+        self.service._patient_service.get_all.assert_not_called()
+
+    def test_record_failing_again_is_kept(self):
+        self.service._BlazeService__upload_donor = Mock(return_value=500)
+        self.service._BlazeService__process_donor_upload(SampleDonor("failing"))
+
+        summary = self.service.retry_failed(ignore_backoff=True)
+
+        self.assertEqual({'processed': 0, 'failed': 1, 'skipped': 0}, summary['patients'])
+        self.assertEqual({'patients': 1}, summary['remaining'])
+        store = FailedRecordStore(os.path.join(self.tmp_dir.name, "failed_records.sqlite"))
+        self.assertEqual(2, store.list_records("blaze")[0].attempts)
+
+    def test_condition_of_missing_patient_stays_failed(self):
+        condition = Condition("C50", "missing")
+        store = FailedRecordStore(os.path.join(self.tmp_dir.name, "failed_records.sqlite"))
+        store.add("blaze", "conditions", "missing:C50", condition, "Blaze responded with status 500")
+        self.service._BlazeService__find_patient_fhir_ids = Mock(return_value={})
+
+        summary = self.service.retry_failed(ignore_backoff=True)
+
+        self.assertEqual({'processed': 0, 'failed': 1, 'skipped': 0}, summary['conditions'])
+        self.assertEqual({'conditions': 1}, summary['remaining'])
+
+    def test_present_condition_is_skipped_and_removed(self):
+        condition = Condition("C50", "donor")
+        store = FailedRecordStore(os.path.join(self.tmp_dir.name, "failed_records.sqlite"))
+        store.add("blaze", "conditions", "donor:C50", condition, "Blaze responded with status 500")
+        self.service._BlazeService__find_patient_fhir_ids = Mock(return_value={"donor": "Patient-1"})
+        self.service._BlazeService__find_condition_codes = Mock(return_value={"Patient-1": {"C50": "Condition-1"}})
+
+        summary = self.service.retry_failed(ignore_backoff=True)
+
+        self.assertEqual({'processed': 0, 'failed': 0, 'skipped': 1}, summary['conditions'])
+        self.assertEqual({}, summary['remaining'])
+
+
+if __name__ == '__main__':
+    unittest.main()
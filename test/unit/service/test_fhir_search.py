@@ -0,0 +1,69 @@
+import unittest
+from unittest.mock import Mock
+
+from service.fhir_search import FhirSearch
+
+BLAZE_URL = "http://blaze:8080/fhir"
+
+
+def _response(body: dict) -> Mock:
+    response = Mock()
+    response.status_code = 200
+    response.json.return_value = body
+    return response
+
+
+def _page(resources: list[dict], next_url: str = None) -> Mock:
+    body = {"resourceType": "Bundle", "entry": [{"resource": resource} for resource in resources]}
+    if next_url is not None:
+        body["link"] = [{"relation": "next", "url": next_url}]
+    return _response(body)
+
+
+class TestFhirSearch(unittest.TestCase):
+
+    def setUp(self):
+        self.session = Mock()
+        self.search = FhirSearch(self.session, BLAZE_URL, page_size=2)
+
+    def test_pages_are_requested_only_when_consumed(self):
+        self.session.get.side_effect = [
+            _page([{"resourceType": "Patient", "id": "1"}, {"resourceType": "Patient", "id": "2"}],
+                  next_url="http://proxy/fhir/Patient?page=2"),
+            _page([{"resourceType": "Patient", "id": "3"}]),
+        ]
+
+        ids = self.search.ids("Patient", {"identifier": "a,b,c"})
+
+        self.assertEqual(["1", "2"], [next(ids), next(ids)])
+        self.assertEqual(1, self.session.get.call_count)
+        self.assertEqual({"identifier": "a,b,c", "_count": 2, "_elements": "id"},
+                         self.session.get.call_args.kwargs["params"])
+        self.assertEqual(["3"], list(ids))
+        self.assertEqual(f"{BLAZE_URL}/Patient?page=2", self.session.get.call_args.kwargs["url"])
+
+    def test_included_resources_are_left_out_of_resources(self):
+        self.session.get.return_value = _page([{"resourceType": "Specimen", "id": "s1"},
+                                               {"resourceType": "Patient", "id": "p1"}])
+
+        self.assertEqual(["s1"], [resource["id"] for resource in self.search.resources("Specimen")])
+        self.assertEqual(["s1", "p1"], [resource["id"] for resource in self.search.search("Specimen")])
+
+    def test_first_id_requests_single_resource(self):
+        self.session.get.return_value = _page([{"resourceType": "Patient", "id": "1"}],
+                                              next_url=f"{BLAZE_URL}/Patient?page=2")
+
+        self.assertEqual("1", self.search.first_id("Patient", {"identifier": "donor_1"}))
+        self.assertEqual(1, self.session.get.call_args.kwargs["params"]["_count"])
+        self.assertEqual(1, self.session.get.call_count)
+
+    def test_count_requests_summary_only(self):
+        self.session.get.return_value = _response({"resourceType": "Bundle", "total": 42})
+
+        self.assertEqual(42, self.search.count("Specimen", {"identifier": "sample_1"}))
+        self.assertEqual({"identifier": "sample_1", "_summary": "count"},
+                         self.session.get.call_args.kwargs["params"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,87 @@
+import tempfile
+import tracemalloc
+import unittest
+from unittest.mock import Mock, patch
+
+from service.blaze_service import BlazeService
+from util.memory_tracker import PhaseMemoryTracker
+
+
+def _allocate_records() -> list:
+    return [{"identifier": f"donor_{index}", "gender": "M"} for index in range(20000)]
+
+
+class TestPhaseMemoryTracker(unittest.TestCase):
+
+    def test_phase_memory_is_measured_and_reported(self):
+        metrics = Mock()
+        tracker = PhaseMemoryTracker(metrics)
+        tracker.start()
+        with tracker.phase("patients"):
+            _allocate_records()
+        tracker.stop()
+
+        memory = tracker.summary()["patients"]
+        self.assertGreater(memory["peak_rss_bytes"], 0)
+        self.assertGreater(memory["python_blocks"], 0)
+        self.assertNotIn("top_allocations", memory)
+        metrics.set_phase_memory.assert_called_once_with("patients", tracker.phases["patients"])
+
+    def test_allocation_sites_are_traced(self):
+        tracker = PhaseMemoryTracker(trace_allocations=True, top_allocations=3)
+        tracker.start()
+        try:
+            with tracker.phase("patients"):
+                records = _allocate_records()
+        finally:
+            tracker.stop()
+
+        memory = tracker.summary()["patients"]
+        self.assertFalse(tracemalloc.is_tracing())
+        self.assertGreater(memory["traced_peak_bytes"], 0)
+        self.assertEqual(3, len(memory["top_allocations"]))
+        self.assertIn("test_memory_tracker.py", memory["top_allocations"][0]["site"])
+        self.assertGreater(memory["top_allocations"][0]["size_bytes"], 0)
+        self.assertEqual(20000, len(records))
+
+    def test_tracing_lasts_until_every_sync_stopped(self):
+        first = PhaseMemoryTracker(trace_allocations=True)
+        second = PhaseMemoryTracker(trace_allocations=True)
+        first.start()
+        second.start()
+        first.stop()
+        self.assertTrue(tracemalloc.is_tracing())
+        second.stop()
+        self.assertFalse(tracemalloc.is_tracing())
+
+
+class TestBlazeServicePhaseMemory(unittest.TestCase):
+
+    def test_sync_summary_contains_memory_of_every_phase(self):
+        with patch("service.blaze_service.requests.session"), \
+             patch("service.blaze_service.get_blaze_auth", return_value=("u", "p")), \
+             patch("service.blaze_service.get_metrics_for_service"):
+            service = BlazeService(patient_service=Mock(), condition_service=Mock(), sample_service=Mock(),
+                                   blaze_url="http://blaze:8080/fhir", sample_collection_repository=Mock())
+        service._refresh_services = Mock(return_value=True)
+        empty_summary = {'processed': 0, 'failed': 0, 'skipped': 0}
+        service.upload_sample_collections = Mock(return_value=empty_summary)
+        service.sync_patients = Mock(side_effect=lambda: _allocate_records() and empty_summary)
+        service.sync_conditions = Mock(return_value=empty_summary)
+        service.sync_samples = Mock(return_value=empty_summary)
+
+        with tempfile.TemporaryDirectory() as state_dir, \
+             patch("service.blaze_service.get_sync_tracemalloc", return_value=True), \
+             patch("service.blaze_service.get_reconciliation_snapshot", return_value=False), \
+             patch("service.blaze_service.get_sync_state_dir", return_value=state_dir), \
+             patch("service.blaze_service.fingerprint_records_dir", return_value="fingerprint"):
+            summary = service.sync()
+
+        self.assertTrue(summary['success'], summary)
+        self.assertEqual(['organizations', 'patients', 'conditions', 'specimens'], list(summary['memory']))
+        self.assertTrue(summary['memory']['patients']['top_allocations'])
+        self.assertFalse(tracemalloc.is_tracing())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -27,7 +27,7 @@ class TestMiabisBlazeServiceMetrics(unittest.TestCase):
         self.mock_blaze_client = Mock()
         
         # Create MiabisBlazeService instance with mocked dependencies
-        with patch('service.miabis_blaze_service.BlazeClient') as mock_blaze_client_class, \
+        with patch('service.miabis_blaze_service.VersionedBlazeClient') as mock_blaze_client_class, \
              patch('service.miabis_blaze_service.setup_logger'), \
              patch('service.miabis_blaze_service.get_miabis_blaze_auth', return_value=('user', 'pass')), \
              patch('service.miabis_blaze_service.get_metrics_for_service'):
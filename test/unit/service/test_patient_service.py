@@ -31,6 +31,12 @@ class TestPatientService(unittest.TestCase):
         self.assertEqual("Patient", bundle.entry[0].resource.resource_type)
         self.assertEqual("newId", bundle.entry[0].resource.identifier[0].value)
 
+    def test_get_patients_in_fhir_transactions_by_batch_size(self):
+        bundles = list(self.patient_service.get_patients_in_fhir_transactions(lambda: 1))
+        self.assertEqual(2, len(bundles))
+        self.assertEqual(["newId", "patient2"], [bundle.entry[0].resource.identifier[0].value for bundle in bundles])
+        self.assertEqual(1, len(list(self.patient_service.get_patients_in_fhir_transactions(lambda: 2))))
+
     def test_get_all(self):
         counter = 0
         for donor in self.patient_service.get_all():
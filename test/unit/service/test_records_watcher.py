@@ -0,0 +1,60 @@
+import os
+import tempfile
+import unittest
+
+from service.records_watcher import RecordsWatcher
+from service.sync_job_queue import SyncJobQueue, JOB_TRIGGER_FILES
+
+
+class TestRecordsWatcher(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.records_dir = os.path.join(self.tmp_dir.name, "records")
+        os.mkdir(self.records_dir)
+        self.job_queue = SyncJobQueue(os.path.join(self.tmp_dir.name, "sync_jobs.sqlite"))
+        self.now = 0.0
+        self.watcher = RecordsWatcher(self.job_queue, ["blaze", "miabis-blaze"], self.records_dir, "csv",
+                                      debounce_seconds=60, clock=lambda: self.now)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def _write(self, name: str, content: str = "id;gender\n1;M\n") -> None:
+        with open(os.path.join(self.records_dir, name), "a") as file:
+            file.write(content)
+
+    def test_changed_files_are_synced_after_debounce_window(self):
+        self._write("existing.csv")
+        self.assertEqual([], self.watcher.check())
+
+        self._write("new.csv")
+        self._write("notes.txt")
+        self.assertEqual([], self.watcher.check())
+        self.now = 30
+        self._write("existing.csv", "2;F\n")
+        self.assertEqual([], self.watcher.check())
+        self.now = 80
+        self.assertEqual([], self.watcher.check())
+        self.now = 90
+        jobs = self.watcher.check()
+
+        self.assertEqual(["blaze", "miabis-blaze"], [job.service for job in jobs])
+        self.assertEqual({"files": ["existing.csv", "new.csv"]}, jobs[0].options)
+        self.assertEqual(JOB_TRIGGER_FILES, self.job_queue.claim_next().trigger)
+        self.now = 200
+        self.assertEqual([], self.watcher.check())
+
+    def test_removed_files_are_not_synced(self):
+        self.watcher.check()
+        self._write("dropped.csv")
+        self.watcher.check()
+        os.remove(os.path.join(self.records_dir, "dropped.csv"))
+        self.now = 100
+
+        self.assertEqual([], self.watcher.check())
+        self.assertIsNone(self.job_queue.claim_next())
+
+
+if __name__ == '__main__':
+    unittest.main()
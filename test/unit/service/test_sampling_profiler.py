@@ -0,0 +1,59 @@
+import threading
+import time
+import unittest
+
+from util.sampling_profiler import SamplingProfile, SamplingProfiler
+
+
+def _spin(seconds: float) -> None:
+    finish = time.perf_counter() + seconds
+    while time.perf_counter() < finish:
+        pass
+
+
+def _outer(seconds: float) -> None:
+    _spin(seconds)
+
+
+class TestSamplingProfiler(unittest.TestCase):
+
+    def test_threads_started_during_profiling_are_sampled(self):
+        idle = threading.Event()
+        idle_thread = threading.Thread(target=idle.wait, name="idle", daemon=True)
+        idle_thread.start()
+        try:
+            with SamplingProfiler(interval=0.002) as profiler:
+                worker = threading.Thread(target=_outer, args=(0.2,), name="sync-executor")
+                worker.start()
+                worker.join()
+            profile = profiler.stop()
+        finally:
+            idle.set()
+
+        self.assertGreater(profile.samples, 10)
+        self.assertFalse(any(stack.startswith("idle;") for stack in profile.stacks))
+        spinning = [stack for stack in profile.stacks if stack.startswith("sync-executor;")]
+        self.assertTrue(spinning)
+        self.assertTrue(all("_outer (" in stack for stack in spinning if "_spin (" in stack))
+
+    def test_sampling_stops_when_requested(self):
+        profiler = SamplingProfiler(interval=0.001, should_stop=lambda: True, stop_check_interval=0.0).start()
+        time.sleep(0.05)
+        profile = profiler.stop()
+
+        self.assertEqual(1, profile.samples)
+
+    def test_top_functions_by_self_and_cumulative_samples(self):
+        profile = SamplingProfile(interval=0.01, samples=4)
+        profile.stacks.update({"main;sync (a.py:1);post (b.py:2)": 3, "main;sync (a.py:1)": 1})
+
+        top = profile.top_functions()
+        self.assertEqual({"function": "post (b.py:2)", "samples": 3, "seconds": 0.03, "percent": 75.0},
+                         top["self"][0])
+        self.assertEqual({"function": "sync (a.py:1)", "samples": 4, "seconds": 0.04, "percent": 100.0},
+                         top["cumulative"][0])
+        self.assertEqual("main;sync (a.py:1) 1\nmain;sync (a.py:1);post (b.py:2) 3\n", profile.collapsed())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,107 @@
+import os
+import subprocess
+import sys
+import threading
+import unittest
+from unittest.mock import Mock, patch
+
+import requests
+
+import util.custom_logger as custom_logger
+from util.http_util import are_endpoints_available, is_endpoint_available
+from util.lazy_import import LazyImport
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+
+class TestEndpointProbing(unittest.TestCase):
+
+    @patch("util.http_util.get_blaze_auth", return_value=None)
+    @patch("util.http_util.time.sleep")
+    @patch("util.http_util.requests.get")
+    def test_waits_twice_as_long_after_each_attempt(self, mock_get, mock_sleep, _):
+        mock_get.side_effect = [requests.ConnectionError(), requests.ConnectionError(),
+                                requests.ConnectionError(), Mock()]
+
+        self.assertTrue(is_endpoint_available("http://blaze/fhir", max_attempts=5, wait_time=10, max_wait_time=30))
+        self.assertEqual([10, 20, 30], [call.args[0] for call in mock_sleep.call_args_list])
+
+    @patch("util.http_util.get_blaze_auth", return_value=None)
+    @patch("util.http_util.time.sleep")
+    @patch("util.http_util.requests.get", side_effect=requests.ConnectionError())
+    def test_does_not_wait_after_last_attempt(self, mock_get, mock_sleep, _):
+        self.assertFalse(is_endpoint_available("http://blaze/fhir", max_attempts=3, wait_time=1))
+        self.assertEqual(3, mock_get.call_count)
+        self.assertEqual([1, 2], [call.args[0] for call in mock_sleep.call_args_list])
+
+    @patch("util.http_util.get_blaze_auth", return_value=None)
+    def test_endpoints_are_probed_at_the_same_time(self, _):
+        # both probes have to be waiting at the barrier at once for either of them to succeed
+        barrier = threading.Barrier(2, timeout=5)
+
+        def get(url, **kwargs):
+            barrier.wait()
+            return Mock()
+
+        with patch("util.http_util.requests.get", side_effect=get):
+            self.assertTrue(are_endpoints_available(["http://blaze/fhir", "http://miabis-blaze/fhir"],
+                                                    max_attempts=1))
+
+    @patch("util.http_util.get_blaze_auth", return_value=None)
+    @patch("util.http_util.time.sleep")
+    def test_unavailable_endpoint_fails_the_probe(self, _sleep, _auth):
+        def get(url, **kwargs):
+            if "miabis" in url:
+                raise requests.ConnectionError()
+            return Mock()
+
+        with patch("util.http_util.requests.get", side_effect=get):
+            self.assertFalse(are_endpoints_available(["http://blaze/fhir", "http://miabis-blaze/fhir"],
+                                                     max_attempts=2, wait_time=1))
+
+
+class TestLazyImport(unittest.TestCase):
+
+    def test_attribute_and_call_are_delegated(self):
+        json_module = LazyImport("json")
+        dumps = LazyImport("json", "dumps")
+
+        self.assertEqual('{"a": 1}', json_module.dumps({"a": 1}))
+        self.assertEqual("[1]", dumps([1]))
+
+    def test_api_does_not_import_sync_dependencies(self):
+        self.assertEqual([], self.__imported_after("service.configuration_info_service", "simple_icd_10", "aiohttp"))
+
+    def test_blaze_service_does_not_import_asyncio_client(self):
+        self.assertEqual([], self.__imported_after("service.blaze_service", "aiohttp"))
+
+    @staticmethod
+    def __imported_after(module_name: str, *dependencies: str) -> list[str]:
+        code = (f"import sys, {module_name}; "
+                f"print('imported:' + ','.join(sorted({set(dependencies)!r} & set(sys.modules))))")
+        result = subprocess.run([sys.executable, "-c", code], cwd=ROOT_DIR, capture_output=True, text=True,
+                                timeout=60, check=True)
+        imported = [line for line in result.stdout.splitlines() if line.startswith("imported:")][-1]
+        return [name for name in imported.removeprefix("imported:").split(",") if name]
+
+
+class TestSetupLogger(unittest.TestCase):
+
+    def setUp(self):
+        self.configured = custom_logger._configured
+
+    def tearDown(self):
+        custom_logger._configured = self.configured
+
+    def test_logging_config_is_loaded_once(self):
+        custom_logger._configured = False
+        with patch("util.custom_logger._load_logging_config") as mock_load:
+            custom_logger.setup_logger()
+            custom_logger.setup_logger()
+            self.assertEqual(1, mock_load.call_count)
+            custom_logger.setup_logger(force=True)
+            self.assertEqual(2, mock_load.call_count)
+
+
+if __name__ == '__main__':
+    unittest.main()
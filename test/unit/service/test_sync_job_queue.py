@@ -0,0 +1,193 @@
+import os
+import tempfile
+import time
+import unittest
+from unittest.mock import Mock, patch
+
+from service.sync_job_queue import SyncJobQueue, JOB_STATUS_FAILED, JOB_STATUS_FINISHED, JOB_STATUS_QUEUED, \
+    JOB_STATUS_RUNNING, JOB_TRIGGER_API, JOB_TRIGGER_SCHEDULE
+from service.sync_worker import SyncWorker
+
+
+class TestSyncJobQueue(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmp_dir.name, "state", "sync_jobs.sqlite")
+        self.job_queue = SyncJobQueue(self.db_path)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_jobs_are_claimed_in_order(self):
+        first = self.job_queue.enqueue("blaze", "sync", {"resume": True})
+        second = self.job_queue.enqueue("miabis-blaze", "delete")
+
+        claimed = self.job_queue.claim_next()
+        self.assertEqual(first.id, claimed.id)
+        self.assertEqual({"resume": True}, claimed.options)
+        self.assertEqual(JOB_STATUS_RUNNING, claimed.status)
+        self.assertEqual(second.id, self.job_queue.claim_next().id)
+        self.assertIsNone(self.job_queue.claim_next())
+
+    def test_queue_is_shared_between_instances(self):
+        job = SyncJobQueue(self.db_path).enqueue("blaze", "sync")
+
+        self.assertEqual(job.id, self.job_queue.claim_next().id)
+        self.assertIsNone(SyncJobQueue(self.db_path).claim_next())
+
+    def test_finished_and_failed_jobs(self):
+        finished = self.job_queue.enqueue("blaze", "sync")
+        failed = self.job_queue.enqueue("blaze", "delete")
+        self.job_queue.claim_next()
+        self.job_queue.claim_next()
+        self.job_queue.finish(finished.id)
+        self.job_queue.finish(failed.id, error="Cannot connect to blaze!")
+
+        self.assertEqual(JOB_STATUS_FINISHED, self.job_queue.get_job(finished.id).status)
+        self.assertEqual(JOB_STATUS_FAILED, self.job_queue.get_job(failed.id).status)
+        self.assertEqual("Cannot connect to blaze!", self.job_queue.get_job(failed.id).error)
+        self.assertIsNone(self.job_queue.get_job(12345))
+
+    def test_oldest_finished_jobs_are_dropped_from_the_history(self):
+        job_queue = SyncJobQueue(self.db_path, max_finished_jobs=2)
+        jobs = [job_queue.enqueue("blaze", "sync", {"run": index}) for index in range(3)]
+        queued = job_queue.enqueue("blaze", "delete")
+        for job in jobs:
+            job_queue.claim_next()
+            job_queue.save_profile(job.id, {"samples": 1}, "main 1")
+            job_queue.finish(job.id)
+
+        self.assertIsNone(job_queue.get_job(jobs[0].id))
+        self.assertIsNone(job_queue.get_profile(jobs[0].id))
+        self.assertEqual([queued.id, jobs[2].id, jobs[1].id], [job.id for job in job_queue.list_jobs()])
+        self.assertIsNotNone(job_queue.get_profile(jobs[1].id))
+
+    def test_running_jobs_of_a_stopped_worker_are_failed(self):
+        running = self.job_queue.enqueue("blaze", "sync")
+        self.job_queue.claim_next()
+        queued = self.job_queue.enqueue("blaze", "sync")
+
+        self.assertEqual(1, self.job_queue.fail_running_jobs("restarted"))
+        self.assertEqual(JOB_STATUS_FAILED, self.job_queue.get_job(running.id).status)
+        self.assertEqual(JOB_STATUS_QUEUED, self.job_queue.get_job(queued.id).status)
+
+    def test_same_waiting_job_is_coalesced(self):
+        first = self.job_queue.enqueue("blaze", "sync")
+        coalesced = self.job_queue.enqueue("blaze", "sync")
+        resumed = self.job_queue.enqueue("blaze", "sync", {"resume": True})
+
+        self.assertFalse(first.coalesced)
+        self.assertTrue(coalesced.coalesced)
+        self.assertEqual(first.id, coalesced.id)
+        self.assertNotEqual(first.id, resumed.id)
+        self.job_queue.claim_next()
+        self.assertNotEqual(first.id, self.job_queue.enqueue("blaze", "sync").id)
+
+    def test_run_history_with_summary(self):
+        job = self.job_queue.enqueue("blaze", "sync", trigger=JOB_TRIGGER_SCHEDULE)
+        self.job_queue.enqueue("miabis-blaze", "sync")
+        self.job_queue.claim_next()
+        summary = {"patients": {"processed": 2}, "phase_durations": {"patients": 0.5}, "http_calls": 7}
+        self.job_queue.finish(job.id, summary=summary)
+
+        stored = self.job_queue.get_job(job.id)
+        self.assertEqual(summary, stored.summary)
+        self.assertEqual(JOB_TRIGGER_SCHEDULE, stored.trigger)
+        self.assertGreaterEqual(stored.duration, 0)
+        self.assertEqual(["miabis-blaze", "blaze"], [run.service for run in self.job_queue.list_jobs()])
+        self.assertEqual([job.id], [run.id for run in self.job_queue.list_jobs(service="blaze")])
+        self.assertEqual(1, len(self.job_queue.list_jobs(limit=1)))
+        self.assertEqual(JOB_TRIGGER_API, self.job_queue.list_jobs(limit=1)[0].trigger)
+
+
+class TestSyncWorker(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.job_queue = SyncJobQueue(os.path.join(self.tmp_dir.name, "sync_jobs.sqlite"))
+        self.blaze_service = Mock()
+        self.blaze_service.sync.return_value = {"patients": {"processed": 1}, "http_calls": 3}
+        self.worker = SyncWorker(self.job_queue, {"blaze": self.blaze_service})
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_queued_jobs_are_run_by_the_service(self):
+        sync_job = self.job_queue.enqueue("blaze", "sync", {"resume": True})
+        delete_job = self.job_queue.enqueue("blaze", "delete")
+
+        self.assertEqual(2, self.worker.run_pending_jobs())
+        self.blaze_service.sync.assert_called_once_with(resume=True)
+        self.blaze_service.delete_everything.assert_called_once()
+        self.assertEqual(JOB_STATUS_FINISHED, self.job_queue.get_job(sync_job.id).status)
+        self.assertEqual(JOB_STATUS_FINISHED, self.job_queue.get_job(delete_job.id).status)
+
+    def test_job_for_disabled_service_fails(self):
+        job = self.job_queue.enqueue("miabis-blaze", "sync")
+
+        self.worker.run_pending_jobs()
+        self.assertEqual(JOB_STATUS_FAILED, self.job_queue.get_job(job.id).status)
+
+    def test_error_of_a_job_does_not_stop_the_worker(self):
+        self.blaze_service.delete_everything.side_effect = RuntimeError("boom")
+        failing = self.job_queue.enqueue("blaze", "delete")
+        following = self.job_queue.enqueue("blaze", "sync")
+
+        self.assertEqual(2, self.worker.run_pending_jobs())
+        self.assertEqual("boom", self.job_queue.get_job(failing.id).error)
+        self.assertEqual(JOB_STATUS_FINISHED, self.job_queue.get_job(following.id).status)
+
+    def test_sync_summary_is_stored(self):
+        job = self.job_queue.enqueue("blaze", "sync")
+
+        self.worker.run_pending_jobs()
+        self.assertEqual({"patients": {"processed": 1}, "http_calls": 3}, self.job_queue.get_job(job.id).summary)
+
+    def test_unsuccessful_sync_fails_the_job(self):
+        self.blaze_service.sync.return_value = {"success": False, "error_message": "Wrong parsing map"}
+        job = self.job_queue.enqueue("blaze", "sync")
+
+        self.worker.run_pending_jobs()
+        stored = self.job_queue.get_job(job.id)
+        self.assertEqual(JOB_STATUS_FAILED, stored.status)
+        self.assertEqual("Wrong parsing map", stored.error)
+
+    def test_requested_profiling_profiles_only_the_next_sync(self):
+        def busy_sync(**kwargs):
+            finish = time.perf_counter() + 0.2
+            while time.perf_counter() < finish:
+                pass
+            return {"http_calls": 0}
+
+        self.blaze_service.sync.side_effect = busy_sync
+        self.job_queue.request_profiling("blaze", 0.005)
+        profiled = self.job_queue.enqueue("blaze", "sync")
+        self.worker.run_pending_jobs()
+        following = self.job_queue.enqueue("blaze", "sync")
+        self.worker.run_pending_jobs()
+
+        statistics, collapsed = self.job_queue.get_profile(profiled.id)
+        self.assertGreater(statistics["samples"], 0)
+        self.assertIn("busy_sync", statistics["top_functions"]["self"][0]["function"])
+        self.assertIn("busy_sync", collapsed)
+        self.assertIsNone(self.job_queue.get_profile(following.id))
+        self.assertEqual([], self.job_queue.list_profiling())
+
+    def test_profiling_is_cancelled(self):
+        self.job_queue.request_profiling("blaze", 0.01)
+
+        self.assertTrue(self.job_queue.cancel_profiling("blaze"))
+        self.assertFalse(self.job_queue.cancel_profiling("blaze"))
+        job = self.job_queue.enqueue("blaze", "sync")
+        self.worker.run_pending_jobs()
+        self.assertIsNone(self.job_queue.get_profile(job.id))
+
+    def test_scheduled_sync_is_queued(self):
+        self.worker.schedule_weekly_sync("blaze")
+        with patch("schedule.Job.should_run", new=True):
+            self.worker._scheduler.run_pending()
+
+        job = self.job_queue.claim_next()
+        self.assertEqual("sync", job.action)
+        self.assertEqual(JOB_TRIGGER_SCHEDULE, job.trigger)
@@ -0,0 +1,81 @@
+import unittest
+from unittest.mock import Mock
+
+from requests import HTTPError
+
+from service.versioned_blaze_client import VersionedBlazeClient
+
+
+def _response(body: dict, status_code: int = 200) -> Mock:
+    response = Mock()
+    response.status_code = status_code
+    response.json.return_value = body
+    return response
+
+
+class TestVersionedBlazeClient(unittest.TestCase):
+    stored_patient = {"resourceType": "Patient", "id": "pat-1", "meta": {"versionId": "3"},
+                      "identifier": [{"value": "patient_1"}], "gender": "female"}
+
+    def setUp(self):
+        self.metrics = Mock()
+        self.client = VersionedBlazeClient("http://blaze:8080/fhir", "u", "p", metrics=self.metrics)
+        self.client._session = Mock()
+
+    def _read_stored_patient(self):
+        self.client._session.get.return_value = _response(self.stored_patient)
+        self.client.get_fhir_resource_as_json("Patient", "pat-1")
+        self.client._session.get.reset_mock()
+
+    def test_unchanged_resource_is_not_updated(self):
+        self._read_stored_patient()
+        updated_patient = {"resourceType": "Patient", "id": "pat-1", "gender": "female",
+                           "identifier": [{"value": "patient_1"}]}
+
+        self.assertTrue(self.client._update_fhir_resource("Patient", "pat-1", updated_patient))
+        self.client._session.put.assert_not_called()
+        self.client._session.get.assert_not_called()
+        self.metrics.record_update.assert_called_once_with("patients", "skipped")
+
+    def test_changed_resource_is_updated_with_if_match_of_the_read_version(self):
+        self._read_stored_patient()
+        self.client._session.put.return_value = _response({}, status_code=200)
+        updated_patient = dict(self.stored_patient, gender="male")
+
+        self.assertTrue(self.client._update_fhir_resource("Patient", "pat-1", updated_patient))
+        put_call = self.client._session.put.call_args
+        self.assertEqual("http://blaze:8080/fhir/Patient/pat-1", put_call.args[0])
+        self.assertEqual({"If-Match": 'W/"3"'}, put_call.kwargs["headers"])
+        self.client._session.get.assert_not_called()
+        self.metrics.record_update.assert_called_once_with("patients", "applied")
+
+    def test_concurrent_modification_raises_http_error(self):
+        self._read_stored_patient()
+        self.client._session.put.return_value = _response({}, status_code=412)
+
+        with self.assertRaises(HTTPError):
+            self.client._update_fhir_resource("Patient", "pat-1", dict(self.stored_patient, gender="male"))
+        self.metrics.record_update.assert_called_once_with("patients", "conflict")
+
+    def test_resource_not_read_before_is_updated_unconditionally(self):
+        self.client._session.put.return_value = _response({}, status_code=200)
+
+        self.assertTrue(self.client._update_fhir_resource("Specimen", "spec-1", {"resourceType": "Specimen"}))
+        self.assertEqual({}, self.client._session.put.call_args.kwargs["headers"])
+        self.client._session.get.assert_not_called()
+
+    def test_read_is_used_by_a_single_update(self):
+        self._read_stored_patient()
+        self.client._session.put.return_value = _response({}, status_code=200)
+        self.client._update_fhir_resource("Patient", "pat-1", dict(self.stored_patient, gender="male"))
+
+        self.client._update_fhir_resource("Patient", "pat-1", dict(self.stored_patient, gender="other"))
+        self.assertEqual({}, self.client._session.put.call_args.kwargs["headers"])
+
+    def test_failed_update_raises_http_error_with_diagnostics(self):
+        self.client._session.put.return_value = _response(
+            {"resourceType": "OperationOutcome", "issue": [{"diagnostics": "invalid gender"}]}, status_code=400)
+        self.client._session.put.return_value.raise_for_status.side_effect = HTTPError("400 Client Error")
+
+        with self.assertRaisesRegex(HTTPError, "invalid gender"):
+            self.client._update_fhir_resource("Patient", "pat-1", self.stored_patient)
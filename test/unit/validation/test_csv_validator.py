@@ -1,4 +1,5 @@
 import unittest
+from unittest.mock import patch
 
 from pyfakefs.fake_filesystem_unittest import patchfs
 
@@ -190,6 +191,17 @@ class TestCsvValidator(unittest.TestCase):
         self.validator = CsvValidator(self.missing_condition_icd_10_code, self.dir_path, ";")
         self.assertRaises(WrongParsingMapException, self.validator.validate)
 
+    @patchfs
+    def test_csv_validator_validates_each_header_once(self, fake_fs):
+        fake_fs.create_file(self.dir_path + "mock_file_1.csv", contents=self.header + self.samples)
+        fake_fs.create_file(self.dir_path + "mock_file_2.csv", contents=self.header + self.samples)
+        fake_fs.create_file(self.dir_path + "mock_file_3.csv", contents=self.header)
+        self.validator = CsvValidator(self.parsing_map, self.dir_path, ";")
+        with patch.object(self.validator, "_validate_file_attributes",
+                          wraps=self.validator._validate_file_attributes) as validate_file_attributes:
+            self.assertTrue(self.validator.validate())
+        validate_file_attributes.assert_called_once()
+
     @patchfs
     def test_csv_actual_file_missing_defined_sample_id_field_in_header(self, fake_fs):
         fake_fs.create_file(self.dir_path + "mock_file.csv", contents=self.header_missing_sample_id_field)
@@ -1,9 +1,14 @@
+import os
 import unittest
+from unittest.mock import patch
+
+import xmltodict
 from pyfakefs.fake_filesystem_unittest import patchfs
 
 from exception.no_files_provided import NoFilesProvidedException
 from exception.nonexistent_attribute_parsing_map import NonexistentAttributeParsingMapException
 from exception.wrong_parsing_map import WrongParsingMapException
+from persistence.xml_util import parse_xml_prefix
 from util.config import get_parsing_map
 from validation.xml_validator import XMLValidator
 
@@ -285,3 +290,19 @@ class TestXMLValidator(unittest.TestCase):
         fake_fs.create_file(self.dir_path + "mock.xml", contents=self.content.format(sample=self.missing_materialType))
         self.validator = XMLValidator(self.parsing_map, self.dir_path)
         self.assertRaises(NonexistentAttributeParsingMapException, self.validator.validate)
+
+    @patchfs
+    def test_xml_validator_reads_only_until_paths_resolve(self, fake_fs):
+        # the end of the file is malformed, it is never read because the first sample resolves all paths
+        fake_fs.create_file(self.dir_path + "mock.xml", contents=self.test_xml + " " * 1000 + "<unclosed")
+        self.validator = XMLValidator(self.parsing_map, self.dir_path)
+        with patch("persistence.xml_util.PROBE_CHUNK_SIZE", 1024):
+            self.assertTrue(self.validator.validate())
+
+    @patchfs
+    def test_xml_prefix_parsed_to_the_end_equals_xmltodict(self, fake_fs):
+        fake_fs.create_file(self.dir_path + "mock.xml", contents=self.test_xml)
+        with os.scandir(self.dir_path) as entries:
+            dir_entry = next(entries)
+            self.assertEqual(xmltodict.parse(self.test_xml), parse_xml_prefix(dir_entry, lambda tree: False, 64))
+
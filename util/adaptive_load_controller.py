@@ -0,0 +1,247 @@
+"""Module for adapting the load put on a Blaze store (bundle size, requests in flight) to its observed latency"""
+import asyncio
+import logging
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+from typing import AsyncGenerator, Callable, Generator, Optional
+
+import requests
+from requests.adapters import HTTPAdapter, Retry
+
+from util.custom_logger import setup_logger
+from util.metrics import adaptive_batch_size, adaptive_max_in_flight
+
+setup_logger()
+logger = logging.getLogger()
+
+# Bounds and starting point of the number of resources posted in one transaction bundle
+MIN_BATCH_SIZE = 10
+MAX_BATCH_SIZE = 1000
+INITIAL_BATCH_SIZE = 100
+# Resources added to the bundle size after every window of fast responses
+BATCH_SIZE_STEP = 10
+# Bounds and starting point of the number of requests sent to the Blaze store at the same time
+MAX_IN_FLIGHT = 8
+INITIAL_IN_FLIGHT = 2
+# Responses slower than this (in seconds) are a sign of an overloaded Blaze store
+LATENCY_TARGET = 2.0
+# Number of successful responses within the latency target, after which the load is increased
+INCREASE_WINDOW = 20
+# Factor the load is multiplied by when the Blaze store is overloaded
+DECREASE_FACTOR = 0.5
+# Longest pause (in seconds) requested by a Retry-After header which is respected
+MAX_RETRY_AFTER = 60.0
+# Seconds between the checks of an asyncio request waiting for a slot
+ASYNC_SLOT_POLL_INTERVAL = 0.01
+# Status codes with which an overloaded Blaze store responds
+OVERLOAD_STATUS_CODES = frozenset({429, 500, 502, 503, 504})
+
+
+class AdaptiveLoadController:
+    """AIMD (additive increase, multiplicative decrease) controller of the load put on a Blaze store.
+    After every window of successful responses within the latency target, the bundle size and the number of requests
+    in flight are increased by a step. A slow response, or a response with an overload status (also one retried
+    by the Retry of the session), halves both. A Retry-After header pauses all new requests until it expires.
+    The current settings are exported as Prometheus gauges."""
+
+    def __init__(self, service_name: str, latency_target: float = LATENCY_TARGET,
+                 min_batch_size: int = MIN_BATCH_SIZE, max_batch_size: int = MAX_BATCH_SIZE,
+                 initial_batch_size: int = INITIAL_BATCH_SIZE, max_in_flight: int = MAX_IN_FLIGHT,
+                 initial_in_flight: int = INITIAL_IN_FLIGHT, clock: Callable[[], float] = time.monotonic):
+        """
+        :param service_name: name of the service the gauges are labeled with (blaze, miabis-blaze)
+        :param latency_target: slowest response (in seconds) which is not a sign of overload
+        :param clock: monotonic clock in seconds
+        """
+        self._service_name = service_name
+        self._latency_target = latency_target
+        self._min_batch_size = min_batch_size
+        self._max_batch_size = max_batch_size
+        self._max_in_flight_limit = max_in_flight
+        self._batch_size = min(max(initial_batch_size, min_batch_size), max_batch_size)
+        self._max_in_flight = min(max(initial_in_flight, 1), max_in_flight)
+        self._clock = clock
+        self._condition = threading.Condition()
+        self._in_flight = 0
+        self._successes = 0
+        self._paused_until = 0.0
+        # decreases caused by responses sent before the last decrease are ignored, they saw the old load
+        self._last_decrease = float("-inf")
+        self.__export()
+
+    @property
+    def batch_size(self) -> int:
+        """Number of resources to post in one transaction bundle."""
+        return self._batch_size
+
+    @property
+    def max_in_flight(self) -> int:
+        """Number of requests which may be sent to the Blaze store at the same time."""
+        return self._max_in_flight
+
+    @contextmanager
+    def slot(self) -> Generator[float, None, None]:
+        """
+        Waits until a request may be sent, i.e. there are less requests in flight than allowed and no Retry-After
+        pause is running, and holds the slot for the duration of the request.
+        :return: time the request was started at
+        """
+        with self._condition:
+            while (wait := self.__try_acquire_locked()) is not None:
+                self._condition.wait(timeout=wait if wait > 0 else None)
+        try:
+            yield self._clock()
+        finally:
+            self.__release()
+
+    @asynccontextmanager
+    async def async_slot(self) -> AsyncGenerator[float, None]:
+        """
+        Like slot, for the requests of an asyncio client, waiting without blocking the event loop.
+        :return: time the request was started at
+        """
+        while True:
+            with self._condition:
+                wait = self.__try_acquire_locked()
+            if wait is None:
+                break
+            await asyncio.sleep(wait if wait > 0 else ASYNC_SLOT_POLL_INTERVAL)
+        try:
+            yield self._clock()
+        finally:
+            self.__release()
+
+    def __try_acquire_locked(self) -> Optional[float]:
+        """Takes a slot if a request may be sent. Returns None if it was taken, otherwise the seconds until
+        the Retry-After pause expires, or 0 if the request waits for a request in flight."""
+        pause = self._paused_until - self._clock()
+        if pause > 0:
+            return pause
+        if self._in_flight >= self._max_in_flight:
+            return 0
+        self._in_flight += 1
+        return None
+
+    def __release(self) -> None:
+        with self._condition:
+            self._in_flight -= 1
+            self._condition.notify_all()
+
+    def record_response(self, started_at: float, status_code: int, retry_after: Optional[float] = None) -> None:
+        """
+        Adapts the load to a response of the Blaze store.
+        :param started_at: time the request was started at, as returned by slot
+        :param status_code: status code of the response
+        :param retry_after: seconds to wait before the next request, from the Retry-After header
+        """
+        latency = self._clock() - started_at
+        if status_code in OVERLOAD_STATUS_CODES or retry_after is not None:
+            self.record_overload(started_at, retry_after)
+        elif latency > self._latency_target:
+            logger.debug(f"{self._service_name}: response took {latency:.2f}s, decreasing the load.")
+            self.record_overload(started_at)
+        elif status_code < 400:
+            self.__record_success()
+
+    def record_overload(self, started_at: float = None, retry_after: Optional[float] = None) -> None:
+        """
+        Decreases the load, because the Blaze store is overloaded.
+        :param started_at: time the request was started at, the load is decreased only once for all requests
+        which were sent before the previous decrease. Without it (retried responses), the load is decreased
+        at most once per latency target.
+        :param retry_after: seconds to pause all requests for
+        """
+        with self._condition:
+            now = self._clock()
+            if retry_after is not None:
+                self._paused_until = max(self._paused_until, now + min(max(retry_after, 0.0), MAX_RETRY_AFTER))
+            self._successes = 0
+            if started_at is not None and started_at < self._last_decrease:
+                return
+            if started_at is None and now - self._last_decrease < self._latency_target:
+                return
+            self._last_decrease = now
+            self._batch_size = max(self._min_batch_size, int(self._batch_size * DECREASE_FACTOR))
+            self._max_in_flight = max(1, int(self._max_in_flight * DECREASE_FACTOR))
+            self._condition.notify_all()
+        logger.info(f"{self._service_name}: Blaze store is overloaded, decreased the bundle size to "
+                    f"{self._batch_size} and the requests in flight to {self._max_in_flight}.")
+        self.__export()
+
+    def __record_success(self) -> None:
+        with self._condition:
+            self._successes += 1
+            if self._successes < INCREASE_WINDOW:
+                return
+            self._successes = 0
+            self._batch_size = min(self._max_batch_size, self._batch_size + BATCH_SIZE_STEP)
+            self._max_in_flight = min(self._max_in_flight_limit, self._max_in_flight + 1)
+            self._condition.notify_all()
+        self.__export()
+
+    def __export(self) -> None:
+        try:
+            adaptive_batch_size.labels(service=self._service_name).set(self._batch_size)
+            adaptive_max_in_flight.labels(service=self._service_name).set(self._max_in_flight)
+        except Exception as e:
+            logger.error(f"Error exporting adaptive load settings: {e}")
+
+
+class AdaptiveRetry(Retry):
+    """Retry which reports every retried response to an AdaptiveLoadController, so the overload responses
+    hidden by the retries (e.g. 503 with Retry-After) decrease the load as well."""
+
+    def __init__(self, *args, controller: AdaptiveLoadController = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.controller = controller
+
+    def new(self, **kwargs) -> "AdaptiveRetry":
+        retry = super().new(**kwargs)
+        retry.controller = self.controller
+        return retry
+
+    def increment(self, method=None, url=None, response=None, error=None, _pool=None, _stacktrace=None):
+        if self.controller is not None and response is not None:
+            self.controller.record_overload(retry_after=self.get_retry_after(response))
+        return super().increment(method=method, url=url, response=response, error=error, _pool=_pool,
+                                 _stacktrace=_stacktrace)
+
+
+class AdaptiveHTTPAdapter(HTTPAdapter):
+    """HTTPAdapter which sends a request only when an AdaptiveLoadController allows it, and reports the latency,
+    status code and Retry-After header of the response to the controller."""
+
+    def __init__(self, controller: AdaptiveLoadController, **kwargs):
+        self.controller = controller
+        super().__init__(**kwargs)
+
+    def send(self, request, *args, **kwargs) -> requests.Response:
+        with self.controller.slot() as started_at:
+            response = super().send(request, *args, **kwargs)
+            self.controller.record_response(started_at, response.status_code,
+                                            parse_retry_after(response.headers.get("Retry-After")))
+        return response
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Seconds of a Retry-After header, which may be given in seconds or as a date."""
+    if not value:
+        return None
+    try:
+        return max(Retry().parse_retry_after(value), 0.0)
+    except Exception:
+        return None
+
+
+def mount_adaptive_adapter(session: requests.Session, controller: AdaptiveLoadController) -> None:
+    """
+    Mounts an adapter controlled by the controller to a session, with the retries the Blaze sessions use.
+    :param session: session of a Blaze service or of a BlazeClient
+    :param controller: controller of the load put on the Blaze store of the session
+    """
+    retries = AdaptiveRetry(total=5, backoff_factor=0.1, status_forcelist=[500, 502, 503, 504],
+                            controller=controller)
+    adapter = AdaptiveHTTPAdapter(controller, max_retries=retries)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
@@ -0,0 +1,326 @@
+"""Module for reconciling the records with a snapshot of a Blaze store, instead of checking every record separately"""
+import json
+import logging
+import os
+import shutil
+import sqlite3
+import tempfile
+import time
+from typing import Callable, Generator, Iterable, Optional
+
+import requests
+
+from service.fhir_search import FhirSearch
+from util.custom_logger import setup_logger
+
+setup_logger()
+logger = logging.getLogger()
+
+# Number of spooled resources written to the index at once
+INDEX_BATCH_SIZE = 1000
+# Seconds between two status requests of a running bulk export, unless the Blaze store asks for another pause
+EXPORT_POLL_INTERVAL = 2.0
+# Longest time (in seconds) a bulk export may take, the snapshot is pulled by searches afterwards
+EXPORT_TIMEOUT = 600.0
+_FHIR_JSON = "application/fhir+json"
+
+
+def created_fhir_id(response: requests.Response) -> Optional[str]:
+    """
+    Logical id of a resource created by a POST, taken from the Location header (e.g. .../Patient/1/_history/1)
+    or from the returned resource.
+    :return: the logical id, None if the response does not tell it
+    """
+    location = response.headers.get("Location") or response.headers.get("Content-Location")
+    if location:
+        parts = location.rstrip("/").split("/")
+        if "_history" in parts:
+            parts = parts[:parts.index("_history")]
+        if len(parts) >= 2:
+            return parts[-1]
+    try:
+        body = response.json()
+    except ValueError:
+        return None
+    return body.get("id") if isinstance(body, dict) else None
+
+
+class BlazeSnapshot:
+    """Snapshot of the resources of a Blaze store. The resources are pulled as NDJSON, with the bulk data $export
+    operation where the Blaze store supports it, otherwise with paged searches, spooled to local NDJSON files
+    and indexed in a SQLite database next to them. The records are then looked up in the snapshot by their
+    identifiers, locally, so a sync sends requests only for the resources it has to create or update.
+    Every resource matched by a record is marked as seen, the resources never seen are stale, i.e. present
+    in the Blaze store but no longer among the records."""
+
+    def __init__(self, session: requests.Session, blaze_url: str, use_export: bool = True,
+                 poll_interval: float = EXPORT_POLL_INTERVAL, export_timeout: float = EXPORT_TIMEOUT,
+                 clock: Callable[[], float] = time.monotonic, sleep: Callable[[float], None] = time.sleep):
+        """
+        :param session: session of the Blaze service
+        :param blaze_url: base url of the Blaze store, without a trailing /
+        :param use_export: try the bulk data $export operation before falling back to searches
+        :param poll_interval: seconds between two status requests of a running bulk export
+        :param export_timeout: longest time (in seconds) a bulk export may take
+        """
+        self._session = session
+        self._blaze_url = blaze_url
+        self._search = FhirSearch(session, blaze_url)
+        self._export_supported = use_export
+        self._poll_interval = poll_interval
+        self._export_timeout = export_timeout
+        self._clock = clock
+        self._sleep = sleep
+        self._spool_dir = tempfile.mkdtemp(prefix="blaze-snapshot-")
+        # used by one thread at a time, not always the same one (the asyncio sync resolves its windows in threads)
+        self._connection = sqlite3.connect(os.path.join(self._spool_dir, "snapshot.sqlite"), check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=OFF")
+        self._connection.execute("PRAGMA synchronous=OFF")
+        self._connection.executescript("""
+            CREATE TABLE resources (resource_type TEXT NOT NULL, fhir_id TEXT NOT NULL, subject TEXT,
+                                    body TEXT NOT NULL, seen INTEGER NOT NULL DEFAULT 0,
+                                    PRIMARY KEY (resource_type, fhir_id));
+            CREATE INDEX resources_by_subject ON resources (resource_type, subject);
+            CREATE TABLE identifiers (resource_type TEXT NOT NULL, identifier TEXT NOT NULL, fhir_id TEXT NOT NULL);
+            CREATE INDEX identifiers_by_value ON identifiers (resource_type, identifier);
+        """)
+        self.source: Optional[str] = None
+        self._pulled_types: set[str] = set()
+
+    def __enter__(self) -> "BlazeSnapshot":
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Removes the spooled NDJSON files and the index."""
+        self._connection.close()
+        shutil.rmtree(self._spool_dir, ignore_errors=True)
+
+    @property
+    def pulled_types(self) -> frozenset[str]:
+        """Types of the resources pulled into the snapshot."""
+        return frozenset(self._pulled_types)
+
+    def pull(self, resource_types: Iterable[str], elements: dict[str, str] = None) -> dict[str, int]:
+        """
+        Pulls all resources of the types into the snapshot, replacing the ones pulled before.
+        :param resource_types: types of the resources (e.g. Patient, Condition)
+        :param elements: elements requested by the searches, by resource type (e.g. identifier),
+        whole resources are requested for the other types. A bulk export always returns whole resources.
+        :return: number of pulled resources by type
+        :raises requests.RequestException: if the resources cannot be fetched.
+        """
+        resource_types = list(resource_types)
+        elements = elements or {}
+        spool_paths = self.__export_to_spool(resource_types) if self._export_supported else None
+        if spool_paths is None:
+            spool_paths = {resource_type: self.__search_to_spool(resource_type, elements.get(resource_type))
+                           for resource_type in resource_types}
+            self.source = "search"
+        else:
+            self.source = "export"
+        counts = {resource_type: self.__index(resource_type, spool_paths.get(resource_type))
+                  for resource_type in resource_types}
+        self._pulled_types.update(resource_types)
+        logger.info(f"Pulled a snapshot of the Blaze store by {self.source}: {counts}")
+        return counts
+
+    def fhir_id(self, resource_type: str, identifier: str) -> Optional[str]:
+        """
+        :return: logical id of the resource with the identifier, None if it is not in the snapshot
+        """
+        row = self._connection.execute(
+            "SELECT fhir_id FROM identifiers WHERE resource_type = ? AND identifier = ? LIMIT 1",
+            (resource_type, identifier)).fetchone()
+        return row[0] if row is not None else None
+
+    def fhir_ids(self, resource_type: str) -> dict[str, str]:
+        """Logical ids of all resources of the type in the snapshot, by their identifiers."""
+        fhir_ids: dict[str, str] = {}
+        for identifier, fhir_id in self._connection.execute(
+                "SELECT identifier, fhir_id FROM identifiers WHERE resource_type = ?", (resource_type,)):
+            fhir_ids.setdefault(identifier, fhir_id)
+        return fhir_ids
+
+    def get(self, resource_type: str, fhir_id: str) -> Optional[dict]:
+        """
+        :return: the resource with the logical id, None if it is not in the snapshot
+        """
+        row = self._connection.execute("SELECT body FROM resources WHERE resource_type = ? AND fhir_id = ?",
+                                       (resource_type, fhir_id)).fetchone()
+        return json.loads(row[0]) if row is not None else None
+
+    def find(self, resource_type: str, identifier: str) -> Optional[dict]:
+        """
+        :return: the resource with the identifier, None if it is not in the snapshot
+        """
+        fhir_id = self.fhir_id(resource_type, identifier)
+        return self.get(resource_type, fhir_id) if fhir_id is not None else None
+
+    def resources(self, resource_type: str) -> Generator[dict, None, None]:
+        """Yields all resources of the type in the snapshot."""
+        for (body,) in self._connection.execute("SELECT body FROM resources WHERE resource_type = ?",
+                                                (resource_type,)):
+            yield json.loads(body)
+
+    def referencing(self, resource_type: str, subject_fhir_ids: Iterable[str]) -> Generator[dict, None, None]:
+        """Yields the resources of the type whose subject is one of the patients (by their logical ids)."""
+        for subject_fhir_id in subject_fhir_ids:
+            for (body,) in self._connection.execute(
+                    "SELECT body FROM resources WHERE resource_type = ? AND subject = ?",
+                    (resource_type, subject_fhir_id)):
+                yield json.loads(body)
+
+    def mark_seen(self, resource_type: str, fhir_id: str) -> None:
+        """Marks a resource as matched by a record, so it is not stale."""
+        self._connection.execute("UPDATE resources SET seen = 1 WHERE resource_type = ? AND fhir_id = ?",
+                                 (resource_type, fhir_id))
+
+    def add(self, resource: dict, fhir_id: str = None) -> None:
+        """
+        Adds a resource created by the sync, so the following records with the same identifier find it.
+        The resource is marked as seen.
+        :param resource: the created resource
+        :param fhir_id: logical id assigned by the Blaze store, if it is not known the resource is searched by its
+        identifier, and left out if it is not found
+        """
+        fhir_id = fhir_id or resource.get("id") or self.__search_fhir_id(resource)
+        if fhir_id is None:
+            logger.warning(f"Logical id of a created {resource.get('resourceType')} is not known, it is not added "
+                           f"to the snapshot.")
+            return
+        resource = {**resource, "id": fhir_id}
+        self.__insert([resource], resource["resourceType"], seen=True)
+
+    def stale(self, resource_type: str) -> Generator[str, None, None]:
+        """Yields the logical ids of the resources of the type which were not matched by any record."""
+        for (fhir_id,) in self._connection.execute(
+                "SELECT fhir_id FROM resources WHERE resource_type = ? AND seen = 0 ORDER BY fhir_id",
+                (resource_type,)):
+            yield fhir_id
+
+    def count_stale(self, resource_type: str) -> int:
+        """Number of the resources of the type which were not matched by any record."""
+        return self._connection.execute("SELECT COUNT(*) FROM resources WHERE resource_type = ? AND seen = 0",
+                                        (resource_type,)).fetchone()[0]
+
+    def __search_fhir_id(self, resource: dict) -> Optional[str]:
+        """Logical id of a resource in the Blaze store, searched by its first identifier."""
+        identifier = next((identifier.get("value") for identifier in resource.get("identifier", [])
+                           if identifier.get("value") is not None), None)
+        if identifier is None:
+            return None
+        try:
+            return self._search.first_id(resource["resourceType"], {"identifier": identifier})
+        except (requests.RequestException, ValueError) as e:
+            logger.warning(f"Cannot search the created {resource['resourceType']} {identifier}: {e}")
+            return None
+
+    def __export_to_spool(self, resource_types: list[str]) -> Optional[dict[str, str]]:
+        """
+        Pulls the resources with the bulk data $export operation.
+        :return: paths of the spooled NDJSON files by resource type, None if the Blaze store does not support
+        the operation or the export failed
+        """
+        try:
+            response = self._session.get(url=f"{self._blaze_url}/$export",
+                                         params={"_type": ",".join(resource_types)},
+                                         headers={"Accept": _FHIR_JSON, "Prefer": "respond-async"},
+                                         verify=False)
+            if response.status_code != 202 or not response.headers.get("Content-Location"):
+                logger.info(f"Blaze store does not support the bulk data export (status {response.status_code}), "
+                            f"the snapshot is pulled by searches.")
+                self._export_supported = False
+                return None
+            manifest = self.__wait_for_export(response.headers["Content-Location"])
+            if manifest is None:
+                return None
+            spool_paths = {resource_type: self.__spool_path(resource_type) for resource_type in resource_types}
+            for spool_path in spool_paths.values():
+                open(spool_path, "w").close()
+            for output in manifest.get("output", []):
+                if output.get("type") in spool_paths:
+                    self.__download_to_spool(output.get("url"), spool_paths[output.get("type")])
+            return spool_paths
+        except (requests.RequestException, ValueError) as e:
+            logger.warning(f"Bulk data export failed, the snapshot is pulled by searches: {e}")
+            self._export_supported = False
+            return None
+
+    def __wait_for_export(self, status_url: str) -> Optional[dict]:
+        """Polls the status of a bulk export until it is complete. Returns its manifest, None if it failed."""
+        deadline = self._clock() + self._export_timeout
+        while True:
+            response = self._session.get(url=status_url, headers={"Accept": "application/json"}, verify=False)
+            if response.status_code == 200:
+                return response.json()
+            if response.status_code != 202:
+                logger.warning(f"Bulk data export failed (status {response.status_code}), "
+                               f"the snapshot is pulled by searches.")
+                return None
+            if self._clock() >= deadline:
+                logger.warning("Bulk data export did not finish in time, the snapshot is pulled by searches.")
+                self._session.delete(url=status_url, verify=False)
+                return None
+            try:
+                pause = float(response.headers.get("Retry-After", self._poll_interval))
+            except ValueError:
+                pause = self._poll_interval
+            self._sleep(max(0.0, min(pause, deadline - self._clock())))
+
+    def __download_to_spool(self, url: str, spool_path: str) -> None:
+        """Appends an NDJSON file of a bulk export to the spool, streamed line by line."""
+        with self._session.get(url=url, headers={"Accept": "application/fhir+ndjson"}, stream=True,
+                               verify=False) as response:
+            response.raise_for_status()
+            with open(spool_path, "a", encoding="utf-8") as spool:
+                for line in response.iter_lines(decode_unicode=True):
+                    if line:
+                        spool.write(line + "\n")
+
+    def __search_to_spool(self, resource_type: str, elements: Optional[str]) -> str:
+        """Pulls all resources of the type page by page into an NDJSON file of the spool."""
+        spool_path = self.__spool_path(resource_type)
+        with open(spool_path, "w", encoding="utf-8") as spool:
+            for resource in self._search.resources(resource_type, elements=elements or None):
+                spool.write(json.dumps(resource, separators=(",", ":")) + "\n")
+        return spool_path
+
+    def __spool_path(self, resource_type: str) -> str:
+        return os.path.join(self._spool_dir, f"{resource_type}.ndjson")
+
+    def __index(self, resource_type: str, spool_path: Optional[str]) -> int:
+        """Replaces the resources of the type in the index with the ones in an NDJSON file of the spool."""
+        self._connection.execute("DELETE FROM resources WHERE resource_type = ?", (resource_type,))
+        self._connection.execute("DELETE FROM identifiers WHERE resource_type = ?", (resource_type,))
+        count = 0
+        if spool_path is not None and os.path.exists(spool_path):
+            with open(spool_path, "r", encoding="utf-8") as spool:
+                batch = []
+                for line in spool:
+                    if not line.strip():
+                        continue
+                    batch.append(json.loads(line))
+                    if len(batch) >= INDEX_BATCH_SIZE:
+                        count += self.__insert(batch, resource_type)
+                        batch = []
+                count += self.__insert(batch, resource_type)
+        self._connection.commit()
+        return count
+
+    def __insert(self, resources: list[dict], resource_type: str, seen: bool = False) -> int:
+        """Writes resources of the type to the index, with their identifiers and the logical id of their subject."""
+        resources = [resource for resource in resources
+                     if resource.get("resourceType", resource_type) == resource_type and resource.get("id")]
+        self._connection.executemany(
+            "INSERT OR REPLACE INTO resources (resource_type, fhir_id, subject, body, seen) VALUES (?, ?, ?, ?, ?)",
+            [(resource_type, resource["id"],
+              (resource.get("subject") or {}).get("reference", "").split("/")[-1] or None,
+              json.dumps(resource, separators=(",", ":")), int(seen)) for resource in resources])
+        self._connection.executemany(
+            "INSERT INTO identifiers (resource_type, identifier, fhir_id) VALUES (?, ?, ?)",
+            [(resource_type, identifier.get("value"), resource["id"]) for resource in resources
+             for identifier in resource.get("identifier", []) if identifier.get("value") is not None])
+        return len(resources)
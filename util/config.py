@@ -4,7 +4,6 @@ import logging
 import os
 import sys
 from json import JSONDecodeError
-from distutils.util import strtobool
 from typing import Any, Dict, Optional
 
 from util.custom_logger import setup_logger
@@ -14,6 +13,20 @@ logger = logging.getLogger()
 
 MAX_VALIDATION_FILES = 1000
 
+
+def strtobool(value: str) -> int:
+    """
+    Converts a string representation of truth to 1 or 0, as distutils.util.strtobool did. Not imported from
+    distutils, which is deprecated and pulls in setuptools, a large part of the import time of the module.
+    :raises ValueError: if the string represents neither truth nor falsehood.
+    """
+    value = value.lower()
+    if value in ('y', 'yes', 't', 'true', 'on', '1'):
+        return 1
+    if value in ('n', 'no', 'f', 'false', 'off', '0'):
+        return 0
+    raise ValueError(f"invalid truth value {value!r}")
+
 class ConfigLoader:
     """Dynamic configuration loader that reads from JSON file and allows runtime updates"""
     
@@ -104,9 +117,10 @@ class ConfigLoader:
         return self._load_config().copy()
     
     def get_map(self, map_type: str, force_reload: bool = False) -> Dict[str, Any]:
-        if not force_reload and map_type in self._loaded_maps:
-            return self._loaded_maps[map_type]
-        
+        """
+        Map of the given type, loaded from its file. The loaded maps are cached, a cached map is loaded again once
+        its file is modified (e.g. uploaded in the UI through another process) or a different file is configured.
+        """
         map_path_key = f"{map_type.upper()}_MAP_PATH"
         if map_type.upper() == 'PARSING_MAP':
             map_path_key = f"{map_type.upper()}_PATH"
@@ -115,13 +129,20 @@ class ConfigLoader:
         if not map_path:
             logger.error(f"No path configured for map type: {map_type}")
             return {}
+
+        map_file_version = (map_path, self._file_version(map_path))
+        cached = self._loaded_maps.get(map_type)
+        if not force_reload and cached is not None and cached[0] == map_file_version:
+            return cached[1]
         
         try:
             with open(map_path) as json_file:
                 map_data = json.load(json_file)
-                self._loaded_maps[map_type] = map_data
+                self._loaded_maps[map_type] = (map_file_version, map_data)
                 if force_reload:
                     logger.debug(f"Force reloaded map: {map_type} from {map_path}")
+                elif cached is not None:
+                    logger.info(f"Reloaded modified map: {map_type} from {map_path}")
                 return map_data
         except FileNotFoundError:
             logger.error(f"Map file not found: {map_path}")
@@ -129,6 +150,15 @@ class ConfigLoader:
         except JSONDecodeError:
             logger.error(f"Map file does not have correct JSON format: {map_path}")
             return {}
+
+    @staticmethod
+    def _file_version(path: str) -> Optional[tuple]:
+        """Modification time and size of a file, None if the file cannot be accessed."""
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
     
     def reload_all_maps(self) -> None:
         """Clear the map cache and force reload all maps on next access"""
@@ -192,6 +222,36 @@ def get_standardised():
 def get_miabis_on_fhir(): 
     return bool(strtobool(os.getenv("MIABIS_ON_FHIR", "False")))
 
+def get_shared_ingest():
+    return bool(strtobool(os.getenv("SHARED_INGEST", "False")))
+
+def get_reconciliation_snapshot():
+    return bool(strtobool(os.getenv("RECONCILIATION_SNAPSHOT", "True")))
+
+def get_async_blaze_client():
+    return bool(strtobool(os.getenv("ASYNC_BLAZE_CLIENT", "False")))
+
+def get_sync_pipelined():
+    return bool(strtobool(os.getenv("SYNC_PIPELINED", "False")))
+
+def get_async_blaze_connections():
+    return int(os.getenv("ASYNC_BLAZE_CONNECTIONS", 100))
+
+def get_file_triggered_sync():
+    return bool(strtobool(os.getenv("FILE_TRIGGERED_SYNC", "False")))
+
+def get_file_sync_debounce_seconds():
+    return float(os.getenv("FILE_SYNC_DEBOUNCE_SECONDS", 60))
+
+def get_sync_tracemalloc():
+    return bool(strtobool(os.getenv("SYNC_TRACEMALLOC", "False")))
+
+def get_sync_tracemalloc_top():
+    return int(os.getenv("SYNC_TRACEMALLOC_TOP", 10))
+
+def get_failed_records_max():
+    return int(os.getenv("FAILED_RECORDS_MAX", 10000))
+
 def get_csv_separator(): 
     return _config.get('CSV_SEPARATOR')
 
@@ -201,6 +261,15 @@ def get_records_file_type():
 def get_new_file_period_days(): 
     return os.getenv("NEW_FILE_PERIOD_DAYS", 30)
 
+def get_sync_state_dir():
+    return os.getenv("SYNC_STATE_DIR", "/var/lib/fhir-module")
+
+def get_sync_job_queue_path():
+    return os.path.join(get_sync_state_dir(), "sync_jobs.sqlite")
+
+def get_sync_history_max():
+    return int(os.getenv("SYNC_HISTORY_MAX", 1000))
+
 def get_blaze_auth(): 
     return (os.getenv("BLAZE_USER", ""), os.getenv("BLAZE_PASS", ""))
 
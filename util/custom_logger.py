@@ -3,12 +3,17 @@ import logging
 import logging.config
 import os
 import sys
+import threading
 
 import yaml
 
 ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
 logger = logging.getLogger(__name__)
 
+# The logging configuration is loaded by the first module calling setup_logger, the later calls keep it
+_configured = False
+_configure_lock = threading.Lock()
+
 
 class JsonFormatter(logging.Formatter):
     """JSON log formatter for structured logging.
@@ -47,7 +52,21 @@ def is_running_tests():
     )
 
 
-def setup_logger():
+def setup_logger(force: bool = False):
+    """
+    Configures logging from logging.yaml (logging_test.yaml when running tests). The configuration is read once,
+    by the first call, as nearly every module calls this on import.
+    :param force: reads the configuration again, e.g. after LOG_LEVEL or LOG_DIR changed
+    """
+    global _configured
+    with _configure_lock:
+        if _configured and not force:
+            return
+        _load_logging_config()
+        _configured = True
+
+
+def _load_logging_config():
     # Use different logging config for tests
     if is_running_tests():
         config_file_name = 'logging_test.yaml'
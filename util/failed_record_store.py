@@ -0,0 +1,215 @@
+"""Module for the dead-letter store of the records which failed to sync"""
+import logging
+import pickle
+import sqlite3
+import time
+from dataclasses import dataclass
+from typing import Any, Optional
+
+from util.custom_logger import setup_logger
+from util.sqlite_util import create_database, transaction
+
+setup_logger()
+logger = logging.getLogger()
+
+# File of the store in the sync state directory, shared by the standard and the MIABIS on FHIR sync and the API
+FAILED_RECORDS_FILE_NAME = "failed_records.sqlite"
+# Largest number of failed records kept, the ones failing longest ago are dropped first
+MAX_FAILED_RECORDS = 10000
+# Seconds until a failed record is retried after its first failure, doubled by every further failure
+RETRY_BACKOFF = 60.0
+# Longest wait until a failed record is retried
+MAX_RETRY_BACKOFF = 6 * 60 * 60.0
+# Records are retried in the order of the phases, so e.g. the patients of the failed samples are uploaded first
+_RESOURCE_TYPE_ORDER = ("organizations", "collections", "patients", "conditions", "specimens")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS failed_records (
+    service TEXT NOT NULL,
+    resource_type TEXT NOT NULL,
+    identifier TEXT NOT NULL,
+    record BLOB NOT NULL,
+    error TEXT,
+    attempts INTEGER NOT NULL,
+    first_failed_at REAL NOT NULL,
+    last_failed_at REAL NOT NULL,
+    next_attempt_at REAL NOT NULL,
+    PRIMARY KEY (service, resource_type, identifier)
+)
+"""
+
+
+@dataclass
+class FailedRecord:
+    """Record which failed to sync, with the error of its last failure and the number of failed attempts."""
+    service: str
+    resource_type: str
+    identifier: str
+    error: Optional[str]
+    attempts: int
+    first_failed_at: float
+    last_failed_at: float
+    next_attempt_at: float
+    record: Any = None
+
+    def to_dict(self) -> dict:
+        return {"service": self.service, "resource_type": self.resource_type, "identifier": self.identifier,
+                "error": self.error, "attempts": self.attempts, "first_failed_at": self.first_failed_at,
+                "last_failed_at": self.last_failed_at, "next_attempt_at": self.next_attempt_at}
+
+
+class FailedRecordStore:
+    """Persistent dead-letter store of the records (donors, conditions, samples) which failed to sync, in a local
+    SQLite database. The records are kept pickled, as read from the record files, so they can be retried without
+    reading the record files again. The database is local state of the module, like the sync checkpoint,
+    and is never read from outside. A record is retried with an exponential backoff after each failure,
+    and removed once it was synced. The store keeps a bounded number of records."""
+
+    def __init__(self, db_path: str, max_records: int = MAX_FAILED_RECORDS, backoff: float = RETRY_BACKOFF,
+                 max_backoff: float = MAX_RETRY_BACKOFF):
+        """
+        :param db_path: path to the SQLite database file, created if it does not exist
+        :param max_records: largest number of records kept
+        :param backoff: seconds until a record is retried after its first failure
+        :param max_backoff: longest wait until a record is retried
+        """
+        self._db_path = db_path
+        self._max_records = max_records
+        self._backoff = backoff
+        self._max_backoff = max_backoff
+        create_database(db_path, _SCHEMA)
+
+    def add(self, service: str, resource_type: str, identifier: str, record: Any, error: str) -> None:
+        """
+        Stores a failed record, or counts another failed attempt of an already stored one.
+        :param service: name of the service the record failed in (blaze, miabis-blaze)
+        :param resource_type: phase the record failed in (patients, conditions, specimens)
+        :param identifier: identifier of the record, unique within the resource type
+        :param record: the record, as read from the record files
+        :param error: error the record failed with
+        """
+        try:
+            serialized_record = pickle.dumps(record)
+        except (pickle.PicklingError, TypeError, AttributeError) as e:
+            logger.error(f"Cannot store failed {resource_type} record {identifier}: {e}")
+            return
+        now = time.time()
+        with transaction(self._db_path) as connection:
+            connection.execute("BEGIN IMMEDIATE")
+            row = connection.execute("SELECT attempts FROM failed_records "
+                                     "WHERE service = ? AND resource_type = ? AND identifier = ?",
+                                     (service, resource_type, identifier)).fetchone()
+            attempts = 1 if row is None else row["attempts"] + 1
+            next_attempt_at = now + min(self._backoff * 2 ** (attempts - 1), self._max_backoff)
+            if row is None:
+                connection.execute(
+                    "INSERT INTO failed_records (service, resource_type, identifier, record, error, attempts, "
+                    "first_failed_at, last_failed_at, next_attempt_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (service, resource_type, identifier, serialized_record, error, attempts, now, now,
+                     next_attempt_at))
+            else:
+                connection.execute(
+                    "UPDATE failed_records SET record = ?, error = ?, attempts = ?, last_failed_at = ?, "
+                    "next_attempt_at = ? WHERE service = ? AND resource_type = ? AND identifier = ?",
+                    (serialized_record, error, attempts, now, next_attempt_at, service, resource_type, identifier))
+            dropped = connection.execute(
+                "DELETE FROM failed_records WHERE rowid IN (SELECT rowid FROM failed_records "
+                "ORDER BY last_failed_at DESC LIMIT -1 OFFSET ?)", (self._max_records,)).rowcount
+        if dropped:
+            logger.warning(f"Failed record store is full, dropped {dropped} record(s) failing longest ago.")
+
+    def remove(self, service: str, resource_type: str, identifier: str) -> bool:
+        """
+        Removes a record, e.g. once it was synced.
+        :return: whether the record was stored
+        """
+        with transaction(self._db_path) as connection:
+            return connection.execute("DELETE FROM failed_records "
+                                      "WHERE service = ? AND resource_type = ? AND identifier = ?",
+                                      (service, resource_type, identifier)).rowcount > 0
+
+    def keys(self, service: str) -> set[tuple[str, str]]:
+        """Resource types and identifiers of the stored records of a service."""
+        with transaction(self._db_path) as connection:
+            rows = connection.execute("SELECT resource_type, identifier FROM failed_records WHERE service = ?",
+                                      (service,)).fetchall()
+        return {(row["resource_type"], row["identifier"]) for row in rows}
+
+    def due(self, service: str, ignore_backoff: bool = False) -> list[FailedRecord]:
+        """
+        Records of a service whose backoff has passed, with the records, in the order of the phases.
+        :param service: name of the service
+        :param ignore_backoff: all records of the service, also the ones still backing off
+        """
+        query = "SELECT * FROM failed_records WHERE service = ?"
+        params: tuple = (service,)
+        if not ignore_backoff:
+            query += " AND next_attempt_at <= ?"
+            params += (time.time(),)
+        with transaction(self._db_path) as connection:
+            rows = connection.execute(query + " ORDER BY first_failed_at", params).fetchall()
+        records = []
+        for row in rows:
+            try:
+                records.append(self.__to_record(row, pickle.loads(row["record"])))
+            except Exception as e:
+                logger.error(f"Cannot read failed {row['resource_type']} record {row['identifier']}, "
+                             f"removing it: {e}")
+                self.remove(service, row["resource_type"], row["identifier"])
+        return sorted(records, key=lambda record: self.__phase_rank(record.resource_type))
+
+    def list_records(self, service: str = None, resource_type: str = None, limit: int = 100) -> list[FailedRecord]:
+        """
+        Stored records, without the records themselves, failing most recently first.
+        :param service: only records of this service
+        :param resource_type: only records of this resource type
+        :param limit: maximal number of returned records
+        """
+        conditions = []
+        params: tuple = ()
+        if service is not None:
+            conditions.append("service = ?")
+            params += (service,)
+        if resource_type is not None:
+            conditions.append("resource_type = ?")
+            params += (resource_type,)
+        query = "SELECT service, resource_type, identifier, error, attempts, first_failed_at, last_failed_at, " \
+                "next_attempt_at FROM failed_records"
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        with transaction(self._db_path) as connection:
+            rows = connection.execute(query + " ORDER BY last_failed_at DESC LIMIT ?", params + (limit,)).fetchall()
+        return [self.__to_record(row) for row in rows]
+
+    def count(self, service: str = None) -> dict[str, int]:
+        """Number of stored records by resource type."""
+        query = "SELECT resource_type, COUNT(*) AS records FROM failed_records"
+        params: tuple = ()
+        if service is not None:
+            query += " WHERE service = ?"
+            params = (service,)
+        with transaction(self._db_path) as connection:
+            rows = connection.execute(query + " GROUP BY resource_type", params).fetchall()
+        return {row["resource_type"]: row["records"] for row in rows}
+
+    def clear(self, service: str = None) -> int:
+        """
+        Removes all stored records, or the ones of a service.
+        :return: number of removed records
+        """
+        with transaction(self._db_path) as connection:
+            if service is None:
+                return connection.execute("DELETE FROM failed_records").rowcount
+            return connection.execute("DELETE FROM failed_records WHERE service = ?", (service,)).rowcount
+
+    @staticmethod
+    def __phase_rank(resource_type: str) -> int:
+        return _RESOURCE_TYPE_ORDER.index(resource_type) if resource_type in _RESOURCE_TYPE_ORDER \
+            else len(_RESOURCE_TYPE_ORDER)
+
+    @staticmethod
+    def __to_record(row: sqlite3.Row, record: Any = None) -> FailedRecord:
+        return FailedRecord(service=row["service"], resource_type=row["resource_type"], identifier=row["identifier"],
+                            error=row["error"], attempts=row["attempts"], first_failed_at=row["first_failed_at"],
+                            last_failed_at=row["last_failed_at"], next_attempt_at=row["next_attempt_at"],
+                            record=record)
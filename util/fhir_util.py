@@ -0,0 +1,65 @@
+"""Helpers for comparing, conditionally updating and searching FHIR resources"""
+import hashlib
+import json
+from typing import Iterable, Optional
+
+# Elements maintained by the server (or derived from the content), which do not make two resources different
+_NON_CONTENT_ELEMENTS = ("id", "meta", "text")
+
+
+def canonical_resource_hash(resource_json: dict) -> str:
+    """
+    Hash of the canonical JSON form (sorted keys, no whitespace) of a FHIR resource,
+    ignoring the server maintained elements id, meta and text.
+    :param resource_json: JSON representation of the resource
+    :return: hex digest of the canonical form
+    """
+    content = {key: value for key, value in resource_json.items() if key not in _NON_CONTENT_ELEMENTS}
+    canonical_json = json.dumps(content, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(canonical_json.encode("utf-8")).hexdigest()
+
+
+def has_same_content(resource_json: dict, other_resource_json: dict) -> bool:
+    """Checks if two FHIR resources are equal, ignoring the server maintained elements."""
+    return canonical_resource_hash(resource_json) == canonical_resource_hash(other_resource_json)
+
+
+def get_version_id(resource_json: dict) -> Optional[str]:
+    """Returns meta.versionId of a FHIR resource, or None if the resource is not versioned."""
+    return (resource_json.get("meta") or {}).get("versionId")
+
+
+def if_match_headers(version_id: Optional[str]) -> dict:
+    """Headers for a conditional update of a specific resource version (empty if the version is unknown)."""
+    if version_id is None:
+        return {}
+    return {"If-Match": f'W/"{version_id}"'}
+
+
+def escape_search_value(value: str) -> str:
+    """Escapes the characters with a special meaning in FHIR search parameter values (\\ , | $)."""
+    return value.replace("\\", "\\\\").replace(",", "\\,").replace("|", "\\|").replace("$", "\\$")
+
+
+def any_of_search_values(values: Iterable[str]) -> str:
+    """Search parameter value matching any of the values, e.g. identifier=a,b,c."""
+    return ",".join(escape_search_value(value) for value in values)
+
+
+def next_page_url(bundle: dict, base_url: str) -> Optional[str]:
+    """
+    URL of the next page of a search result, relative to the base url of the FHIR server the search was sent to
+    (the server may link its pages under a different host, e.g. behind a proxy).
+    :param bundle: searchset Bundle of the current page
+    :param base_url: base url of the FHIR server, without a trailing /
+    :return: URL of the next page, None if it is the last page
+    """
+    links = bundle.get("link", [])
+    link_relations = [link.get("relation") for link in links]
+    if "next" not in link_relations:
+        return None
+    url = links[link_relations.index("next")].get("url")
+    url_after_fhir = url.find("/fhir")
+    if url_after_fhir == -1:
+        return None
+    return base_url + url[url_after_fhir + len("/fhir"):]
@@ -1,5 +1,6 @@
 import logging
 import time
+from concurrent.futures import ThreadPoolExecutor
 
 import requests
 
@@ -10,27 +11,70 @@ setup_logger()
 logger = logging.getLogger()
 
 
-def is_endpoint_available(endpoint_url, max_attempts=10, wait_time=60) -> bool:
+def is_endpoint_available(endpoint_url, max_attempts=10, wait_time=60, max_wait_time=None) -> bool:
     """
-    Check for the availability of an http endpoint
+    Check for the availability of an http endpoint, waiting twice as long after each unsuccessful attempt
     :param endpoint_url: URL for the endpoint
     :param max_attempts: max number of attempts for connection retries
-    :param wait_time: seconds in between unsuccessful connection attempts
+    :param wait_time: seconds waited after the first unsuccessful connection attempt
+    :param max_wait_time: longest wait in between unsuccessful connection attempts, no limit if not given
     :return: true if reachable, false otherwise
     """
-    attempts = 0
     logger.info(f"Attempting to reach endpoint: '{endpoint_url}'.")
-    while attempts < max_attempts:
+    for attempt in range(max_attempts):
         try:
             response = requests.get(endpoint_url, verify=True, auth=get_blaze_auth(), proxies={"http": None, "https": None})
             response.raise_for_status()
             logger.info(f"Endpoint '{endpoint_url}' is available.")
             return True
         except requests.exceptions.RequestException:
+            if attempt + 1 == max_attempts:
+                break
+            backoff = wait_time * 2 ** attempt
+            if max_wait_time is not None:
+                backoff = min(backoff, max_wait_time)
             logger.info(
-                f"Attempt {attempts + 1}/{max_attempts} on endpoint {endpoint_url} : Endpoint not available yet. Retrying in {wait_time} seconds.")
-            attempts += 1
-            time.sleep(wait_time)
+                f"Attempt {attempt + 1}/{max_attempts} on endpoint {endpoint_url} : Endpoint not available yet. Retrying in {backoff} seconds.")
+            time.sleep(backoff)
 
     logger.warning(f"Endpoint '{endpoint_url}' was not available after {max_attempts} attempts.")
     return False
+
+
+def are_endpoints_available(endpoint_urls: list[str], **kwargs) -> bool:
+    """
+    Check for the availability of several http endpoints at the same time, so waiting for one of them does not
+    delay the checks of the others
+    :param endpoint_urls: URLs for the endpoints
+    :param kwargs: retry settings of is_endpoint_available
+    :return: true if all are reachable, false otherwise
+    """
+    if not endpoint_urls:
+        return True
+    with ThreadPoolExecutor(max_workers=len(endpoint_urls), thread_name_prefix="endpoint-probe") as executor:
+        return all(list(executor.map(lambda url: is_endpoint_available(url, **kwargs), endpoint_urls)))
+
+
+class RequestCounter:
+    """Response hook of a requests session, counting the HTTP calls made through the session."""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, response, *args, **kwargs):
+        self.count += 1
+        return response
+
+    def reset(self) -> None:
+        self.count = 0
+
+
+def count_requests(session: requests.Session) -> RequestCounter:
+    """
+    Counts the HTTP calls made through a session. Replaces the response hooks of the session.
+    :param session: session to count the calls of
+    :return: the counter registered as the response hook
+    """
+    counter = RequestCounter()
+    session.hooks = {"response": [counter]}
+    return counter
@@ -0,0 +1,44 @@
+"""Module for imports deferred until the imported module is first used"""
+import importlib
+import threading
+from typing import Any, Optional
+
+
+class LazyImport:
+    """Stands in for a module, or an attribute of a module, which is imported only when it is first used, so heavy
+    dependencies needed only by the syncs (e.g. the ICD-10 tables or the asyncio HTTP client) do not slow down
+    the start of the API and the sync worker. Attributes and calls are delegated to the imported object, and
+    the attributes read are cached on the stand-in, so later reads cost the same as on the module itself."""
+
+    def __init__(self, module_name: str, attribute: Optional[str] = None):
+        """
+        :param module_name: absolute name of the module imported
+        :param attribute: attribute of the module standing in for, the module itself if not given
+        """
+        object.__setattr__(self, "_module_name", module_name)
+        object.__setattr__(self, "_attribute", attribute)
+        object.__setattr__(self, "_target", None)
+        object.__setattr__(self, "_lock", threading.Lock())
+
+    def resolve(self) -> Any:
+        """Imports the module, if not imported yet, and returns the object stood in for."""
+        if self._target is None:
+            with self._lock:
+                if self._target is None:
+                    target = importlib.import_module(self._module_name)
+                    if self._attribute is not None:
+                        target = getattr(target, self._attribute)
+                    object.__setattr__(self, "_target", target)
+        return self._target
+
+    def __getattr__(self, name: str) -> Any:
+        value = getattr(self.resolve(), name)
+        object.__setattr__(self, name, value)
+        return value
+
+    def __call__(self, *args, **kwargs) -> Any:
+        return self.resolve()(*args, **kwargs)
+
+    def __repr__(self) -> str:
+        name = self._module_name if self._attribute is None else f"{self._module_name}.{self._attribute}"
+        return f"<lazy import of {name}>"
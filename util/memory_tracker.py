@@ -0,0 +1,154 @@
+"""Module for the memory accounting of the sync phases"""
+import logging
+import os
+import resource
+import sys
+import threading
+import tracemalloc
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from typing import Generator, Optional
+
+from util.custom_logger import setup_logger
+
+setup_logger()
+logger = logging.getLogger()
+
+# Number of allocation sites reported per phase in the tracemalloc mode
+TOP_ALLOCATIONS = 10
+_PROC_STATUS_PATH = "/proc/self/status"
+_PROC_CLEAR_REFS_PATH = "/proc/self/clear_refs"
+# Allocations of the tracing itself and of imports are left out of the allocation sites
+_IGNORED_ALLOCATIONS = (tracemalloc.Filter(False, tracemalloc.__file__),
+                        tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+                        tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+                        tracemalloc.Filter(False, "<unknown>"))
+
+# tracemalloc is process-wide, it is traced as long as any sync (e.g. both syncs of a combined sync) traces it
+_tracing_lock = threading.Lock()
+_tracing_syncs = 0
+
+
+@dataclass
+class PhaseMemory:
+    """Memory used by a phase of a sync. With concurrent syncs (a combined sync), the process-wide values
+    include the memory used by the phases running at the same time."""
+    peak_rss_bytes: Optional[int]
+    python_blocks: int
+    traced_peak_bytes: Optional[int] = None
+    top_allocations: Optional[list[dict]] = None
+
+    def to_dict(self) -> dict:
+        return {key: value for key, value in asdict(self).items() if value is not None}
+
+
+class PhaseMemoryTracker:
+    """Measures the memory of the phases of a sync: the peak resident set size of the process during the phase and
+    the number of memory blocks allocated by Python at its end. In the tracemalloc mode, the allocations are traced,
+    and the peak traced memory and the sites allocating most of the memory still held at the end of the phase are
+    measured too. Tracing slows the sync down, so it is meant for diagnosing memory issues only."""
+
+    def __init__(self, metrics=None, trace_allocations: bool = False, top_allocations: int = TOP_ALLOCATIONS):
+        """
+        :param metrics: metrics service the memory of the phases is reported to
+        :param trace_allocations: trace the allocations with tracemalloc
+        :param top_allocations: number of allocation sites reported per phase
+        """
+        self._metrics = metrics
+        self._trace_allocations = trace_allocations
+        self._top_allocations = top_allocations
+        self._tracing = False
+        self.phases: dict[str, PhaseMemory] = {}
+
+    def start(self) -> None:
+        if self._trace_allocations and not self._tracing:
+            _start_tracing()
+            self._tracing = True
+
+    def stop(self) -> None:
+        if self._tracing:
+            _stop_tracing()
+            self._tracing = False
+
+    @contextmanager
+    def phase(self, name: str) -> Generator[None, None, None]:
+        """Measures the memory of a phase, also of a failed one."""
+        _reset_peak_rss()
+        if self._tracing:
+            tracemalloc.reset_peak()
+        try:
+            yield
+        finally:
+            memory = self.__measure()
+            self.phases[name] = memory
+            logger.debug(f"Memory of sync phase {name}: {memory.to_dict()}")
+            if self._metrics:
+                self._metrics.set_phase_memory(name, memory)
+
+    def summary(self) -> dict:
+        """Memory of the measured phases, by phase name."""
+        return {name: memory.to_dict() for name, memory in self.phases.items()}
+
+    def __measure(self) -> PhaseMemory:
+        memory = PhaseMemory(peak_rss_bytes=_peak_rss_bytes(), python_blocks=sys.getallocatedblocks())
+        if self._tracing:
+            memory.traced_peak_bytes = tracemalloc.get_traced_memory()[1]
+            statistics = tracemalloc.take_snapshot().filter_traces(_IGNORED_ALLOCATIONS).statistics("lineno")
+            memory.top_allocations = [_allocation_site(stat) for stat in statistics[:self._top_allocations]]
+        return memory
+
+
+def _allocation_site(statistic: tracemalloc.Statistic) -> dict:
+    frame = statistic.traceback[0]
+    return {"site": f"{_short_path(frame.filename)}:{frame.lineno}", "size_bytes": statistic.size,
+            "count": statistic.count}
+
+
+def _start_tracing() -> None:
+    global _tracing_syncs
+    with _tracing_lock:
+        if _tracing_syncs == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        _tracing_syncs += 1
+
+
+def _stop_tracing() -> None:
+    global _tracing_syncs
+    with _tracing_lock:
+        _tracing_syncs -= 1
+        if _tracing_syncs == 0:
+            tracemalloc.stop()
+
+
+def _reset_peak_rss() -> None:
+    """Resets the peak resident set size of the process (VmHWM), supported on Linux only."""
+    try:
+        with open(_PROC_CLEAR_REFS_PATH, "w") as clear_refs:
+            clear_refs.write("5")
+    except OSError:
+        pass
+
+
+def _peak_rss_bytes() -> Optional[int]:
+    """Peak resident set size of the process since the last reset, or since its start if it cannot be reset."""
+    try:
+        with open(_PROC_STATUS_PATH) as status:
+            for line in status:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        # kilobytes on Linux, bytes on macOS
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+    except (OSError, ValueError):
+        return None
+
+
+def _short_path(filename: str) -> str:
+    """Path of a source file relative to the import path it was imported from."""
+    for path in sorted((path for path in sys.path if path), key=len, reverse=True):
+        if filename.startswith(path + os.sep):
+            return os.path.relpath(filename, path)
+    return filename
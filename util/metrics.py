@@ -5,8 +5,9 @@ import requests
 import schedule
 import time
 from util.custom_logger import setup_logger
+from util.startup_timer import seconds_since_start
 
-from prometheus_client import Gauge
+from prometheus_client import CollectorRegistry, Counter, Gauge, multiprocess
 
 
 last_sync_timestamp = Gauge('fhir_last_sync_timestamp', 'Timestamp of the last sync', ['service'], multiprocess_mode='liveall')
@@ -17,9 +18,27 @@ sync_progress_current = Gauge('fhir_sync_progress_current', 'Current items proce
 sync_in_progress = Gauge('fhir_sync_in_progress', 'Whether sync is currently running', ['service'], multiprocess_mode='liveall')
 sync_current_phase = Gauge('fhir_sync_current_phase', 'Current sync phase (0=idle, 1=organizations, 2=patients, 3=conditions, 4=specimens)', ['service'], multiprocess_mode='liveall')
 
+# Memory of the sync phases: peak resident set size of the process and Python heap (allocated blocks, and the peak traced bytes with SYNC_TRACEMALLOC)
+sync_phase_peak_rss = Gauge('fhir_sync_phase_peak_rss_bytes', 'Peak resident set size of the process during a sync phase', ['service', 'phase'], multiprocess_mode='liveall')
+sync_phase_python_blocks = Gauge('fhir_sync_phase_python_blocks', 'Memory blocks allocated by Python at the end of a sync phase', ['service', 'phase'], multiprocess_mode='liveall')
+sync_phase_python_heap = Gauge('fhir_sync_phase_python_heap_bytes', 'Peak Python heap traced by tracemalloc during a sync phase', ['service', 'phase'], multiprocess_mode='liveall')
+
+# Outcome of updates of already present resources (applied, skipped, conflict)
+sync_resource_updates = Counter('fhir_sync_resource_updates', 'Updates of already present resources by outcome', ['service', 'resource_type', 'outcome'])
+
+# Lookups of fetched resources in the resource cache of a service (hit, miss)
+resource_cache_lookups = Counter('fhir_resource_cache_lookups', 'Lookups of fetched FHIR resources in the resource cache by outcome', ['service', 'outcome'])
+
 # FHIR resource count metrics
 fhir_resource_count = Gauge('fhir_resource_count', 'Total count of FHIR resources', ['service', 'resource_type'], multiprocess_mode='liveall')
 
+# Load put on the Blaze stores, tuned by the adaptive load controller of the service
+adaptive_batch_size = Gauge('fhir_adaptive_batch_size', 'Number of resources posted in one transaction bundle', ['service'], multiprocess_mode='liveall')
+adaptive_max_in_flight = Gauge('fhir_adaptive_max_in_flight', 'Number of requests sent to the Blaze store at the same time', ['service'], multiprocess_mode='liveall')
+
+# Cold start of the API and the sync worker: seconds spent importing the modules and until the process was ready
+startup_seconds = Gauge('fhir_startup_seconds', 'Seconds the process took to start by stage (imports, ready)', ['process', 'stage'], multiprocess_mode='liveall')
+
 # Metric registry for generic access
 METRIC_REGISTRY = {
     'last_sync_timestamp': last_sync_timestamp,
@@ -27,7 +46,11 @@ METRIC_REGISTRY = {
     'sync_progress_current': sync_progress_current,
     'sync_in_progress': sync_in_progress,
     'sync_current_phase': sync_current_phase,
+    'sync_resource_updates': sync_resource_updates,
+    'resource_cache_lookups': resource_cache_lookups,
     'fhir_resource_count': fhir_resource_count,
+    'adaptive_batch_size': adaptive_batch_size,
+    'adaptive_max_in_flight': adaptive_max_in_flight,
 }
 
 setup_logger()
@@ -59,12 +82,25 @@ class MetricsService:
         except Exception as e:
             logger.error(f"Error setting sync progress: {e}")
     
+    def set_sync_progress_total(self, resource_type: str, total: int) -> None:
+        try:
+            sync_progress_total.labels(service=self.service_name, resource_type=resource_type).set(total)
+        except Exception as e:
+            logger.error(f"Error setting sync progress total: {e}")
+
     def increment_sync_progress(self, resource_type: str) -> None:
         try:
             sync_progress_current.labels(service=self.service_name, resource_type=resource_type).inc()
         except Exception as e:
             logger.error(f"Error incrementing sync progress: {e}")
     
+    def record_update(self, resource_type: str, outcome: str) -> None:
+        """Count an update of an already present resource. outcome is one of applied, skipped, conflict."""
+        try:
+            sync_resource_updates.labels(service=self.service_name, resource_type=resource_type, outcome=outcome).inc()
+        except Exception as e:
+            logger.error(f"Error recording resource update: {e}")
+
     def reset_sync_progress(self) -> None:
         try:
             resource_types = ['organizations', 'patients', 'conditions', 'specimens', 'biobank', 'collections']
@@ -98,6 +134,17 @@ class MetricsService:
         except Exception as e:
             logger.error(f"Error setting sync phase: {e}")
 
+    def set_phase_memory(self, phase: str, memory) -> None:
+        """Report the memory of a finished sync phase, a PhaseMemory of util.memory_tracker."""
+        try:
+            if memory.peak_rss_bytes is not None:
+                sync_phase_peak_rss.labels(service=self.service_name, phase=phase).set(memory.peak_rss_bytes)
+            sync_phase_python_blocks.labels(service=self.service_name, phase=phase).set(memory.python_blocks)
+            if memory.traced_peak_bytes is not None:
+                sync_phase_python_heap.labels(service=self.service_name, phase=phase).set(memory.traced_peak_bytes)
+        except Exception as e:
+            logger.error(f"Error setting sync phase memory: {e}")
+
     def __check_metric_exists(self, metric_name: str) -> bool:
         if metric_name not in METRIC_REGISTRY:
             logger.error(f"Metric {metric_name} not found")
@@ -111,9 +158,22 @@ def get_metrics_for_service(service_name: str) -> MetricsService:
     return MetricsService(service_name)
 
 
+def record_startup_stage(process: str, stage: str) -> float:
+    """
+    Reports the seconds the process took to reach a stage of its start (imports, ready), as a log line and a metric.
+    :param process: process starting (api, worker)
+    :param stage: stage reached
+    :return: the seconds since the start of the process
+    """
+    seconds = seconds_since_start()
+    startup_seconds.labels(process=process, stage=stage).set(seconds)
+    logger.info(f"Startup of {process}: {stage} after {seconds:.3f} s.")
+    return seconds
+
+
 def update_fhir_resource_counts(blaze_url: str = None, miabis_blaze_url: str = None):
     """Update FHIR resource count metrics by querying the Blaze servers."""
-    from distutils.util import strtobool
+    from util.config import strtobool
     miabis_on_fhir = bool(strtobool(os.environ.get("MIABIS_ON_FHIR", "False")))
 
     blaze_url = blaze_url or os.environ.get("BLAZE_URL", "http://test-blaze:8080/fhir")
@@ -169,21 +229,36 @@ def start_resource_count_scheduler(interval_seconds: int = 30):
     logger.info(f"Started FHIR resource count scheduler (every {interval_seconds}s)")
 
 
-def _find_metric_value_for_service(metric_gauge, service_name: str, default_value=0, value_type=int):
-    """Find and return a metric value for a specific service."""
-    for sample in metric_gauge.collect()[0].samples:
-        if sample.labels.get('service') == service_name:
-            return value_type(sample.value)
-    return default_value
+def _collect_gauge_samples(*metric_gauges) -> dict:
+    """
+    Collect samples of gauges by metric name. In multiprocess mode the samples are read from all processes
+    (the sync runs in the sync worker process, not in the API process), one sample per process.
+    """
+    names = [metric_gauge.describe()[0].name for metric_gauge in metric_gauges]
+    if not os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        return {name: metric_gauge.collect()[0].samples for name, metric_gauge in zip(names, metric_gauges)}
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    samples = {name: [] for name in names}
+    for metric in registry.collect():
+        if metric.name in samples:
+            samples[metric.name] = metric.samples
+    return samples
+
+
+def _find_metric_value_for_service(samples: list, service_name: str, default_value=0, value_type=int):
+    """Find and return a metric value for a specific service (the highest one, if reported by several processes)."""
+    values = [sample.value for sample in samples if sample.labels.get('service') == service_name]
+    return value_type(max(values)) if values else default_value
 
 
-def _collect_resource_metrics_by_type(metric_gauge, service_name: str) -> dict:
+def _collect_resource_metrics_by_type(samples: list, service_name: str) -> dict:
     """Collect resource metrics grouped by resource type."""
     resource_data = {}
-    for sample in metric_gauge.collect()[0].samples:
+    for sample in samples:
         if sample.labels.get('service') == service_name:
             resource_type = sample.labels.get('resource_type')
-            resource_data[resource_type] = int(sample.value)
+            resource_data[resource_type] = max(int(sample.value), resource_data.get(resource_type, 0))
     return resource_data
 
 
@@ -223,18 +298,20 @@ def _create_error_response(error_message: str) -> dict:
 def get_sync_progress(service_name: str) -> dict:
     """Get current sync progress for a service."""
     try:
+        samples = _collect_gauge_samples(sync_in_progress, sync_current_phase,
+                                         sync_progress_total, sync_progress_current)
         in_progress = _find_metric_value_for_service(
-            sync_in_progress, service_name, default_value=False, value_type=bool
+            samples['fhir_sync_in_progress'], service_name, default_value=False, value_type=bool
         )
         current_phase = _find_metric_value_for_service(
-            sync_current_phase, service_name, default_value=0, value_type=int
+            samples['fhir_sync_current_phase'], service_name, default_value=0, value_type=int
         )
         
         resource_totals = _collect_resource_metrics_by_type(
-            sync_progress_total, service_name
+            samples['fhir_sync_progress_total'], service_name
         )
         resource_currents = _collect_resource_metrics_by_type(
-            sync_progress_current, service_name
+            samples['fhir_sync_progress_current'], service_name
         )
         
         resources = _build_resource_progress(resource_totals, resource_currents)
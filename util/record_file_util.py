@@ -0,0 +1,47 @@
+"""Module for recognizing and opening record files, which may be compressed with gzip (or zstd)"""
+import gzip
+import os
+from typing import IO
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Extensions of the record files which may be compressed, parquet files are compressed internally
+COMPRESSIBLE_EXTENSIONS = (".csv", ".json", ".xml")
+# Suffixes of the compressed record files, zstd files are read only if the zstandard package is installed
+COMPRESSION_SUFFIXES = (".gz", ".zst") if zstandard is not None else (".gz",)
+
+
+def is_record_file(file_name: str, extension: str) -> bool:
+    """
+    Checks if a file is a record file of the given type, either plain or compressed (e.g. records.csv.gz).
+    :param file_name: name of the file
+    :param extension: extension of the record files, with the leading dot (e.g. .csv)
+    """
+    file_name = file_name.lower()
+    extension = extension.lower()
+    if file_name.endswith(extension):
+        return True
+    if extension not in COMPRESSIBLE_EXTENSIONS:
+        return False
+    return any(file_name.endswith(extension + suffix) for suffix in COMPRESSION_SUFFIXES)
+
+
+def open_record_file(path: str | os.PathLike, mode: str = "r", encoding: str = None) -> IO:
+    """
+    Opens a record file, decompressing it on the fly if it is compressed. The file is decompressed in a stream,
+    it is never decompressed as a whole, neither on disk nor in memory.
+    :param path: path to the file (or its DirEntry)
+    :param mode: "r" for text, "rb" for bytes
+    :param encoding: encoding of the text, not used for bytes
+    """
+    path = os.fspath(path)
+    binary = "b" in mode
+    lower_path = path.lower()
+    if lower_path.endswith(".gz"):
+        return gzip.open(path, "rb" if binary else "rt", encoding=None if binary else encoding)
+    if lower_path.endswith(".zst") and zstandard is not None:
+        return zstandard.open(path, "rb" if binary else "rt", encoding=None if binary else encoding)
+    return open(path, mode, encoding=encoding)
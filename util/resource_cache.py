@@ -0,0 +1,142 @@
+"""Module for a short-lived cache of FHIR resources fetched from a Blaze store"""
+import logging
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Generator, Optional
+
+from util.custom_logger import setup_logger
+from util.fhir_util import get_version_id
+from util.metrics import resource_cache_lookups
+
+setup_logger()
+logger = logging.getLogger()
+
+# Maximal number of resources (versions) held by the cache, the least recently used ones are evicted first
+MAX_CACHED_RESOURCES = 1000
+
+
+class ResourceCache:
+    """Cache of fetched FHIR resources, keyed by their resource type, logical id and version, and of the logical ids
+    found by identifier searches. The resources are cached only within a scope (e.g. a single inspection request or a phase of a sync), the cache is emptied when
+    the outermost scope ends, so it never serves resources fetched before the current scope started.
+    Lookups are counted by outcome (hit, miss) and exported as a Prometheus counter."""
+
+    def __init__(self, service_name: str, max_resources: int = MAX_CACHED_RESOURCES):
+        """
+        :param service_name: name of the service the lookups are counted for (blaze, miabis-blaze)
+        :param max_resources: maximal number of cached resources
+        """
+        self._service_name = service_name
+        self._max_resources = max_resources
+        self._lock = threading.Lock()
+        self._resources: OrderedDict[tuple[str, str, Optional[str]], dict] = OrderedDict()
+        self._latest_versions: dict[tuple[str, str], Optional[str]] = {}
+        self._fhir_ids: OrderedDict[tuple[str, str], str] = OrderedDict()
+        self._scope_depth = 0
+        self.hits = 0
+        self.misses = 0
+
+    @contextmanager
+    def scope(self) -> Generator[None, None, None]:
+        """Caches the resources fetched until the scope ends. Scopes may be nested."""
+        with self._lock:
+            self._scope_depth += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._scope_depth -= 1
+                if self._scope_depth == 0:
+                    self._resources.clear()
+                    self._latest_versions.clear()
+                    self._fhir_ids.clear()
+
+    def put(self, resource: dict) -> None:
+        """Caches a fetched resource, if a scope is active. A newer version replaces the older one as the latest."""
+        resource_type = resource.get("resourceType")
+        fhir_id = resource.get("id")
+        if resource_type is None or fhir_id is None:
+            return
+        version_id = get_version_id(resource)
+        with self._lock:
+            if self._scope_depth == 0:
+                return
+            key = (resource_type, fhir_id, version_id)
+            self._resources[key] = resource
+            self._resources.move_to_end(key)
+            self._latest_versions[(resource_type, fhir_id)] = version_id
+            while len(self._resources) > self._max_resources:
+                (evicted_type, evicted_id, evicted_version), _ = self._resources.popitem(last=False)
+                evicted_resource = (evicted_type, evicted_id)
+                if evicted_resource in self._latest_versions \
+                        and self._latest_versions[evicted_resource] == evicted_version:
+                    del self._latest_versions[evicted_resource]
+
+    def get(self, resource_type: str, fhir_id: str, version_id: str = None) -> Optional[dict]:
+        """
+        :param resource_type: type of the resource
+        :param fhir_id: logical id of the resource
+        :param version_id: version of the resource, the latest cached version if not given
+        :return: the cached resource, None if it is not cached or no scope is active
+        """
+        with self._lock:
+            if self._scope_depth == 0:
+                return None
+            if version_id is None:
+                version_id = self._latest_versions.get((resource_type, fhir_id))
+            resource = self._resources.get((resource_type, fhir_id, version_id))
+            if resource is not None:
+                self._resources.move_to_end((resource_type, fhir_id, version_id))
+                self.hits += 1
+            else:
+                self.misses += 1
+        self.__record_lookup("hit" if resource is not None else "miss")
+        return resource
+
+    def put_fhir_id(self, resource_type: str, identifier: str, fhir_id: str) -> None:
+        """Caches the logical id of the resource found by its identifier, if a scope is active."""
+        with self._lock:
+            if self._scope_depth == 0:
+                return
+            self._fhir_ids[(resource_type, identifier)] = fhir_id
+            self._fhir_ids.move_to_end((resource_type, identifier))
+            while len(self._fhir_ids) > self._max_resources:
+                self._fhir_ids.popitem(last=False)
+
+    def get_fhir_id(self, resource_type: str, identifier: str) -> Optional[str]:
+        """
+        :return: logical id of the resource with the identifier, None if it is not cached or no scope is active
+        """
+        with self._lock:
+            if self._scope_depth == 0:
+                return None
+            fhir_id = self._fhir_ids.get((resource_type, identifier))
+            if fhir_id is not None:
+                self.hits += 1
+            else:
+                self.misses += 1
+        self.__record_lookup("hit" if fhir_id is not None else "miss")
+        return fhir_id
+
+    def invalidate(self, resource_type: str, fhir_id: str) -> None:
+        """Drops all cached versions of a resource, e.g. after it was updated or deleted."""
+        with self._lock:
+            self._latest_versions.pop((resource_type, fhir_id), None)
+            for key in [key for key, cached_id in self._fhir_ids.items() if key[0] == resource_type
+                        and cached_id == fhir_id]:
+                del self._fhir_ids[key]
+            for key in [key for key in self._resources if key[:2] == (resource_type, fhir_id)]:
+                del self._resources[key]
+
+    @property
+    def hit_rate(self) -> float:
+        """Share of the lookups served from the cache."""
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def __record_lookup(self, outcome: str) -> None:
+        try:
+            resource_cache_lookups.labels(service=self._service_name, outcome=outcome).inc()
+        except Exception as e:
+            logger.error(f"Error recording resource cache lookup: {e}")
@@ -0,0 +1,124 @@
+"""Module for the sampling profiler of the syncs, based on the stacks of the running threads"""
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from types import FrameType
+from typing import Callable, Optional
+
+# Seconds between two samples of the thread stacks
+SAMPLE_INTERVAL = 0.01
+# Seconds between two checks whether the profiling was stopped from outside
+STOP_CHECK_INTERVAL = 1.0
+# Number of functions listed in the top functions of a profile
+TOP_FUNCTIONS = 30
+
+
+@dataclass
+class SamplingProfile:
+    """Samples of the thread stacks taken during a profiled run, as collapsed stacks (root first, ';' separated)
+    with the number of samples they were seen in."""
+    interval: float
+    samples: int = 0
+    duration: float = 0.0
+    stacks: Counter = field(default_factory=Counter)
+
+    def collapsed(self) -> str:
+        """Collapsed stack lines ("frame;frame;frame count"), the input of flamegraph.pl and speedscope."""
+        return "".join(f"{stack} {count}\n" for stack, count in sorted(self.stacks.items()))
+
+    def top_functions(self, limit: int = TOP_FUNCTIONS) -> dict[str, list[dict]]:
+        """
+        Functions with the most samples. Self time counts the samples a function was running in, cumulative
+        time the samples it was on the stack in, counted once per sample even if it recursed.
+        :param limit: number of functions listed
+        """
+        self_samples: Counter = Counter()
+        cumulative_samples: Counter = Counter()
+        for stack, count in self.stacks.items():
+            frames = stack.split(";")[1:]
+            if not frames:
+                continue
+            self_samples[frames[-1]] += count
+            for frame in set(frames):
+                cumulative_samples[frame] += count
+        return {"self": self.__ranked(self_samples, limit), "cumulative": self.__ranked(cumulative_samples, limit)}
+
+    def to_dict(self, limit: int = TOP_FUNCTIONS) -> dict:
+        return {"interval": self.interval, "samples": self.samples, "duration": self.duration,
+                "top_functions": self.top_functions(limit)}
+
+    def __ranked(self, samples: Counter, limit: int) -> list[dict]:
+        return [{"function": function, "samples": count, "seconds": round(count * self.interval, 3),
+                 "percent": round(100 * count / self.samples, 1) if self.samples else 0.0}
+                for function, count in samples.most_common(limit)]
+
+
+class SamplingProfiler:
+    """Sampling profiler of a run, e.g. of a sync. A daemon thread takes the stacks of the profiled threads at a fixed
+    interval, so the profiled code is not slowed down by tracing its calls. The profiled threads are the thread which
+    started the profiler and every thread started after it, e.g. the threads of the executors of the sync; threads
+    which were already idling in the background are left out. Nothing runs unless a profiler was started."""
+
+    def __init__(self, interval: float = SAMPLE_INTERVAL, should_stop: Callable[[], bool] = None,
+                 stop_check_interval: float = STOP_CHECK_INTERVAL):
+        """
+        :param interval: seconds between two samples
+        :param should_stop: checked every stop_check_interval, the sampling stops once it returns True
+        :param stop_check_interval: seconds between two calls of should_stop
+        """
+        self._interval = interval
+        self._should_stop = should_stop
+        self._stop_check_interval = stop_check_interval
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._excluded_threads: set[int] = set()
+        self._profile = SamplingProfile(interval)
+        self._started_at = 0.0
+
+    def start(self) -> "SamplingProfiler":
+        self._excluded_threads = {thread.ident for thread in threading.enumerate()} - {threading.get_ident()}
+        self._started_at = time.perf_counter()
+        self._thread = threading.Thread(target=self.__sample, daemon=True, name="sampling-profiler")
+        self._thread.start()
+        return self
+
+    def stop(self) -> SamplingProfile:
+        """Stops the sampling, if not stopped yet, and returns the profile."""
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+        return self._profile
+
+    def __enter__(self) -> "SamplingProfiler":
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.stop()
+
+    def __sample(self) -> None:
+        excluded_threads = self._excluded_threads | {threading.get_ident()}
+        next_stop_check = time.perf_counter() + self._stop_check_interval
+        while not self._stopped.wait(self._interval):
+            thread_names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id not in excluded_threads:
+                    self._profile.stacks[self.__collapse(thread_names.get(thread_id, str(thread_id)), frame)] += 1
+            self._profile.samples += 1
+            self._profile.duration = time.perf_counter() - self._started_at
+            if self._should_stop is not None and time.perf_counter() >= next_stop_check:
+                next_stop_check = time.perf_counter() + self._stop_check_interval
+                if self._should_stop():
+                    return
+
+    @staticmethod
+    def __collapse(thread_name: str, frame: Optional[FrameType]) -> str:
+        frames = []
+        while frame is not None:
+            code = frame.f_code
+            frames.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+            frame = frame.f_back
+        frames.append(thread_name.replace(";", ":"))
+        return ";".join(reversed(frames))
@@ -1,8 +1,10 @@
 from dataclasses import dataclass
 import logging
+from typing import Optional
 
 from exception.wrong_parsing_map import WrongParsingMapException
 from persistence.factories.factory_util import get_repository_factory
+from persistence.factories.repository_factory import RepositoryFactory
 from persistence.sample_collection_repository import SampleCollectionRepository
 from persistence.biobank_repository import BiobankRepository
 from service.patient_service import PatientService
@@ -17,6 +19,7 @@ class ServiceBundle:
     condition_service: ConditionService
     sample_service: SampleService
     sample_collection_repository: SampleCollectionRepository
+    repository_factory: Optional[RepositoryFactory] = None
 
 
 @dataclass
@@ -27,15 +30,18 @@ class MiabisServiceBundle:
     biobank_repository: BiobankRepository
 
 
-def prepare_services() -> ServiceBundle:
+def prepare_services(repository_factory: RepositoryFactory = None) -> ServiceBundle:
     """
     Prepare services for standard FHIR operations.
-    
+
+    Args:
+        repository_factory: factory of the repositories, a new one is created if not given
+
     Returns:
         ServiceBundle: Bundle with services, or None values if parsing map is unavailable
     """
     try:
-        repository_factory = get_repository_factory()
+        repository_factory = repository_factory or get_repository_factory()
         
         patient_service = PatientService(repository_factory.create_sample_donor_repository())
         condition_service = ConditionService(repository_factory.create_condition_repository())
@@ -46,7 +52,8 @@ def prepare_services() -> ServiceBundle:
             patient_service=patient_service,
             condition_service=condition_service,
             sample_service=sample_service,
-            sample_collection_repository=sample_collection_repository
+            sample_collection_repository=sample_collection_repository,
+            repository_factory=repository_factory
         )
     except WrongParsingMapException as e:
         logger.warning(f"Services not ready due to parsing map error: {e}")
@@ -58,15 +65,18 @@ def prepare_services() -> ServiceBundle:
         )
 
 
-def prepare_services_miabis() -> MiabisServiceBundle:
+def prepare_services_miabis(repository_factory: RepositoryFactory = None) -> MiabisServiceBundle:
     """
     Prepare services for MIABIS on FHIR operations.
-    
+
+    Args:
+        repository_factory: factory of the repositories, a new one is created if not given
+
     Returns:
         MiabisServiceBundle: Bundle with services, or None values if parsing map is unavailable
     """
     try:
-        repository_factory = get_repository_factory()
+        repository_factory = repository_factory or get_repository_factory()
         
         patient_service = PatientService(repository_factory.create_sample_donor_repository(True))
         sample_service = SampleService(repository_factory.create_sample_repository(True))
@@ -86,4 +96,16 @@ def prepare_services_miabis() -> MiabisServiceBundle:
             sample_service=None,
             sample_collection_repository=None,
             biobank_repository=None
-        )
\ No newline at end of file
+        )
+
+
+def prepare_shared_services() -> tuple[ServiceBundle, MiabisServiceBundle, RepositoryFactory]:
+    """
+    Prepare services for standard FHIR and MIABIS on FHIR operations, which share one repository factory,
+    so that the records are parsed once for both of them.
+
+    Returns:
+        tuple: standard and MIABIS service bundles, and the shared repository factory
+    """
+    repository_factory = get_repository_factory()
+    return prepare_services(repository_factory), prepare_services_miabis(repository_factory), repository_factory
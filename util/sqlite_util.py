@@ -0,0 +1,37 @@
+"""Helpers for the local SQLite databases shared between the API and the sync worker process"""
+import os
+import sqlite3
+from contextlib import closing, contextmanager
+from typing import Generator
+
+# Seconds a connection waits for a lock held by the other process
+BUSY_TIMEOUT = 30
+
+
+def create_database(db_path: str, *schemas: str) -> None:
+    """
+    Creates the database file and its directory if they do not exist, and the tables of the schemas.
+    The database is switched to write-ahead logging, so its readers do not block the writer.
+    :param db_path: path to the SQLite database file
+    :param schemas: CREATE TABLE IF NOT EXISTS statements of the tables
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+    with transaction(db_path) as connection:
+        connection.execute("PRAGMA journal_mode=WAL")
+        for schema in schemas:
+            connection.execute(schema)
+
+
+@contextmanager
+def transaction(db_path: str) -> Generator[sqlite3.Connection, None, None]:
+    """Connection for a single transaction, committed on success and rolled back on error."""
+    with closing(sqlite3.connect(db_path, timeout=BUSY_TIMEOUT, isolation_level=None)) as connection:
+        connection.row_factory = sqlite3.Row
+        try:
+            yield connection
+            if connection.in_transaction:
+                connection.execute("COMMIT")
+        except Exception:
+            if connection.in_transaction:
+                connection.execute("ROLLBACK")
+            raise
@@ -0,0 +1,10 @@
+"""Module timing the start of the API and the sync worker. Imported first by them, so the time of their other
+imports is counted too."""
+import time
+
+STARTED = time.perf_counter()
+
+
+def seconds_since_start() -> float:
+    """Seconds since the process started importing its modules."""
+    return time.perf_counter() - STARTED
@@ -0,0 +1,12 @@
+import sys
+from typing import Optional
+
+
+def intern_value(value: Optional[str]) -> Optional[str]:
+    """
+    Interns a string repeated across many records (material type, collection id, ICD-10 code...),
+    so the buffered records share one copy of it. Values which are not strings are returned unchanged.
+    """
+    if type(value) is str:
+        return sys.intern(value)
+    return value
@@ -0,0 +1,183 @@
+"""Module for persisting the progress of a sync, so an interrupted sync can be resumed"""
+import hashlib
+import json
+import logging
+import os
+from typing import Generator, Iterable, Optional
+
+from persistence.records_catalog import get_records_catalog
+from util.custom_logger import setup_logger
+
+setup_logger()
+logger = logging.getLogger()
+
+# Number of processed records after which the checkpoint is written
+CHECKPOINT_INTERVAL = 100
+
+
+def fingerprint_records_dir(records_dir_path: str) -> str:
+    """
+    Fingerprint of the records directory (names, sizes and modification times of its files).
+    A checkpoint is only valid for the same set of unchanged files, so the catalog is rescanned first,
+    a change it has not noticed yet would otherwise resume a sync on the changed files.
+    :param records_dir_path: path to the directory with records
+    :return: hex digest of the directory listing
+    """
+    digest = hashlib.sha256()
+    catalog = get_records_catalog(records_dir_path)
+    try:
+        catalog.refresh(full_rescan=True)
+        files = [(entry.name, entry.stat().st_size, entry.stat().st_mtime_ns) for entry in catalog.files()]
+    except OSError:
+        files = []
+    for name, size, mtime in files:
+        digest.update(f"{name}:{size}:{mtime};".encode("utf-8"))
+    return digest.hexdigest()
+
+
+class SyncCheckpoint:
+    """Progress of a sync persisted in a JSON file. Phases are processed in order, the checkpoint holds the phase
+    which is currently synced, the number of its records which were already committed to the Blaze store,
+    and the summaries of the phases which were already finished."""
+
+    def __init__(self, checkpoint_path: str, records_fingerprint: str, interval: int = CHECKPOINT_INTERVAL):
+        """
+        :param checkpoint_path: path to the JSON file holding the checkpoint
+        :param records_fingerprint: fingerprint of the records the sync is run on
+        :param interval: number of processed records after which the checkpoint is written
+        """
+        self._checkpoint_path = checkpoint_path
+        self._records_fingerprint = records_fingerprint
+        self._interval = interval
+        self._phase = 0
+        self._offset = 0
+        self._summaries: dict[str, dict] = {}
+
+    @property
+    def phase(self) -> int:
+        return self._phase
+
+    @property
+    def offset(self) -> int:
+        return self._offset
+
+    def load(self) -> bool:
+        """
+        Loads the stored checkpoint.
+        :return: True if a checkpoint for the same records was found, False otherwise.
+        """
+        try:
+            with open(self._checkpoint_path, "r") as checkpoint_file:
+                state = json.load(checkpoint_file)
+        except FileNotFoundError:
+            return False
+        except (OSError, ValueError) as e:
+            logger.warning(f"Cannot read sync checkpoint {self._checkpoint_path}: {e}")
+            return False
+        if state.get("records_fingerprint") != self._records_fingerprint:
+            logger.info("Records changed since the last checkpoint was written, the checkpoint is not used.")
+            return False
+        self._phase = state.get("phase", 0)
+        self._offset = state.get("offset", 0)
+        self._summaries = state.get("summaries", {})
+        return True
+
+    def is_phase_finished(self, phase: int) -> bool:
+        return phase < self._phase
+
+    def get_summary(self, resource_type: str) -> Optional[dict]:
+        """Summary of an already finished phase."""
+        return self._summaries.get(resource_type)
+
+    def start_phase(self, phase: int) -> int:
+        """
+        Moves the checkpoint to a phase.
+        :return: number of records of the phase which were already committed
+        """
+        if phase != self._phase:
+            self._phase = phase
+            self._offset = 0
+            self.save()
+        return self._offset
+
+    def finish_phase(self, phase: int, resource_type: str, summary: dict) -> None:
+        self._summaries[resource_type] = summary
+        self._phase = phase + 1
+        self._offset = 0
+        self.save()
+
+    def track(self, records: Iterable, on_skipped=None) -> Generator:
+        """
+        Yields records of the current phase, skipping the ones which were already committed. A record counts
+        as committed once the next record is requested, the checkpoint is written every interval records.
+        :param records: records of the current phase
+        :param on_skipped: called for every record skipped because of the checkpoint
+        """
+        already_committed = self._offset
+        for index, record in enumerate(records):
+            if index < already_committed:
+                if on_skipped is not None:
+                    on_skipped()
+                continue
+            yield record
+            self.__commit(index + 1)
+
+    def track_windows(self, records: Iterable, size: int, on_skipped=None) -> Generator[list, None, None]:
+        """
+        Yields records of the current phase in windows of up to size records, skipping the ones which were
+        already committed. A window counts as committed once the next window is requested.
+        :param records: records of the current phase
+        :param size: maximal number of records in a window
+        :param on_skipped: called for every record skipped because of the checkpoint
+        """
+        already_committed = self._offset
+        window = []
+        index = -1
+        for index, record in enumerate(records):
+            if index < already_committed:
+                if on_skipped is not None:
+                    on_skipped()
+                continue
+            window.append(record)
+            if len(window) >= size:
+                yield window
+                window = []
+                self.__commit(index + 1)
+        if window:
+            yield window
+            self.__commit(index + 1)
+
+    def __commit(self, offset: int) -> None:
+        """Advances the checkpoint, it is written whenever another interval of records is committed."""
+        previous_offset = self._offset
+        self._offset = offset
+        if offset // self._interval > previous_offset // self._interval:
+            self.save()
+
+    def save(self) -> None:
+        state = {
+            "records_fingerprint": self._records_fingerprint,
+            "phase": self._phase,
+            "offset": self._offset,
+            "summaries": self._summaries,
+        }
+        tmp_path = f"{self._checkpoint_path}.tmp"
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(self._checkpoint_path)), exist_ok=True)
+            with open(tmp_path, "w") as checkpoint_file:
+                json.dump(state, checkpoint_file)
+            os.replace(tmp_path, self._checkpoint_path)
+        except OSError as e:
+            logger.error(f"Cannot write sync checkpoint {self._checkpoint_path}: {e}")
+
+    def clear(self) -> None:
+        """Removes the stored checkpoint, the next sync starts from the beginning."""
+        self._phase = 0
+        self._offset = 0
+        self._summaries = {}
+        try:
+            os.remove(self._checkpoint_path)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logger.error(f"Cannot remove sync checkpoint {self._checkpoint_path}: {e}")
@@ -4,8 +4,10 @@ import os
 
 from exception.no_files_provided import NoFilesProvidedException
 from exception.nonexistent_attribute_parsing_map import NonexistentAttributeParsingMapException
+from persistence.records_catalog import list_record_files
 from util.custom_logger import setup_logger
-from validation.validator import Validator, MAX_FILES_TO_SCAN
+from util.record_file_util import open_record_file
+from validation.validator import Validator
 
 setup_logger()
 logger = logging.getLogger()
@@ -17,18 +19,14 @@ class CsvValidator(Validator):
     def __init__(self, parsing_map: dict, records_path: str, separator: str):
         super().__init__(parsing_map, records_path)
         self._separator = separator
+        self._properties = None
+        # headers (as sets of their fields) already validated, files with the same header are not checked again
+        self._validated_headers: set[frozenset[str]] = set()
 
     def _validate_files_present(self, file_type: str) -> bool:
         """this method validates if files with correct format are provided inside the specified directory. """
-        dir_entry: os.DirEntry
-        files_scanned = 0
-        
-        for dir_entry in os.scandir(self._dir_path):
-            if dir_entry.name.lower().endswith("." + file_type):
-                return True
-            files_scanned += 1
-            if files_scanned > MAX_FILES_TO_SCAN:
-                break
+        if list_record_files(self._dir_path, "." + file_type):
+            return True
 
         error_message = "No CSV files are provided for data transformation. Please check that you provided correct directory in ROOT_DIR variable."
         logger.error(error_message)
@@ -37,14 +35,22 @@ class CsvValidator(Validator):
     def _validate_single_file(self, file: os.DirEntry) -> bool:
         """Validates if the fields in header of the csv file
         correspond to the name/value pairs provided in parsing map"""
-        with open(file, "r") as file_content:
+        with open_record_file(file, "r") as file_content:
             reader = csv.reader(file_content, delimiter=self._separator)
             fields = next(reader)
-            return self._validate_file_attributes(fields, self._get_properties())
+        header_signature = frozenset(fields)
+        if header_signature in self._validated_headers:
+            return True
+        self._validate_file_attributes(fields, self._get_properties())
+        self._validated_headers.add(header_signature)
+        return True
 
     def _get_properties(self) -> list[str]:
-        """method that extracts all the necessary attributes  in the form of name of the properties of this class."""
-        return [attr for attr in dir(self) if attr.startswith(("_donor", "_sample", "_condition"))]
+        """method that extracts all the necessary attributes  in the form of name of the properties of this class.
+        The attributes are looked up once per validator."""
+        if self._properties is None:
+            self._properties = [attr for attr in dir(self) if attr.startswith(("_donor", "_sample", "_condition"))]
+        return self._properties
 
     def _validate_file_attributes(self, fields: list[str], properties: list[str]) -> bool:
         """Validates that all the values defined by parsing_map are present in the header of the csv file."""
@@ -67,6 +73,7 @@ class CsvValidator(Validator):
         return True
 
     def validate(self) -> bool:
+        self._validated_headers.clear()
         super()._validate_donor_map()
         super()._validate_sample_map()
         super()._validate_condition_map()
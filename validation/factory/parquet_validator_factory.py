@@ -0,0 +1,9 @@
+from util.config import get_parsing_map, get_records_dir_path
+from validation.factory.validator_factory import ValidatorFactory
+from validation.parquet_validator import ParquetValidator
+from validation.validator import Validator
+
+
+class ParquetValidatorFactory(ValidatorFactory):
+    def create_validator(self) -> Validator:
+        return ParquetValidator(get_parsing_map(), get_records_dir_path())
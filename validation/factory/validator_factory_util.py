@@ -11,5 +11,8 @@ def get_validator_factory() -> ValidatorFactory:
             return CsvValidatorFactory()
         case "xml":
             return XMLValidatorFactory()
+        case "parquet":
+            from validation.factory.parquet_validator_factory import ParquetValidatorFactory
+            return ParquetValidatorFactory()
         case _:
             raise WrongRecordsFileTypeException("RECORDS_FILE_TYPE environment variable has unsupported file type.")
\ No newline at end of file
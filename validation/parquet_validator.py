@@ -0,0 +1,41 @@
+import logging
+import os
+
+import pyarrow.parquet as pq
+
+from exception.no_files_provided import NoFilesProvidedException
+from persistence.records_catalog import list_record_files
+from util.custom_logger import setup_logger
+from validation.csv_validator import CsvValidator
+
+setup_logger()
+logger = logging.getLogger()
+
+
+class ParquetValidator(CsvValidator):
+    """Concrete implementation of Validator abstract class. Handles the validation of Parquet files,
+    which use the same parsing map as CSV files. Only the schema of the files is read."""
+
+    def __init__(self, parsing_map: dict, records_path: str):
+        super().__init__(parsing_map, records_path, separator=None)
+
+    def _validate_files_present(self, file_type: str) -> bool:
+        """this method validates if files with correct format are provided inside the specified directory. """
+        if list_record_files(self._dir_path, "." + file_type):
+            return True
+
+        error_message = "No Parquet files are provided for data transformation. Please check that you provided correct directory in ROOT_DIR variable."
+        logger.error(error_message)
+        raise NoFilesProvidedException(error_message)
+
+    def _validate_single_file(self, file: os.DirEntry) -> bool:
+        """Validates if the columns in the schema of the Parquet file
+        correspond to the name/value pairs provided in parsing map"""
+        fields = pq.read_schema(file.path).names
+        return self._validate_file_attributes(fields, self._get_properties())
+
+    def validate(self) -> bool:
+        super()._validate_donor_map()
+        super()._validate_sample_map()
+        super()._validate_condition_map()
+        return self._validate_files_structure("parquet")
@@ -2,14 +2,15 @@ import logging
 import os
 import sys
 
-from glom import glom, PathAccessError
+from glom import glom, GlomError, PathAccessError
 
 from exception.no_files_provided import NoFilesProvidedException
 from exception.nonexistent_attribute_parsing_map import NonexistentAttributeParsingMapException
 from exception.wrong_parsing_map import WrongParsingMapException
-from persistence.xml_util import parse_xml_file
+from persistence.records_catalog import list_record_files
+from persistence.xml_util import parse_xml_prefix
 from util.custom_logger import setup_logger
-from validation.validator import Validator, MAX_FILES_TO_SCAN
+from validation.validator import Validator
 
 setup_logger()
 logger = logging.getLogger()
@@ -21,51 +22,67 @@ class XMLValidator(Validator):
     def __init__(self, parsing_map: dict, records_dir: str):
         super().__init__(parsing_map, records_dir)
         self._sample = None
+        self._probed_properties = None
 
     def _validate_files_present(self, file_type: str) -> bool:
         """this method validates if files with correct format are provided inside the specified directory. """
-        dir_entry: os.DirEntry
-        files_scanned = 0
-        
-        for dir_entry in os.scandir(self._dir_path):
-            if dir_entry.name.lower().endswith("." + file_type):
-                return True
-            files_scanned += 1
-            if files_scanned > MAX_FILES_TO_SCAN:
-                break
-                
+        if list_record_files(self._dir_path, "." + file_type):
+            return True
+
         error_message = "No XML files are provided for data transformation. Please check that you provided correct directory in RECORDS_DIR_PATH variable."
         logger.error(error_message)
         raise NoFilesProvidedException(error_message)
 
     def _validate_single_file(self, file: os.DirEntry) -> bool:
-        """Validates presence of xml tags which names are specified in the provided parsing_map"""
-        file_content = parse_xml_file(file)
-        donor_and_condition_properties = [attr for attr in dir(self) if
-                                          attr.startswith(("_donor", "_condition"))]
+        """Validates presence of xml tags which names are specified in the provided parsing_map.
+        The file is read only until all the tags are found, usually just its first sample."""
+        file_content = parse_xml_prefix(file, self._resolves_all_paths)
 
         return self._validate_file_attributes(file_content,
-                                              donor_and_condition_properties) and self._validate_sample_attributes(
+                                              self._get_probed_properties()) and self._validate_sample_attributes(
             file_content)
 
-    def _validate_sample_attributes(self, file_content: dict) -> bool:
+    def _get_probed_properties(self) -> list[str]:
+        """Names of the properties holding the donor and condition paths, looked up once per validator."""
+        if self._probed_properties is None:
+            self._probed_properties = [attr for attr in dir(self) if attr.startswith(("_donor", "_condition"))]
+        return self._probed_properties
+
+    def _resolves_all_paths(self, file_content: dict) -> bool:
+        """Checks, without reporting any error, if all the paths of the parsing map resolve in the part
+        of the file read so far."""
+        try:
+            for prop in self._get_probed_properties():
+                glom(file_content, getattr(self, prop))
+            self._probe_first_sample(file_content)
+        except GlomError:
+            return False
+        return True
+
+    def _probe_first_sample(self, file_content: dict) -> None:
+        """Resolves the sample_map paths of the first sample.
+        :raises PathAccessError: if a path does not resolve"""
         for parsing_path in str(self._sample).split(" || "):
-            try:
-                for xml_sample in self.flatten_list(glom(file_content, parsing_path)):
-                    glom(xml_sample, self._sample_id)
-                    glom(xml_sample, self._sample_diagnosis)
-                    glom(xml_sample, self._sample_material_type)
-                    # Break because we only need to test one sample
-                    break
-            except PathAccessError:
-                error_message = "Provided parsing map contains the necessary name/value pairs, however,"
-                error_message += " values from sample_map dont have corresponding values in the xml file."
-                logger.error(error_message)
-                raise NonexistentAttributeParsingMapException({
-                    "concept": "sample",
-                    "error_message": error_message
-                })
-            return True
+            for xml_sample in self.flatten_list(glom(file_content, parsing_path)):
+                glom(xml_sample, self._sample_id)
+                glom(xml_sample, self._sample_diagnosis)
+                glom(xml_sample, self._sample_material_type)
+                # Break because we only need to test one sample
+                break
+            return
+
+    def _validate_sample_attributes(self, file_content: dict) -> bool:
+        try:
+            self._probe_first_sample(file_content)
+        except PathAccessError:
+            error_message = "Provided parsing map contains the necessary name/value pairs, however,"
+            error_message += " values from sample_map dont have corresponding values in the xml file."
+            logger.error(error_message)
+            raise NonexistentAttributeParsingMapException({
+                "concept": "sample",
+                "error_message": error_message
+            })
+        return True
 
     def _validate_file_attributes(self, file_content: dict, properties: list[str]):
         """Validates that all the values defined by parsing_map are present as a xml tags."""
@@ -0,0 +1,134 @@
+"""Sync worker module, runs the syncs, schedulers and jobs queued by the API in a process of its own"""
+from util import startup_timer  # noqa: F401, first import, so the start is timed from here
+import atexit
+import logging
+import os
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from prometheus_client import multiprocess
+
+from service.blaze_service import BlazeService
+from service.combined_sync_service import CombinedSyncService
+from service.mail_service import MailService
+from service.miabis_blaze_service import MiabisBlazeService
+from service.records_watcher import RecordsWatcher
+from service.sync_job_queue import SyncJobQueue
+from service.sync_worker import SyncWorker
+from util.config import get_blaze_url, get_miabis_on_fhir, get_miabis_blaze_url, get_new_file_period_days, \
+    get_records_dir_path, get_records_file_type, get_email_receiver, get_smtp_host, get_smtp_port, \
+    get_sync_job_queue_path, get_sync_history_max, get_shared_ingest, get_file_triggered_sync, \
+    get_file_sync_debounce_seconds
+from util.custom_logger import setup_logger
+from util.http_util import are_endpoints_available
+from util.service_preparation_utils import prepare_services, prepare_services_miabis
+from util.metrics import record_startup_stage, start_resource_count_scheduler, sync_in_progress
+
+BLAZE_URL = get_blaze_url()
+MIABIS_BLAZE_URL = get_miabis_blaze_url()
+MIABIS_ON_FHIR = get_miabis_on_fhir()
+SHARED_INGEST = get_shared_ingest()
+
+if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+    # values of live gauges written by this process are removed once it exits
+    atexit.register(multiprocess.mark_process_dead, os.getpid())
+
+sync_in_progress.labels(service='blaze').set(0)
+if MIABIS_ON_FHIR:
+    sync_in_progress.labels(service='miabis').set(0)
+
+setup_logger()
+logger = logging.getLogger(__name__)
+logger.info("Starting FHIR_Module sync worker...")
+record_startup_stage("worker", "imports")
+
+# The Blaze stores are probed at the same time, in the background while the services are prepared,
+# retrying after 1, 2, 4, ... up to 30 seconds
+endpoint_probe_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="endpoint-probe")
+endpoints_available = endpoint_probe_executor.submit(
+    are_endpoints_available, [BLAZE_URL] + ([MIABIS_BLAZE_URL] if MIABIS_ON_FHIR else []),
+    max_attempts=7, wait_time=1, max_wait_time=30)
+endpoint_probe_executor.shutdown(wait=False)
+
+# Prepare standard FHIR services
+services = prepare_services()
+blaze_service = BlazeService(
+    patient_service=services.patient_service,
+    condition_service=services.condition_service,
+    sample_service=services.sample_service,
+    blaze_url=BLAZE_URL,
+    sample_collection_repository=services.sample_collection_repository
+)
+blaze_services_initialized = services.patient_service is not None
+
+if blaze_services_initialized:
+    logger.info("Standard FHIR services initialized successfully.")
+else:
+    logger.warning("Standard FHIR services not initialized: parsing map configuration is missing or invalid.")
+    logger.info("Sync worker will keep running. Services will retry initialization on next sync.")
+
+# Prepare MIABIS services if enabled
+miabis_blaze_service = None
+miabis_services_initialized = False
+if MIABIS_ON_FHIR:
+    miabis_services = prepare_services_miabis()
+    miabis_blaze_service = MiabisBlazeService(
+        patient_service=miabis_services.patient_service,
+        sample_service=miabis_services.sample_service,
+        blaze_url=MIABIS_BLAZE_URL,
+        sample_collection_repository=miabis_services.sample_collection_repository,
+        biobank_repository=miabis_services.biobank_repository
+    )
+    miabis_services_initialized = miabis_services.patient_service is not None
+
+    if miabis_services_initialized:
+        logger.info("MIABIS services initialized successfully.")
+    else:
+        logger.warning("MIABIS services not initialized: parsing map configuration is missing or invalid.")
+        logger.info("Sync worker will keep running. Services will retry initialization on next sync.")
+
+mail_service = MailService(records_path=get_records_dir_path(), new_file_period=get_new_file_period_days(),
+                           smtp_host=get_smtp_host(), smtp_port=get_smtp_port(), email_receiver=get_email_receiver(),
+                           records_file_type=get_records_file_type())
+
+if not endpoints_available.result():
+    logger.error("Exiting FHIR_Module sync worker.")
+    sys.exit()
+
+worker_services = {'blaze': blaze_service}
+if miabis_blaze_service is not None:
+    worker_services['miabis-blaze'] = miabis_blaze_service
+    worker_services['combined'] = CombinedSyncService(blaze_service, miabis_blaze_service)
+sync_job_queue = SyncJobQueue(get_sync_job_queue_path(), get_sync_history_max())
+sync_worker = SyncWorker(sync_job_queue, worker_services)
+
+# Scheduled syncs are queued like the manual ones, so they are coalesced with them and kept in the run history
+miabis_scheduled = MIABIS_ON_FHIR and miabis_services_initialized and miabis_blaze_service is not None
+scheduled_services = []
+if SHARED_INGEST and blaze_services_initialized and miabis_scheduled:
+    logger.info("Shared ingest enabled, standard and MIABIS syncs are run as one combined sync.")
+    scheduled_services.append('combined')
+else:
+    if blaze_services_initialized:
+        scheduled_services.append('blaze')
+    if miabis_scheduled:
+        scheduled_services.append('miabis-blaze')
+for scheduled_service in scheduled_services:
+    sync_worker.schedule_weekly_sync(scheduled_service)
+
+# New or modified record files are synced shortly after they are dropped, by syncs of only those files
+if get_file_triggered_sync() and scheduled_services:
+    records_watcher = RecordsWatcher(sync_job_queue, scheduled_services, get_records_dir_path(),
+                                     get_records_file_type(), get_file_sync_debounce_seconds())
+    records_watcher_thread = threading.Thread(target=records_watcher.run_forever, daemon=True, name="records-watcher")
+    records_watcher_thread.start()
+
+# Start periodic FHIR resource count updates for Prometheus
+start_resource_count_scheduler(interval_seconds=30)
+
+scheduler_mail_thread = threading.Thread(target=mail_service.run_scheduler, daemon=True)
+scheduler_mail_thread.start()
+
+record_startup_stage("worker", "ready")
+sync_worker.run_forever()